@@ -67,6 +67,14 @@ class BatchBeamSearch(BeamSearch):
             },
         )
 
+    def hyp_scores(self, hyps: BatchHypothesis) -> torch.Tensor:
+        """Get the total scores of hypotheses."""
+        return hyps.score
+
+    def select_hyps(self, hyps: BatchHypothesis, ids: List[int]) -> BatchHypothesis:
+        """Select hypotheses by their indices."""
+        return self._batch_select(hyps, ids)
+
     def unbatchfy(self, batch_hyps: BatchHypothesis) -> List[Hypothesis]:
         """Revert batch to list."""
         return [
@@ -154,7 +162,8 @@ class BatchBeamSearch(BeamSearch):
         scores = dict()
         states = dict()
         for k, d in self.full_scorers.items():
-            scores[k], states[k] = d.batch_score(hyp.yseq, hyp.states[k], x)
+            with self.measure(k, len(hyp)):
+                scores[k], states[k] = d.batch_score(hyp.yseq, hyp.states[k], x)
         return scores, states
 
     def score_partial(
@@ -178,9 +187,10 @@ class BatchBeamSearch(BeamSearch):
         scores = dict()
         states = dict()
         for k, d in self.part_scorers.items():
-            scores[k], states[k] = d.batch_score_partial(
-                hyp.yseq, ids, hyp.states[k], x
-            )
+            with self.measure(k, len(hyp)):
+                scores[k], states[k] = d.batch_score_partial(
+                    hyp.yseq, ids, hyp.states[k], x
+                )
         return scores, states
 
     def merge_states(self, states: Any, part_states: Any, part_idx: int) -> Any:
@@ -231,7 +241,10 @@ class BatchBeamSearch(BeamSearch):
                 if self.pre_beam_score_key == "full"
                 else scores[self.pre_beam_score_key]
             )
-            part_ids = torch.topk(pre_beam_scores, self.pre_beam_size, dim=-1)[1]
+            with self.measure("pre_beam", n_batch):
+                part_ids = torch.topk(pre_beam_scores, self.pre_beam_size, dim=-1)[1]
+            if self.profiler is not None:
+                self.profiler.add_pre_beam(part_ids.size(1))
         # NOTE(takaaki-hori): Unlike BeamSearch, we assume that score_partial returns
         # full-size score matrices, which has non-zero scores for part_ids and zeros
         # for others.
@@ -243,45 +256,83 @@ class BatchBeamSearch(BeamSearch):
             dtype=x.dtype, device=x.device
         ).unsqueeze(1)
 
-        # TODO(karita): do not use list. use batch instead
-        # see also https://github.com/espnet/espnet/pull/1402#discussion_r354561029
-        # update hyps
-        best_hyps = []
-        prev_hyps = self.unbatchfy(running_hyps)
-        for (
-            full_prev_hyp_id,
-            full_new_token_id,
-            part_prev_hyp_id,
-            part_new_token_id,
-        ) in zip(*self.batch_beam(weighted_scores, part_ids)):
-            prev_hyp = prev_hyps[full_prev_hyp_id]
-            best_hyps.append(
-                Hypothesis(
-                    score=weighted_scores[full_prev_hyp_id, full_new_token_id],
-                    yseq=self.append_token(prev_hyp.yseq, full_new_token_id),
-                    scores=self.merge_scores(
-                        prev_hyp.scores,
-                        {k: v[full_prev_hyp_id] for k, v in scores.items()},
-                        full_new_token_id,
-                        {k: v[part_prev_hyp_id] for k, v in part_scores.items()},
-                        part_new_token_id,
-                    ),
-                    states=self.merge_states(
-                        {
-                            k: self.full_scorers[k].select_state(v, full_prev_hyp_id)
-                            for k, v in states.items()
-                        },
-                        {
-                            k: self.part_scorers[k].select_state(
-                                v, part_prev_hyp_id, part_new_token_id
-                            )
-                            for k, v in part_states.items()
-                        },
-                        part_new_token_id,
-                    ),
-                )
+        with self.measure("extend", n_batch):
+            return self.batch_extend(
+                running_hyps,
+                weighted_scores,
+                self.batch_beam(weighted_scores, part_ids),
+                scores,
+                states,
+                part_scores,
+                part_states,
             )
-        return self.batchfy(best_hyps)
+
+    def batch_extend(
+        self,
+        running_hyps: BatchHypothesis,
+        weighted_scores: torch.Tensor,
+        beam_ids: Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor],
+        scores: Dict[str, torch.Tensor],
+        states: Dict[str, Any],
+        part_scores: Dict[str, torch.Tensor],
+        part_states: Dict[str, Any],
+    ) -> BatchHypothesis:
+        """Extend the running hypotheses with the selected tokens.
+
+        The new hypotheses are built with batched tensor operations
+        without converting them to the list of `Hypothesis`,
+        which are materialized only for the ended hypotheses in `post_process`.
+
+        Args:
+            running_hyps (BatchHypothesis): Running hypotheses on beam
+            weighted_scores (torch.Tensor): The weighted sum scores for each tokens.
+                Its shape is `(n_batch, self.n_vocab)`.
+            beam_ids (Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]):
+                The full (prev_hyp, new_token) ids and partial (prev_hyp, new_token)
+                ids from `batch_beam`.
+            scores (Dict[str, torch.Tensor]): The scores by `self.full_scorers`
+            states (Dict[str, Any]): The states by `self.full_scorers`
+            part_scores (Dict[str, torch.Tensor]): The scores by `self.part_scorers`
+            part_states (Dict[str, Any]): The states by `self.part_scorers`
+
+        Returns:
+            BatchHypothesis: Best sorted hypotheses
+
+        """
+        prev_ids, new_ids, part_prev_ids, part_new_ids = beam_ids
+        prev_list = prev_ids.tolist()
+        part_prev_list = part_prev_ids.tolist()
+        part_new_list = part_new_ids.tolist()
+        yseq = running_hyps.yseq.to(prev_ids.device)
+        # tokens are appended to all the hypotheses having the same length
+        yseq = torch.cat((yseq[prev_ids], new_ids.to(yseq.dtype).unsqueeze(1)), dim=1)
+        new_scores = dict()
+        for k, v in scores.items():
+            prev_scores = running_hyps.scores[k].to(v.device)[prev_ids]
+            new_scores[k] = prev_scores + v[prev_ids, new_ids]
+        for k, v in part_scores.items():
+            prev_scores = running_hyps.scores[k].to(v.device)[prev_ids]
+            new_scores[k] = prev_scores + v[part_prev_ids, part_new_ids]
+        return BatchHypothesis(
+            yseq=yseq,
+            score=weighted_scores[prev_ids, new_ids],
+            length=running_hyps.length[prev_list] + 1,
+            scores=new_scores,
+            states=self.merge_states(
+                {
+                    k: [self.full_scorers[k].select_state(v, i) for i in prev_list]
+                    for k, v in states.items()
+                },
+                {
+                    k: [
+                        self.part_scorers[k].select_state(v, i, j)
+                        for i, j in zip(part_prev_list, part_new_list)
+                    ]
+                    for k, v in part_states.items()
+                },
+                part_new_ids,
+            ),
+        )
 
     def post_process(
         self,
@@ -344,5 +395,7 @@ class BatchBeamSearch(BeamSearch):
         for b in torch.nonzero(is_eos, as_tuple=False).view(-1):
             hyp = self._select(running_hyps, b)
             ended_hyps.append(hyp)
+        if not bool(is_eos.any()):
+            return running_hyps
         remained_ids = torch.nonzero(is_eos == 0, as_tuple=False).view(-1)
         return self._batch_select(running_hyps, remained_ids)
@@ -0,0 +1,432 @@
+"""Parallel beam search module for multiple utterances."""
+
+import logging
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Union
+
+import torch
+
+from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.batch_beam_search import BatchHypothesis
+from espnet.nets.beam_search import Hypothesis
+from espnet.nets.e2e_asr_common import end_detect
+
+
+class BatchBeamSearchMultiUtt(BatchBeamSearch):
+    """Batch beam search implementation for multiple utterances.
+
+    The hypotheses of all the utterances are kept in one `BatchHypothesis`
+    of `(n_utt * beam_size)` rows, which are ordered utterance by utterance,
+    so that every scorer is called once per step for the whole batch.
+    The ended, pruned and finished hypotheses are not removed from the batch
+    but disabled by `-inf` scores so that each utterance keeps the same number
+    of rows in `batch_beam_multi`. Only the other rows are given to the scorers
+    with the utterance index of each row, which refers to the padded features
+    of its utterance.
+
+    """
+
+    def init_hyp_multi(self, x: torch.Tensor, x_lens: torch.Tensor) -> BatchHypothesis:
+        """Get initial hypotheses of multiple utterances.
+
+        Args:
+            x (torch.Tensor): The padded encoder output feature (n_utt, T, D)
+            x_lens (torch.Tensor): The lengths of the encoder output feature (n_utt,)
+
+        Returns:
+            BatchHypothesis: The initial hypotheses, one for each utterance.
+
+        """
+        init_states = dict()
+        for k, d in self.scorers.items():
+            init_states[k] = d.batch_init_state_padded(x, x_lens)
+        return self.batchfy(
+            [
+                Hypothesis(
+                    score=0.0,
+                    scores={k: 0.0 for k in self.scorers},
+                    states={k: v[b] for k, v in init_states.items()},
+                    yseq=torch.tensor([self.sos], device=x.device),
+                )
+                for b in range(len(x))
+            ]
+        )
+
+    def score_full_multi(
+        self,
+        hyp: BatchHypothesis,
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        utt_ids: torch.Tensor,
+    ) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+        """Score new hypotheses by `self.full_scorers` with padded features.
+
+        Args:
+            hyp (BatchHypothesis): Hypotheses with prefix tokens to score
+            xs (torch.Tensor): Padded input feature of each utterance
+            xs_lens (torch.Tensor): Input feature lengths of each utterance
+            utt_ids (torch.Tensor): Utterance index of each hypothesis
+
+        Returns:
+            Tuple[Dict[str, torch.Tensor], Dict[str, Any]]: Tuple of
+                score dict of `hyp` that has string keys of `self.full_scorers`
+                and tensor score values of shape: `(n_batch, self.n_vocab)`,
+                and state dict that has string keys
+                and state values of `self.full_scorers`
+
+        """
+        scores = dict()
+        states = dict()
+        for k, d in self.full_scorers.items():
+            with self.measure(k, len(hyp)):
+                scores[k], states[k] = d.batch_score_padded(
+                    hyp.yseq, hyp.states[k], xs, xs_lens, utt_ids
+                )
+        return scores, states
+
+    def score_partial_multi(
+        self,
+        hyp: BatchHypothesis,
+        ids: torch.Tensor,
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        utt_ids: torch.Tensor,
+    ) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+        """Score new hypotheses by `self.part_scorers` with padded features.
+
+        Args:
+            hyp (BatchHypothesis): Hypotheses with prefix tokens to score
+            ids (torch.Tensor): 2D tensor of new partial tokens to score
+            xs (torch.Tensor): Padded input feature of each utterance
+            xs_lens (torch.Tensor): Input feature lengths of each utterance
+            utt_ids (torch.Tensor): Utterance index of each hypothesis
+
+        Returns:
+            Tuple[Dict[str, torch.Tensor], Dict[str, Any]]: Tuple of
+                score dict of `hyp` that has string keys of `self.part_scorers`
+                and tensor score values of shape: `(n_batch, self.n_vocab)`,
+                and state dict that has string keys
+                and state values of `self.part_scorers`
+
+        """
+        scores = dict()
+        states = dict()
+        for k, d in self.part_scorers.items():
+            with self.measure(k, len(hyp)):
+                scores[k], states[k] = d.batch_score_partial_padded(
+                    hyp.yseq, ids, hyp.states[k], xs, xs_lens, utt_ids
+                )
+        return scores, states
+
+    def batch_beam_multi(
+        self, weighted_scores: torch.Tensor, n_utt: int
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Batch-compute topk full token ids for each utterance.
+
+        Args:
+            weighted_scores (torch.Tensor): The weighted sum scores for each tokens.
+                Its shape is `(n_utt * n_hyps, self.vocab_size)`.
+            n_utt (int): The number of utterances.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+                The topk full (prev_hyp, new_token) ids
+                and partial (prev_hyp, new_token) ids.
+                Their shapes are all `(n_utt * self.beam_size,)`
+
+        """
+        n_hyps = weighted_scores.size(0) // n_utt
+        top_ids = weighted_scores.view(n_utt, -1).topk(self.beam_size, dim=1)[1]
+        # offsets of the first hypothesis of each utterance
+        offsets = torch.arange(n_utt, device=top_ids.device).unsqueeze(1) * n_hyps
+        prev_hyp_ids = (top_ids // self.n_vocab + offsets).view(-1)
+        new_token_ids = (top_ids % self.n_vocab).view(-1)
+        return prev_hyp_ids, new_token_ids, prev_hyp_ids, new_token_ids
+
+    def search_multi(
+        self,
+        running_hyps: BatchHypothesis,
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        n_utt: int,
+    ) -> BatchHypothesis:
+        """Search new tokens for running hypotheses of multiple utterances.
+
+        Args:
+            running_hyps (BatchHypothesis): Running hypotheses on beam
+            xs (torch.Tensor): Padded encoded speech feature (n_utt, T, D)
+            xs_lens (torch.Tensor): Encoded speech lengths (n_utt,)
+            n_utt (int): The number of utterances
+
+        Returns:
+            BatchHypothesis: Best hypotheses of `(n_utt * self.beam_size)` rows
+
+        """
+        n_batch = len(running_hyps)
+        utt_ids = torch.arange(n_utt, device=xs.device).repeat_interleave(
+            n_batch // n_utt
+        )
+        # only the running rows are scored, and the disabled rows,
+        # e.g., pruned, ended or finished ones, are skipped
+        is_alive = torch.isfinite(running_hyps.score).cpu()
+        if bool(is_alive.all()):
+            alive_ids = None
+            hyps = running_hyps
+        else:
+            alive_ids = torch.nonzero(is_alive).view(-1)
+            hyps = self._batch_select(running_hyps, alive_ids.tolist())
+            alive_ids = alive_ids.to(xs.device)
+            utt_ids = utt_ids[alive_ids]
+        n_alive = len(hyps)
+        part_ids = None  # no pre-beam
+        # batch scoring
+        weighted_scores = torch.zeros(
+            n_alive, self.n_vocab, dtype=xs.dtype, device=xs.device
+        )
+        scores, states = self.score_full_multi(hyps, xs, xs_lens, utt_ids)
+        for k in self.full_scorers:
+            weighted_scores += self.weights[k] * scores[k]
+        # partial scoring
+        if self.do_pre_beam:
+            pre_beam_scores = (
+                weighted_scores
+                if self.pre_beam_score_key == "full"
+                else scores[self.pre_beam_score_key]
+            )
+            with self.measure("pre_beam", n_alive):
+                part_ids = torch.topk(pre_beam_scores, self.pre_beam_size, dim=-1)[1]
+            if self.profiler is not None:
+                self.profiler.add_pre_beam(part_ids.size(1))
+        part_scores, part_states = self.score_partial_multi(
+            hyps, part_ids, xs, xs_lens, utt_ids
+        )
+        for k in self.part_scorers:
+            weighted_scores += self.weights[k] * part_scores[k]
+        # add previous hyp scores
+        weighted_scores += hyps.score.to(dtype=xs.dtype, device=xs.device).unsqueeze(1)
+
+        with self.measure("extend", n_batch):
+            if alive_ids is None:
+                return self.batch_extend(
+                    hyps,
+                    weighted_scores,
+                    self.batch_beam_multi(weighted_scores, n_utt),
+                    scores,
+                    states,
+                    part_scores,
+                    part_states,
+                )
+            # select the best tokens from all the rows, where the disabled rows
+            # have `-inf` scores, and extend the scored rows selected by them
+            all_scores = torch.full(
+                (n_batch, self.n_vocab),
+                float("-inf"),
+                dtype=xs.dtype,
+                device=xs.device,
+            )
+            all_scores[alive_ids] = weighted_scores
+            prev_ids, new_ids, _, _ = self.batch_beam_multi(all_scores, n_utt)
+            new_scores = all_scores[prev_ids, new_ids]
+            # the rows selected from the disabled rows are filled by any scored row
+            # and disabled again by their `-inf` scores
+            alive_index = torch.zeros(n_batch, dtype=torch.long, device=xs.device)
+            alive_index[alive_ids] = torch.arange(n_alive, device=xs.device)
+            prev_ids = alive_index[prev_ids]
+            best = self.batch_extend(
+                hyps,
+                weighted_scores,
+                (prev_ids, new_ids, prev_ids, new_ids),
+                scores,
+                states,
+                part_scores,
+                part_states,
+            )
+            return BatchHypothesis(
+                yseq=best.yseq,
+                score=new_scores,
+                length=best.length,
+                scores=best.scores,
+                states=best.states,
+            )
+
+    def post_process_multi(
+        self,
+        i: int,
+        maxlens: List[int],
+        maxlenratio: float,
+        running_hyps: BatchHypothesis,
+        ended_hyps: List[List[Hypothesis]],
+        finished: List[bool],
+    ) -> BatchHypothesis:
+        """Perform post-processing of beam search iterations for each utterance.
+
+        Args:
+            i (int): The length of hypothesis tokens.
+            maxlens (List[int]): The maximum length of tokens of each utterance.
+            maxlenratio (int): The maximum length ratio in beam search.
+            running_hyps (BatchHypothesis): The running hypotheses in beam search.
+            ended_hyps (List[List[Hypothesis]]):
+                The ended hypotheses of each utterance.
+                The newly ended hypotheses are appended to it.
+            finished (List[bool]): Whether the search of each utterance is finished.
+                It is updated in place.
+
+        Returns:
+            BatchHypothesis: The new running hypotheses,
+                whose ended or finished hypotheses are disabled by `-inf` scores.
+
+        """
+        n_utt = len(maxlens)
+        n_batch = len(running_hyps)
+        n_hyps = n_batch // n_utt
+        is_eos = (
+            running_hyps.yseq[torch.arange(n_batch), running_hyps.length - 1]
+            == self.eos
+        ).cpu()
+        is_alive = torch.isfinite(running_hyps.score).cpu()
+        is_disabled = is_eos.clone()
+        do_prune = self.beam_threshold is not None or self.dynamic_beam_mass is not None
+        if do_prune or self.early_stop:
+            scores = running_hyps.score.cpu()
+        for b in range(n_utt):
+            rows = range(b * n_hyps, (b + 1) * n_hyps)
+            if finished[b]:
+                is_disabled[rows] = True
+                continue
+            # add eos in the final loop to avoid that there are no ended hyps
+            last_loop = i == maxlens[b] - 1
+            for j in rows:
+                if not is_alive[j]:
+                    continue
+                if last_loop:
+                    hyp = self._select(running_hyps, j)
+                    ended_hyps[b].append(
+                        hyp._replace(yseq=self.append_token(hyp.yseq, self.eos))
+                    )
+                elif is_eos[j]:
+                    ended_hyps[b].append(self._select(running_hyps, j))
+            is_running = is_alive[rows] & ~is_eos[rows]
+            if (
+                last_loop
+                or not bool(is_running.any())
+                or (
+                    maxlenratio == 0.0
+                    and end_detect([h.asdict() for h in ended_hyps[b]], i)
+                )
+                or (
+                    self.early_stop
+                    and len(ended_hyps[b]) > 0
+                    and float(scores[rows][is_running].max())
+                    < max(float(h.score) for h in ended_hyps[b])
+                )
+            ):
+                logging.debug(f"utterance {b}: search finished at {i}")
+                finished[b] = True
+                is_disabled[rows] = True
+            elif do_prune:
+                running_ids = torch.tensor(rows)[is_running]
+                keep = self.prune_mask(scores[running_ids])
+                is_disabled[running_ids[~keep]] = True
+        # NOTE: do not fill in-place because the ended hyps refer to the scores
+        return BatchHypothesis(
+            yseq=running_hyps.yseq,
+            score=running_hyps.score.masked_fill(
+                is_disabled.to(running_hyps.score.device), float("-inf")
+            ),
+            length=running_hyps.length,
+            scores=running_hyps.scores,
+            states=running_hyps.states,
+        )
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        maxlenratio: float = 0.0,
+        minlenratio: float = 0.0,
+        x_lens: torch.Tensor = None,
+    ) -> Union[List[Hypothesis], List[List[Hypothesis]]]:
+        """Perform beam search for multiple utterances.
+
+        Args:
+            x (torch.Tensor): Padded encoded speech feature (n_utt, T, D).
+                If `x_lens` is None, it is a single utterance (T, D)
+                and decoded as in `BatchBeamSearch`.
+            maxlenratio (float): Input length ratio to obtain max output length.
+                If maxlenratio=0.0 (default), it uses a end-detect function
+                to automatically find maximum hypothesis lengths
+                If maxlenratio<0.0, its absolute value is interpreted
+                as a constant max output length.
+            minlenratio (float): Input length ratio to obtain min output length.
+            x_lens (torch.Tensor): Lengths of the encoded speech feature (n_utt,)
+
+        Returns:
+            list[list[Hypothesis]]: N-best decoding results of each utterance
+
+        """
+        if x_lens is None:
+            return super().forward(x, maxlenratio, minlenratio)
+
+        n_utt = x.size(0)
+        x_lens = torch.as_tensor(x_lens).to(device=x.device)
+        # set length bounds for each utterance
+        maxlens = []
+        for length in x_lens.tolist():
+            if maxlenratio == 0:
+                maxlens.append(length)
+            elif maxlenratio < 0:
+                maxlens.append(-1 * int(maxlenratio))
+            else:
+                maxlens.append(max(1, int(maxlenratio * length)))
+        logging.info("decoder input lengths: " + str(x_lens.tolist()))
+        logging.info("max output lengths: " + str(maxlens))
+
+        # main loop of prefix search
+        if self.profiler is not None:
+            self.profiler.reset()
+        running_hyps = self.init_hyp_multi(x, x_lens)
+        ended_hyps = [[] for _ in range(n_utt)]
+        finished = [maxlen <= 0 for maxlen in maxlens]
+        for i in range(max(maxlens)):
+            logging.debug("position " + str(i))
+            if self.profiler is not None:
+                # the disabled hypotheses are not counted as they are not scored
+                n_running = int(torch.isfinite(running_hyps.score).sum())
+                self.profiler.start_step(i, n_running)
+            best = self.search_multi(running_hyps, x, x_lens, n_utt)
+            with self.measure("post_process", len(best)):
+                running_hyps = self.post_process_multi(
+                    i, maxlens, maxlenratio, best, ended_hyps, finished
+                )
+            if self.profiler is not None:
+                self.profiler.end_step()
+            if all(finished):
+                logging.info(f"all utterances are finished at {i}")
+                break
+
+        results = []
+        for b in range(n_utt):
+            nbest_hyps = sorted(ended_hyps[b], key=lambda x: x.score, reverse=True)
+            # check the number of hypotheses reaching to eos
+            if len(nbest_hyps) == 0:
+                logging.warning(
+                    f"there is no N-best results for utterance {b}, "
+                    "perform recognition again with smaller minlenratio."
+                )
+                nbest_hyps = (
+                    []
+                    if minlenratio < 0.1 or x_lens[b] == 0
+                    else super().forward(
+                        x[b, : x_lens[b]], maxlenratio, max(0.0, minlenratio - 0.1)
+                    )
+                )
+            elif self.token_list is not None:
+                best = nbest_hyps[0]
+                logging.info(
+                    f"best hypo of utterance {b}: "
+                    + "".join([self.token_list[x] for x in best.yseq[1:-1]])
+                )
+            results.append(nbest_hyps)
+        return results
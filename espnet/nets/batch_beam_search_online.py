@@ -92,9 +92,11 @@ class BatchBeamSearchOnline(BatchBeamSearch):
                 self.running_hyps.states["decoder"] = [
                     None for _ in self.running_hyps.states["decoder"]
                 ]
-                scores[k], states[k] = d.batch_score(temp_yseq, hyp.states[k], x)
+                with self.measure(k, len(hyp)):
+                    scores[k], states[k] = d.batch_score(temp_yseq, hyp.states[k], x)
             else:
-                scores[k], states[k] = d.batch_score(hyp.yseq, hyp.states[k], x)
+                with self.measure(k, len(hyp)):
+                    scores[k], states[k] = d.batch_score(hyp.yseq, hyp.states[k], x)
         return scores, states
 
     def forward(
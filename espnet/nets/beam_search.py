@@ -1,16 +1,19 @@
 """Beam search module."""
 
+from contextlib import nullcontext
 from itertools import chain
 import logging
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import NamedTuple
+from typing import Optional
 from typing import Tuple
 from typing import Union
 
 import torch
 
+from espnet.nets.beam_search_profiler import BeamSearchProfiler
 from espnet.nets.e2e_asr_common import end_detect
 from espnet.nets.scorer_interface import PartialScorerInterface
 from espnet.nets.scorer_interface import ScorerInterface
@@ -47,6 +50,10 @@ class BeamSearch(torch.nn.Module):
         token_list: List[str] = None,
         pre_beam_ratio: float = 1.5,
         pre_beam_score_key: str = None,
+        beam_threshold: Optional[float] = None,
+        dynamic_beam_mass: Optional[float] = None,
+        min_beam_size: int = 1,
+        early_stop: bool = False,
     ):
         """Initialize beam search.
 
@@ -64,6 +71,18 @@ class BeamSearch(torch.nn.Module):
             pre_beam_score_key (str): key of scores to perform pre-beam search
             pre_beam_ratio (float): beam size in the pre-beam search
                 will be `int(pre_beam_ratio * beam_size)`
+            beam_threshold (float): If given, the running hypotheses whose scores
+                are lower than `best score - beam_threshold` are pruned
+            dynamic_beam_mass (float): If given, the running hypotheses are pruned
+                to the smallest set of the best ones whose posterior mass,
+                i.e. the softmax of their scores, reaches `dynamic_beam_mass`,
+                so that the beam shrinks when the best hypothesis is confident
+            min_beam_size (int): The minimum number of running hypotheses
+                kept by `beam_threshold` and `dynamic_beam_mass`
+            early_stop (bool): Whether to finish the search when all the running
+                hypotheses are dominated by the best ended hypothesis.
+                This does not change the best result as long as the scores
+                never increase with the length, e.g. without a positive penalty
 
         """
         super().__init__()
@@ -97,6 +116,14 @@ class BeamSearch(torch.nn.Module):
         self.pre_beam_size = int(pre_beam_ratio * beam_size)
         self.beam_size = beam_size
         self.n_vocab = vocab_size
+        if dynamic_beam_mass is not None and not 0.0 < dynamic_beam_mass <= 1.0:
+            raise ValueError(
+                f"dynamic_beam_mass must be in (0, 1]: {dynamic_beam_mass}"
+            )
+        self.beam_threshold = beam_threshold
+        self.dynamic_beam_mass = dynamic_beam_mass
+        self.min_beam_size = min_beam_size
+        self.early_stop = early_stop
         if (
             pre_beam_score_key is not None
             and pre_beam_score_key != "full"
@@ -109,6 +136,8 @@ class BeamSearch(torch.nn.Module):
             and self.pre_beam_size < self.n_vocab
             and len(self.part_scorers) > 0
         )
+        # set BeamSearchProfiler to profile the search
+        self.profiler: Optional[BeamSearchProfiler] = None
 
     def init_hyp(self, x: torch.Tensor) -> List[Hypothesis]:
         """Get an initial hypothesis data.
@@ -134,6 +163,21 @@ class BeamSearch(torch.nn.Module):
             )
         ]
 
+    def measure(self, name: str, n_hyps: int = 0):
+        """Measure the time of a component if the profiler is set.
+
+        Args:
+            name (str): The name of the component, e.g., the key of the scorer.
+            n_hyps (int): The number of hypotheses processed by the component.
+
+        Returns:
+            Context manager to measure the time.
+
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.measure(name, n_hyps)
+
     @staticmethod
     def append_token(xs: torch.Tensor, x: int) -> torch.Tensor:
         """Append new token to prefix tokens.
@@ -169,7 +213,8 @@ class BeamSearch(torch.nn.Module):
         scores = dict()
         states = dict()
         for k, d in self.full_scorers.items():
-            scores[k], states[k] = d.score(hyp.yseq, hyp.states[k], x)
+            with self.measure(k, 1):
+                scores[k], states[k] = d.score(hyp.yseq, hyp.states[k], x)
         return scores, states
 
     def score_partial(
@@ -193,7 +238,8 @@ class BeamSearch(torch.nn.Module):
         scores = dict()
         states = dict()
         for k, d in self.part_scorers.items():
-            scores[k], states[k] = d.score_partial(hyp.yseq, ids, hyp.states[k], x)
+            with self.measure(k, 1):
+                scores[k], states[k] = d.score_partial(hyp.yseq, ids, hyp.states[k], x)
         return scores, states
 
     def beam(
@@ -306,7 +352,10 @@ class BeamSearch(torch.nn.Module):
                     if self.pre_beam_score_key == "full"
                     else scores[self.pre_beam_score_key]
                 )
-                part_ids = torch.topk(pre_beam_scores, self.pre_beam_size)[1]
+                with self.measure("pre_beam", 1):
+                    part_ids = torch.topk(pre_beam_scores, self.pre_beam_size)[1]
+                if self.profiler is not None:
+                    self.profiler.add_pre_beam(len(part_ids))
             part_scores, part_states = self.score_partial(hyp, part_ids, x)
             for k in self.part_scorers:
                 weighted_scores[part_ids] += self.weights[k] * part_scores[k]
@@ -333,6 +382,97 @@ class BeamSearch(torch.nn.Module):
             ]
         return best_hyps
 
+    def hyp_scores(self, hyps: List[Hypothesis]) -> torch.Tensor:
+        """Get the total scores of hypotheses.
+
+        Args:
+            hyps (List[Hypothesis]): Hypotheses
+
+        Returns:
+            torch.Tensor: The scores of shape `(len(hyps),)`
+
+        """
+        return torch.tensor([float(h.score) for h in hyps])
+
+    def select_hyps(self, hyps: List[Hypothesis], ids: List[int]) -> List[Hypothesis]:
+        """Select hypotheses by their indices.
+
+        Args:
+            hyps (List[Hypothesis]): Hypotheses
+            ids (List[int]): The indices of hypotheses to select
+
+        Returns:
+            List[Hypothesis]: The selected hypotheses
+
+        """
+        return [hyps[i] for i in ids]
+
+    def prune_mask(self, scores: torch.Tensor) -> torch.Tensor:
+        """Get the mask of scores kept by `beam_threshold` and `dynamic_beam_mass`.
+
+        Args:
+            scores (torch.Tensor): The scores of running hypotheses `(n_hyps,)`
+
+        Returns:
+            torch.Tensor: The boolean mask of the kept hypotheses `(n_hyps,)`
+
+        """
+        keep = torch.ones_like(scores, dtype=torch.bool)
+        if len(scores) <= max(1, self.min_beam_size) or (
+            self.beam_threshold is None and self.dynamic_beam_mass is None
+        ):
+            return keep
+        sorted_scores, order = scores.sort(descending=True)
+        n_keep = len(scores)
+        if self.beam_threshold is not None:
+            n_keep = min(
+                n_keep,
+                int((sorted_scores >= sorted_scores[0] - self.beam_threshold).sum()),
+            )
+        if self.dynamic_beam_mass is not None:
+            mass = sorted_scores.float().softmax(dim=0).cumsum(dim=0)
+            n_keep = min(n_keep, int((mass < self.dynamic_beam_mass).sum()) + 1)
+        keep[order[max(n_keep, self.min_beam_size) :]] = False
+        return keep
+
+    def prune(self, running_hyps: List[Hypothesis]) -> List[Hypothesis]:
+        """Prune running hypotheses by `beam_threshold` and `dynamic_beam_mass`.
+
+        Args:
+            running_hyps (List[Hypothesis]): The running hypotheses in beam search.
+
+        Returns:
+            List[Hypothesis]: The pruned running hypotheses in the original order.
+
+        """
+        if self.beam_threshold is None and self.dynamic_beam_mass is None:
+            return running_hyps
+        keep = self.prune_mask(self.hyp_scores(running_hyps))
+        if bool(keep.all()):
+            return running_hyps
+        ids = keep.nonzero(as_tuple=True)[0].tolist()
+        logging.debug(f"pruned hypotheses: {len(running_hyps)} -> {len(ids)}")
+        return self.select_hyps(running_hyps, ids)
+
+    def is_dominated(
+        self, running_hyps: List[Hypothesis], ended_hyps: List[Hypothesis]
+    ) -> bool:
+        """Check whether all running hypotheses are worse than the best ended one.
+
+        Args:
+            running_hyps (List[Hypothesis]): The running hypotheses in beam search.
+            ended_hyps (List[Hypothesis]): The ended hypotheses in beam search.
+
+        Returns:
+            bool: True if no running hypothesis can be the best result
+                as long as the scores never increase with the length.
+
+        """
+        if len(running_hyps) == 0 or len(ended_hyps) == 0:
+            return False
+        best_ended = max(float(h.score) for h in ended_hyps)
+        return float(self.hyp_scores(running_hyps).max()) < best_ended
+
     def forward(
         self, x: torch.Tensor, maxlenratio: float = 0.0, minlenratio: float = 0.0
     ) -> List[Hypothesis]:
@@ -364,17 +504,31 @@ class BeamSearch(torch.nn.Module):
         logging.info("min output length: " + str(minlen))
 
         # main loop of prefix search
+        if self.profiler is not None:
+            self.profiler.reset()
         running_hyps = self.init_hyp(x)
         ended_hyps = []
         for i in range(maxlen):
             logging.debug("position " + str(i))
+            if self.profiler is not None:
+                self.profiler.start_step(i, len(running_hyps))
             best = self.search(running_hyps, x)
             # post process of one iteration
-            running_hyps = self.post_process(i, maxlen, maxlenratio, best, ended_hyps)
+            with self.measure("post_process", len(best)):
+                running_hyps = self.post_process(
+                    i, maxlen, maxlenratio, best, ended_hyps
+                )
+            with self.measure("prune", len(running_hyps)):
+                running_hyps = self.prune(running_hyps)
+            if self.profiler is not None:
+                self.profiler.end_step()
             # end detection
             if maxlenratio == 0.0 and end_detect([h.asdict() for h in ended_hyps], i):
                 logging.info(f"end detected at {i}")
                 break
+            if self.early_stop and self.is_dominated(running_hyps, ended_hyps):
+                logging.info(f"all running hypotheses are dominated at {i}")
+                break
             if len(running_hyps) == 0:
                 logging.info("no hypothesis. Finish decoding.")
                 break
@@ -0,0 +1,137 @@
+"""Profiler of beam search."""
+
+from collections import defaultdict
+from contextlib import contextmanager
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+
+import torch
+
+
+class BeamSearchProfiler:
+    """Collect the wall time of each component in beam search.
+
+    Set an instance to `BeamSearch.profiler` to enable the profiling.
+    The time of each component, i.e., each scorer with its key,
+    `pre_beam`, `extend` and `post_process`, is accumulated
+    with the number of processed hypotheses,
+    and the timeline of the steps is recorded for each search.
+
+    Examples:
+        >>> profiler = BeamSearchProfiler()
+        >>> beam_search.profiler = profiler
+        >>> nbest = beam_search(x)
+        >>> profiler.summary()["components"]["decoder"]["time"]
+
+    """
+
+    def __init__(self, synchronize: bool = False):
+        """Initialize profiler.
+
+        Args:
+            synchronize (bool): Whether to synchronize CUDA before measuring the time,
+                which is required to measure the asynchronous GPU computation.
+
+        """
+        self.synchronize = synchronize and torch.cuda.is_available()
+        self.totals = defaultdict(lambda: dict(time=0.0, calls=0, n_hyps=0))
+        self.total_steps = 0
+        self.total_searches = 0
+        self.components = defaultdict(lambda: dict(time=0.0, calls=0, n_hyps=0))
+        self.pre_beam_sizes = []
+        self.timeline = []
+        self.start_time = self._now()
+
+    def reset(self):
+        """Start a new search."""
+        self.components.clear()
+        self.pre_beam_sizes = []
+        self.timeline = []
+        self.start_time = self._now()
+        self.total_searches += 1
+
+    def _now(self) -> float:
+        if self.synchronize:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    @contextmanager
+    def measure(self, name: str, n_hyps: int = 0):
+        """Measure the wall time of a component.
+
+        Args:
+            name (str): The name of the component, e.g., the key of the scorer.
+            n_hyps (int): The number of hypotheses processed by the component.
+
+        """
+        start = self._now()
+        yield
+        elapsed = self._now() - start
+        for stats in (self.components[name], self.totals[name]):
+            stats["time"] += elapsed
+            stats["calls"] += 1
+            stats["n_hyps"] += n_hyps
+        if len(self.timeline) > 0 and "end" not in self.timeline[-1]:
+            step_times = self.timeline[-1]["components"]
+            step_times[name] = step_times.get(name, 0.0) + elapsed
+
+    def add_pre_beam(self, size: int):
+        """Record the number of tokens selected in the pre-beam search.
+
+        Args:
+            size (int): The pre-beam size.
+
+        """
+        self.pre_beam_sizes.append(size)
+        if len(self.timeline) > 0 and "end" not in self.timeline[-1]:
+            self.timeline[-1]["pre_beam_size"] = size
+
+    def start_step(self, step: int, n_hyps: int):
+        """Start a step of beam search.
+
+        Args:
+            step (int): The index of the step.
+            n_hyps (int): The number of running hypotheses.
+
+        """
+        self.timeline.append(
+            dict(step=step, n_hyps=n_hyps, start=self._now() - self.start_time)
+        )
+        self.timeline[-1]["components"] = dict()
+
+    def end_step(self):
+        """End the current step of beam search."""
+        self.timeline[-1]["end"] = self._now() - self.start_time
+        self.total_steps += 1
+
+    def summary(self, total: bool = False) -> Dict[str, Any]:
+        """Summarize the profile.
+
+        Args:
+            total (bool): Whether to summarize all the searches since initialized
+                instead of the last search. The timeline is not included.
+
+        Returns:
+            Dict[str, Any]: JSON-friendly summary of the profile.
+
+        """
+        if total:
+            return dict(
+                n_searches=self.total_searches,
+                n_steps=self.total_steps,
+                components={k: dict(v) for k, v in self.totals.items()},
+            )
+        sizes: List[int] = self.pre_beam_sizes
+        return dict(
+            n_steps=len(self.timeline),
+            time=self.timeline[-1]["end"] if len(self.timeline) > 0 else 0.0,
+            components={k: dict(v) for k, v in self.components.items()},
+            pre_beam=dict(
+                calls=len(sizes),
+                mean_size=sum(sizes) / len(sizes) if len(sizes) > 0 else 0.0,
+                max_size=max(sizes, default=0),
+            ),
+            timeline=self.timeline,
+        )
@@ -20,7 +20,7 @@ class CTCPrefixScoreTH(object):
     Speech Recognition," In INTERSPEECH (pp. 3825-3829), 2019.
     """
 
-    def __init__(self, x, xlens, blank, eos, margin=0):
+    def __init__(self, x, xlens, blank, eos, margin=0, chunk_size=1, window=0):
         """Construct CTC prefix scorer
 
         :param torch.Tensor x: input label posterior sequences (B, T, O)
@@ -28,12 +28,18 @@ class CTCPrefixScoreTH(object):
         :param int blank: blank label id
         :param int eos: end-of-sequence id
         :param int margin: margin parameter for windowing (0 means no windowing)
+        :param int chunk_size: number of frames computed at once
+            in the forward recursion (1 means frame-by-frame recursion)
+        :param int window: number of frames computed for each label
+            in the incremental mode (0 means the whole input is computed)
         """
         # In the comment lines,
         # we assume T: input_length, B: batch size, W: beam width, O: output dim.
         self.logzero = -10000000000.0
         self.blank = blank
         self.eos = eos
+        self.chunk_size = chunk_size
+        self.window = window
         self.batch = x.size(0)
         self.input_length = x.size(1)
         self.odim = x.size(2)
@@ -51,8 +57,13 @@ class CTCPrefixScoreTH(object):
                 x[i, l:, blank] = 0
         # Reshape input x
         xn = x.transpose(0, 1)  # (B, T, O) -> (T, B, O)
-        xb = xn[:, :, self.blank].unsqueeze(2).expand(-1, -1, self.odim)
-        self.x = torch.stack([xn, xb])  # (2, T, B, O)
+        if window > 0:
+            # blank posteriors are expanded only within the window at each step
+            self.x = None
+            self.set_window_posteriors(xn)
+        else:
+            xb = xn[:, :, self.blank].unsqueeze(2).expand(-1, -1, self.odim)
+            self.x = torch.stack([xn, xb])  # (2, T, B, O)
         self.end_frames = torch.as_tensor(xlens) - 1
 
         # Setup CTC windowing
@@ -66,30 +77,47 @@ class CTCPrefixScoreTH(object):
         self.idx_b = torch.arange(self.batch, device=self.device)
         self.idx_bo = (self.idx_b * self.odim).unsqueeze(1)
 
-    def __call__(self, y, state, scoring_ids=None, att_w=None):
+    def __call__(self, y, state, scoring_ids=None, att_w=None, utt_ids=None):
         """Compute CTC prefix scores for next labels
 
         :param list y: prefix label sequences
         :param tuple state: previous CTC state
         :param torch.Tensor pre_scores: scores for pre-selection of hypotheses (BW, O)
         :param torch.Tensor att_w: attention weights to decide CTC window
+        :param torch.Tensor utt_ids: utterance indices of hypotheses (BW,)
+            (None means that each utterance has the same number of hypotheses
+            and they are ordered utterance by utterance)
         :return new_state, ctc_local_scores (BW, O)
         """
         output_length = len(y[0]) - 1  # ignore sos
-        last_ids = [yi[-1] for yi in y]  # last output label ids
+        # last output label ids
+        if isinstance(y, torch.Tensor):
+            last_ids = y[:, -1].to(self.device)
+        else:
+            last_ids = torch.tensor([yi[-1] for yi in y], device=self.device)
         n_bh = len(last_ids)  # batch * hyps
         n_hyps = n_bh // self.batch  # assuming each utterance has the same # of hyps
+        if utt_ids is None:
+            utt_ids = self.idx_b.repeat_interleave(n_hyps)
+        else:
+            utt_ids = utt_ids.to(self.device)
         self.scoring_num = scoring_ids.size(-1) if scoring_ids is not None else 0
         # prepare state info
         if state is None:
+            # in the incremental mode, only the first frame is prepared
+            # and the rest is continued with blanks
+            x_blank = (
+                self.x[0, :, :, self.blank]
+                if self.x is not None
+                else self.xn[:1, :, self.blank]
+            )
             r_prev = torch.full(
-                (self.input_length, 2, self.batch, n_hyps),
+                (x_blank.size(0), 2, n_bh),
                 self.logzero,
                 dtype=self.dtype,
                 device=self.device,
             )
-            r_prev[:, 1] = torch.cumsum(self.x[0, :, :, self.blank], 0).unsqueeze(2)
-            r_prev = r_prev.view(-1, 2, n_bh)
+            r_prev[:, 1] = torch.cumsum(x_blank, 0)[:, utt_ids]
             s_prev = 0.0
             f_min_prev = 0
             f_max_prev = 1
@@ -107,59 +135,99 @@ class CTCPrefixScoreTH(object):
             scoring_idmap[self.idx_bh[:n_bh], scoring_ids] = torch.arange(
                 snum, device=self.device
             )
-            scoring_idx = (
-                scoring_ids + self.idx_bo.repeat(1, n_hyps).view(-1, 1)
-            ).view(-1)
-            x_ = torch.index_select(
-                self.x.view(2, -1, self.batch * self.odim), 2, scoring_idx
-            ).view(2, -1, n_bh, snum)
         else:
             scoring_ids = None
             scoring_idmap = None
             snum = self.odim
-            x_ = self.x.unsqueeze(3).repeat(1, 1, 1, n_hyps, 1).view(2, -1, n_bh, snum)
+
+        # decide start and end frames
+        if self.window > 0:
+            # In the incremental mode, the forward probabilities are computed
+            # only within a window of each hypothesis, and f_min and f_max hold
+            # the first and last + 1 frames of the windows (BW,).
+            # The window starts at the spike of the last label, i.e., the frame
+            # where r_t^n(g) is the largest, as the next label is emitted after it.
+            # If the next non-blank frame is far from the spike, e.g., after
+            # a long silence, the window is moved forward over the blank frames,
+            # where the prefixes are continued with blanks.
+            offset_prev = torch.as_tensor(f_min_prev, device=self.device)
+            if state is None:
+                spike = torch.zeros(n_bh, dtype=torch.long, device=self.device)
+            else:
+                r_max, spike = r_prev[:, 0].max(dim=0)
+                spike = spike.masked_fill(r_max < self.logzero / 2, 0) + offset_prev
+            n_frames = min(self.window + 1, self.input_length)
+            next_active = self.next_active[spike + 1, utt_ids]
+            offset = torch.max(spike - 1, next_active - self.window // 2 - 1)
+            offset = torch.max(offset, offset_prev)
+            max_offset = self.end_frames.to(self.device)[utt_ids] + 1 - n_frames
+            offset = torch.min(offset, max_offset.clamp(min=0))
+            frames = offset + torch.arange(n_frames, device=self.device).unsqueeze(1)
+            r_prev = self.align_state(r_prev, offset_prev, frames, utt_ids)
+            f_min, f_max = offset, offset + n_frames
+            start, end = 1, n_frames
+        elif att_w is not None and self.margin > 0:
+            # decide start and end frames based on attention weights
+            f_arg = torch.matmul(att_w, self.frame_ids)
+            f_min = max(int(f_arg.min().cpu()), f_min_prev)
+            f_max = max(int(f_arg.max().cpu()), f_max_prev)
+            start = min(f_max_prev, max(f_min - self.margin, output_length, 1))
+            end = min(f_max + self.margin, self.input_length)
+        else:
+            f_min = f_max = 0
+            start = max(output_length, 1)
+            end = self.input_length
+
+        # select label posteriors to be scored
+        if self.window > 0:
+            x_ = self.window_posteriors(frames, utt_ids, scoring_ids)
+        elif scoring_ids is not None:
+            scoring_idx = (scoring_ids + self.idx_bo[utt_ids]).view(-1)
+            x_ = torch.index_select(
+                self.x.view(2, -1, self.batch * self.odim), 2, scoring_idx
+            ).view(2, -1, n_bh, snum)
+        else:
+            x_ = self.x[:, :, utt_ids]
 
         # new CTC forward probs are prepared as a (T x 2 x BW x S) tensor
         # that corresponds to r_t^n(h) and r_t^b(h) in a batch.
+        # In the incremental mode, T is the number of frames in the windows.
         r = torch.full(
-            (self.input_length, 2, n_bh, snum),
+            (x_.size(1), 2, n_bh, snum),
             self.logzero,
             dtype=self.dtype,
             device=self.device,
         )
         if output_length == 0:
             r[0, 0] = x_[0, 0]
+            if self.window > 0:
+                r[0, 0].masked_fill_((f_min > 0).unsqueeze(1), self.logzero)
 
         r_sum = torch.logsumexp(r_prev, 1)
         log_phi = r_sum.unsqueeze(2).repeat(1, 1, snum)
+        hyp_idx = torch.arange(n_bh, device=self.device)
         if scoring_ids is not None:
-            for idx in range(n_bh):
-                pos = scoring_idmap[idx, last_ids[idx]]
-                if pos >= 0:
-                    log_phi[:, idx, pos] = r_prev[:, 1, idx]
+            pos = scoring_idmap[hyp_idx, last_ids]
+            hyp_idx = hyp_idx[pos >= 0]
+            pos = pos[pos >= 0]
         else:
-            for idx in range(n_bh):
-                log_phi[:, idx, last_ids[idx]] = r_prev[:, 1, idx]
-
-        # decide start and end frames based on attention weights
-        if att_w is not None and self.margin > 0:
-            f_arg = torch.matmul(att_w, self.frame_ids)
-            f_min = max(int(f_arg.min().cpu()), f_min_prev)
-            f_max = max(int(f_arg.max().cpu()), f_max_prev)
-            start = min(f_max_prev, max(f_min - self.margin, output_length, 1))
-            end = min(f_max + self.margin, self.input_length)
-        else:
-            f_min = f_max = 0
-            start = max(output_length, 1)
-            end = self.input_length
+            pos = last_ids
+        log_phi[:, hyp_idx, pos] = r_prev[:, 1, hyp_idx]
 
         # compute forward probabilities log(r_t^n(h)) and log(r_t^b(h))
-        for t in range(start, end):
-            rp = r[t - 1]
-            rr = torch.stack([rp[0], log_phi[t - 1], rp[0], rp[1]]).view(
-                2, 2, n_bh, snum
-            )
-            r[t] = torch.logsumexp(rr, 1) + x_[:, t]
+        if self.chunk_size > 1:
+            for t in range(start, end, self.chunk_size):
+                t_end = min(t + self.chunk_size, end)
+                r[t:t_end] = self.forward_chunk(
+                    r[t - 1], log_phi[t - 1 : t_end - 1], x_[:, t:t_end]
+                )
+        else:
+            for t in range(start, end):
+                rp = r[t - 1]
+                rr = torch.stack([rp[0], log_phi[t - 1], rp[0], rp[1]]).view(
+                    2, 2, n_bh, snum
+                )
+                r[t] = torch.logsumexp(rr, 1) + x_[:, t]
 
         # compute log prefix probabilities log(psi)
         log_phi_x = torch.cat((log_phi[0].unsqueeze(0), log_phi[:-1]), dim=0) + x_[0]
@@ -171,22 +239,151 @@ class CTCPrefixScoreTH(object):
                 torch.cat((log_phi_x[start:end], r[start - 1, 0].unsqueeze(0)), dim=0),
                 dim=0,
             )
-            for si in range(n_bh):
-                log_psi[si, scoring_ids[si]] = log_psi_[si]
+            log_psi.scatter_(1, scoring_ids, log_psi_)
         else:
             log_psi = torch.logsumexp(
                 torch.cat((log_phi_x[start:end], r[start - 1, 0].unsqueeze(0)), dim=0),
                 dim=0,
             )
 
-        for si in range(n_bh):
-            log_psi[si, self.eos] = r_sum[self.end_frames[si // n_hyps], si]
+        end_frames = self.end_frames.to(self.device)[utt_ids]
+        if self.window > 0:
+            # the frames before the windows have been padded if the input has ended,
+            # and the prefixes are continued with blanks beyond the windows
+            last = f_max - 1
+            log_psi[:, self.eos] = r_sum[
+                (end_frames - f_min).clamp(0, end - 1),
+                torch.arange(n_bh, device=self.device),
+            ] + self.blank_sum(last, torch.max(end_frames, last), utt_ids)
+        else:
+            log_psi[:, self.eos] = r_sum[
+                end_frames, torch.arange(n_bh, device=self.device)
+            ]
 
         # exclude blank probs
         log_psi[:, self.blank] = self.logzero
 
         return (log_psi - s_prev), (r, log_psi, f_min, f_max, scoring_idmap)
 
+    def align_state(self, r_prev, offset_prev, frames, utt_ids):
+        """Align stored forward probabilities to the frames of new windows
+
+        The frames before the new windows are discarded, and the frames after
+        the stored ones are filled by continuing the prefixes with blanks.
+
+        :param torch.Tensor r_prev: forward probabilities from `offset_prev`
+            (T', 2, BW)
+        :param torch.Tensor offset_prev: first frames of r_prev (BW,)
+        :param torch.Tensor frames: frames of the new windows (T'', BW)
+        :param torch.Tensor utt_ids: utterance indices of hypotheses (BW,)
+        :return forward probabilities of the new windows (T'', 2, BW)
+        """
+        n_prev = r_prev.size(0)
+        last = offset_prev + n_prev - 1
+        idx = (frames - offset_prev).clamp(max=n_prev - 1)
+        r_new = r_prev.gather(0, idx.unsqueeze(1).expand(-1, 2, -1))
+        beyond = frames > last
+        r_new[:, 0].masked_fill_(beyond, self.logzero)
+        r_new[:, 1] = torch.where(
+            beyond,
+            torch.logsumexp(r_prev[-1], 0) + self.blank_sum(last, frames, utt_ids),
+            r_new[:, 1],
+        )
+        return r_new
+
+    def set_window_posteriors(self, xn):
+        """Set label posteriors for the incremental mode
+
+        :param torch.Tensor xn: input label posterior sequences (T, B, O)
+        """
+        self.xn = xn
+        # cumulative sums to continue the prefixes with blanks beyond the windows
+        self.blank_cumsum = torch.cumsum(xn[:, :, self.blank].double(), 0)
+        # the nearest frame at or after each frame
+        # where any label but blank has the largest posterior
+        n_frames = xn.size(0)
+        frames = torch.arange(n_frames + 1, device=xn.device).unsqueeze(1)
+        frames = frames.repeat(1, xn.size(1))
+        frames[:n_frames].masked_fill_(xn.argmax(dim=2) == self.blank, n_frames)
+        self.next_active = frames.flip(0).cummin(0)[0].flip(0)
+
+    def window_posteriors(self, frames, utt_ids, scoring_ids=None):
+        """Select label posteriors within windows
+
+        :param torch.Tensor frames: frames of the windows (T', BW)
+        :param torch.Tensor utt_ids: utterance indices of hypotheses (BW,)
+        :param torch.Tensor scoring_ids: label ids to be scored (BW, S)
+        :return label and blank posteriors (2, T', BW, S)
+        """
+        if scoring_ids is not None:
+            x_n = self.xn[frames.unsqueeze(2), utt_ids.unsqueeze(1), scoring_ids]
+        else:
+            x_n = self.xn[frames, utt_ids]
+        x_b = self.xn[frames, utt_ids, self.blank].unsqueeze(2)
+        return torch.stack([x_n, x_b.expand_as(x_n)])
+
+    def blank_sum(self, start, end, utt_ids):
+        """Sum blank log probabilities from frame start + 1 to frame end
+
+        :param torch.Tensor start: first frames - 1 of the sums (BW,)
+        :param torch.Tensor end: last frames of the sums (..., BW)
+        :param torch.Tensor utt_ids: utterance indices of hypotheses (BW,)
+        :return sums of blank log probabilities (..., BW)
+        """
+        blank_sum = self.blank_cumsum[end, utt_ids] - self.blank_cumsum[start, utt_ids]
+        return blank_sum.to(self.dtype)
+
+    def forward_chunk(self, r_prev, log_phi, x):
+        """Compute forward probabilities for a chunk of frames at once
+
+        The recursion r_t = logaddexp(r_{t-1}, a_{t-1}) + x_t is unrolled as
+        r_t = logsumexp(r_{t0-1} + X(t0, t), a_{s-1} + X(s, t) for t0 <= s <= t)
+        where X(s, t) is the sum of x_s, ..., x_t within the chunk.
+        X(s, t) is accumulated for each s separately, i.e.,
+        no cumulative sums are subtracted from each other,
+        so that logzero values do not cause any cancellation.
+
+        :param torch.Tensor r_prev: forward probabilities of the previous frame
+            (2, BW, S)
+        :param torch.Tensor log_phi: log(phi) of the previous frames (C, BW, S)
+        :param torch.Tensor x: label posteriors of the chunk (2, C, BW, S)
+        :return forward probabilities of the chunk (C, 2, BW, S)
+        """
+        n_frames = x.size(1)
+        # mask[t, s] is True if frame t is not earlier than frame s
+        mask = torch.ones(
+            n_frames, n_frames, dtype=torch.bool, device=self.device
+        ).tril()
+        mask = mask.view(n_frames, n_frames, 1, 1)
+        # xs[k, t, s] = X_k(s, t) (-inf if t < s), (2, C, C, BW, S)
+        xs = torch.cumsum(x.unsqueeze(2) * mask, dim=1).masked_fill(
+            ~mask, float("-inf")
+        )
+        # r_t^n(h): terms of r_{t0-1}^n(h) and log(phi)
+        r_n = torch.logsumexp(
+            torch.cat(
+                (
+                    (r_prev[0] + xs[0, :, 0]).unsqueeze(1),
+                    log_phi.unsqueeze(0) + xs[0],
+                ),
+                dim=1,
+            ),
+            dim=1,
+        )
+        # r_t^b(h): terms of r_{t0-1}^b(h) and r_{s-1}^n(h)
+        r_n_prev = torch.cat((r_prev[0].unsqueeze(0), r_n[:-1]), dim=0)
+        r_b = torch.logsumexp(
+            torch.cat(
+                (
+                    (r_prev[1] + xs[1, :, 0]).unsqueeze(1),
+                    r_n_prev.unsqueeze(0) + xs[1],
+                ),
+                dim=1,
+            ),
+            dim=1,
+        )
+        return torch.stack((r_n, r_b), dim=1)
+
     def index_select_state(self, state, best_ids):
         """Select CTC states according to best ids
 
@@ -202,12 +399,13 @@ class CTCPrefixScoreTH(object):
         # select hypothesis scores
         s_new = torch.index_select(s.view(-1), 0, vidx)
         s_new = s_new.view(-1, 1).repeat(1, self.odim).view(n_bh, self.odim)
+        hyp_idx = (best_ids // self.odim + (self.idx_b * n_hyps).view(-1, 1)).view(-1)
+        if self.window > 0:
+            # select the windows of hypotheses
+            f_min, f_max = f_min[hyp_idx], f_max[hyp_idx]
         # convert ids to BHS space (S: scoring_num)
         if scoring_idmap is not None:
             snum = self.scoring_num
-            hyp_idx = (best_ids // self.odim + (self.idx_b * n_hyps).view(-1, 1)).view(
-                -1
-            )
             label_ids = torch.fmod(best_ids, self.odim).view(-1)
             score_idx = scoring_idmap[hyp_idx, label_ids]
             score_idx[score_idx == -1] = 0
@@ -226,7 +424,14 @@ class CTCPrefixScoreTH(object):
         :param torch.Tensor x: input label posterior sequences (B, T, O)
         """
 
-        if self.x.shape[1] < x.shape[1]:  # self.x (2,T,B,O); x (B,T,O)
+        if self.window > 0:
+            if self.input_length < x.size(1):
+                xn = x.transpose(0, 1)  # (B, T, O) -> (T, B, O)
+                xn[: self.input_length] = self.xn
+                self.set_window_posteriors(xn)
+                self.input_length = x.size(1)
+                self.end_frames = torch.as_tensor([x.size(1)]) - 1
+        elif self.x.shape[1] < x.shape[1]:  # self.x (2,T,B,O); x (B,T,O)
             # Pad the rest of posteriors in the batch
             # TODO(takaaki-hori): need a better way without for-loops
             xlens = [x.size(1)]
@@ -250,8 +455,9 @@ class CTCPrefixScoreTH(object):
         :return ctc_state
         """
 
-        if state is None:
+        if state is None or self.window > 0:
             # nothing to do
+            # (in the incremental mode, the state is extended in the next step)
             return state
         else:
             r_prev, s_prev, f_min_prev, f_max_prev = state
@@ -241,9 +241,14 @@ class TransformerLM(nn.Module, LMInterface, BatchScorerInterface):
             emb = self.embed(ys)
 
         # batch decoding
-        h, _, states = self.encoder.forward_one_step(
-            emb, self._target_mask(ys), cache=batch_state
-        )
+        if self.encoder.use_kv_cache:
+            h, _, states = self.encoder.forward_one_step_kv_cache(
+                emb, self._target_mask(ys), cache=batch_state
+            )
+        else:
+            h, _, states = self.encoder.forward_one_step(
+                emb, self._target_mask(ys), cache=batch_state
+            )
         h = self.decoder(h[:, -1])
         logp = h.log_softmax(dim=-1)
 
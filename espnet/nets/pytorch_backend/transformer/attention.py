@@ -113,6 +113,49 @@ class MultiHeadedAttention(nn.Module):
         scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(self.d_k)
         return self.forward_attention(v, scores, mask)
 
+    def forward_kv(self, key, value):
+        """Transform key and value to be cached.
+
+        Args:
+            key (torch.Tensor): Key tensor (#batch, time2, size).
+            value (torch.Tensor): Value tensor (#batch, time2, size).
+
+        Returns:
+            torch.Tensor: Transformed key and value tensor
+                (#batch, 2, n_head, time2, d_k).
+
+        """
+        n_batch = key.size(0)
+        k = self.linear_k(key).view(n_batch, -1, self.h, self.d_k)
+        v = self.linear_v(value).view(n_batch, -1, self.h, self.d_k)
+        return torch.stack((k, v), dim=1).transpose(2, 3)
+
+    def forward_cached(self, query, kv, mask):
+        """Compute scaled dot product attention with transformed key and value.
+
+        The key and value can be shared by the consecutive hypotheses in the batch,
+        e.g., the encoded memory of an utterance in beam search,
+        where #batch of the query is a multiple of #group of the key and value.
+
+        Args:
+            query (torch.Tensor): Query tensor (#batch, time1, size).
+            kv (torch.Tensor): Transformed key and value tensor
+                (#group, 2, n_head, time2, d_k) from `forward_kv`.
+            mask (torch.Tensor): Mask tensor (#group, 1, time2) or
+                (#batch, time1, time2) when #group equals #batch.
+
+        Returns:
+            torch.Tensor: Output tensor (#batch, time1, d_model).
+
+        """
+        n_batch = query.size(0)
+        n_group = kv.size(0)
+        # (group, head, batch / group * time1, d_k)
+        q = self.linear_q(query).view(n_group, -1, self.h, self.d_k).transpose(1, 2)
+        scores = torch.matmul(q, kv[:, 0].transpose(-2, -1)) / math.sqrt(self.d_k)
+        x = self.forward_attention(kv[:, 1], scores, mask)
+        return x.view(n_batch, -1, self.h * self.d_k)
+
 
 class LegacyRelPositionMultiHeadedAttention(MultiHeadedAttention):
     """Multi-Head Attention layer with relative position encoding (old version).
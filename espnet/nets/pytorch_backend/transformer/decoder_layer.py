@@ -132,3 +132,71 @@ class DecoderLayer(nn.Module):
             x = torch.cat([cache, x], dim=1)
 
         return x, tgt_mask, memory, memory_mask
+
+    def forward_kv_cache(self, tgt, tgt_mask, memory_kv, memory_mask, cache=None):
+        """Compute decoded features of new positions with key/value caches.
+
+        Unlike `forward` caching the layer outputs, the keys and values of
+        the self-attention are cached so that only the new positions are projected,
+        and those of the source attention are given as precomputed ones.
+        Both `self_attn` and `src_attn` need to be `MultiHeadedAttention`.
+
+        Args:
+            tgt (torch.Tensor): Input tensor of new positions (#batch, time, size).
+            tgt_mask (torch.Tensor): Mask for the new positions
+                (#batch, time, maxlen_out).
+            memory_kv (torch.Tensor): Transformed key and value of encoded memory
+                (#group, 2, n_head, maxlen_in, d_k), where #batch is a multiple of
+                #group, e.g., the number of utterances in beam search.
+            memory_mask (torch.Tensor): Encoded memory mask (#group, 1, maxlen_in).
+            cache (torch.Tensor): Cached key and value of the self-attention
+                (#batch, 2, n_head, maxlen_out - time, d_k).
+
+        Returns:
+            torch.Tensor: Output tensor (#batch, time, size).
+            torch.Tensor: New key and value cache (#batch, 2, n_head, maxlen_out, d_k).
+
+        """
+        residual = tgt
+        if self.normalize_before:
+            tgt = self.norm1(tgt)
+
+        kv = self.self_attn.forward_kv(tgt, tgt)
+        if cache is not None:
+            kv = torch.cat([cache, kv], dim=3)
+
+        if self.concat_after:
+            tgt_concat = torch.cat(
+                (tgt, self.self_attn.forward_cached(tgt, kv, tgt_mask)), dim=-1
+            )
+            x = residual + self.concat_linear1(tgt_concat)
+        else:
+            x = residual + self.dropout(
+                self.self_attn.forward_cached(tgt, kv, tgt_mask)
+            )
+        if not self.normalize_before:
+            x = self.norm1(x)
+
+        residual = x
+        if self.normalize_before:
+            x = self.norm2(x)
+        if self.concat_after:
+            x_concat = torch.cat(
+                (x, self.src_attn.forward_cached(x, memory_kv, memory_mask)), dim=-1
+            )
+            x = residual + self.concat_linear2(x_concat)
+        else:
+            x = residual + self.dropout(
+                self.src_attn.forward_cached(x, memory_kv, memory_mask)
+            )
+        if not self.normalize_before:
+            x = self.norm2(x)
+
+        residual = x
+        if self.normalize_before:
+            x = self.norm3(x)
+        x = residual + self.dropout(self.feed_forward(x))
+        if not self.normalize_before:
+            x = self.norm3(x)
+
+        return x, kv
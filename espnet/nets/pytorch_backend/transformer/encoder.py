@@ -372,3 +372,46 @@ class Encoder(torch.nn.Module):
         if self.normalize_before:
             xs = self.after_norm(xs)
         return xs, masks, new_cache
+
+    def forward_one_step_kv_cache(self, xs, masks, cache=None):
+        """Encode new frames with key/value caches of the self-attention.
+
+        Only the frames not in the cache are processed,
+        which requires `EncoderLayer` with `MultiHeadedAttention`
+        and no subsampling in `self.embed`.
+
+        Args:
+            xs (torch.Tensor): Input tensor of all the frames.
+            masks (torch.Tensor): Mask tensor of all the frames.
+            cache (List[torch.Tensor]): List of key and value cache tensors.
+
+        Returns:
+            torch.Tensor: Output tensor of the new frames.
+            torch.Tensor: Mask tensor of the new frames.
+            List[torch.Tensor]: List of new key and value cache tensors.
+
+        """
+        xs = self.embed(xs)
+        if cache is None:
+            cache = [None for _ in range(len(self.encoders))]
+        else:
+            offset = cache[0].size(3)
+            xs = xs[:, offset:]
+            masks = masks[:, offset:]
+        new_cache = []
+        for c, e in zip(cache, self.encoders):
+            xs, c = e.forward_kv_cache(xs, masks, cache=c)
+            new_cache.append(c)
+        if self.normalize_before:
+            xs = self.after_norm(xs)
+        return xs, masks, new_cache
+
+    @property
+    def use_kv_cache(self):
+        """Whether the layers support `forward_one_step_kv_cache`."""
+        subsampling = (Conv2dSubsampling, Conv2dSubsampling6, Conv2dSubsampling8, VGG2L)
+        return not isinstance(self.embed, subsampling) and all(
+            isinstance(e, EncoderLayer)
+            and isinstance(e.self_attn, MultiHeadedAttention)
+            for e in self.encoders
+        )
@@ -118,3 +118,49 @@ class EncoderLayer(nn.Module):
             x = torch.cat([cache, x], dim=1)
 
         return x, mask
+
+    def forward_kv_cache(self, x, mask, cache=None):
+        """Compute encoded features of new positions with a key/value cache.
+
+        Unlike `forward` caching the layer outputs, the keys and values of
+        the self-attention are cached so that only the new positions are projected.
+        `self_attn` needs to be `MultiHeadedAttention`.
+
+        Args:
+            x (torch.Tensor): Input tensor of new positions (#batch, time, size).
+            mask (torch.Tensor): Mask tensor for the new positions
+                (#batch, time, time_all).
+            cache (torch.Tensor): Cached key and value of the self-attention
+                (#batch, 2, n_head, time_all - time, d_k).
+
+        Returns:
+            torch.Tensor: Output tensor (#batch, time, size).
+            torch.Tensor: New key and value cache (#batch, 2, n_head, time_all, d_k).
+
+        """
+        residual = x
+        if self.normalize_before:
+            x = self.norm1(x)
+
+        kv = self.self_attn.forward_kv(x, x)
+        if cache is not None:
+            kv = torch.cat([cache, kv], dim=3)
+
+        if self.concat_after:
+            x_concat = torch.cat(
+                (x, self.self_attn.forward_cached(x, kv, mask)), dim=-1
+            )
+            x = residual + self.concat_linear(x_concat)
+        else:
+            x = residual + self.dropout(self.self_attn.forward_cached(x, kv, mask))
+        if not self.normalize_before:
+            x = self.norm1(x)
+
+        residual = x
+        if self.normalize_before:
+            x = self.norm2(x)
+        x = residual + self.dropout(self.feed_forward(x))
+        if not self.normalize_before:
+            x = self.norm2(x)
+
+        return x, kv
@@ -127,6 +127,72 @@ class BatchScorerInterface(ScorerInterface):
         scores = torch.cat(scores, 0).view(ys.shape[0], -1)
         return scores, outstates
 
+    def batch_init_state_padded(
+        self, xs: torch.Tensor, xs_lens: torch.Tensor
+    ) -> List[Any]:
+        """Get initial states of multiple utterances for decoding (optional).
+
+        Args:
+            xs (torch.Tensor): The padded encoded feature tensor (n_utt, xlen, n_feat)
+            xs_lens (torch.Tensor): The lengths of the encoded features (n_utt,)
+
+        Returns: list of initial states for each utterance
+
+        """
+        return [self.batch_init_state(x[:l]) for x, l in zip(xs, xs_lens)]
+
+    def batch_score_padded(
+        self,
+        ys: torch.Tensor,
+        states: List[Any],
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        utt_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Score new token batch whose encoder features are padded (optional).
+
+        The features are given for each utterance, and each hypothesis refers to
+        the features of its utterance by `utt_ids`, so that any hypotheses of
+        any utterances can be scored together.
+        The default implementation calls `batch_score` for each group of
+        hypotheses having the same feature length, so that the padded frames
+        are never seen by the scorer. Override it when the scorer can mask
+        the padded frames by itself or does not depend on `xs`.
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            states (List[Any]): Scorer states for prefix tokens.
+            xs (torch.Tensor):
+                The padded encoder feature of the utterances (n_utt, xlen, n_feat).
+            xs_lens (torch.Tensor): The lengths of the encoder features (n_utt,).
+            utt_ids (torch.Tensor): The utterance index of each hypothesis (n_batch,).
+
+        Returns:
+            tuple[torch.Tensor, List[Any]]: Tuple of
+                batchfied scores for next token with shape of `(n_batch, n_vocab)`
+                and next state list for ys.
+
+        """
+        utt_ids = torch.as_tensor(utt_ids, device=xs.device)
+        lens = torch.as_tensor(xs_lens).cpu()[utt_ids.cpu()]
+        if bool((lens == xs.size(1)).all()):
+            return self.batch_score(ys, states, xs[utt_ids])
+
+        scores = None
+        outstates = [None] * len(ys)
+        for length in torch.unique(lens).tolist():
+            ids = torch.nonzero(lens == length, as_tuple=False).view(-1).tolist()
+            score, outstate = self.batch_score(
+                ys[ids], [states[i] for i in ids], xs[utt_ids[ids], :length]
+            )
+            if scores is None:
+                scores = score.new_zeros(len(ys), score.size(-1))
+            scores[ids] = score
+            if outstate is not None:
+                for i, s in zip(ids, outstate):
+                    outstates[i] = s
+        return scores, outstates
+
 
 class PartialScorerInterface(ScorerInterface):
     """Partial scorer interface for beam search.
@@ -186,3 +252,35 @@ class BatchPartialScorerInterface(BatchScorerInterface, PartialScorerInterface):
                 and next states for ys
         """
         raise NotImplementedError
+
+    def batch_score_partial_padded(
+        self,
+        ys: torch.Tensor,
+        next_tokens: torch.Tensor,
+        states: List[Any],
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        utt_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, Any]:
+        """Score new token whose encoder features are padded (optional).
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            next_tokens (torch.Tensor): torch.int64 tokens to score (n_batch, n_token).
+            states (List[Any]): Scorer states for prefix tokens.
+            xs (torch.Tensor):
+                The padded encoder feature of the utterances (n_utt, xlen, n_feat).
+            xs_lens (torch.Tensor): The lengths of the encoder features (n_utt,).
+            utt_ids (torch.Tensor): The utterance index of each hypothesis (n_batch,).
+
+        Returns:
+            tuple[torch.Tensor, Any]:
+                Tuple of a score tensor for ys that has a shape `(n_batch, n_vocab)`
+                and next states for ys
+        """
+        utt_ids = torch.as_tensor(utt_ids, device=xs.device)
+        if bool((torch.as_tensor(xs_lens).cpu()[utt_ids.cpu()] == xs.size(1)).all()):
+            return self.batch_score_partial(ys, next_tokens, states, xs[utt_ids])
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support padded encoder features"
+        )
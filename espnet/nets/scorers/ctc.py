@@ -11,17 +11,29 @@ from espnet.nets.scorer_interface import BatchPartialScorerInterface
 class CTCPrefixScorer(BatchPartialScorerInterface):
     """Decoder interface wrapper for CTCPrefixScore."""
 
-    def __init__(self, ctc: torch.nn.Module, eos: int):
+    def __init__(
+        self, ctc: torch.nn.Module, eos: int, chunk_size: int = 1, window: int = 0
+    ):
         """Initialize class.
 
         Args:
             ctc (torch.nn.Module): The CTC implementation.
                 For example, :class:`espnet.nets.pytorch_backend.ctc.CTC`
             eos (int): The end-of-sequence id.
+            chunk_size (int): The number of frames computed at once
+                in the forward recursion of the batch implementation.
+                1 means the frame-by-frame recursion.
+            window (int): The number of frames computed for each token
+                after the spike of the previous token in the batch implementation.
+                The states of hypotheses are bounded to this window
+                so that long-form inputs can be decoded in bounded memory.
+                0 means the whole input is computed for each token.
 
         """
         self.ctc = ctc
         self.eos = eos
+        self.chunk_size = chunk_size
+        self.window = window
         self.impl = None
 
     def init_state(self, x: torch.Tensor):
@@ -57,6 +69,8 @@ class CTCPrefixScorer(BatchPartialScorerInterface):
             else:  # for CTCPrefixScoreTH (need new_id > 0)
                 r, log_psi, f_min, f_max, scoring_idmap = state
                 s = log_psi[i, new_id].expand(log_psi.size(1))
+                if self.window > 0:  # the windows of hypotheses
+                    f_min, f_max = f_min[i], f_max[i]
                 if scoring_idmap is not None:
                     return r[:, :, i, scoring_idmap[i, new_id]], s, f_min, f_max
                 else:
@@ -96,7 +110,14 @@ class CTCPrefixScorer(BatchPartialScorerInterface):
         """
         logp = self.ctc.log_softmax(x.unsqueeze(0))  # assuming batch_size = 1
         xlen = torch.tensor([logp.size(1)])
-        self.impl = CTCPrefixScoreTH(logp, xlen, 0, self.eos)
+        self.impl = CTCPrefixScoreTH(
+            logp,
+            xlen,
+            0,
+            self.eos,
+            chunk_size=self.chunk_size,
+            window=self.window,
+        )
         return None
 
     def batch_score_partial(self, y, ids, state, x):
@@ -114,17 +135,67 @@ class CTCPrefixScorer(BatchPartialScorerInterface):
                 and next state for ys
 
         """
+        return self._batch_score_partial(y, ids, state)
+
+    def _batch_score_partial(self, y, ids, state, utt_ids=None):
+        if state[0] is None:
+            return self.impl(y, None, ids, utt_ids=utt_ids)
+        if self.window > 0:  # the windows of hypotheses
+            f_min = torch.stack([s[2] for s in state])
+            f_max = torch.stack([s[3] for s in state])
+        else:
+            f_min, f_max = state[0][2], state[0][3]
         batch_state = (
-            (
-                torch.stack([s[0] for s in state], dim=2),
-                torch.stack([s[1] for s in state]),
-                state[0][2],
-                state[0][3],
-            )
-            if state[0] is not None
-            else None
+            torch.stack([s[0] for s in state], dim=2),
+            torch.stack([s[1] for s in state]),
+            f_min,
+            f_max,
         )
-        return self.impl(y, batch_state, ids)
+        return self.impl(y, batch_state, ids, utt_ids=utt_ids)
+
+    def batch_init_state_padded(self, xs: torch.Tensor, xs_lens: torch.Tensor):
+        """Get initial states of multiple utterances for decoding.
+
+        Args:
+            xs (torch.Tensor): The padded encoded feature tensor (n_utt, xlen, n_feat)
+            xs_lens (torch.Tensor): The lengths of the encoded features (n_utt,)
+
+        Returns: list of initial states for each utterance
+
+        """
+        logp = self.ctc.log_softmax(xs)
+        self.impl = CTCPrefixScoreTH(
+            logp,
+            xs_lens,
+            0,
+            self.eos,
+            chunk_size=self.chunk_size,
+            window=self.window,
+        )
+        return [None] * len(xs)
+
+    def batch_score_partial_padded(self, y, ids, state, x, x_lens, utt_ids):
+        """Score new token with padded encoder features.
+
+        The features and their lengths have been already given to `CTCPrefixScoreTH`
+        in `batch_init_state_padded`, and `utt_ids` tells it the utterance
+        of each hypothesis.
+
+        Args:
+            y (torch.Tensor): 1D prefix token
+            ids (torch.Tensor): torch.int64 next token to score
+            state: decoder state for prefix tokens
+            x (torch.Tensor): 3D padded encoder feature of the utterances
+            x_lens (torch.Tensor): The lengths of the encoder features
+            utt_ids (torch.Tensor): The utterance index of each hypothesis
+
+        Returns:
+            tuple[torch.Tensor, Any]:
+                Tuple of a score tensor for y that has a shape `(len(next_tokens),)`
+                and next state for ys
+
+        """
+        return self._batch_score_partial(y, ids, state, utt_ids)
 
     def extend_prob(self, x: torch.Tensor):
         """Extend probs for decoding.
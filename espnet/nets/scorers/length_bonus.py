@@ -59,3 +59,18 @@ class LengthBonus(BatchScorerInterface):
             ),
             None,
         )
+
+    def batch_score_padded(
+        self,
+        ys: torch.Tensor,
+        states: List[Any],
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        utt_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Score new token batch with padded encoder features.
+
+        The score does not depend on the features, so the padding is ignored.
+
+        """
+        return self.batch_score(ys, states, xs)
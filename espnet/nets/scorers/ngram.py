@@ -1,29 +1,43 @@
 """Ngram lm implement."""
 
 from abc import ABC
+from collections import OrderedDict
 
 import kenlm
 import torch
 
+from espnet.nets.scorer_interface import BatchPartialScorerInterface
 from espnet.nets.scorer_interface import BatchScorerInterface
-from espnet.nets.scorer_interface import PartialScorerInterface
 
 
 class Ngrambase(ABC):
-    """Ngram base implemented through ScorerInterface."""
+    """Ngram base implemented through ScorerInterface.
 
-    def __init__(self, ngram_model, token_list):
+    The transitions `(kenlm state, token) -> (score, next state)` and
+    the scores of the whole vocabulary for each context state
+    are memoized in bounded LRU caches,
+    because the same contexts are scored repeatedly in beam search.
+
+    """
+
+    def __init__(self, ngram_model, token_list, cache_size=100000, row_cache_size=1000):
         """Initialize Ngrambase.
 
         Args:
             ngram_model: ngram model path
             token_list: token list from dict or model.json
+            cache_size: max number of cached transitions
+            row_cache_size: max number of cached full-vocabulary score rows
 
         """
         self.chardict = [x if x != "<eos>" else "</s>" for x in token_list]
         self.charlen = len(self.chardict)
         self.lm = kenlm.LanguageModel(ngram_model)
         self.tmpkenlmstate = kenlm.State()
+        self.cache_size = cache_size
+        self.row_cache_size = row_cache_size
+        self.cache = OrderedDict()
+        self.row_cache = OrderedDict()
 
     def init_state(self, x):
         """Initialize tmp state."""
@@ -31,6 +45,79 @@ class Ngrambase(ABC):
         self.lm.NullContextWrite(state)
         return state
 
+    def transition(self, state, word):
+        """Score a word and get the next state with the LRU cache.
+
+        Args:
+            state: kenlm state of the context
+            word: word to be scored
+
+        Returns:
+            tuple[float, kenlm.State]: Tuple of the score and the next state
+
+        """
+        key = (state, word)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        out_state = kenlm.State()
+        value = self.lm.BaseScore(state, word, out_state), out_state
+        self.cache[key] = value
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return value
+
+    def score_row(self, state):
+        """Score the whole vocabulary with the LRU cache.
+
+        Args:
+            state: kenlm state of the context
+
+        Returns:
+            torch.Tensor: scores of the vocabulary with shape of `(n_vocab,)`
+
+        """
+        if state in self.row_cache:
+            self.row_cache.move_to_end(state)
+            return self.row_cache[state]
+        row = torch.tensor(
+            [self.lm.BaseScore(state, w, self.tmpkenlmstate) for w in self.chardict],
+            dtype=torch.float64,
+        )
+        self.row_cache[state] = row
+        if len(self.row_cache) > self.row_cache_size:
+            self.row_cache.popitem(last=False)
+        return row
+
+    def next_context(self, y, state):
+        """Get the context state after the last token of y.
+
+        Args:
+            y: prefix tokens
+            state: kenlm state before the last token
+
+        Returns:
+            kenlm.State: context state for the next token
+
+        """
+        ys = self.chardict[y[-1]] if y.shape[0] > 1 else "<s>"
+        return self.transition(state, ys)[1]
+
+    def score_tokens(self, state, next_token):
+        """Score tokens with the caches.
+
+        Args:
+            state: kenlm state of the context
+            next_token: tokens to be scored
+
+        Returns:
+            list[float]: scores of the tokens
+
+        """
+        if state in self.row_cache:
+            return self.score_row(state)[next_token].tolist()
+        return [self.transition(state, self.chardict[j])[0] for j in next_token]
+
     def score_partial_(self, y, next_token, state, x):
         """Score interface for both full and partial scorer.
 
@@ -46,14 +133,12 @@ class Ngrambase(ABC):
                 and next state list for ys.
 
         """
-        out_state = kenlm.State()
-        ys = self.chardict[y[-1]] if y.shape[0] > 1 else "<s>"
-        self.lm.BaseScore(state, ys, out_state)
-        scores = torch.empty_like(next_token, dtype=x.dtype, device=y.device)
-        for i, j in enumerate(next_token):
-            scores[i] = self.lm.BaseScore(
-                out_state, self.chardict[j], self.tmpkenlmstate
-            )
+        out_state = self.next_context(y, state)
+        scores = torch.tensor(
+            self.score_tokens(out_state, next_token.tolist()),
+            dtype=x.dtype,
+            device=y.device,
+        )
         return scores, out_state
 
 
@@ -74,12 +159,45 @@ class NgramFullScorer(Ngrambase, BatchScorerInterface):
                 and next state list for ys.
 
         """
-        return self.score_partial_(y, torch.tensor(range(self.charlen)), state, x)
+        out_state = self.next_context(y, state)
+        scores = self.score_row(out_state).to(dtype=x.dtype, device=y.device)
+        return scores, out_state
+
+    def batch_score(self, ys, states, xs):
+        """Score new token batch.
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            states (List[Any]): Scorer states for prefix tokens.
+            xs (torch.Tensor):
+                The encoder feature that generates ys (n_batch, xlen, n_feat).
+
+        Returns:
+            tuple[torch.Tensor, List[Any]]: Tuple of
+                batchfied scores for next token with shape of `(n_batch, n_vocab)`
+                and next state list for ys.
+
+        """
+        out_states = [self.next_context(y, s) for y, s in zip(ys, states)]
+        scores = torch.stack([self.score_row(s) for s in out_states])
+        return scores.to(dtype=xs.dtype, device=xs.device), out_states
+
+    def batch_score_padded(self, ys, states, xs, xs_lens, utt_ids):
+        """Score new token batch with padded encoder features.
+
+        The score does not depend on the features, so the padding is ignored.
+
+        """
+        return self.batch_score(ys, states, xs)
 
 
-class NgramPartScorer(Ngrambase, PartialScorerInterface):
+class NgramPartScorer(Ngrambase, BatchPartialScorerInterface):
     """Partialscorer for ngram."""
 
+    # The score of the tokens not to be scored in batch_score_partial().
+    # NOTE: Not -inf, which gives NaN if multiplied by the weight 0.
+    logzero = -10000000000.0
+
     def score_partial(self, y, next_token, state, x):
         """Score interface for both full and partial scorer.
 
@@ -97,6 +215,46 @@ class NgramPartScorer(Ngrambase, PartialScorerInterface):
         """
         return self.score_partial_(y, next_token, state, x)
 
-    def select_state(self, state, i):
-        """Empty select state for scorer interface."""
-        return state
+    def batch_score_partial(self, ys, next_tokens, states, xs):
+        """Score new token batch.
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            next_tokens (torch.Tensor): torch.int64 tokens to score (n_batch, n_token).
+                If None, the whole vocabulary is scored.
+            states (List[Any]): Scorer states for prefix tokens.
+            xs (torch.Tensor):
+                The encoder feature that generates ys (n_batch, xlen, n_feat).
+
+        Returns:
+            tuple[torch.Tensor, Any]:
+                Tuple of a score tensor for ys that has a shape `(n_batch, n_vocab)`
+                and next states for ys. The tokens not in `next_tokens` have
+                `logzero` scores so that they are not selected in beam search.
+
+        """
+        out_states = [self.next_context(y, s) for y, s in zip(ys, states)]
+        if next_tokens is None:
+            scores = torch.stack([self.score_row(s) for s in out_states])
+        else:
+            scores = torch.full((len(ys), self.charlen), self.logzero)
+            for i, (s, ids) in enumerate(zip(out_states, next_tokens.tolist())):
+                scores[i, ids] = torch.tensor(self.score_tokens(s, ids))
+        return scores.to(dtype=xs.dtype, device=xs.device), out_states
+
+    def batch_score_partial_padded(self, ys, next_tokens, states, xs, xs_lens, utt_ids):
+        """Score new token batch with padded encoder features.
+
+        The score does not depend on the features, so the padding is ignored.
+
+        """
+        return self.batch_score_partial(ys, next_tokens, states, xs)
+
+    def select_state(self, state, i, new_id=None):
+        """Select state for scorer interface.
+
+        The states are lists of hypotheses in batch beam search,
+        and a state shared by the next tokens in beam search.
+
+        """
+        return state[i] if isinstance(state, list) else state
@@ -91,6 +91,7 @@ class BaseTransformerDecoder(AbsDecoder, BatchScorerInterface):
 
         # Must set by the inheritance
         self.decoders = None
+        self._memory_kv_cache = None
 
     def forward(
         self,
@@ -153,6 +154,7 @@ class BaseTransformerDecoder(AbsDecoder, BatchScorerInterface):
         tgt_mask: torch.Tensor,
         memory: torch.Tensor,
         cache: List[torch.Tensor] = None,
+        memory_mask: torch.Tensor = None,
     ) -> Tuple[torch.Tensor, List[torch.Tensor]]:
         """Forward one step.
 
@@ -163,6 +165,7 @@ class BaseTransformerDecoder(AbsDecoder, BatchScorerInterface):
                       dtype=torch.bool in PyTorch 1.2+ (include 1.2)
             memory: encoded memory, float32  (batch, maxlen_in, feat)
             cache: cached output list of (batch, max_time_out-1, size)
+            memory_mask: encoded memory mask, (batch, 1, maxlen_in)
         Returns:
             y, cache: NN output value and cache per `self.decoders`.
             y.shape` is (batch, maxlen_out, token)
@@ -173,7 +176,7 @@ class BaseTransformerDecoder(AbsDecoder, BatchScorerInterface):
         new_cache = []
         for c, decoder in zip(cache, self.decoders):
             x, tgt_mask, memory, memory_mask = decoder(
-                x, tgt_mask, memory, None, cache=c
+                x, tgt_mask, memory, memory_mask, cache=c
             )
             new_cache.append(x)
 
@@ -186,6 +189,114 @@ class BaseTransformerDecoder(AbsDecoder, BatchScorerInterface):
 
         return y, new_cache
 
+    def forward_one_step_kv_cache(
+        self,
+        tgt: torch.Tensor,
+        tgt_mask: torch.Tensor,
+        memory: torch.Tensor,
+        cache: List[torch.Tensor] = None,
+        memory_mask: torch.Tensor = None,
+        memory_ids: torch.Tensor = None,
+    ) -> Tuple[torch.Tensor, List[torch.Tensor]]:
+        """Forward one step with key/value caches of the attention layers.
+
+        Only the positions not in the cache are projected in the self-attention,
+        and the keys and values of the source attention are computed once
+        for the memory (see `memory_kv`).
+        Available when `use_kv_cache` is True.
+
+        Args:
+            tgt: input token ids, int64 (batch, maxlen_out)
+            tgt_mask: input token mask,  (batch, maxlen_out, maxlen_out)
+            memory: encoded memory, float32  (batch, maxlen_in, feat)
+            cache: cached key and value list of
+                (batch, 2, head, max_time_out-1, d_k)
+            memory_mask: encoded memory mask, (batch, 1, maxlen_in)
+            memory_ids: index of the memory of each target, int64 (batch,)
+                when the memory is given for each utterance (n_utt, maxlen_in, feat)
+        Returns:
+            y, cache: NN output value and cache per `self.decoders`.
+            y.shape` is (batch, maxlen_out, token)
+        """
+        x = self.embed(tgt)
+        if cache is None:
+            cache = [None] * len(self.decoders)
+        else:
+            offset = cache[0].size(3)
+            x = x[:, offset:]
+            tgt_mask = tgt_mask[:, offset:]
+        new_cache = []
+        memory_kvs = self.memory_kv(memory, memory_mask)
+        if memory_ids is not None:
+            n_group = memory.size(0)
+            memory_ids = memory_ids.to(memory.device)
+            groups = torch.arange(n_group, device=memory.device).repeat_interleave(
+                len(tgt) // n_group
+            )
+            # the keys and values are shared by the consecutive targets of a memory
+            # as long as every memory has the same number of targets
+            if len(groups) != len(tgt) or not torch.equal(memory_ids, groups):
+                memory_kvs = [kv[memory_ids] for kv in memory_kvs]
+                if memory_mask is not None:
+                    memory_mask = memory_mask[memory_ids]
+        for c, memory_kv, decoder in zip(cache, memory_kvs, self.decoders):
+            x, c = decoder.forward_kv_cache(
+                x, tgt_mask, memory_kv, memory_mask, cache=c
+            )
+            new_cache.append(c)
+
+        if self.normalize_before:
+            y = self.after_norm(x[:, -1])
+        else:
+            y = x[:, -1]
+        if self.output_layer is not None:
+            y = torch.log_softmax(self.output_layer(y), dim=-1)
+
+        return y, new_cache
+
+    @property
+    def use_kv_cache(self) -> bool:
+        """Whether the attention layers support `forward_one_step_kv_cache`."""
+        return all(
+            isinstance(d, DecoderLayer)
+            and isinstance(d.self_attn, MultiHeadedAttention)
+            and isinstance(d.src_attn, MultiHeadedAttention)
+            for d in self.decoders
+        )
+
+    def memory_kv(
+        self, memory: torch.Tensor, memory_mask: torch.Tensor = None
+    ) -> List[torch.Tensor]:
+        """Get keys and values of the source attention layers for the memory.
+
+        They are cached while the same memory is given step by step in beam search.
+        The memory expanded from a single utterance, i.e., with the stride 0
+        in the batch dimension, is computed only once for all the hypotheses.
+
+        Args:
+            memory: encoded memory, float32  (batch, maxlen_in, feat)
+            memory_mask: encoded memory mask, (batch, 1, maxlen_in)
+        Returns:
+            List of keys and values (batch or 1, 2, head, maxlen_in, d_k)
+            per `self.decoders`.
+        """
+        if memory_mask is None and memory.size(0) > 1 and memory.stride(0) == 0:
+            memory = memory[:1]
+        key = (
+            memory.data_ptr(),
+            memory.shape,
+            memory.stride()[1:],
+            memory._version,
+        )
+        if self._memory_kv_cache is None or self._memory_kv_cache[0] != key:
+            # NOTE: keep the reference so that its address is not reused
+            self._memory_kv_cache = (
+                key,
+                memory,
+                [d.src_attn.forward_kv(memory, memory) for d in self.decoders],
+            )
+        return self._memory_kv_cache[2]
+
     def score(self, ys, state, x):
         """Score."""
         ys_mask = subsequent_mask(len(ys), device=x.device).unsqueeze(0)
@@ -211,6 +322,50 @@ class BaseTransformerDecoder(AbsDecoder, BatchScorerInterface):
                 and next state list for ys.
 
         """
+        return self._batch_score(ys, states, xs)
+
+    def batch_score_padded(
+        self,
+        ys: torch.Tensor,
+        states: List[Any],
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        utt_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Score new token batch with padded encoder features.
+
+        With the key/value caches, the source attention keys and values are
+        computed once for each utterance while `xs` is unchanged in beam search.
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            states (List[Any]): Scorer states for prefix tokens.
+            xs (torch.Tensor):
+                The padded encoder feature of the utterances (n_utt, xlen, n_feat).
+            xs_lens (torch.Tensor): The lengths of the encoder features (n_utt,).
+            utt_ids (torch.Tensor): The utterance index of each hypothesis (n_batch,).
+
+        Returns:
+            tuple[torch.Tensor, List[Any]]: Tuple of
+                batchfied scores for next token with shape of `(n_batch, n_vocab)`
+                and next state list for ys.
+
+        """
+        memory_mask = (~make_pad_mask(xs_lens, maxlen=xs.size(1)))[:, None, :].to(
+            xs.device
+        )
+        return self._batch_score(
+            ys, states, xs, memory_mask, torch.as_tensor(utt_ids, device=xs.device)
+        )
+
+    def _batch_score(
+        self,
+        ys: torch.Tensor,
+        states: List[Any],
+        xs: torch.Tensor,
+        memory_mask: torch.Tensor = None,
+        memory_ids: torch.Tensor = None,
+    ) -> Tuple[torch.Tensor, List[Any]]:
         # merge states
         n_batch = len(ys)
         n_layers = len(self.decoders)
@@ -225,7 +380,21 @@ class BaseTransformerDecoder(AbsDecoder, BatchScorerInterface):
 
         # batch decoding
         ys_mask = subsequent_mask(ys.size(-1), device=xs.device).unsqueeze(0)
-        logp, states = self.forward_one_step(ys, ys_mask, xs, cache=batch_state)
+        if self.use_kv_cache:
+            logp, states = self.forward_one_step_kv_cache(
+                ys,
+                ys_mask,
+                xs,
+                cache=batch_state,
+                memory_mask=memory_mask,
+                memory_ids=memory_ids,
+            )
+        else:
+            if memory_ids is not None:
+                xs, memory_mask = xs[memory_ids], memory_mask[memory_ids]
+            logp, states = self.forward_one_step(
+                ys, ys_mask, xs, cache=batch_state, memory_mask=memory_mask
+            )
 
         # transpose state of [layer, batch] into [batch, layer]
         state_list = [[states[i][b] for i in range(n_layers)] for b in range(n_batch)]
@@ -22,6 +22,7 @@ from espnet2.asr.encoder.abs_encoder import AbsEncoder
 import math
 import torch
 from typeguard import check_argument_types
+from typing import List
 from typing import Optional
 from typing import Tuple
 
@@ -373,6 +374,96 @@ class ContextualBlockTransformerEncoder(AbsEncoder):
         Returns:
             position embedded tensor and mask
         """
+        outputs, blocks = self._prepare_infer_blocks(
+            xs_pad, ilens, prev_states, is_final
+        )
+        if outputs is not None:
+            return outputs
+
+        ys_chunk, _, _, _, past_encoder_ctx, _, _ = self.encoders(
+            blocks["xs_chunk"],
+            self._infer_block_mask(blocks["xs_chunk"]),
+            True,
+            blocks["past_encoder_ctx"],
+        )
+        return self._assemble_infer_blocks(ys_chunk, past_encoder_ctx, blocks)
+
+    def forward_infer_batch(
+        self,
+        xs_pads: List[torch.Tensor],
+        ilens: List[torch.Tensor],
+        prev_states: List[Optional[dict]],
+        is_final: List[bool],
+    ) -> List[Tuple[torch.Tensor, torch.Tensor, Optional[dict]]]:
+        """Encode the inputs of multiple streams in batches of blocks.
+
+        The blocks of each stream are prepared as in `forward_infer`,
+        and the encoder layers process one block of every stream at once.
+        The blocks of a stream are processed one by one, which is equivalent
+        to processing them at once because the context vectors are passed
+        from a block only to the next block.
+
+        Args:
+            xs_pads: Input tensors of the streams. [(1, L, D)]
+            ilens: Input lengths of the streams. [(1,)]
+            prev_states: States of the streams returned by the previous call.
+            is_final: Whether the inputs are the last ones of the streams.
+        Returns:
+            The outputs of `forward_infer` for each stream.
+        """
+        outputs = []
+        pending = []
+        for i, args in enumerate(zip(xs_pads, ilens, prev_states, is_final)):
+            output, blocks = self._prepare_infer_blocks(*args)
+            outputs.append(output)
+            if output is None:
+                pending.append((i, blocks, []))
+
+        n_rounds = max([blocks["block_num"] for _, blocks, _ in pending], default=0)
+        for r in range(n_rounds):
+            active = [(b, ys) for _, b, ys in pending if r < b["block_num"]]
+            # the first blocks of utterances have no context from past blocks
+            groups = [
+                [(b, ys) for b, ys in active if b["past_encoder_ctx"] is None],
+                [(b, ys) for b, ys in active if b["past_encoder_ctx"] is not None],
+            ]
+            for is_first, group in zip((True, False), groups):
+                if len(group) == 0:
+                    continue
+
+                xs_chunk = torch.cat([b["xs_chunk"][:, r : r + 1] for b, _ in group])
+                past_encoder_ctx = (
+                    None
+                    if is_first
+                    else torch.cat([b["past_encoder_ctx"] for b, _ in group])
+                )
+                ys_chunk, _, _, _, past_encoder_ctx, _, _ = self.encoders(
+                    xs_chunk, self._infer_block_mask(xs_chunk), True, past_encoder_ctx
+                )
+                for j, (blocks, ys_chunks) in enumerate(group):
+                    ys_chunks.append(ys_chunk[j : j + 1])
+                    blocks["past_encoder_ctx"] = past_encoder_ctx[j : j + 1]
+
+        for i, blocks, ys_chunks in pending:
+            outputs[i] = self._assemble_infer_blocks(
+                torch.cat(ys_chunks, dim=1), blocks["past_encoder_ctx"], blocks
+            )
+        return outputs
+
+    def _prepare_infer_blocks(
+        self,
+        xs_pad: torch.Tensor,
+        ilens: torch.Tensor,
+        prev_states: Optional[dict],
+        is_final: bool,
+    ) -> Tuple[Optional[Tuple[torch.Tensor, torch.Tensor, Optional[dict]]], dict]:
+        """Prepare the input blocks of `forward_infer`.
+
+        Returns:
+            The outputs of `forward_infer` if no block needs to be processed
+            by the encoder layers, or None.
+            The input blocks and the information to assemble the outputs.
+        """
         if prev_states is None:
             prev_addin = None
             buffer_before_downsampling = None
@@ -411,7 +502,7 @@ class ContextualBlockTransformerEncoder(AbsEncoder):
                     xs_pad.new_zeros(bsize, 0, self._output_size),
                     xs_pad.new_zeros(bsize),
                     next_states,
-                )
+                ), None
 
             n_res_samples = xs_pad.size(1) % self.subsample + self.subsample * 2
             buffer_before_downsampling = xs_pad.narrow(
@@ -458,7 +549,7 @@ class ContextualBlockTransformerEncoder(AbsEncoder):
                     xs_pad.new_zeros(bsize, 0, self._output_size),
                     xs_pad.new_zeros(bsize),
                     next_states,
-                )
+                ), None
 
             overlap_size = self.block_size - self.hop_size
             block_num = max(0, xs_pad.size(1) - overlap_size) // self.hop_size
@@ -479,7 +570,7 @@ class ContextualBlockTransformerEncoder(AbsEncoder):
             xs_pad = xs_pad.squeeze(0)
             if self.normalize_before:
                 xs_pad = self.after_norm(xs_pad)
-            return xs_pad, None, None
+            return (xs_pad, None, None), None
 
         # start block processing
         xs_chunk = xs_pad.new_zeros(
@@ -511,17 +602,37 @@ class ContextualBlockTransformerEncoder(AbsEncoder):
 
             prev_addin = addin
 
+        return None, {
+            "xs_pad": xs_pad,
+            "xs_chunk": xs_chunk,
+            "block_num": block_num,
+            "is_final": is_final,
+            "prev_addin": prev_addin,
+            "buffer_before_downsampling": buffer_before_downsampling,
+            "ilens_buffer": ilens_buffer,
+            "buffer_after_downsampling": buffer_after_downsampling,
+            "n_processed_blocks": n_processed_blocks,
+            "past_encoder_ctx": past_encoder_ctx,
+        }
+
+    def _infer_block_mask(self, xs_chunk: torch.Tensor) -> torch.Tensor:
         # mask setup, it should be the same to that of forward_train
-        mask_online = xs_pad.new_zeros(
-            xs_pad.size(0), block_num, self.block_size + 2, self.block_size + 2
+        mask_online = xs_chunk.new_zeros(
+            xs_chunk.size(0), xs_chunk.size(1), self.block_size + 2, self.block_size + 2
         )
         mask_online.narrow(2, 1, self.block_size + 1).narrow(
             3, 0, self.block_size + 1
         ).fill_(1)
+        return mask_online
 
-        ys_chunk, _, _, _, past_encoder_ctx, _, _ = self.encoders(
-            xs_chunk, mask_online, True, past_encoder_ctx
-        )
+    def _assemble_infer_blocks(
+        self, ys_chunk: torch.Tensor, past_encoder_ctx: torch.Tensor, blocks: dict
+    ) -> Tuple[torch.Tensor, torch.Tensor, Optional[dict]]:
+        """Assemble the outputs of `forward_infer` from the encoded blocks."""
+        xs_pad = blocks["xs_pad"]
+        block_num = blocks["block_num"]
+        is_final = blocks["is_final"]
+        n_processed_blocks = blocks["n_processed_blocks"]
 
         # remove addin
         ys_chunk = ys_chunk.narrow(2, 1, self.block_size)
@@ -557,10 +668,10 @@ class ContextualBlockTransformerEncoder(AbsEncoder):
             next_states = None
         else:
             next_states = {
-                "prev_addin": prev_addin,
-                "buffer_before_downsampling": buffer_before_downsampling,
-                "ilens_buffer": ilens_buffer,
-                "buffer_after_downsampling": buffer_after_downsampling,
+                "prev_addin": blocks["prev_addin"],
+                "buffer_before_downsampling": blocks["buffer_before_downsampling"],
+                "ilens_buffer": blocks["ilens_buffer"],
+                "buffer_after_downsampling": blocks["buffer_after_downsampling"],
                 "n_processed_blocks": n_processed_blocks + block_num,
                 "past_encoder_ctx": past_encoder_ctx,
             }
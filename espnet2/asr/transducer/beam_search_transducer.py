@@ -232,11 +232,83 @@ class BeamSearchTransducer:
 
         return [hyp]
 
+    def batch_expand(
+        self,
+        hyps: List[Hypothesis],
+        beam_state: Tuple[torch.Tensor, Optional[torch.Tensor]],
+        enc_out_t: torch.Tensor,
+        beam_k: int,
+        cache: Dict[Tuple[int, ...], Any],
+        use_lm: bool,
+    ) -> Tuple[
+        List[float],
+        List[List[float]],
+        List[List[int]],
+        Tuple[torch.Tensor, Optional[torch.Tensor]],
+        List[Any],
+    ]:
+        """Compute blank and label expansions of hypotheses in a batch.
+
+        The prediction network is run once for the label sequences missing
+        in the cache, and the joint network and the LM are called once for all
+        the hypotheses. The scores are moved to the host at once.
+
+        Args:
+            hyps: Hypotheses to expand.
+            beam_state: Decoder hidden states. ((N, B, D_dec), (N, B, D_dec))
+            enc_out_t: Encoder output sequence at the current step. (1 or B, D_enc)
+            beam_k: Number of label expansions per hypothesis.
+            cache: Pairs of (dec_out, dec_state) for each label sequence.
+            use_lm: Whether to add the LM scores to the label expansions.
+
+        Returns:
+            blank_logp: Log-probabilities of blank. [B]
+            topk_logp: Scores of the best label expansions. [B x beam_k]
+            topk_ids: Label IDs of the best label expansions. [B x beam_k]
+            beam_state: Decoder hidden states after the last labels.
+                          ((N, B, D_dec), (N, B, D_dec))
+            beam_lm_states: LM states after the last labels. [B]
+
+        """
+        beam_dec_out, beam_state, beam_lm_tokens = self.decoder.batch_score(
+            hyps,
+            beam_state,
+            cache,
+            use_lm,
+        )
+
+        beam_logp = torch.log_softmax(
+            self.joint_network(enc_out_t, beam_dec_out),
+            dim=-1,
+        )
+        topk_logp, topk_ids = beam_logp[:, 1:].topk(beam_k, dim=-1)
+        topk_ids = topk_ids + 1
+
+        if use_lm:
+            beam_lm_scores, beam_lm_states = self.lm.batch_score(
+                beam_lm_tokens, [h.lm_state for h in hyps], None
+            )
+            topk_logp = topk_logp + self.lm_weight * beam_lm_scores.gather(1, topk_ids)
+        else:
+            beam_lm_states = [h.lm_state for h in hyps]
+
+        return (
+            beam_logp[:, 0].tolist(),
+            topk_logp.tolist(),
+            topk_ids.tolist(),
+            beam_state,
+            beam_lm_states,
+        )
+
     def default_beam_search(self, enc_out: torch.Tensor) -> List[Hypothesis]:
         """Beam search implementation.
 
         Modified from https://arxiv.org/pdf/1211.3711.pdf
 
+        The hypotheses are still popped one by one, but all the hypotheses
+        not expanded yet at the current time step are expanded in a batch
+        when the best one needs its expansions.
+
         Args:
             enc_out: Encoder output sequence. (T, D)
 
@@ -247,53 +319,81 @@ class BeamSearchTransducer:
         beam = min(self.beam_size, self.vocab_size)
         beam_k = min(beam, (self.vocab_size - 1))
 
-        dec_state = self.decoder.init_state(1)
+        beam_state = self.decoder.init_state(beam)
 
-        kept_hyps = [Hypothesis(score=0.0, yseq=[self.blank_id], dec_state=dec_state)]
+        kept_hyps = [
+            Hypothesis(
+                score=0.0,
+                yseq=[self.blank_id],
+                dec_state=self.decoder.select_state(beam_state, 0),
+            )
+        ]
         cache = {}
 
+        if self.use_lm:
+            kept_hyps[0].lm_state = self.lm.zero_state()
+
         for enc_out_t in enc_out:
             hyps = kept_hyps
             kept_hyps = []
 
+            enc_out_t = enc_out_t.unsqueeze(0)
+            expansions = {}
+
             while True:
                 max_hyp = max(hyps, key=lambda x: x.score)
                 hyps.remove(max_hyp)
 
-                dec_out, state, lm_tokens = self.decoder.score(max_hyp, cache)
+                if tuple(max_hyp.yseq) not in expansions:
+                    batch_hyps = {}
+                    for hyp in [max_hyp] + hyps:
+                        key = tuple(hyp.yseq)
 
-                logp = torch.log_softmax(
-                    self.joint_network(enc_out_t, dec_out),
-                    dim=-1,
-                )
-                top_k = logp[1:].topk(beam_k, dim=-1)
+                        if key not in expansions and key not in batch_hyps:
+                            batch_hyps[key] = hyp
+                    batch_hyps = list(batch_hyps.values())
+
+                    (
+                        blank_logp,
+                        topk_logp,
+                        topk_ids,
+                        beam_state,
+                        beam_lm_states,
+                    ) = self.batch_expand(
+                        batch_hyps,
+                        beam_state,
+                        enc_out_t,
+                        beam_k,
+                        cache,
+                        self.use_lm,
+                    )
+
+                    for i, hyp in enumerate(batch_hyps):
+                        # NOTE: A list, not an iterator, because the hypotheses
+                        #   having the same label sequence share the expansions
+                        expansions[tuple(hyp.yseq)] = (
+                            blank_logp[i],
+                            list(zip(topk_logp[i], topk_ids[i])),
+                            self.decoder.select_state(beam_state, i),
+                            beam_lm_states[i],
+                        )
+
+                blank_logp, topk, state, lm_state = expansions[tuple(max_hyp.yseq)]
 
                 kept_hyps.append(
                     Hypothesis(
-                        score=(max_hyp.score + float(logp[0:1])),
+                        score=(max_hyp.score + blank_logp),
                         yseq=max_hyp.yseq[:],
                         dec_state=max_hyp.dec_state,
                         lm_state=max_hyp.lm_state,
                     )
                 )
 
-                if self.use_lm:
-                    lm_scores, lm_state = self.lm.score(
-                        lm_tokens, max_hyp.lm_state, None
-                    )
-                else:
-                    lm_state = max_hyp.lm_state
-
-                for logp, k in zip(*top_k):
-                    score = max_hyp.score + float(logp)
-
-                    if self.use_lm:
-                        score += self.lm_weight * lm_scores[k + 1]
-
+                for logp, k in topk:
                     hyps.append(
                         Hypothesis(
-                            score=score,
-                            yseq=max_hyp.yseq[:] + [int(k + 1)],
+                            score=(max_hyp.score + logp),
+                            yseq=max_hyp.yseq[:] + [k],
                             dec_state=state,
                             lm_state=lm_state,
                         )
@@ -323,6 +423,7 @@ class BeamSearchTransducer:
 
         """
         beam = min(self.beam_size, self.vocab_size)
+        beam_k = min(beam, (self.vocab_size - 1))
 
         beam_state = self.decoder.init_state(beam)
 
@@ -340,6 +441,7 @@ class BeamSearchTransducer:
 
         for enc_out_t in enc_out:
             A = []
+            seq_A = {}
             C = B
 
             enc_out_t = enc_out_t.unsqueeze(0)
@@ -347,59 +449,48 @@ class BeamSearchTransducer:
             for v in range(self.max_sym_exp):
                 D = []
 
-                beam_dec_out, beam_state, beam_lm_tokens = self.decoder.batch_score(
+                (
+                    blank_logp,
+                    topk_logp,
+                    topk_ids,
+                    beam_state,
+                    beam_lm_states,
+                ) = self.batch_expand(
                     C,
                     beam_state,
+                    enc_out_t,
+                    beam_k,
                     cache,
-                    self.use_lm,
-                )
-
-                beam_logp = torch.log_softmax(
-                    self.joint_network(enc_out_t, beam_dec_out),
-                    dim=-1,
+                    self.use_lm and v < (self.max_sym_exp - 1),
                 )
-                beam_topk = beam_logp[:, 1:].topk(beam, dim=-1)
-
-                seq_A = [h.yseq for h in A]
 
                 for i, hyp in enumerate(C):
-                    if hyp.yseq not in seq_A:
-                        A.append(
-                            Hypothesis(
-                                score=(hyp.score + float(beam_logp[i, 0])),
-                                yseq=hyp.yseq[:],
-                                dec_state=hyp.dec_state,
-                                lm_state=hyp.lm_state,
-                            )
-                        )
-                    else:
-                        dict_pos = seq_A.index(hyp.yseq)
+                    key = tuple(hyp.yseq)
+                    score = hyp.score + blank_logp[i]
 
-                        A[dict_pos].score = np.logaddexp(
-                            A[dict_pos].score, (hyp.score + float(beam_logp[i, 0]))
+                    if key not in seq_A:
+                        seq_A[key] = Hypothesis(
+                            score=score,
+                            yseq=hyp.yseq[:],
+                            dec_state=hyp.dec_state,
+                            lm_state=hyp.lm_state,
                         )
+                        A.append(seq_A[key])
+                    else:
+                        seq_A[key].score = np.logaddexp(seq_A[key].score, score)
 
                 if v < (self.max_sym_exp - 1):
-                    if self.use_lm:
-                        beam_lm_scores, beam_lm_states = self.lm.batch_score(
-                            beam_lm_tokens, [c.lm_state for c in C], None
-                        )
-
                     for i, hyp in enumerate(C):
-                        for logp, k in zip(beam_topk[0][i], beam_topk[1][i] + 1):
-                            new_hyp = Hypothesis(
-                                score=(hyp.score + float(logp)),
-                                yseq=(hyp.yseq + [int(k)]),
-                                dec_state=self.decoder.select_state(beam_state, i),
-                                lm_state=hyp.lm_state,
+                        for logp, k in zip(topk_logp[i], topk_ids[i]):
+                            D.append(
+                                Hypothesis(
+                                    score=(hyp.score + logp),
+                                    yseq=(hyp.yseq + [k]),
+                                    dec_state=self.decoder.select_state(beam_state, i),
+                                    lm_state=beam_lm_states[i],
+                                )
                             )
 
-                            if self.use_lm:
-                                new_hyp.score += self.lm_weight * beam_lm_scores[i, k]
-                                new_hyp.lm_state = beam_lm_states[i]
-
-                            D.append(new_hyp)
-
                 C = sorted(D, key=lambda x: x.score, reverse=True)[:beam]
 
             B = sorted(A, key=lambda x: x.score, reverse=True)[:beam]
@@ -171,7 +171,8 @@ class TransducerDecoder(AbsDecoder):
 
         Args:
             hyp: Hypothesis.
-            cache: Pairs of (dec_out, state) for each label sequence. (key)
+            cache: Pairs of (dec_out, state) for each label sequence.
+                The keys are the label sequences as tuples.
 
         Returns:
             dec_out: Decoder output sequence. (1, D_dec)
@@ -181,15 +182,15 @@ class TransducerDecoder(AbsDecoder):
         """
         label = torch.full((1, 1), hyp.yseq[-1], dtype=torch.long, device=self.device)
 
-        str_labels = "_".join(list(map(str, hyp.yseq)))
+        key = tuple(hyp.yseq)
 
-        if str_labels in cache:
-            dec_out, dec_state = cache[str_labels]
+        if key in cache:
+            dec_out, dec_state = cache[key]
         else:
             dec_emb = self.embed(label)
 
             dec_out, dec_state = self.rnn_forward(dec_emb, hyp.dec_state)
-            cache[str_labels] = (dec_out, dec_state)
+            cache[key] = (dec_out, dec_state)
 
         return dec_out[0][0], dec_state, label[0]
 
@@ -205,7 +206,8 @@ class TransducerDecoder(AbsDecoder):
         Args:
             hyps: Hypotheses.
             states: Decoder hidden states. ((N, B, D_dec), (N, B, D_dec))
-            cache: Pairs of (dec_out, dec_states) for each label sequences. (keys)
+            cache: Pairs of (dec_out, dec_states) for each label sequence.
+                The keys are the label sequences as tuples.
             use_lm: Whether to compute label ID sequences for LM.
 
         Returns:
@@ -220,15 +222,17 @@ class TransducerDecoder(AbsDecoder):
         done = [None] * final_batch
 
         for i, hyp in enumerate(hyps):
-            str_labels = "_".join(list(map(str, hyp.yseq)))
+            key = tuple(hyp.yseq)
 
-            if str_labels in cache:
-                done[i] = cache[str_labels]
+            if key in cache:
+                done[i] = cache[key]
             else:
-                process.append((str_labels, hyp.yseq[-1], hyp.dec_state))
+                process.append((key, hyp.yseq[-1], hyp.dec_state))
 
         if process:
-            labels = torch.LongTensor([[p[1]] for p in process], device=self.device)
+            labels = torch.tensor(
+                [[p[1]] for p in process], dtype=torch.long, device=self.device
+            )
             p_dec_states = self.create_batch_states(
                 self.init_state(labels.size(0)), [p[2] for p in process]
             )
@@ -250,8 +254,8 @@ class TransducerDecoder(AbsDecoder):
         dec_states = self.create_batch_states(dec_states, [d[1] for d in done])
 
         if use_lm:
-            lm_labels = torch.LongTensor(
-                [h.yseq[-1] for h in hyps], device=self.device
+            lm_labels = torch.tensor(
+                [h.yseq[-1] for h in hyps], dtype=torch.long, device=self.device
             ).view(final_batch, 1)
 
             return dec_out, dec_states, lm_labels
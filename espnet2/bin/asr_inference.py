@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+import json
 import logging
 from pathlib import Path
 import sys
@@ -16,9 +17,11 @@ from typeguard import check_return_type
 from typing import List
 
 from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.batch_beam_search_multi_utt import BatchBeamSearchMultiUtt
 from espnet.nets.batch_beam_search_online_sim import BatchBeamSearchOnlineSim
 from espnet.nets.beam_search import BeamSearch
 from espnet.nets.beam_search import Hypothesis
+from espnet.nets.beam_search_profiler import BeamSearchProfiler
 from espnet.nets.pytorch_backend.transformer.subsampling import TooShortUttError
 from espnet.nets.scorer_interface import BatchScorerInterface
 from espnet.nets.scorers.ctc import CTCPrefixScorer
@@ -37,6 +40,7 @@ from espnet2.text.token_id_converter import TokenIDConverter
 from espnet2.torch_utils.device_funcs import to_device
 from espnet2.torch_utils.set_all_random_seed import set_all_random_seed
 from espnet2.utils import config_argparse
+from espnet2.utils.types import float_or_none
 from espnet2.utils.types import str2bool
 from espnet2.utils.types import str2triple_str
 from espnet2.utils.types import str_or_none
@@ -72,11 +76,17 @@ class Speech2Text:
         dtype: str = "float32",
         beam_size: int = 20,
         ctc_weight: float = 0.5,
+        ctc_window: int = 0,
         lm_weight: float = 1.0,
         ngram_weight: float = 0.9,
         penalty: float = 0.0,
         nbest: int = 1,
         streaming: bool = False,
+        profile_beam_search: bool = False,
+        beam_threshold: Optional[float] = None,
+        dynamic_beam_mass: Optional[float] = None,
+        min_beam_size: int = 1,
+        early_stop: bool = False,
     ):
         assert check_argument_types()
 
@@ -89,7 +99,7 @@ class Speech2Text:
 
         decoder = asr_model.decoder
 
-        ctc = CTCPrefixScorer(ctc=asr_model.ctc, eos=asr_model.eos)
+        ctc = CTCPrefixScorer(ctc=asr_model.ctc, eos=asr_model.eos, window=ctc_window)
         token_list = asr_model.token_list
         scorers.update(
             decoder=decoder,
@@ -148,31 +158,37 @@ class Speech2Text:
                 vocab_size=len(token_list),
                 token_list=token_list,
                 pre_beam_score_key=None if ctc_weight == 1.0 else "full",
+                beam_threshold=beam_threshold,
+                dynamic_beam_mass=dynamic_beam_mass,
+                min_beam_size=min_beam_size,
+                early_stop=early_stop,
             )
 
             # TODO(karita): make all scorers batchfied
-            if batch_size == 1:
-                non_batch = [
-                    k
-                    for k, v in beam_search.full_scorers.items()
-                    if not isinstance(v, BatchScorerInterface)
-                ]
-                if len(non_batch) == 0:
-                    if streaming:
-                        beam_search.__class__ = BatchBeamSearchOnlineSim
-                        beam_search.set_streaming_config(asr_train_config)
-                        logging.info(
-                            "BatchBeamSearchOnlineSim implementation is selected."
-                        )
-                    else:
-                        beam_search.__class__ = BatchBeamSearch
-                        logging.info("BatchBeamSearch implementation is selected.")
+            non_batch = [
+                k
+                for k, v in beam_search.full_scorers.items()
+                if not isinstance(v, BatchScorerInterface)
+            ]
+            if len(non_batch) == 0:
+                if streaming:
+                    beam_search.__class__ = BatchBeamSearchOnlineSim
+                    beam_search.set_streaming_config(asr_train_config)
+                    logging.info("BatchBeamSearchOnlineSim implementation is selected.")
+                elif batch_size > 1:
+                    beam_search.__class__ = BatchBeamSearchMultiUtt
+                    logging.info("BatchBeamSearchMultiUtt implementation is selected.")
                 else:
-                    logging.warning(
-                        f"As non-batch scorers {non_batch} are found, "
-                        f"fall back to non-batch implementation."
-                    )
+                    beam_search.__class__ = BatchBeamSearch
+                    logging.info("BatchBeamSearch implementation is selected.")
+            else:
+                logging.warning(
+                    f"As non-batch scorers {non_batch} are found, "
+                    f"fall back to non-batch implementation."
+                )
 
+            if profile_beam_search:
+                beam_search.profiler = BeamSearchProfiler(synchronize=device != "cpu")
             beam_search.to(device=device, dtype=getattr(torch, dtype)).eval()
             for scorer in scorers.values():
                 if isinstance(scorer, torch.nn.Module):
@@ -212,21 +228,39 @@ class Speech2Text:
 
     @torch.no_grad()
     def __call__(
-        self, speech: Union[torch.Tensor, np.ndarray]
-    ) -> List[
-        Tuple[
-            Optional[str],
-            List[str],
-            List[int],
-            Union[Hypothesis, ExtTransHypothesis, TransHypothesis],
-        ]
+        self,
+        speech: Union[torch.Tensor, np.ndarray],
+        speech_lengths: Union[torch.Tensor, np.ndarray] = None,
+    ) -> Union[
+        List[
+            Tuple[
+                Optional[str],
+                List[str],
+                List[int],
+                Union[Hypothesis, ExtTransHypothesis, TransHypothesis],
+            ]
+        ],
+        List[
+            List[
+                Tuple[
+                    Optional[str],
+                    List[str],
+                    List[int],
+                    Union[Hypothesis, ExtTransHypothesis, TransHypothesis],
+                ]
+            ]
+        ],
     ]:
         """Inference
 
         Args:
-            data: Input speech data
+            speech: Input speech data of a single utterance (Nsamples,)
+                or padded speech data of multiple utterances (B, Nsamples)
+                if speech_lengths is given
+            speech_lengths: The lengths of the multiple utterances (B,)
         Returns:
-            text, token, token_int, hyp
+            text, token, token_int, hyp for a single utterance,
+            or the list of them for each utterance if speech_lengths is given
 
         """
         assert check_argument_types()
@@ -235,29 +269,73 @@ class Speech2Text:
         if isinstance(speech, np.ndarray):
             speech = torch.tensor(speech)
 
-        # data: (Nsamples,) -> (1, Nsamples)
-        speech = speech.unsqueeze(0).to(getattr(torch, self.dtype))
-        # lengths: (1,)
-        lengths = speech.new_full([1], dtype=torch.long, fill_value=speech.size(1))
+        if speech_lengths is None:
+            # data: (Nsamples,) -> (1, Nsamples)
+            speech = speech.unsqueeze(0).to(getattr(torch, self.dtype))
+            # lengths: (1,)
+            lengths = speech.new_full([1], dtype=torch.long, fill_value=speech.size(1))
+        else:
+            speech = speech.to(getattr(torch, self.dtype))
+            lengths = torch.as_tensor(speech_lengths, dtype=torch.long)
         batch = {"speech": speech, "speech_lengths": lengths}
 
         # a. To device
         batch = to_device(batch, device=self.device)
 
         # b. Forward Encoder
-        enc, _ = self.asr_model.encode(**batch)
+        enc, enc_lens = self.asr_model.encode(**batch)
         if isinstance(enc, tuple):
             enc = enc[0]
-        assert len(enc) == 1, len(enc)
 
+        if speech_lengths is None:
+            assert len(enc) == 1, len(enc)
+            results = self._decode(enc[0])
+            assert check_return_type(results)
+            return results
+
+        # c. Passed the encoder results of all the utterances to the beam search
+        if isinstance(self.beam_search, BatchBeamSearchMultiUtt):
+            nbest_hyps_list = self.beam_search(
+                x=enc,
+                maxlenratio=self.maxlenratio,
+                minlenratio=self.minlenratio,
+                x_lens=enc_lens,
+            )
+            results = [self._to_results(hyps) for hyps in nbest_hyps_list]
+        else:
+            results = [self._decode(e[:l]) for e, l in zip(enc, enc_lens)]
+        assert check_return_type(results)
+        return results
+
+    def _decode(
+        self, enc: torch.Tensor
+    ) -> List[
+        Tuple[
+            Optional[str],
+            List[str],
+            List[int],
+            Union[Hypothesis, ExtTransHypothesis, TransHypothesis],
+        ]
+    ]:
         # c. Passed the encoder result and the beam search
         if self.beam_search_transducer:
-            nbest_hyps = self.beam_search_transducer(enc[0])
+            nbest_hyps = self.beam_search_transducer(enc)
         else:
             nbest_hyps = self.beam_search(
-                x=enc[0], maxlenratio=self.maxlenratio, minlenratio=self.minlenratio
+                x=enc, maxlenratio=self.maxlenratio, minlenratio=self.minlenratio
             )
+        return self._to_results(nbest_hyps)
 
+    def _to_results(
+        self, nbest_hyps: List[Union[Hypothesis, TransHypothesis]]
+    ) -> List[
+        Tuple[
+            Optional[str],
+            List[str],
+            List[int],
+            Union[Hypothesis, ExtTransHypothesis, TransHypothesis],
+        ]
+    ]:
         nbest_hyps = nbest_hyps[: self.nbest]
 
         results = []
@@ -282,8 +360,6 @@ class Speech2Text:
             else:
                 text = None
             results.append((text, token, token_int, hyp))
-
-        assert check_return_type(results)
         return results
 
     @staticmethod
@@ -327,6 +403,7 @@ def inference(
     ngpu: int,
     seed: int,
     ctc_weight: float,
+    ctc_window: int,
     lm_weight: float,
     ngram_weight: float,
     penalty: float,
@@ -348,10 +425,13 @@ def inference(
     allow_variable_data_keys: bool,
     transducer_conf: Optional[dict],
     streaming: bool,
+    profile_beam_search: bool,
+    beam_threshold: Optional[float],
+    dynamic_beam_mass: Optional[float],
+    min_beam_size: int,
+    early_stop: bool,
 ):
     assert check_argument_types()
-    if batch_size > 1:
-        raise NotImplementedError("batch decoding is not implemented")
     if word_lm_train_config is not None:
         raise NotImplementedError("Word LM is not implemented")
     if ngpu > 1:
@@ -383,14 +463,21 @@ def inference(
         device=device,
         maxlenratio=maxlenratio,
         minlenratio=minlenratio,
+        batch_size=batch_size,
         dtype=dtype,
         beam_size=beam_size,
         ctc_weight=ctc_weight,
+        ctc_window=ctc_window,
         lm_weight=lm_weight,
         ngram_weight=ngram_weight,
         penalty=penalty,
         nbest=nbest,
         streaming=streaming,
+        profile_beam_search=profile_beam_search,
+        beam_threshold=beam_threshold,
+        dynamic_beam_mass=dynamic_beam_mass,
+        min_beam_size=min_beam_size,
+        early_stop=early_stop,
     )
     speech2text = Speech2Text.from_pretrained(
         model_tag=model_tag,
@@ -412,35 +499,49 @@ def inference(
 
     # 7 .Start for-loop
     # FIXME(kamo): The output format should be discussed about
+    profiler = getattr(speech2text.beam_search, "profiler", None)
     with DatadirWriter(output_dir) as writer:
         for keys, batch in loader:
             assert isinstance(batch, dict), type(batch)
             assert all(isinstance(s, str) for s in keys), keys
             _bs = len(next(iter(batch.values())))
             assert len(keys) == _bs, f"{len(keys)} != {_bs}"
-            batch = {k: v[0] for k, v in batch.items() if not k.endswith("_lengths")}
+            if batch_size == 1:
+                batch = {
+                    k: v[0] for k, v in batch.items() if not k.endswith("_lengths")
+                }
 
-            # N-best list of (text, token, token_int, hyp_object)
+            # N-best list of (text, token, token_int, hyp_object) for each utterance
             try:
-                results = speech2text(**batch)
+                results_list = speech2text(**batch)
+                if batch_size == 1:
+                    results_list = [results_list]
+                if profiler is not None:
+                    # the profile of the beam search of the batch
+                    profile = dict(keys=list(keys), **profiler.summary())
+                    writer["profile"]["beam_search"][keys[0]] = json.dumps(profile)
             except TooShortUttError as e:
                 logging.warning(f"Utterance {keys} {e}")
                 hyp = Hypothesis(score=0.0, scores={}, states={}, yseq=[])
-                results = [[" ", ["<space>"], [2], hyp]] * nbest
+                results_list = [[[" ", ["<space>"], [2], hyp]] * nbest] * _bs
 
-            # Only supporting batch_size==1
-            key = keys[0]
-            for n, (text, token, token_int, hyp) in zip(range(1, nbest + 1), results):
-                # Create a directory: outdir/{n}best_recog
-                ibest_writer = writer[f"{n}best_recog"]
+            for key, results in zip(keys, results_list):
+                for n, (text, token, token_int, hyp) in zip(
+                    range(1, nbest + 1), results
+                ):
+                    # Create a directory: outdir/{n}best_recog
+                    ibest_writer = writer[f"{n}best_recog"]
 
-                # Write the result to each file
-                ibest_writer["token"][key] = " ".join(token)
-                ibest_writer["token_int"][key] = " ".join(map(str, token_int))
-                ibest_writer["score"][key] = str(hyp.score)
+                    # Write the result to each file
+                    ibest_writer["token"][key] = " ".join(token)
+                    ibest_writer["token_int"][key] = " ".join(map(str, token_int))
+                    ibest_writer["score"][key] = str(hyp.score)
 
-                if text is not None:
-                    ibest_writer["text"][key] = text
+                    if text is not None:
+                        ibest_writer["text"][key] = text
+
+        if profiler is not None:
+            logging.info(f"beam search profile: {profiler.summary(total=True)}")
 
 
 def get_parser():
@@ -566,9 +667,56 @@ def get_parser():
         default=0.5,
         help="CTC weight in joint decoding",
     )
+    group.add_argument(
+        "--ctc_window",
+        type=int,
+        default=0,
+        help="The number of frames computed for each token in CTC prefix scoring. "
+        "If ctc_window>0, the CTC states of hypotheses are bounded to the window "
+        "so that long-form speech can be decoded in bounded memory. "
+        "If ctc_window=0 (default), the whole input is computed for each token",
+    )
     group.add_argument("--lm_weight", type=float, default=1.0, help="RNNLM weight")
     group.add_argument("--ngram_weight", type=float, default=0.9, help="ngram weight")
     group.add_argument("--streaming", type=str2bool, default=False)
+    group.add_argument(
+        "--profile_beam_search",
+        type=str2bool,
+        default=False,
+        help="Whether to profile the beam search. "
+        "The wall time of each scorer, the pre-beam sizes and the timeline of steps "
+        "are written to output_dir/profile/beam_search for each batch",
+    )
+    group.add_argument(
+        "--beam_threshold",
+        type=float_or_none,
+        default=None,
+        help="If given, prune the running hypotheses whose scores are lower than "
+        "the best score minus beam_threshold at each step",
+    )
+    group.add_argument(
+        "--dynamic_beam_mass",
+        type=float_or_none,
+        default=None,
+        help="If given, prune the running hypotheses to the smallest set of the best "
+        "ones whose posterior mass reaches dynamic_beam_mass at each step",
+    )
+    group.add_argument(
+        "--min_beam_size",
+        type=int,
+        default=1,
+        help="The minimum number of the running hypotheses kept by beam_threshold "
+        "and dynamic_beam_mass",
+    )
+    group.add_argument(
+        "--early_stop",
+        type=str2bool,
+        default=False,
+        help="Whether to finish the search when all the running hypotheses are "
+        "dominated by the best ended hypothesis. "
+        "The best result is unchanged unless the scores increase with the length, "
+        "e.g. with a positive penalty",
+    )
 
     group.add_argument(
         "--transducer_conf",
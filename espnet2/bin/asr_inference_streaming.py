@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import copy
 from espnet.nets.batch_beam_search_online import BatchBeamSearchOnline
 from espnet.nets.beam_search import Hypothesis
 from espnet.nets.pytorch_backend.transformer.subsampling import TooShortUttError
@@ -24,6 +26,7 @@ from espnet2.utils import config_argparse
 from espnet2.utils.types import str2bool
 from espnet2.utils.types import str2triple_str
 from espnet2.utils.types import str_or_none
+import functools
 import logging
 import numpy as np
 from pathlib import Path
@@ -31,6 +34,7 @@ import sys
 import torch
 from typeguard import check_argument_types
 from typeguard import check_return_type
+from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Sequence
@@ -309,6 +313,211 @@ class Speech2TextStreaming:
         return results
 
 
+class Speech2TextStreamingMultiplexer:
+    """Serve multiple concurrent streams with one Speech2TextStreaming
+
+    Each stream has its own state slot, i.e., the states of the frontend,
+    the encoder and the beam search, so that the chunks of different streams
+    can be given in any order. The blocks of all the streams given at once
+    are encoded in batches by `forward_infer_batch` of the encoder.
+
+    Examples:
+        >>> speech2text = Speech2TextStreaming("asr_config.yml", "asr.pth")
+        >>> multiplexer = Speech2TextStreamingMultiplexer(speech2text)
+        >>> results = multiplexer({"a": chunk_a, "b": chunk_b}, is_final={"b": True})
+        >>> results["a"]
+        [(text, token, token_int, hypothesis object), ...]
+
+    """
+
+    def __init__(self, speech2text: Speech2TextStreaming):
+        self.speech2text = speech2text
+        self.slots = {}
+
+    def open(self, key: str):
+        """Allocate the state slot of a new stream."""
+        if key in self.slots:
+            raise RuntimeError(f"The stream is already opened: {key}")
+        self.slots[key] = dict(
+            frontend_states=None,
+            encoder_states=None,
+            beam_search=self.build_beam_search(),
+        )
+
+    def close(self, key: str):
+        """Release the state slot of a stream."""
+        del self.slots[key]
+
+    def build_beam_search(self) -> BatchBeamSearchOnline:
+        """Build the beam search of a stream sharing the networks."""
+        beam_search = copy.copy(self.speech2text.beam_search)
+        # The scorers keeping the states of an utterance, e.g., the CTC posteriors
+        # in CTCPrefixScorer, are copied for each stream.
+        scorers = {
+            k: copy.copy(v) if isinstance(v, CTCPrefixScorer) else v
+            for k, v in beam_search.scorers.items()
+        }
+        beam_search.scorers = scorers
+        beam_search.full_scorers = {k: scorers[k] for k in beam_search.full_scorers}
+        beam_search.part_scorers = {k: scorers[k] for k in beam_search.part_scorers}
+        beam_search.reset()
+        return beam_search
+
+    @torch.no_grad()
+    def __call__(
+        self,
+        speech: Dict[str, Union[torch.Tensor, np.ndarray]],
+        is_final: Optional[Dict[str, bool]] = None,
+    ) -> Dict[str, List[Tuple[Optional[str], List[str], List[int], Hypothesis]]]:
+        """Inference of the next chunks of streams
+
+        The streams not opened yet are opened, and the final ones are closed.
+
+        Args:
+            speech: Input speech chunk of each stream
+            is_final: Whether the chunk is the last one of each stream
+        Returns:
+            text, token, token_int, hyp of each stream
+
+        """
+        assert check_argument_types()
+        if is_final is None:
+            is_final = {}
+
+        keys = list(speech)
+        finals = [is_final.get(k, False) for k in keys]
+        for key in keys:
+            if key not in self.slots:
+                self.open(key)
+        slots = [self.slots[k] for k in keys]
+
+        feats = []
+        feats_lengths = []
+        for key, slot, final in zip(keys, slots, finals):
+            x = speech[key]
+            if isinstance(x, np.ndarray):
+                x = torch.tensor(x)
+            feat, feat_lengths, frontend_states = self.speech2text.apply_frontend(
+                x, slot["frontend_states"], is_final=final
+            )
+            slot["frontend_states"] = frontend_states
+            feats.append(feat)
+            feats_lengths.append(feat_lengths)
+
+        encoded = self.speech2text.asr_model.encoder.forward_infer_batch(
+            feats, feats_lengths, [slot["encoder_states"] for slot in slots], finals
+        )
+
+        results = {}
+        for key, slot, final, (enc, _, encoder_states) in zip(
+            keys, slots, finals, encoded
+        ):
+            slot["encoder_states"] = encoder_states
+            nbest_hyps = slot["beam_search"](
+                x=enc[0],
+                maxlenratio=self.speech2text.maxlenratio,
+                minlenratio=self.speech2text.minlenratio,
+                is_final=final,
+            )
+            results[key] = self.speech2text.assemble_hyps(nbest_hyps)
+            if final:
+                self.close(key)
+        return results
+
+
+class Speech2TextStreamingServer:
+    """Asyncio frontend of Speech2TextStreamingMultiplexer
+
+    The chunks sent by concurrent clients are gathered,
+    at most one chunk for each stream, and recognized at once.
+    The recognition runs in the default executor
+    so that the clients can send the next chunks meanwhile.
+
+    Examples:
+        >>> server = Speech2TextStreamingServer(multiplexer)
+        >>> async def client(key, chunks):
+        ...     for i, chunk in enumerate(chunks):
+        ...         results = await server.recognize(
+        ...             key, chunk, is_final=i == len(chunks) - 1
+        ...         )
+        ...     return results
+        >>> async def serve():
+        ...     serving = asyncio.ensure_future(server.run())
+        ...     results = await asyncio.gather(client("a", a), client("b", b))
+        ...     serving.cancel()
+
+    """
+
+    def __init__(self, multiplexer: Speech2TextStreamingMultiplexer):
+        self.multiplexer = multiplexer
+        self.requests = None
+
+    def _queue(self) -> asyncio.Queue:
+        # NOTE: The queue is created in the running event loop.
+        if self.requests is None:
+            self.requests = asyncio.Queue()
+        return self.requests
+
+    async def recognize(
+        self,
+        key: str,
+        speech: Union[torch.Tensor, np.ndarray],
+        is_final: bool = False,
+    ) -> List[Tuple[Optional[str], List[str], List[int], Hypothesis]]:
+        """Recognize the next chunk of a stream
+
+        Args:
+            key: The name of the stream
+            speech: Input speech chunk
+            is_final: Whether the chunk is the last one of the stream
+        Returns:
+            text, token, token_int, hyp
+
+        """
+        future = asyncio.get_event_loop().create_future()
+        await self._queue().put((key, speech, is_final, future))
+        return await future
+
+    async def run(self):
+        """Serve the requests until cancelled."""
+        requests = self._queue()
+        pending = []
+        while True:
+            if len(pending) == 0:
+                pending.append(await requests.get())
+            while not requests.empty():
+                pending.append(requests.get_nowait())
+
+            # the later chunks of a stream wait for the next round
+            batch = {}
+            deferred = []
+            for request in pending:
+                if request[0] in batch:
+                    deferred.append(request)
+                else:
+                    batch[request[0]] = request
+            pending = deferred
+
+            try:
+                results = await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    functools.partial(
+                        self.multiplexer,
+                        {k: r[1] for k, r in batch.items()},
+                        is_final={k: r[2] for k, r in batch.items()},
+                    ),
+                )
+            except Exception as e:
+                for _, _, _, future in batch.values():
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for key, (_, _, _, future) in batch.items():
+                if not future.done():
+                    future.set_result(results[key])
+
+
 def inference(
     output_dir: str,
     maxlenratio: float,
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+from pathlib import Path
+import sys
+from typing import Union
+
+import numpy as np
+
+from espnet.utils.cli_utils import get_commandline_args
+from espnet2.fileio.packed_scp import PackedScpWriter
+from espnet2.train.dataset import ESPnetDataset
+
+
+def make_packed_scp(
+    scp: str,
+    data_type: str,
+    output_dir: Union[str, Path],
+    max_shard_size: str,
+    float_dtype: str,
+    log_level: str,
+):
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
+    output_dir = Path(output_dir)
+
+    # Use the same loader as the training, e.g. the audio is normalized to [-1,1]
+    dataset = ESPnetDataset([(scp, "data", data_type)], float_dtype=float_dtype)
+    loader = dataset.loader_dict["data"]
+
+    nbytes = 0
+    with PackedScpWriter(
+        output_dir / "data", output_dir / "packed.scp", max_shard_size=max_shard_size
+    ) as writer:
+        for key in loader:
+            value = loader[key]
+            if not isinstance(value, np.ndarray):
+                raise TypeError(f"Must be ndarray: {key}: {type(value)}")
+            if value.dtype.kind == "f":
+                value = value.astype(float_dtype, copy=False)
+            writer[key] = value
+            nbytes += value.nbytes
+        num_shards = writer.num_shards
+    logging.info(
+        f"Packed {len(loader)} samples ({nbytes} bytes) into {num_shards} shards: "
+        f"{output_dir / 'packed.scp'}"
+    )
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Pack the arrays of a scp file into shard files "
+        'for the "packed" data type',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--log_level",
+        type=lambda x: x.upper(),
+        default="INFO",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG", "NOTSET"),
+        help="The verbose level of logging",
+    )
+
+    parser.add_argument(
+        "--scp", required=True, help="Input scp file, e.g. wav.scp or feats.scp"
+    )
+    parser.add_argument(
+        "--data_type",
+        default="sound",
+        help="The data type of the input scp file, e.g. sound, kaldi_ark or npy",
+    )
+    parser.add_argument(
+        "--output_dir",
+        required=True,
+        help="Output directory. "
+        "output_dir/packed.scp and output_dir/data/shard.*.bin are created",
+    )
+    parser.add_argument(
+        "--max_shard_size",
+        default="1GB",
+        help="The maximum size of a shard file, e.g. 500MB, 2GiB",
+    )
+    parser.add_argument(
+        "--float_dtype",
+        default="float32",
+        help="The data type of float arrays in the shard files",
+    )
+    return parser
+
+
+def main(cmd=None):
+    print(get_commandline_args(), file=sys.stderr)
+    parser = get_parser()
+    args = parser.parse_args(cmd)
+    kwargs = vars(args)
+    make_packed_scp(**kwargs)
+
+
+if __name__ == "__main__":
+    main()
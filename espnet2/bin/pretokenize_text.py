@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+from pathlib import Path
+import sys
+from typing import List
+from typing import Optional
+
+from typeguard import check_argument_types
+
+from espnet.utils.cli_utils import get_commandline_args
+from espnet2.text.phoneme_tokenizer import g2p_choices
+from espnet2.train.preprocessor import CommonPreprocessor
+from espnet2.utils.types import str_or_none
+
+
+def pretokenize(
+    input: List[str],
+    token_cache_dir: str,
+    token_type: str,
+    token_list: str,
+    bpemodel: Optional[str],
+    non_linguistic_symbols: Optional[str],
+    cleaner: Optional[str],
+    g2p: Optional[str],
+    log_level: str,
+):
+    assert check_argument_types()
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
+
+    # NOTE: Build the preprocessor in the same way as the tasks,
+    #   so that the cache is found by the training with the same options
+    preprocessor = CommonPreprocessor(
+        train=False,
+        token_type=token_type,
+        token_list=token_list,
+        bpemodel=bpemodel,
+        non_linguistic_symbols=non_linguistic_symbols,
+        text_cleaner=cleaner,
+        g2p_type=g2p,
+        token_cache_dir=token_cache_dir,
+    )
+    token_cache = preprocessor.token_cache
+    if not token_cache.enabled:
+        raise RuntimeError(f"Failed to open {token_cache.path}")
+
+    for path in input:
+        num_texts = 0
+        num_tokenized = 0
+        with Path(path).open("r", encoding="utf-8") as f:
+            for line in f:
+                # Split the line as the "text" type of the dataset
+                sps = line.rstrip().split(maxsplit=1)
+                if len(sps) == 0:
+                    continue
+                text = sps[1] if len(sps) == 2 else ""
+                num_texts += 1
+                if token_cache.get(text) is None:
+                    # The token ids are written to the cache by the preprocessor
+                    preprocessor(sps[0], dict(text=text))
+                    num_tokenized += 1
+        logging.info(
+            f"{path}: {num_tokenized} of {num_texts} texts are newly tokenized"
+        )
+    logging.info(f"{len(token_cache)} texts are cached in {token_cache.path}")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Tokenize texts into the token cache used by the training",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--log_level",
+        type=lambda x: x.upper(),
+        default="INFO",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG", "NOTSET"),
+        help="The verbose level of logging",
+    )
+
+    parser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        action="append",
+        help="Input text with the utterance ids, e.g. data/train/text. "
+        "This option is repeatable.",
+    )
+    parser.add_argument(
+        "--token_cache_dir",
+        required=True,
+        help="The directory of the cache given to the training by " "--token_cache_dir",
+    )
+
+    group = parser.add_argument_group("The same options as the training")
+    group.add_argument(
+        "--token_type",
+        default="bpe",
+        choices=["bpe", "char", "word", "phn"],
+        help="Token type",
+    )
+    group.add_argument(
+        "--token_list", required=True, help="A text mapping int-id to token"
+    )
+    group.add_argument(
+        "--bpemodel",
+        type=str_or_none,
+        default=None,
+        help="The model file of sentencepiece",
+    )
+    group.add_argument(
+        "--non_linguistic_symbols",
+        type=str_or_none,
+        help="non_linguistic_symbols file path",
+    )
+    group.add_argument(
+        "--cleaner",
+        type=str_or_none,
+        choices=[None, "tacotron", "jaconv", "vietnamese", "korean_cleaner"],
+        default=None,
+        help="Apply text cleaning",
+    )
+    group.add_argument(
+        "--g2p",
+        type=str_or_none,
+        choices=g2p_choices,
+        default=None,
+        help="Specify g2p method if --token_type=phn",
+    )
+    return parser
+
+
+def main(cmd=None):
+    print(get_commandline_args(), file=sys.stderr)
+    parser = get_parser()
+    args = parser.parse_args(cmd)
+    kwargs = vars(args)
+    pretokenize(**kwargs)
+
+
+if __name__ == "__main__":
+    main()
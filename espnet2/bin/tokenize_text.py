@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 import argparse
 from collections import Counter
+from collections import deque
 import logging
+import multiprocessing
 from pathlib import Path
 import sys
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Union
 
 from typeguard import check_argument_types
 
@@ -63,6 +68,99 @@ def field2slice(field: Optional[str]) -> slice:
     return slic
 
 
+# The cleaner and the tokenizer of each worker process
+_worker_state = {}
+
+
+def _init_worker(kwargs: dict):
+    _worker_state.update(_build_functions(**kwargs))
+
+
+def _build_functions(
+    field: Optional[str],
+    delimiter: Optional[str],
+    token_type: str,
+    space_symbol: str,
+    non_linguistic_symbols: Optional[str],
+    bpemodel: Optional[str],
+    remove_non_linguistic_symbols: bool,
+    cleaner: Optional[str],
+    g2p: Optional[str],
+    write_vocabulary: bool,
+) -> dict:
+    tokenizer = build_tokenizer(
+        token_type=token_type,
+        bpemodel=bpemodel,
+        delimiter=delimiter,
+        space_symbol=space_symbol,
+        non_linguistic_symbols=non_linguistic_symbols,
+        remove_non_linguistic_symbols=remove_non_linguistic_symbols,
+        g2p_type=g2p,
+    )
+    return dict(
+        field=field2slice(field) if field is not None else None,
+        delimiter=delimiter,
+        cleaner=TextCleaner(cleaner),
+        tokenizer=tokenizer,
+        write_vocabulary=write_vocabulary,
+    )
+
+
+def _tokenize_lines(
+    lines: List[str],
+    field: Optional[slice],
+    delimiter: Optional[str],
+    cleaner: TextCleaner,
+    tokenizer,
+    write_vocabulary: bool,
+) -> Union[str, Counter]:
+    """Tokenize the lines.
+
+    Returns:
+        The tokenized lines joined into a string,
+        or the counts of the tokens in write_vocabulary mode.
+    """
+    outputs = []
+    counter = Counter()
+    for line in lines:
+        line = line.rstrip()
+        if field is not None:
+            # e.g. field="2-"
+            # uttidA hello world!! -> hello world!!
+            tokens = line.split(delimiter)
+            tokens = tokens[field]
+            if delimiter is None:
+                line = " ".join(tokens)
+            else:
+                line = delimiter.join(tokens)
+
+        line = cleaner(line)
+        tokens = tokenizer.text2tokens(line)
+        if not write_vocabulary:
+            outputs.append(" ".join(tokens) + "\n")
+        else:
+            for t in tokens:
+                counter[t] += 1
+    if not write_vocabulary:
+        return "".join(outputs)
+    return counter
+
+
+def _tokenize_chunk(lines: List[str]) -> Union[str, Counter]:
+    return _tokenize_lines(lines, **_worker_state)
+
+
+def _iterate_chunks(fin: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    chunk = []
+    for line in fin:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
 def tokenize(
     input: str,
     output: str,
@@ -80,6 +178,8 @@ def tokenize(
     add_symbol: List[str],
     cleaner: Optional[str],
     g2p: Optional[str],
+    nj: int = 1,
+    chunk_size: int = 10000,
 ):
     assert check_argument_types()
 
@@ -98,40 +198,46 @@ def tokenize(
         p.parent.mkdir(parents=True, exist_ok=True)
         fout = p.open("w", encoding="utf-8")
 
-    cleaner = TextCleaner(cleaner)
-    tokenizer = build_tokenizer(
-        token_type=token_type,
-        bpemodel=bpemodel,
+    kwargs = dict(
+        field=field,
         delimiter=delimiter,
+        token_type=token_type,
         space_symbol=space_symbol,
         non_linguistic_symbols=non_linguistic_symbols,
+        bpemodel=bpemodel,
         remove_non_linguistic_symbols=remove_non_linguistic_symbols,
-        g2p_type=g2p,
+        cleaner=cleaner,
+        g2p=g2p,
+        write_vocabulary=write_vocabulary,
     )
-
     counter = Counter()
-    if field is not None:
-        field = field2slice(field)
-
-    for line in fin:
-        line = line.rstrip()
-        if field is not None:
-            # e.g. field="2-"
-            # uttidA hello world!! -> hello world!!
-            tokens = line.split(delimiter)
-            tokens = tokens[field]
-            if delimiter is None:
-                line = " ".join(tokens)
-            else:
-                line = delimiter.join(tokens)
 
-        line = cleaner(line)
-        tokens = tokenizer.text2tokens(line)
+    def consume(result: Union[str, Counter]):
         if not write_vocabulary:
-            fout.write(" ".join(tokens) + "\n")
+            fout.write(result)
         else:
-            for t in tokens:
-                counter[t] += 1
+            # NOTE: The counters are merged in the order of the chunks,
+            #   so that the tokens of the same count are sorted as the serial mode
+            counter.update(result)
+
+    chunks = _iterate_chunks(fin, chunk_size)
+    if nj <= 1:
+        functions = _build_functions(**kwargs)
+        for chunk in chunks:
+            consume(_tokenize_lines(chunk, **functions))
+    else:
+        with multiprocessing.Pool(
+            nj, initializer=_init_worker, initargs=(kwargs,)
+        ) as pool:
+            # Keep the chunks in flight bounded not to read the whole input,
+            # and receive the results in the order of the input
+            results = deque()
+            for chunk in chunks:
+                results.append(pool.apply_async(_tokenize_chunk, (chunk,)))
+                if len(results) >= 2 * nj:
+                    consume(results.popleft().get())
+            while len(results) > 0:
+                consume(results.popleft().get())
 
     if not write_vocabulary:
         return
@@ -233,6 +339,18 @@ def get_parser() -> argparse.ArgumentParser:
         default=None,
         help="Specify g2p method if --token_type=phn",
     )
+    parser.add_argument(
+        "--nj",
+        type=int,
+        default=1,
+        help="The number of processes. The output is the same as the single process",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=10000,
+        help="The number of lines processed at once by each process",
+    )
 
     group = parser.add_argument_group("write_vocabulary mode related")
     group.add_argument(
@@ -72,10 +72,10 @@ class NpyScpReader(collections.abc.Mapping):
 
     """
 
-    def __init__(self, fname: Union[Path, str]):
+    def __init__(self, fname: Union[Path, str], lazy: bool = False):
         assert check_argument_types()
         self.fname = Path(fname)
-        self.data = read_2column_text(fname)
+        self.data = read_2column_text(fname, lazy=lazy)
 
     def get_path(self, key):
         return self.data[key]
@@ -0,0 +1,178 @@
+import collections.abc
+from pathlib import Path
+from typing import Dict
+from typing import Tuple
+from typing import Union
+
+import humanfriendly
+import numpy as np
+from typeguard import check_argument_types
+
+from espnet2.fileio.read_text import IndexedTextReader
+from espnet2.fileio.read_text import read_2column_text
+
+
+class PackedScpWriter:
+    """Writer class for a scp file of arrays packed into shard files.
+
+    The arrays are written contiguously to large shard files
+    and the scp file is an index of them:
+
+        key shard_path offset dtype shape
+
+    Examples:
+        key1 /some/path/shard.0.bin 0 float32 100,80
+        key2 /some/path/shard.0.bin 32000 float32 120,80
+        key3 /some/path/shard.1.bin 0 int16 16000
+        ...
+
+        >>> writer = PackedScpWriter('./data/', './data/packed.scp')
+        >>> writer['aa'] = numpy_array
+        >>> writer['bb'] = numpy_array
+
+    """
+
+    # The offset of each array is aligned to this number of bytes
+    alignment = 64
+
+    def __init__(
+        self,
+        outdir: Union[Path, str],
+        scpfile: Union[Path, str],
+        max_shard_size: Union[int, str] = "1GB",
+    ):
+        assert check_argument_types()
+        self.dir = Path(outdir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        scpfile = Path(scpfile)
+        scpfile.parent.mkdir(parents=True, exist_ok=True)
+        self.fscp = scpfile.open("w", encoding="utf-8")
+        if isinstance(max_shard_size, str):
+            max_shard_size = humanfriendly.parse_size(max_shard_size)
+        self.max_shard_size = max_shard_size
+
+        self.num_shards = 0
+        self.fshard = None
+        self.shard_path = None
+        self.offset = 0
+        self.data = {}
+
+    def get_path(self, key):
+        return self.data[key]
+
+    def _open_shard(self):
+        if self.fshard is not None:
+            self.fshard.close()
+        self.shard_path = self.dir / f"shard.{self.num_shards}.bin"
+        self.fshard = self.shard_path.open("wb")
+        self.num_shards += 1
+        self.offset = 0
+
+    def __setitem__(self, key, value):
+        assert isinstance(value, np.ndarray), type(value)
+        if value.dtype.kind not in ("f", "i", "u"):
+            raise TypeError(f"Not supported dtype: {value.dtype}")
+        if self.fshard is None or (
+            self.offset > 0 and self.offset + value.nbytes > self.max_shard_size
+        ):
+            self._open_shard()
+
+        self.fshard.write(np.ascontiguousarray(value).tobytes())
+        shape = ",".join(map(str, value.shape))
+        self.fscp.write(
+            f"{key} {self.shard_path} {self.offset} {value.dtype.name} {shape}\n"
+        )
+        self.data[key] = str(self.shard_path)
+
+        # Pad to align the offset of the next array
+        self.offset += value.nbytes
+        padding = -self.offset % self.alignment
+        self.fshard.write(b"\0" * padding)
+        self.offset += padding
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.fscp.close()
+        if self.fshard is not None:
+            self.fshard.close()
+
+
+def parse_packed_entry(value: str) -> Tuple[str, int, np.dtype, Tuple[int, ...]]:
+    """Parse "shard_path offset dtype shape" of a line of the packed scp file."""
+    sps = value.split()
+    if len(sps) not in (3, 4):
+        raise RuntimeError(f"shard_path offset dtype shape are required: {value}")
+    path, offset, dtype = sps[:3]
+    shape = tuple(map(int, sps[3].split(","))) if len(sps) == 4 else ()
+    return path, int(offset), np.dtype(dtype), shape
+
+
+class PackedScpReader(collections.abc.Mapping):
+    """Reader class for a scp file of arrays packed into shard files.
+
+    The shard files are mapped to the memory by `np.memmap`
+    and each array is a read-only view of them without copying,
+    so that a large number of small files are not opened for each sample.
+
+    Examples:
+        key1 /some/path/shard.0.bin 0 float32 100,80
+        key2 /some/path/shard.0.bin 32000 float32 120,80
+        key3 /some/path/shard.1.bin 0 int16 16000
+        ...
+
+        >>> reader = PackedScpReader('packed.scp')
+        >>> array = reader['key1']
+
+    """
+
+    def __init__(self, fname: Union[Path, str], lazy: bool = False):
+        assert check_argument_types()
+        self.fname = Path(fname)
+        if lazy:
+            self.data = IndexedTextReader(fname, value_func=parse_packed_entry)
+        else:
+            self.data = {
+                k: parse_packed_entry(v) for k, v in read_2column_text(fname).items()
+            }
+        # The memory maps are opened lazily for each shard
+        self.shards: Dict[str, np.memmap] = {}
+
+    def get_path(self, key):
+        return self.data[key][0]
+
+    def _get_shard(self, path: str) -> np.ndarray:
+        shard = self.shards.get(path)
+        if shard is None:
+            shard = np.memmap(path, dtype=np.uint8, mode="r")
+            self.shards[path] = shard
+        return shard
+
+    def __getitem__(self, key) -> np.ndarray:
+        path, offset, dtype, shape = self.data[key]
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        shard = self._get_shard(path)
+        array = shard[offset : offset + nbytes].view(dtype).reshape(shape)
+        return array.view(np.ndarray)
+
+    def __getstate__(self):
+        # The memory maps are not pickled, but opened again in each worker
+        state = self.__dict__.copy()
+        state["shards"] = {}
+        return state
+
+    def __contains__(self, item):
+        return item in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def keys(self):
+        return self.data.keys()
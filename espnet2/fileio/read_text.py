@@ -1,13 +1,238 @@
+import collections.abc
+import functools
 import logging
+import mmap
+import os
 from pathlib import Path
-from typing import Dict
+import struct
+from typing import Callable
+from typing import Iterator
 from typing import List
+from typing import Mapping
+from typing import Optional
 from typing import Union
 
+import numpy as np
 from typeguard import check_argument_types
 
 
-def read_2column_text(path: Union[Path, str]) -> Dict[str, str]:
+class IndexedTextReader(collections.abc.Mapping):
+    """Lazy reader of a text file with a key in each line.
+
+    The byte offsets of the lines sorted by the keys are written to
+    an index file, `<path>.idx`, only once and the index and the text file
+    are opened by mmap, so that the file is not parsed at startup
+    and the pages are shared by the processes, e.g. the workers of DataLoader.
+    The index is built again if the text file is modified,
+    and it is kept in memory if it can't be written next to the text file.
+
+    Examples:
+        wav.scp:
+            key1 /some/path/a.wav
+            key2 /some/path/b.wav
+
+        >>> reader = IndexedTextReader('wav.scp')
+        >>> reader['key1']
+        '/some/path/a.wav'
+
+    Args:
+        path: The text file
+        value_func: The function to convert the value of the key
+        key_field: The index of the whitespace-separated field of the key
+        unique: If False, the keys can appear in multiple lines and
+            `self[key]` returns the list of the values of the lines
+            instead of a value.
+
+    """
+
+    magic = b"ESPIDX01"
+    # magic, size, mtime_ns, key_field, unique, the number of lines and keys
+    header = struct.Struct("<8sqqqqqq")
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        value_func: Callable[[str], object] = None,
+        key_field: int = 0,
+        unique: bool = True,
+    ):
+        assert check_argument_types()
+        self.path = Path(path)
+        self.value_func = value_func
+        self.key_field = key_field
+        self.unique = unique
+        self.index_path = Path(f"{path}.idx")
+        self._open()
+
+    def _open(self):
+        stat = self.path.stat()
+        self.signature = (stat.st_size, stat.st_mtime_ns, self.key_field, self.unique)
+        if not self._load_index():
+            arrays = self._build_index()
+            try:
+                self._write_index(arrays)
+            except OSError as e:
+                logging.warning(f"Failed to write {self.index_path}: {e}")
+            if not self._load_index():
+                self.offsets, self.sorted_ids, self.key_ids = arrays
+        if stat.st_size > 0:
+            with self.path.open("rb") as f:
+                self.text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.text = b""
+
+    def __getstate__(self):
+        # mmap is not pickled, but opened again in each worker
+        return {
+            k: self.__dict__[k]
+            for k in ("path", "value_func", "key_field", "unique", "index_path")
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def _load_index(self) -> bool:
+        if not self.index_path.exists():
+            return False
+        with self.index_path.open("rb") as f:
+            header = f.read(self.header.size)
+        if len(header) != self.header.size:
+            return False
+        magic, *signature, n_lines, n_keys = self.header.unpack(header)
+        if magic != self.magic or tuple(signature) != self.signature:
+            return False
+        offset = self.header.size
+        arrays = []
+        for n in (n_lines + 1, n_lines, n_keys):
+            if n > 0:
+                arrays.append(
+                    np.memmap(
+                        self.index_path,
+                        dtype=np.int64,
+                        mode="r",
+                        offset=offset,
+                        shape=(n,),
+                    )
+                )
+            else:
+                arrays.append(np.zeros(0, dtype=np.int64))
+            offset += 8 * n
+        self.offsets, self.sorted_ids, self.key_ids = arrays
+        return True
+
+    def _build_index(self):
+        offsets = []
+        keys = []
+        offset = 0
+        with self.path.open("rb") as f:
+            for linenum, line in enumerate(f, 1):
+                sps = line.split(maxsplit=self.key_field + 1)
+                if len(sps) > self.key_field:
+                    offsets.append(offset)
+                    keys.append(sps[self.key_field])
+                elif len(sps) > 0:
+                    raise RuntimeError(
+                        f"The key field is not found ({self.path}:{linenum})"
+                    )
+                offset += len(line)
+        # The end of the lines is also kept to slice the last line
+        if len(offsets) > 0:
+            # NOTE: The last line may not have a newline character
+            offsets.append(offset)
+        keys = np.array(keys, dtype=bytes)
+        sorted_ids = np.argsort(keys, kind="stable")
+        sorted_keys = keys[sorted_ids]
+        is_first = np.ones(len(keys), dtype=bool)
+        is_first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        if self.unique and not is_first.all():
+            k = sorted_keys[np.flatnonzero(~is_first)[0]].decode("utf-8")
+            raise RuntimeError(f"{k} is duplicated ({self.path})")
+        # The lines of the first occurrences of the keys in the order of the file
+        key_ids = np.sort(sorted_ids[is_first])
+        return (
+            np.array(offsets, dtype=np.int64),
+            sorted_ids.astype(np.int64),
+            key_ids.astype(np.int64),
+        )
+
+    def _write_index(self, arrays):
+        tmp_path = Path(f"{self.index_path}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            f.write(
+                self.header.pack(
+                    self.magic, *self.signature, len(arrays[1]), len(arrays[2])
+                )
+            )
+            for array in arrays:
+                f.write(array.tobytes())
+        # Replace atomically not to read an incomplete index in other processes
+        os.replace(tmp_path, self.index_path)
+
+    def _line(self, i: int) -> List[str]:
+        line = self.text[self.offsets[i] : self.offsets[i + 1]].decode("utf-8")
+        return line.rstrip().split(maxsplit=self.key_field + 1)
+
+    def _key(self, i: int) -> bytes:
+        line = self.text[self.offsets[i] : self.offsets[i + 1]]
+        return line.split(maxsplit=self.key_field + 1)[self.key_field]
+
+    def _value(self, i: int) -> str:
+        if self.key_field == 0:
+            sps = self._line(i)
+            value = sps[1] if len(sps) > 1 else ""
+        else:
+            # The whole line is the value if the key is not the first field
+            line = self.text[self.offsets[i] : self.offsets[i + 1]]
+            value = line.decode("utf-8").rstrip()
+        if self.value_func is not None:
+            value = self.value_func(value)
+        return value
+
+    def _search(self, key: bytes) -> int:
+        """Find the first position of the key in the sorted lines."""
+        lo, hi = 0, len(self.sorted_ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(self.sorted_ids[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, key: str) -> Optional[List[int]]:
+        if not isinstance(key, str):
+            return None
+        k = key.encode("utf-8")
+        pos = self._search(k)
+        ids = []
+        while pos < len(self.sorted_ids) and self._key(self.sorted_ids[pos]) == k:
+            ids.append(int(self.sorted_ids[pos]))
+            pos += 1
+            if self.unique:
+                break
+        return ids if len(ids) > 0 else None
+
+    def __getitem__(self, key: str):
+        ids = self._find(key)
+        if ids is None:
+            raise KeyError(key)
+        if self.unique:
+            return self._value(ids[0])
+        return [self._value(i) for i in ids]
+
+    def __contains__(self, key) -> bool:
+        return self._find(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.key_ids)
+
+    def __iter__(self) -> Iterator[str]:
+        for i in self.key_ids:
+            yield self._key(i).decode("utf-8")
+
+
+def read_2column_text(path: Union[Path, str], lazy: bool = False) -> Mapping[str, str]:
     """Read a text file having 2 column as dict object.
 
     Examples:
@@ -18,8 +243,15 @@ def read_2column_text(path: Union[Path, str]) -> Dict[str, str]:
         >>> read_2column_text('wav.scp')
         {'key1': '/some/path/a.wav', 'key2': '/some/path/b.wav'}
 
+    Args:
+        path: The text file
+        lazy: If True, return `IndexedTextReader` instead of dict
+            not to parse the whole file at once
+
     """
     assert check_argument_types()
+    if lazy:
+        return IndexedTextReader(path)
 
     data = {}
     with Path(path).open("r", encoding="utf-8") as f:
@@ -35,9 +267,13 @@ def read_2column_text(path: Union[Path, str]) -> Dict[str, str]:
     return data
 
 
+def _parse_num_sequence(value: str, dtype: type, delimiter: str) -> list:
+    return [dtype(i) for i in value.split(delimiter)]
+
+
 def load_num_sequence_text(
-    path: Union[Path, str], loader_type: str = "csv_int"
-) -> Dict[str, List[Union[float, int]]]:
+    path: Union[Path, str], loader_type: str = "csv_int", lazy: bool = False
+) -> Mapping[str, List[Union[float, int]]]:
     """Read a text file indicating sequences of number
 
     Examples:
@@ -46,6 +282,13 @@ def load_num_sequence_text(
 
         >>> d = load_num_sequence_text('text')
         >>> np.testing.assert_array_equal(d["key1"], np.array([1, 2, 3]))
+
+    Args:
+        path: The text file
+        loader_type: text_int, text_float, csv_int or csv_float
+        lazy: If True, return `IndexedTextReader` instead of dict
+            not to parse the whole file at once
+
     """
     assert check_argument_types()
     if loader_type == "text_int":
@@ -68,6 +311,11 @@ def load_num_sequence_text(
     #   uttb 3,4,5
     # -> return {'utta': np.ndarray([1, 0]),
     #            'uttb': np.ndarray([3, 4, 5])}
+    if lazy:
+        value_func = functools.partial(
+            _parse_num_sequence, dtype=dtype, delimiter=delimiter
+        )
+        return IndexedTextReader(path, value_func=value_func)
     d = read_2column_text(path)
 
     # Using for-loop instead of dict-comprehension for debuggability
@@ -1,6 +1,7 @@
 import collections.abc
 from pathlib import Path
 from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Tuple
 from typing import Union
@@ -9,38 +10,50 @@ import numpy as np
 import re
 from typeguard import check_argument_types
 
+from espnet2.fileio.read_text import IndexedTextReader
 
-def load_rttm_text(path: Union[Path, str]) -> Dict[str, List[Tuple[str, float, float]]]:
+
+def load_rttm_text(
+    path: Union[Path, str], lines: Iterable[str] = None
+) -> Dict[str, List[Tuple[str, float, float]]]:
     """Read a RTTM file
 
     Note: only support speaker information now
+
+    Args:
+        path: The RTTM file
+        lines: If given, the lines are parsed instead of reading the file
+
     """
 
     assert check_argument_types()
+    if lines is None:
+        with Path(path).open("r", encoding="utf-8") as f:
+            return load_rttm_text(path, lines=f)
+
     data = {}
-    with Path(path).open("r", encoding="utf-8") as f:
-        for linenum, line in enumerate(f, 1):
-            sps = re.split(" +", line.rstrip())
-
-            # RTTM format must have exactly 9 fields
-            assert len(sps) == 9, "{} does not have exactly 9 fields".format(path)
-            label_type, utt_id, channel, start, end, _, _, spk_id, _ = sps
-
-            # Only support speaker label now
-            assert label_type in ["SPEAKER", "END"]
-
-            spk_list, spk_event, max_duration = data.get(utt_id, ([], [], 0))
-            if label_type == "END":
-                data[utt_id] = (spk_list, spk_event, int(end))
-                continue
-            if spk_id not in spk_list:
-                spk_list.append(spk_id)
-
-            data[utt_id] = (
-                spk_list,
-                spk_event + [(spk_id, int(float(start)), int(float(end)))],
-                max_duration,
-            )
+    for line in lines:
+        sps = re.split(" +", line.rstrip())
+
+        # RTTM format must have exactly 9 fields
+        assert len(sps) == 9, "{} does not have exactly 9 fields".format(path)
+        label_type, utt_id, channel, start, end, _, _, spk_id, _ = sps
+
+        # Only support speaker label now
+        assert label_type in ["SPEAKER", "END"]
+
+        spk_list, spk_event, max_duration = data.get(utt_id, ([], [], 0))
+        if label_type == "END":
+            data[utt_id] = (spk_list, spk_event, int(end))
+            continue
+        if spk_id not in spk_list:
+            spk_list.append(spk_id)
+
+        data[utt_id] = (
+            spk_list,
+            spk_event + [(spk_id, int(float(start)), int(float(end)))],
+            max_duration,
+        )
 
     return data
 
@@ -71,15 +84,26 @@ class RttmReader(collections.abc.Mapping):
     def __init__(
         self,
         fname: str,
+        lazy: bool = False,
     ):
         assert check_argument_types()
         super().__init__()
 
         self.fname = fname
-        self.data = load_rttm_text(path=fname)
+        self.lazy = lazy
+        if lazy:
+            # The lines of each recording are parsed when it is read
+            self.data = IndexedTextReader(fname, key_field=1, unique=False)
+        else:
+            self.data = load_rttm_text(path=fname)
 
     def __getitem__(self, key):
-        spk_list, spk_event, max_duration = self.data[key]
+        if self.lazy:
+            spk_list, spk_event, max_duration = load_rttm_text(
+                self.fname, lines=self.data[key]
+            )[key]
+        else:
+            spk_list, spk_event, max_duration = self.data[key]
         spk_label = np.zeros((max_duration, len(spk_list)))
         for spk_id, start, end in spk_event:
             spk_label[start : end + 1, spk_list.index(spk_id)] = 1
@@ -30,13 +30,14 @@ class SoundScpReader(collections.abc.Mapping):
         dtype=np.int16,
         always_2d: bool = False,
         normalize: bool = False,
+        lazy: bool = False,
     ):
         assert check_argument_types()
         self.fname = fname
         self.dtype = dtype
         self.always_2d = always_2d
         self.normalize = normalize
-        self.data = read_2column_text(fname)
+        self.data = read_2column_text(fname, lazy=lazy)
 
     def __getitem__(self, key):
         wav = self.data[key]
@@ -1,5 +1,6 @@
 from abc import ABC
 from abc import abstractmethod
+import itertools
 from typing import Iterator
 
 
@@ -7,3 +8,13 @@ class AbsIterFactory(ABC):
     @abstractmethod
     def build_iter(self, epoch: int, shuffle: bool = None) -> Iterator:
         raise NotImplementedError
+
+    def resume_iter(self, epoch: int, iiter: int, shuffle: bool = None) -> Iterator:
+        """Build the iterator of the epoch starting after "iiter" mini-batches.
+
+        This is used to resume the training from the middle of an epoch.
+        The default implementation iterates the first mini-batches and
+        discards them, so their data are still read.
+        Override this method to skip them without loading.
+        """
+        return itertools.islice(self.build_iter(epoch, shuffle), iiter, None)
@@ -33,6 +33,8 @@ class ChunkIterFactory(AbsIterFactory):
       because IterFactory doesn't be given to the length information.
     - Since the first reason, "num_iters_per_epoch" can't be implemented
       for this iterator. Instead of it, "num_samples_per_epoch" is implemented.
+    - For the same reason, resuming from the middle of an epoch
+      can't skip the consumed mini-batches without loading their samples.
 
     """
 
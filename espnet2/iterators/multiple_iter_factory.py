@@ -1,3 +1,4 @@
+import itertools
 import logging
 from typing import Callable
 from typing import Collection
@@ -22,6 +23,9 @@ class MultipleIterFactory(AbsIterFactory):
         self.shuffle = shuffle
 
     def build_iter(self, epoch: int, shuffle: bool = None) -> Iterator:
+        return self.resume_iter(epoch, 0, shuffle)
+
+    def resume_iter(self, epoch: int, iiter: int, shuffle: bool = None) -> Iterator:
         if shuffle is None:
             shuffle = self.shuffle
 
@@ -34,4 +38,23 @@ class MultipleIterFactory(AbsIterFactory):
             logging.info(f"Building {i}th iter-factory...")
             iter_factory = build_func()
             assert isinstance(iter_factory, AbsIterFactory), type(iter_factory)
-            yield from iter_factory.build_iter(epoch, shuffle)
+            if iiter == 0:
+                yield from iter_factory.build_iter(epoch, shuffle)
+                continue
+
+            try:
+                # NOTE: DataLoader knows the length without loading the data
+                num_iters = len(iter_factory.build_iter(epoch, shuffle))
+            except TypeError:
+                num_iters = None
+            if num_iters is None:
+                # Count the consumed mini-batches by iterating them
+                it = iter(iter_factory.build_iter(epoch, shuffle))
+                iiter -= sum(1 for _ in itertools.islice(it, iiter))
+                yield from it
+            elif iiter >= num_iters:
+                # The whole of this iter-factory was consumed
+                iiter -= num_iters
+            else:
+                yield from iter_factory.resume_iter(epoch, iiter, shuffle)
+                iiter = 0
@@ -0,0 +1,198 @@
+import queue
+import threading
+from typing import Iterable
+from typing import Iterator
+from typing import Union
+
+import torch
+from typeguard import check_argument_types
+
+from espnet2.iterators.abs_iter_factory import AbsIterFactory
+from espnet2.torch_utils.device_funcs import to_device
+
+
+def pin_memory(data):
+    """Pin the memory of the tensors in an object recursively"""
+    if isinstance(data, torch.Tensor):
+        return data if data.is_pinned() else data.pin_memory()
+    elif isinstance(data, dict):
+        return {k: pin_memory(v) for k, v in data.items()}
+    elif isinstance(data, (list, tuple)) and type(data) in (list, tuple):
+        return type(data)(pin_memory(v) for v in data)
+    else:
+        return data
+
+
+def record_stream(data, stream: "torch.cuda.Stream"):
+    """Mark the tensors in an object as used by the stream recursively"""
+    if isinstance(data, torch.Tensor):
+        if data.is_cuda:
+            data.record_stream(stream)
+    elif isinstance(data, dict):
+        for v in data.values():
+            record_stream(v, stream)
+    elif isinstance(data, (list, tuple)):
+        for v in data:
+            record_stream(v, stream)
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class Prefetcher:
+    """Iterate over the mini-batches prepared in a background thread.
+
+    The background thread keeps `num_prefetch` mini-batches ahead of
+    the consumer, so that the loading and the collation of the next mini-batches
+    are overlapped with the computation of the current one.
+    For a CUDA device, the tensors are pinned and copied to the device with
+    `non_blocking=True` on a side stream in the background thread,
+    and the consumer's stream only waits for the copy of its own mini-batch.
+
+    Examples:
+        >>> loader = iter_factory.build_iter(epoch)
+        >>> for ids, batch in Prefetcher(loader, num_prefetch=2, device="cuda"):
+        ...     ...
+
+    """
+
+    # The interval to check if the consumer is stopped
+    timeout = 0.1
+
+    def __init__(
+        self,
+        iterable: Iterable,
+        num_prefetch: int = 2,
+        device: Union[str, torch.device] = "cpu",
+        pin_memory: bool = True,
+    ):
+        assert check_argument_types()
+        assert num_prefetch > 0, num_prefetch
+        self.iterable = iterable
+        self.num_prefetch = num_prefetch
+        self.device = torch.device(device)
+        self.use_cuda = self.device.type == "cuda"
+        self.pin_memory = pin_memory and self.use_cuda
+
+    def __len__(self) -> int:
+        # NOTE: TypeError is raised if the iterable has no length
+        return len(self.iterable)
+
+    def _produce(
+        self,
+        queue_: queue.Queue,
+        stop: threading.Event,
+        device: torch.device,
+        stream: "torch.cuda.Stream",
+    ):
+        if self.use_cuda:
+            # NOTE: The current device is not inherited from the main thread
+            torch.cuda.set_device(device)
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    queue_.put(item, timeout=self.timeout)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for data in self.iterable:
+                event = None
+                if self.pin_memory:
+                    data = pin_memory(data)
+                if self.use_cuda:
+                    with torch.cuda.stream(stream):
+                        data = to_device(data, device, non_blocking=True)
+                        event = torch.cuda.Event()
+                        event.record(stream)
+                if not put((data, event)):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+            return
+        put(None)
+
+    def __iter__(self) -> Iterator:
+        device = self.device
+        if self.use_cuda:
+            if device.index is None:
+                device = torch.device("cuda", torch.cuda.current_device())
+            stream = torch.cuda.Stream(device)
+        else:
+            stream = None
+        queue_ = queue.Queue(maxsize=self.num_prefetch)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._produce, args=(queue_, stop, device, stream), daemon=True
+        )
+        thread.start()
+        try:
+            while True:
+                item = queue_.get()
+                if item is None:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.exc
+                data, event = item
+                if event is not None:
+                    current_stream = torch.cuda.current_stream(device)
+                    current_stream.wait_event(event)
+                    # Not to reuse the memory allocated by the side stream
+                    # until the computation on the current stream is finished
+                    record_stream(data, current_stream)
+                yield data
+        finally:
+            # e.g. The consumer breaks the loop
+            stop.set()
+            thread.join()
+
+
+class PrefetchIterFactory(AbsIterFactory):
+    """Wrap the iterator of another factory by Prefetcher.
+
+    The time for which the training loop waits for the data is reported as
+    "iter_time" by `Reporter.measure_iter_time`,
+    which is close to 0 if the data loading is fast enough.
+
+    Examples:
+        >>> iter_factory = PrefetchIterFactory(
+        ...     SequenceIterFactory(dataset, batches), num_prefetch=2, device="cuda"
+        ... )
+        >>> for ids, batch in iter_factory.build_iter(epoch):
+        ...     ...
+
+    """
+
+    def __init__(
+        self,
+        iter_factory: AbsIterFactory,
+        num_prefetch: int = 2,
+        device: Union[str, torch.device] = "cpu",
+        pin_memory: bool = True,
+    ):
+        assert check_argument_types()
+        self.iter_factory = iter_factory
+        self.num_prefetch = num_prefetch
+        self.device = device
+        self.pin_memory = pin_memory
+
+    def build_iter(self, epoch: int, shuffle: bool = None) -> Prefetcher:
+        return Prefetcher(
+            self.iter_factory.build_iter(epoch, shuffle),
+            num_prefetch=self.num_prefetch,
+            device=self.device,
+            pin_memory=self.pin_memory,
+        )
+
+    def resume_iter(self, epoch: int, iiter: int, shuffle: bool = None) -> Prefetcher:
+        return Prefetcher(
+            self.iter_factory.resume_iter(epoch, iiter, shuffle),
+            num_prefetch=self.num_prefetch,
+            device=self.device,
+            pin_memory=self.pin_memory,
+        )
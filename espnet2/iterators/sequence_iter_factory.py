@@ -1,4 +1,5 @@
 from typing import Any
+from typing import List
 from typing import Sequence
 from typing import Union
 
@@ -63,9 +64,30 @@ class SequenceIterFactory(AbsIterFactory):
         self.pin_memory = pin_memory
 
     def build_iter(self, epoch: int, shuffle: bool = None) -> DataLoader:
+        return self.resume_iter(epoch, 0, shuffle)
+
+    def resume_iter(self, epoch: int, iiter: int, shuffle: bool = None) -> DataLoader:
         if shuffle is None:
             shuffle = self.shuffle
+        # NOTE: The mini-batches of the epoch are determined by the seed,
+        #   so the consumed ones are skipped without loading their data
+        batches = self._generate_batches(epoch, shuffle)[iiter:]
+
+        # For backward compatibility for pytorch DataLoader
+        if self.collate_fn is not None:
+            kwargs = dict(collate_fn=self.collate_fn)
+        else:
+            kwargs = {}
+
+        return DataLoader(
+            dataset=self.dataset,
+            batch_sampler=batches,
+            num_workers=self.num_workers,
+            pin_memory=self.pin_memory,
+            **kwargs,
+        )
 
+    def _generate_batches(self, epoch: int, shuffle: bool) -> List[Sequence[Any]]:
         if self.num_iters_per_epoch is not None:
             N = len(self.sampler)
             # If corpus size is larger than the num_per_epoch
@@ -127,17 +149,4 @@ class SequenceIterFactory(AbsIterFactory):
             batches = self.sampler.generate(epoch + self.seed)
             if shuffle:
                 np.random.RandomState(epoch + self.seed).shuffle(batches)
-
-        # For backward compatibility for pytorch DataLoader
-        if self.collate_fn is not None:
-            kwargs = dict(collate_fn=self.collate_fn)
-        else:
-            kwargs = {}
-
-        return DataLoader(
-            dataset=self.dataset,
-            batch_sampler=batches,
-            num_workers=self.num_workers,
-            pin_memory=self.pin_memory,
-            **kwargs,
-        )
+        return batches
@@ -0,0 +1,191 @@
+import itertools
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from torch.utils.data import DataLoader
+from torch.utils.data.dataset import IterableDataset
+from typeguard import check_argument_types
+
+from espnet2.iterators.abs_iter_factory import AbsIterFactory
+from espnet2.samplers.shape_index import greedy_batch_sizes
+from espnet2.train.iterable_dataset import IterableESPnetDataset
+
+
+class BucketBatchDataset(IterableDataset):
+    """Make mini-batches of the samples of similar lengths from a stream.
+
+    The samples are collected into a buffer of `bucket_buffer_size` samples,
+    sorted by their lengths, and split into mini-batches
+    of `batch_size` samples or up to `batch_bins` bins with padding.
+    The order of the mini-batches is shuffled within the buffer.
+    This dataset is iterated in each DataLoader worker,
+    so that each worker makes the mini-batches from its own shard.
+
+    Args:
+        length_type: "length" or "numel". The bins of a sample are the sum of
+            the lengths or the number of elements of the arrays.
+    """
+
+    def __init__(
+        self,
+        dataset: IterableESPnetDataset,
+        batch_size: int = 1,
+        batch_bins: Optional[int] = None,
+        length_type: str = "length",
+        bucket_buffer_size: int = 1000,
+        sort_in_batch: str = "descending",
+        shuffle: bool = False,
+        seed: int = 0,
+    ):
+        assert check_argument_types()
+        if length_type not in ("length", "numel"):
+            raise ValueError(f"length_type must be length or numel: {length_type}")
+        if sort_in_batch not in ("descending", "ascending"):
+            raise ValueError(
+                f"sort_in_batch must be ascending or descending: {sort_in_batch}"
+            )
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.batch_bins = batch_bins
+        self.length_type = length_type
+        self.bucket_buffer_size = max(bucket_buffer_size, batch_size)
+        self.sort_in_batch = sort_in_batch
+        self.shuffle = shuffle
+        self.seed = seed
+
+    def _cost(self, data: Dict[str, np.ndarray]) -> int:
+        if self.length_type == "length":
+            return sum(len(v) for v in data.values() if v.ndim > 0)
+        else:
+            return sum(v.size for v in data.values())
+
+    def _make_batches(
+        self, buffer: List[Tuple[str, Dict[str, np.ndarray]]], state
+    ) -> List[List[Tuple[str, Dict[str, np.ndarray]]]]:
+        costs = np.array([self._cost(data) for _, data in buffer])
+        order = np.argsort(costs, kind="stable")
+        if self.batch_bins is None:
+            batch_sizes = [self.batch_size] * (len(buffer) // self.batch_size)
+            if len(buffer) % self.batch_size != 0:
+                batch_sizes.append(len(buffer) % self.batch_size)
+        else:
+            batch_sizes = greedy_batch_sizes(
+                costs[order],
+                batch_bins=self.batch_bins,
+                min_batch_size=1,
+                drop_last=False,
+                padding=True,
+            )
+
+        batches = []
+        start = 0
+        for bs in batch_sizes:
+            indices = order[start : start + bs]
+            start += bs
+            if self.sort_in_batch == "descending":
+                indices = indices[::-1]
+            batches.append([buffer[i] for i in indices])
+        if self.shuffle:
+            state.shuffle(batches)
+        return batches
+
+    def __iter__(self) -> Iterator[List[Tuple[str, Dict[str, np.ndarray]]]]:
+        shard_id, _ = self.dataset.shard()
+        state = np.random.RandomState([self.seed, self.dataset.epoch, shard_id])
+        buffer = []
+        for sample in self.dataset:
+            buffer.append(sample)
+            if len(buffer) == self.bucket_buffer_size:
+                yield from self._make_batches(buffer, state)
+                buffer = []
+        if len(buffer) > 0:
+            yield from self._make_batches(buffer, state)
+
+
+class StreamIterFactory(AbsIterFactory):
+    """Build the iterator of the mini-batches made from IterableESPnetDataset.
+
+    Unlike SequenceIterFactory, the samples are not accessed randomly,
+    but the files are read sequentially and split into shards
+    for the workers and the ranks by the dataset,
+    and the mini-batches are made by BucketBatchDataset in each worker.
+    The number of the mini-batches is not known in advance
+    and can be different between the ranks.
+
+    Examples:
+        >>> dataset = IterableESPnetDataset(
+        ...     [("wav.scp", "speech", "sound"), ("text", "text", "text")],
+        ...     shuffle_buffer_size=10000,
+        ... )
+        >>> iter_factory = StreamIterFactory(dataset, batch_bins=1000000)
+        >>> for ids, batch in iter_factory.build_iter(epoch):
+        ...     ...
+
+    """
+
+    def __init__(
+        self,
+        dataset: IterableESPnetDataset,
+        batch_size: int = 1,
+        batch_bins: Optional[int] = None,
+        length_type: str = "length",
+        bucket_buffer_size: int = 1000,
+        sort_in_batch: str = "descending",
+        num_batches: Optional[int] = None,
+        seed: int = 0,
+        shuffle: bool = False,
+        num_workers: int = 0,
+        collate_fn=None,
+        pin_memory: bool = False,
+    ):
+        assert check_argument_types()
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.batch_bins = batch_bins
+        self.length_type = length_type
+        self.bucket_buffer_size = bucket_buffer_size
+        self.sort_in_batch = sort_in_batch
+        self.num_batches = num_batches
+        self.seed = seed
+        self.shuffle = shuffle
+        self.num_workers = num_workers
+        self.collate_fn = collate_fn
+        self.pin_memory = pin_memory
+
+    def build_iter(self, epoch: int, shuffle: bool = None) -> Iterator:
+        if shuffle is None:
+            shuffle = self.shuffle
+        # NOTE: The dataset is copied to the workers when the iteration starts
+        self.dataset.set_epoch(epoch)
+        batch_dataset = BucketBatchDataset(
+            self.dataset,
+            batch_size=self.batch_size,
+            batch_bins=self.batch_bins,
+            length_type=self.length_type,
+            bucket_buffer_size=self.bucket_buffer_size,
+            sort_in_batch=self.sort_in_batch,
+            shuffle=shuffle,
+            seed=self.seed,
+        )
+
+        # For backward compatibility for pytorch DataLoader
+        if self.collate_fn is not None:
+            kwargs = dict(collate_fn=self.collate_fn)
+        else:
+            kwargs = {}
+
+        # batch_size=None: Each item of the dataset is a mini-batch
+        loader = DataLoader(
+            dataset=batch_dataset,
+            batch_size=None,
+            num_workers=self.num_workers,
+            pin_memory=self.pin_memory,
+            **kwargs,
+        )
+        if self.num_batches is not None:
+            return itertools.islice(loader, self.num_batches)
+        return loader
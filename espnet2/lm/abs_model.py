@@ -1,5 +1,7 @@
 from abc import ABC
 from abc import abstractmethod
+from typing import Any
+from typing import List
 from typing import Tuple
 
 import torch
@@ -27,3 +29,19 @@ class AbsLM(torch.nn.Module, BatchScorerInterface, ABC):
         self, input: torch.Tensor, hidden: torch.Tensor
     ) -> Tuple[torch.Tensor, torch.Tensor]:
         raise NotImplementedError
+
+    def batch_score_padded(
+        self,
+        ys: torch.Tensor,
+        states: List[Any],
+        xs: torch.Tensor,
+        xs_lens: torch.Tensor,
+        utt_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Score new token batch.
+
+        LM does not depend on the encoder features,
+        so the whole batch is scored at once regardless of the padding.
+
+        """
+        return self.batch_score(ys, states, xs)
@@ -120,9 +120,14 @@ class TransformerLM(AbsLM):
             ]
 
         # batch decoding
-        h, _, states = self.encoder.forward_one_step(
-            self.embed(ys), self._target_mask(ys), cache=batch_state
-        )
+        if self.encoder.use_kv_cache:
+            h, _, states = self.encoder.forward_one_step_kv_cache(
+                self.embed(ys), self._target_mask(ys), cache=batch_state
+            )
+        else:
+            h, _, states = self.encoder.forward_one_step(
+                self.embed(ys), self._target_mask(ys), cache=batch_state
+            )
         h = self.decoder(h[:, -1])
         logp = h.log_softmax(dim=-1)
 
@@ -1,14 +1,17 @@
 from typing import Iterator
 from typing import List
+from typing import Optional
 from typing import Sequence
 from typing import Tuple
 from typing import Union
 
+import numpy as np
 from typeguard import check_argument_types
 
-from espnet2.fileio.read_text import load_num_sequence_text
 from espnet2.fileio.read_text import read_2column_text
 from espnet2.samplers.abs_sampler import AbsSampler
+from espnet2.samplers.shape_index import cached_batch_list
+from espnet2.samplers.shape_index import load_aligned_shapes
 
 
 class FoldedBatchSampler(AbsSampler):
@@ -40,52 +43,70 @@ class FoldedBatchSampler(AbsSampler):
         self.sort_batch = sort_batch
         self.drop_last = drop_last
 
+        self.batch_list = cached_batch_list(
+            self.__class__.__name__,
+            list(shape_files) + [utt2category_file],
+            dict(
+                batch_size=batch_size,
+                fold_lengths=tuple(fold_lengths),
+                min_batch_size=min_batch_size,
+                sort_in_batch=sort_in_batch,
+                sort_batch=sort_batch,
+                drop_last=drop_last,
+            ),
+            lambda: self._build_batch_list(
+                batch_size, shape_files, fold_lengths, min_batch_size, utt2category_file
+            ),
+        )
+
+    def _build_batch_list(
+        self,
+        batch_size: int,
+        shape_files: Union[Tuple[str, ...], List[str]],
+        fold_lengths: Sequence[int],
+        min_batch_size: int,
+        utt2category_file: Optional[str],
+    ) -> List[Tuple[str, ...]]:
         # utt2shape: (Length, ...)
         #    uttA 100,...
         #    uttB 201,...
-        utt2shapes = [
-            load_num_sequence_text(s, loader_type="csv_int") for s in shape_files
-        ]
-
-        first_utt2shape = utt2shapes[0]
-        for s, d in zip(shape_files, utt2shapes):
-            if set(d) != set(first_utt2shape):
-                raise RuntimeError(
-                    f"keys are mismatched between {s} != {shape_files[0]}"
-                )
-
-        # Sort samples in ascending order
+        # The keys are sorted in ascending order
         # (shape order should be like (Length, Dim))
-        keys = sorted(first_utt2shape, key=lambda k: first_utt2shape[k][0])
+        keys, shapes, _ = load_aligned_shapes(shape_files)
         if len(keys) == 0:
             raise RuntimeError(f"0 lines found: {shape_files[0]}")
 
-        category2utt = {}
+        # The fold factor of each sample
+        factors = np.stack([sh[:, 0] // m for sh, m in zip(shapes, fold_lengths)])
+        factors = factors.max(axis=0)
+        keys = keys.tolist()
+
+        category2ids = {}
         if utt2category_file is not None:
             utt2category = read_2column_text(utt2category_file)
-            if set(utt2category) != set(first_utt2shape):
+            if set(utt2category) != set(keys):
                 raise RuntimeError(
                     "keys are mismatched between "
                     f"{utt2category_file} != {shape_files[0]}"
                 )
-            for k in keys:
-                category2utt.setdefault(utt2category[k], []).append(k)
+            for i, k in enumerate(keys):
+                category2ids.setdefault(utt2category[k], []).append(i)
         else:
-            category2utt["default_category"] = keys
+            category2ids["default_category"] = list(range(len(keys)))
 
-        self.batch_list = []
-        for d, v in category2utt.items():
-            category_keys = v
+        batch_list = []
+        for category_ids in category2ids.values():
+            category_keys = [keys[i] for i in category_ids]
+            category_factors = factors[category_ids].tolist()
             # Decide batch-sizes
             start = 0
             batch_sizes = []
             while True:
-                k = category_keys[start]
-                factor = max(int(d[k][0] / m) for d, m in zip(utt2shapes, fold_lengths))
+                factor = category_factors[start]
                 bs = max(min_batch_size, int(batch_size / (1 + factor)))
                 if self.drop_last and start + bs > len(category_keys):
                     # This if-block avoids 0-batches
-                    if len(self.batch_list) > 0:
+                    if len(batch_list) > 0:
                         break
 
                 bs = min(len(category_keys) - start, bs)
@@ -117,27 +138,28 @@ class FoldedBatchSampler(AbsSampler):
                 assert len(category_keys) >= start + bs, "Bug"
                 minibatch_keys = category_keys[start : start + bs]
                 start += bs
-                if sort_in_batch == "descending":
+                if self.sort_in_batch == "descending":
                     minibatch_keys.reverse()
-                elif sort_in_batch == "ascending":
+                elif self.sort_in_batch == "ascending":
                     # Key are already sorted in ascending
                     pass
                 else:
                     raise ValueError(
                         "sort_in_batch must be ascending or "
-                        f"descending: {sort_in_batch}"
+                        f"descending: {self.sort_in_batch}"
                     )
                 cur_batch_list.append(tuple(minibatch_keys))
 
-            if sort_batch == "ascending":
+            if self.sort_batch == "ascending":
                 pass
-            elif sort_batch == "descending":
+            elif self.sort_batch == "descending":
                 cur_batch_list.reverse()
             else:
                 raise ValueError(
-                    f"sort_batch must be ascending or descending: {sort_batch}"
+                    f"sort_batch must be ascending or descending: {self.sort_batch}"
                 )
-            self.batch_list.extend(cur_batch_list)
+            batch_list.extend(cur_batch_list)
+        return batch_list
 
     def __repr__(self):
         return (
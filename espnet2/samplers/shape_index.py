@@ -0,0 +1,280 @@
+import collections
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+from typeguard import check_argument_types
+
+from espnet2.fileio.read_text import load_num_sequence_text
+
+
+class ShapeIndex:
+    """The shapes of the samples of a shape file as numpy arrays.
+
+    The keys are identified by uint32 ids, i.e. the line numbers in the file,
+    and the shapes are held as a matrix instead of a dict of lists.
+    The arrays and the order of the ids sorted by the length are written to
+    `<shape_file>.idx.npz` only once, so that the text file is not parsed
+    at the next startup. The index is built again if the file is modified,
+    and it is kept in memory if it can't be written next to the shape file.
+
+    Examples:
+        shape_file:
+            uttA 100,80
+            uttB 201,80
+
+        >>> index = ShapeIndex('shape_file')
+        >>> index.keys
+        array(['uttA', 'uttB'], dtype='<U4')
+        >>> index.shapes
+        array([[100,  80],
+               [201,  80]])
+
+    Attributes:
+        keys: (N,) The keys in the order of the file
+        shapes: (N, D) The shapes. The rows having less than D dimensions
+            are padded with 1.
+        ndims: (N,) The number of dimensions of each shape
+        order: (N,) The ids sorted by the first dimension in ascending order.
+            The ids of the same length keep the order of the file.
+
+    """
+
+    version = 1
+
+    def __init__(self, shape_file: Union[Path, str]):
+        assert check_argument_types()
+        self.shape_file = Path(shape_file)
+        self.index_path = Path(f"{shape_file}.idx.npz")
+        stat = self.shape_file.stat()
+        self.signature = np.array(
+            [self.version, stat.st_size, stat.st_mtime_ns], dtype=np.int64
+        )
+        if not self._load_index():
+            arrays = self._build_index()
+            try:
+                self._write_index(arrays)
+            except OSError as e:
+                logging.warning(f"Failed to write {self.index_path}: {e}")
+            self.__dict__.update(arrays)
+
+    def _load_index(self) -> bool:
+        if not self.index_path.exists():
+            return False
+        try:
+            with np.load(self.index_path, allow_pickle=False) as f:
+                if not np.array_equal(f["signature"], self.signature):
+                    return False
+                arrays = {k: f[k] for k in ("keys", "shapes", "ndims", "order")}
+        except (OSError, ValueError, KeyError):
+            # e.g. The file is broken
+            return False
+        self.__dict__.update(arrays)
+        return True
+
+    def _build_index(self) -> Dict[str, np.ndarray]:
+        # NOTE: read_2column_text checks the duplicated keys
+        utt2shape = load_num_sequence_text(self.shape_file, loader_type="csv_int")
+        keys = np.array(list(utt2shape), dtype=str)
+        ndims = np.array([len(v) for v in utt2shape.values()], dtype=np.int64)
+        shapes = np.ones((len(keys), max(ndims, default=1)), dtype=np.int64)
+        for i, v in enumerate(utt2shape.values()):
+            shapes[i, : len(v)] = v
+        order = np.argsort(shapes[:, 0], kind="stable").astype(np.uint32)
+        return dict(keys=keys, shapes=shapes, ndims=ndims, order=order)
+
+    def _write_index(self, arrays: Dict[str, np.ndarray]):
+        tmp_path = Path(f"{self.index_path}.{os.getpid()}.tmp")
+        # NOTE: np.savez appends ".npz" to the file name, but not to a file object
+        with tmp_path.open("wb") as f:
+            np.savez(f, signature=self.signature, **arrays)
+        # Replace atomically not to read an incomplete index in other processes
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """Get the ids of the keys.
+
+        Raises:
+            KeyError: If any of the keys is not found.
+
+        """
+        if len(keys) == 0:
+            return np.zeros(0, dtype=np.uint32)
+        if len(self.keys) == 0:
+            raise KeyError(keys[0])
+        sorter = np.argsort(self.keys)
+        pos = np.searchsorted(self.keys, keys, sorter=sorter)
+        ids = sorter[np.minimum(pos, len(self.keys) - 1)]
+        found = self.keys[ids] == keys
+        if not found.all():
+            raise KeyError(keys[np.flatnonzero(~found)[0]])
+        return ids.astype(np.uint32)
+
+
+_shape_indices: Dict[Tuple[str, int, int], ShapeIndex] = {}
+
+
+def get_shape_index(shape_file: Union[Path, str]) -> ShapeIndex:
+    """Get the ShapeIndex of the shape file shared in the process."""
+    stat = Path(shape_file).stat()
+    key = (str(Path(shape_file).absolute()), stat.st_size, stat.st_mtime_ns)
+    index = _shape_indices.get(key)
+    if index is None:
+        index = ShapeIndex(shape_file)
+        _shape_indices[key] = index
+    return index
+
+
+def load_aligned_shapes(
+    shape_files: Sequence[Union[Path, str]],
+) -> Tuple[np.ndarray, List[np.ndarray], List[np.ndarray]]:
+    """Load the shape files and align them with the sorted keys of the first one.
+
+    Returns:
+        keys: (N,) The keys sorted by the first dimension of the first file
+        shapes: The (N, D) shapes of each file in the order of the keys
+        ndims: The (N,) number of dimensions of each file
+
+    """
+    indices = [get_shape_index(s) for s in shape_files]
+    first = indices[0]
+    keys = first.keys[first.order]
+    shapes = []
+    ndims = []
+    for s, index in zip(shape_files, indices):
+        if index is first or np.array_equal(index.keys, first.keys):
+            # The shape files are usually written in the same order
+            ids = first.order
+        else:
+            try:
+                if len(index) != len(first):
+                    raise KeyError
+                ids = index.lookup(keys)
+            except KeyError:
+                raise RuntimeError(
+                    f"keys are mismatched between {s} != {shape_files[0]}"
+                )
+        shapes.append(index.shapes[ids])
+        ndims.append(index.ndims[ids])
+    return keys, shapes, ndims
+
+
+def greedy_batch_sizes(
+    costs: Sequence[int],
+    batch_bins: int,
+    min_batch_size: int,
+    drop_last: bool,
+    padding: bool,
+) -> List[int]:
+    """Decide the batch sizes to fill each mini-batch up to batch_bins.
+
+    Args:
+        costs: The bins of each sample in ascending order of the length
+        padding: If True, the bins of a mini-batch are the batch size
+            multiplied by the cost of the longest sample
+            instead of the sum of the costs.
+
+    """
+    batch_sizes = []
+    n = 0
+    total = 0
+    for cost in costs:
+        n += 1
+        total += cost
+        bins = n * cost if padding else total
+        if bins > batch_bins and n >= min_batch_size:
+            batch_sizes.append(n)
+            n = 0
+            total = 0
+    else:
+        if n != 0 and (not drop_last or len(batch_sizes) == 0):
+            batch_sizes.append(n)
+
+    if len(batch_sizes) == 0:
+        # Maybe we can't reach here
+        raise RuntimeError("0 batches")
+
+    # If the last batch-size is smaller than minimum batch_size,
+    # the samples are redistributed to the other mini-batches
+    if len(batch_sizes) > 1 and batch_sizes[-1] < min_batch_size:
+        for i in range(batch_sizes.pop(-1)):
+            batch_sizes[-(i % len(batch_sizes)) - 1] += 1
+
+    if not drop_last:
+        # Bug check
+        assert sum(batch_sizes) == len(costs), f"{sum(batch_sizes)} != {len(costs)}"
+    return batch_sizes
+
+
+def split_batches(
+    keys: Sequence[str], batch_sizes: Sequence[int], sort_in_batch: str
+) -> List[Tuple[str, ...]]:
+    """Split the keys sorted in ascending order into mini-batches."""
+    batch_list = []
+    start = 0
+    for bs in batch_sizes:
+        minibatch_keys = keys[start : start + bs]
+        if len(minibatch_keys) < bs:
+            break
+        start += bs
+        if sort_in_batch == "descending":
+            minibatch_keys = minibatch_keys[::-1]
+        elif sort_in_batch == "ascending":
+            # Key are already sorted in ascending
+            pass
+        else:
+            raise ValueError(
+                f"sort_in_batch must be ascending or descending: {sort_in_batch}"
+            )
+        batch_list.append(tuple(minibatch_keys))
+    return batch_list
+
+
+_batch_lists: "collections.OrderedDict[tuple, list]" = collections.OrderedDict()
+_max_batch_lists = 16
+
+
+def cached_batch_list(
+    name: str,
+    files: Sequence[Union[Path, str, None]],
+    options: dict,
+    build: Callable[[], list],
+) -> list:
+    """Get the batch list from the cache or build it.
+
+    The batch list is cached with the key of the sampler name, the options
+    and the files, which are identified by the path, size and mtime,
+    so that the same batch list is not built again, e.g. for
+    the iterator factories of the same data.
+
+    """
+    file_stamps = []
+    for p in files:
+        if p is None:
+            file_stamps.append(None)
+        else:
+            stat = Path(p).stat()
+            file_stamps.append(
+                (str(Path(p).absolute()), stat.st_size, stat.st_mtime_ns)
+            )
+    key = (name, tuple(file_stamps), tuple(sorted(options.items())))
+    batch_list = _batch_lists.get(key)
+    if batch_list is None:
+        batch_list = build()
+        _batch_lists[key] = batch_list
+        while len(_batch_lists) > _max_batch_lists:
+            _batch_lists.popitem(last=False)
+    else:
+        _batch_lists.move_to_end(key)
+    # The sampler may modify its batch list
+    return list(batch_list)
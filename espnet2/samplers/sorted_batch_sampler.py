@@ -2,10 +2,12 @@ import logging
 from typing import Iterator
 from typing import Tuple
 
+import numpy as np
 from typeguard import check_argument_types
 
-from espnet2.fileio.read_text import load_num_sequence_text
 from espnet2.samplers.abs_sampler import AbsSampler
+from espnet2.samplers.shape_index import cached_batch_list
+from espnet2.samplers.shape_index import get_shape_index
 
 
 class SortedBatchSampler(AbsSampler):
@@ -34,49 +36,65 @@ class SortedBatchSampler(AbsSampler):
         self.sort_batch = sort_batch
         self.drop_last = drop_last
 
+        self.batch_list = cached_batch_list(
+            self.__class__.__name__,
+            [shape_file],
+            dict(
+                batch_size=batch_size,
+                sort_in_batch=sort_in_batch,
+                sort_batch=sort_batch,
+                drop_last=drop_last,
+            ),
+            self._build_batch_list,
+        )
+
+    def _build_batch_list(self) -> list:
         # utt2shape: (Length, ...)
         #    uttA 100,...
         #    uttB 201,...
-        utt2shape = load_num_sequence_text(shape_file, loader_type="csv_int")
-        if sort_in_batch == "descending":
+        index = get_shape_index(self.shape_file)
+        if self.sort_in_batch == "descending":
             # Sort samples in descending order (required by RNN)
-            keys = sorted(utt2shape, key=lambda k: -utt2shape[k][0])
-        elif sort_in_batch == "ascending":
+            ids = np.argsort(-index.shapes[:, 0], kind="stable")
+        elif self.sort_in_batch == "ascending":
             # Sort samples in ascending order
-            keys = sorted(utt2shape, key=lambda k: utt2shape[k][0])
+            ids = index.order
         else:
             raise ValueError(
                 f"sort_in_batch must be either one of "
-                f"ascending, descending, or None: {sort_in_batch}"
+                f"ascending, descending, or None: {self.sort_in_batch}"
             )
+        keys = index.keys[ids].tolist()
         if len(keys) == 0:
-            raise RuntimeError(f"0 lines found: {shape_file}")
+            raise RuntimeError(f"0 lines found: {self.shape_file}")
 
         # Apply max(, 1) to avoid 0-batches
-        N = max(len(keys) // batch_size, 1)
+        N = max(len(keys) // self.batch_size, 1)
         if not self.drop_last:
             # Split keys evenly as possible as. Note that If N != 1,
             # the these batches always have size of batch_size at minimum.
-            self.batch_list = [
+            batch_list = [
                 keys[i * len(keys) // N : (i + 1) * len(keys) // N] for i in range(N)
             ]
         else:
-            self.batch_list = [
-                tuple(keys[i * batch_size : (i + 1) * batch_size]) for i in range(N)
+            batch_list = [
+                tuple(keys[i * self.batch_size : (i + 1) * self.batch_size])
+                for i in range(N)
             ]
 
-        if len(self.batch_list) == 0:
-            logging.warning(f"{shape_file} is empty")
+        if len(batch_list) == 0:
+            logging.warning(f"{self.shape_file} is empty")
 
-        if sort_in_batch != sort_batch:
-            if sort_batch not in ("ascending", "descending"):
+        if self.sort_in_batch != self.sort_batch:
+            if self.sort_batch not in ("ascending", "descending"):
                 raise ValueError(
-                    f"sort_batch must be ascending or descending: {sort_batch}"
+                    f"sort_batch must be ascending or descending: {self.sort_batch}"
                 )
-            self.batch_list.reverse()
+            batch_list.reverse()
 
-        if len(self.batch_list) == 0:
+        if len(batch_list) == 0:
             raise RuntimeError("0 batches")
+        return batch_list
 
     def __repr__(self):
         return (
@@ -34,7 +34,9 @@ from espnet.utils.cli_utils import get_commandline_args
 from espnet2.iterators.abs_iter_factory import AbsIterFactory
 from espnet2.iterators.chunk_iter_factory import ChunkIterFactory
 from espnet2.iterators.multiple_iter_factory import MultipleIterFactory
+from espnet2.iterators.prefetch_iter_factory import PrefetchIterFactory
 from espnet2.iterators.sequence_iter_factory import SequenceIterFactory
+from espnet2.iterators.stream_iter_factory import StreamIterFactory
 from espnet2.main_funcs.collect_stats import collect_stats
 from espnet2.optimizers.sgd import SGD
 from espnet2.samplers.build_batch_sampler import BATCH_TYPES
@@ -48,6 +50,7 @@ from espnet2.torch_utils.pytorch_version import pytorch_cudnn_version
 from espnet2.torch_utils.set_all_random_seed import set_all_random_seed
 from espnet2.train.abs_espnet_model import AbsESPnetModel
 from espnet2.train.class_choices import ClassChoices
+from espnet2.train.collate_fn import BatchPreprocessCollateFn
 from espnet2.train.dataset import AbsDataset
 from espnet2.train.dataset import DATA_TYPES
 from espnet2.train.dataset import ESPnetDataset
@@ -307,7 +310,7 @@ class AbsTask(ABC):
         group.add_argument(
             "--iterator_type",
             type=str,
-            choices=["sequence", "chunk", "task", "none"],
+            choices=["sequence", "chunk", "stream", "task", "none"],
             default="sequence",
             help="Specify iterator type",
         )
@@ -326,6 +329,16 @@ class AbsTask(ABC):
             default=1,
             help="The number of workers used for DataLoader",
         )
+        group.add_argument(
+            "--prefetch_batches",
+            type=int,
+            default=0,
+            help="The number of mini-batches prepared in advance by a background "
+            "thread for training and validation. If > 0, the mini-batches are "
+            "copied to GPU asynchronously from pinned memory and "
+            "'iter_time' shows the time waiting for the data. "
+            "0 indicates no prefetching",
+        )
         group.add_argument(
             "--num_att_plot",
             type=int,
@@ -545,6 +558,49 @@ class AbsTask(ABC):
             default=False,
             help="Enable resuming if checkpoint is existing",
         )
+        group.add_argument(
+            "--async_checkpoint",
+            type=str2bool,
+            default=True,
+            help="Write the checkpoint files in background. "
+            "The states are copied to CPU memory before writing them",
+        )
+        group.add_argument(
+            "--checkpoint_interval",
+            type=int,
+            default=0,
+            help="Save the checkpoint every the number iterations in each epoch "
+            "in addition to the end of the epoch, so that the training can be "
+            "resumed from the middle of the epoch. "
+            "It must be a multiple of accum_grad. 0 indicates disabled",
+        )
+        group.add_argument(
+            "--report_step_details",
+            type=str2bool,
+            default=False,
+            help="Report the time of the host-to-device copy, the all-reduce, "
+            "and the gradient clipping, the peak memory, and the throughputs, "
+            "e.g. samples_per_sec and text_per_sec, at each training step. "
+            "Note that the CUDA device is synchronized to measure the time",
+        )
+        group.add_argument(
+            "--stats_reduce_interval",
+            type=int,
+            default=1,
+            help="The interval of the iterations to average the training stats "
+            "over the processes in distributed training. The stats are accumulated "
+            "in each process until then, and they are averaged by one all_reduce. "
+            "They are also averaged at every log_interval.",
+        )
+        group.add_argument(
+            "--profiler_steps",
+            type=int,
+            nargs=2,
+            default=None,
+            help="Capture the trace of torch.profiler in the first epoch, "
+            "e.g. '10 20' traces the 11th to 20th iterations. "
+            "The trace is written to output_dir/profiler for tensorboard",
+        )
         group.add_argument(
             "--train_dtype",
             default="float32",
@@ -761,6 +817,25 @@ class AbsTask(ABC):
             "More larger this value, more randomness can be obtained.",
         )
 
+        group = parser.add_argument_group("Stream iterator related")
+        group.add_argument(
+            "--shuffle_buffer_size",
+            type=int,
+            default=10000,
+            help="The number of samples in the buffer to shuffle the training data "
+            "read sequentially. The shuffling is disabled if it's 0 or 1. "
+            "The mini-batches are made of --batch_size samples "
+            "if batch_type='unsorted' or 'sorted', "
+            "otherwise up to --batch_bins bins in terms of the 'length' or 'numel'.",
+        )
+        group.add_argument(
+            "--bucket_buffer_size",
+            type=int,
+            default=1000,
+            help="The number of samples sorted by their lengths "
+            "to make mini-batches of similar lengths",
+        )
+
         group = parser.add_argument_group("Dataset related")
         _data_path_and_name_and_type_help = (
             "Give three words splitted by comma. It's used for the training data. "
@@ -808,6 +883,25 @@ class AbsTask(ABC):
             "as opened for ark files. "
             "This feature is only valid when data type is 'kaldi_ark'.",
         )
+        group.add_argument(
+            "--lazy_index",
+            type=str2bool,
+            default=False,
+            help="Whether to read the scp and text files lazily by an index of "
+            "the keys, which is written next to each file as <file>.idx, "
+            "instead of loading them into the memory at startup. "
+            "This feature is valid for the data types except for 'kaldi_ark', "
+            "'hdf5' and the random generators.",
+        )
+        group.add_argument(
+            "--token_cache_dir",
+            type=str_or_none,
+            default=None,
+            help="The directory of the persistent cache of the tokenized texts. "
+            "The cache is filled at the first epoch or by "
+            "'python -m espnet2.bin.pretokenize_text' in advance, "
+            "so that the tokenizer, e.g. g2p, isn't invoked again.",
+        )
         group.add_argument(
             "--valid_max_cache_size",
             type=humanfriendly_parse_size_or_none,
@@ -1255,6 +1349,16 @@ class AbsTask(ABC):
                 distributed_option=distributed_option,
                 mode="valid",
             )
+            if args.prefetch_batches > 0:
+                train_iter_factory, valid_iter_factory = [
+                    PrefetchIterFactory(
+                        iter_factory,
+                        num_prefetch=args.prefetch_batches,
+                        device="cuda" if args.ngpu > 0 else "cpu",
+                        pin_memory=args.ngpu > 0,
+                    )
+                    for iter_factory in (train_iter_factory, valid_iter_factory)
+                ]
             if not args.use_matplotlib and args.num_att_plot != 0:
                 args.num_att_plot = 0
                 logging.info("--use_matplotlib false => Changing --num_att_plot to 0")
@@ -1396,6 +1500,10 @@ class AbsTask(ABC):
         else:
             raise NotImplementedError(f"mode={mode}")
 
+        if getattr(preprocess_fn, "batch_augmentation", False):
+            # The augmentation is applied to each mini-batch in collate_fn
+            collate_fn = BatchPreprocessCollateFn(preprocess_fn, collate_fn)
+
         return IteratorOptions(
             preprocess_fn=preprocess_fn,
             collate_fn=collate_fn,
@@ -1464,6 +1572,12 @@ class AbsTask(ABC):
                 iter_options=iter_options,
                 mode=mode,
             )
+        elif args.iterator_type == "stream":
+            return cls.build_stream_iter_factory(
+                args=args,
+                iter_options=iter_options,
+                mode=mode,
+            )
         elif args.iterator_type == "task":
             return cls.build_task_iter_factory(
                 args=args,
@@ -1485,6 +1599,7 @@ class AbsTask(ABC):
             preprocess=iter_options.preprocess_fn,
             max_cache_size=iter_options.max_cache_size,
             max_cache_fd=iter_options.max_cache_fd,
+            lazy_index=args.lazy_index,
         )
         cls.check_task_requirements(
             dataset, args.allow_variable_data_keys, train=iter_options.train
@@ -1566,6 +1681,7 @@ class AbsTask(ABC):
             preprocess=iter_options.preprocess_fn,
             max_cache_size=iter_options.max_cache_size,
             max_cache_fd=iter_options.max_cache_fd,
+            lazy_index=args.lazy_index,
         )
         cls.check_task_requirements(
             dataset, args.allow_variable_data_keys, train=iter_options.train
@@ -1623,6 +1739,83 @@ class AbsTask(ABC):
             num_cache_chunks=num_cache_chunks,
         )
 
+    @classmethod
+    def build_stream_iter_factory(
+        cls,
+        args: argparse.Namespace,
+        iter_options: IteratorOptions,
+        mode: str,
+    ) -> AbsIterFactory:
+        assert check_argument_types()
+        if iter_options.num_iters_per_epoch is not None:
+            raise RuntimeError(
+                "--num_iters_per_epoch is not supported for --iterator_type stream"
+            )
+
+        dataset = IterableESPnetDataset(
+            iter_options.data_path_and_name_and_type,
+            float_dtype=args.train_dtype,
+            preprocess=iter_options.preprocess_fn,
+            shuffle_buffer_size=args.shuffle_buffer_size if iter_options.train else 0,
+            seed=args.seed,
+            distributed=iter_options.distributed,
+        )
+        cls.check_task_requirements(
+            dataset, args.allow_variable_data_keys, train=iter_options.train
+        )
+        logging.info(f"[{mode}] dataset:\n{dataset}")
+
+        if iter_options.batch_type in ("unsorted", "sorted"):
+            batch_bins = None
+            length_type = "length"
+        elif iter_options.batch_type == "numel":
+            batch_bins = iter_options.batch_bins
+            length_type = "numel"
+        else:
+            # e.g. "length" and "folded"
+            batch_bins = iter_options.batch_bins
+            length_type = "length"
+
+        batch_size = iter_options.batch_size
+        if iter_options.distributed:
+            # NOTE: --batch_size and --batch_bins are the global values over
+            #   the workers, as the other iterator types, so they are divided here
+            #   because each rank makes its mini-batches from its own shard.
+            world_size = torch.distributed.get_world_size()
+            rank = torch.distributed.get_rank()
+            if batch_bins is None:
+                if batch_size < world_size:
+                    raise RuntimeError(
+                        "batch_size must be equal or more than world_size: "
+                        f"{batch_size} < {world_size}"
+                    )
+                if rank < batch_size % world_size:
+                    batch_size = batch_size // world_size + 1
+                else:
+                    batch_size = batch_size // world_size
+            else:
+                if batch_bins < world_size:
+                    raise RuntimeError(
+                        "batch_bins must be equal or more than world_size: "
+                        f"{batch_bins} < {world_size}"
+                    )
+                batch_bins = batch_bins // world_size
+
+        return StreamIterFactory(
+            dataset=dataset,
+            batch_size=batch_size,
+            batch_bins=batch_bins,
+            length_type=length_type,
+            bucket_buffer_size=args.bucket_buffer_size,
+            sort_in_batch=args.sort_in_batch,
+            num_batches=iter_options.num_batches,
+            seed=args.seed,
+            shuffle=iter_options.train,
+            num_workers=args.num_workers,
+            collate_fn=iter_options.collate_fn,
+            pin_memory=args.ngpu > 0,
+        )
+
     # NOTE(kamo): Not abstract class
     @classmethod
     def build_task_iter_factory(
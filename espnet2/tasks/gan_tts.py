@@ -238,6 +238,9 @@ class GANTTSTask(AbsTask):
                 non_linguistic_symbols=args.non_linguistic_symbols,
                 text_cleaner=args.cleaner,
                 g2p_type=args.g2p,
+                token_cache_dir=args.token_cache_dir
+                if hasattr(args, "token_cache_dir")
+                else None,
             )
         else:
             retval = None
@@ -230,6 +230,13 @@ class HubertTask(AbsTask):
             default="13_15",
             help="The range of noise decibel level.",
         )
+        parser.add_argument(
+            "--batch_augmentation",
+            type=str2bool,
+            default=False,
+            help="Apply the RIR convolution and the noise adding to each mini-batch "
+            "in collate_fn instead of each sample",
+        )
         parser.add_argument(
             "--pred_masked_weight",
             type=float,
@@ -299,6 +306,12 @@ class HubertTask(AbsTask):
                 speech_volume_normalize=args.speech_volume_normalize
                 if hasattr(args, "rir_scp")
                 else None,
+                batch_augmentation=args.batch_augmentation
+                if hasattr(args, "batch_augmentation")
+                else False,
+                token_cache_dir=args.token_cache_dir
+                if hasattr(args, "token_cache_dir")
+                else None,
             )
         else:
             retval = None
@@ -160,6 +160,9 @@ class LMTask(AbsTask):
                 text_cleaner=args.cleaner,
                 g2p_type=args.g2p,
                 non_linguistic_symbols=args.non_linguistic_symbols,
+                token_cache_dir=args.token_cache_dir
+                if hasattr(args, "token_cache_dir")
+                else None,
             )
         else:
             retval = None
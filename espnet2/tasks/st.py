@@ -343,6 +343,13 @@ class STTask(AbsTask):
             default="13_15",
             help="The range of noise decibel level.",
         )
+        parser.add_argument(
+            "--batch_augmentation",
+            type=str2bool,
+            default=False,
+            help="Apply the RIR convolution and the noise adding to each mini-batch "
+            "in collate_fn instead of each sample",
+        )
 
         for class_choices in cls.class_choices_list:
             # Append --<name> and --<name>_conf.
@@ -389,6 +396,10 @@ class STTask(AbsTask):
                 speech_volume_normalize=args.speech_volume_normalize
                 if hasattr(args, "speech_volume_normalize")
                 else None,
+                batch_augmentation=args.batch_augmentation,
+                token_cache_dir=args.token_cache_dir
+                if hasattr(args, "token_cache_dir")
+                else None,
                 speech_name="speech",
                 text_name=["text", "src_text"],
             )
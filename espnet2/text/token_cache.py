@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Union
+
+import numpy as np
+from typeguard import check_argument_types
+
+
+def _digest(value):
+    """Convert a value of the tokenizer configuration to a hashable string.
+
+    The files, e.g. token_list and bpemodel, are identified by their contents
+    instead of their paths.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (str, Path)) and Path(value).is_file():
+        with Path(value).open("rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    if isinstance(value, (str, Path)):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _digest(v) for k, v in value.items()}
+    # e.g. token_list given as a list of tokens
+    return hashlib.sha1("\n".join(map(str, value)).encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """Persistent cache of the token ids of texts.
+
+    The token ids are stored in a sqlite3 database, `<cache_dir>/<hash>.db`,
+    keyed by the hash of the text, where `<hash>` is derived from
+    the configuration of the text cleaner, the tokenizer and the token list,
+    so that the cache is never used for another configuration.
+    The database can be shared by the processes, e.g. the workers of DataLoader,
+    and the processes of the other jobs.
+
+    Note that the versions of the external tools, e.g. the g2p modules,
+    are not included in the configuration:
+    Remove the cache directory if they are updated.
+
+    Examples:
+        >>> cache = TokenCache("exp/token_cache", dict(token_type="phn", ...))
+        >>> ids = cache.get(text)
+        >>> if ids is None:
+        ...     ids = text2ids(text)
+        ...     cache.put(text, ids)
+
+    """
+
+    version = 1
+
+    def __init__(self, cache_dir: Union[Path, str], config: Dict[str, object]):
+        assert check_argument_types()
+        config = dict(_digest(config), version=self.version)
+        fingerprint = hashlib.sha1(
+            json.dumps(config, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / f"{fingerprint}.db"
+        self._pid = None
+        self._connection = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write the configuration for humans
+            config_path = self.cache_dir / f"{fingerprint}.json"
+            if not config_path.exists():
+                with config_path.open("w", encoding="utf-8") as f:
+                    json.dump(config, f, indent=4, sort_keys=True)
+            self._connect()
+            self.enabled = True
+        except (OSError, sqlite3.Error) as e:
+            # e.g. The model is used on another machine
+            logging.warning(f"The token cache is disabled: {self.path}: {e}")
+            self.enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # NOTE: A connection must not be shared by the forked processes
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._connection = sqlite3.connect(
+                str(self.path), timeout=60, isolation_level=None
+            )
+            # Allow the readers to run concurrently with a writer
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS tokens "
+                "(key BLOB PRIMARY KEY, ids BLOB NOT NULL)"
+            )
+        return self._connection
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pid"] = None
+        state["_connection"] = None
+        return state
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.sha1(text.encode("utf-8")).digest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        if not self.enabled:
+            return None
+        row = (
+            self._connect()
+            .execute("SELECT ids FROM tokens WHERE key = ?", (self.key(text),))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.int32).astype(np.int64)
+
+    def put(self, text: str, ids: Iterable[int]):
+        if not self.enabled:
+            return
+        ids = np.asarray(ids, dtype=np.int32)
+        try:
+            self._connect().execute(
+                "INSERT OR IGNORE INTO tokens VALUES (?, ?)",
+                (self.key(text), ids.tobytes()),
+            )
+        except sqlite3.OperationalError as e:
+            # e.g. The database is locked for a long time: Not to stop training
+            logging.warning(f"Failed to write {self.path}: {e}")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
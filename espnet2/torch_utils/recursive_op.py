@@ -37,11 +37,55 @@ def recursive_divide(a, b: torch.Tensor):
         raise ValueError(type(a))
 
 
+def _recursive_tensors(obj) -> list:
+    if isinstance(obj, (tuple, list)):
+        return [t for v in obj for t in _recursive_tensors(v)]
+    elif isinstance(obj, dict):
+        return [t for v in obj.values() for t in _recursive_tensors(v)]
+    elif isinstance(obj, torch.Tensor):
+        return [obj]
+    elif obj is None:
+        return []
+    else:
+        raise ValueError(type(obj))
+
+
+def _recursive_replace(obj, tensors):
+    if isinstance(obj, (tuple, list)):
+        return type(obj)(_recursive_replace(v, tensors) for v in obj)
+    elif isinstance(obj, dict):
+        return {k: _recursive_replace(v, tensors) for k, v in obj.items()}
+    elif isinstance(obj, torch.Tensor):
+        return next(tensors)
+    else:
+        return obj
+
+
+def recursive_all_reduce(obj):
+    """Sum the tensors in the nested containers over the workers.
+
+    The tensors are packed into a flat float64 tensor,
+    so that only one all_reduce is issued for all of them.
+    All workers must give the same structure of the tensors.
+    """
+    tensors = _recursive_tensors(obj)
+    if len(tensors) == 0:
+        return obj
+    flat = torch.cat([t.detach().reshape(-1).to(torch.float64) for t in tensors])
+    torch.distributed.all_reduce(flat, op=ReduceOp.SUM)
+    reduced = (
+        v.view_as(t).to(t.dtype)
+        for v, t in zip(flat.split([t.numel() for t in tensors]), tensors)
+    )
+    return _recursive_replace(obj, reduced)
+
+
 def recursive_average(obj, weight: torch.Tensor, distributed: bool = False):
-    obj = recursive_sum(obj, weight, distributed)
+    obj = recursive_sum(obj, weight)
     weight = weight.sum()
     if distributed:
-        torch.distributed.all_reduce(weight, op=ReduceOp.SUM)
+        # NOTE: Reduce all stats and the weight by one collective communication
+        obj, weight = recursive_all_reduce((obj, weight))
     # Normalize weight to be sum-to-1
     obj = recursive_divide(obj, weight)
     return obj, weight
@@ -0,0 +1,132 @@
+"""Checkpoint writer saving the states in a background thread."""
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+import torch
+from typeguard import check_argument_types
+
+
+def snapshot_state(obj: Any, memo: Optional[Dict[int, Any]] = None) -> Any:
+    """Copy the tensors in the nested containers to CPU.
+
+    The containers are also copied, so the snapshot isn't changed
+    by the following training steps, e.g. the in-place update of the parameters
+    or a new entry in the stats of the reporter.
+    The tensors shared between the objects, e.g. the parameters referred
+    by the checkpoint and the model file, are copied only once via "memo".
+
+    Examples:
+        >>> state = snapshot_state(model.state_dict())
+        >>> model.weight.data.add_(1.0)  # Doesn't change the state
+    """
+    if memo is None:
+        memo = {}
+    if id(obj) in memo:
+        return memo[id(obj)]
+
+    if isinstance(obj, torch.Tensor):
+        retval = obj.detach().to("cpu", copy=True)
+    elif isinstance(obj, np.ndarray):
+        retval = obj.copy()
+    elif isinstance(obj, dict):
+        # NOTE: Keep the type and the attributes, e.g. OrderedDict
+        #   having "_metadata" created by torch.nn.Module.state_dict()
+        retval = obj.__class__()
+        for k, v in obj.items():
+            retval[k] = snapshot_state(v, memo)
+        if hasattr(obj, "_metadata"):
+            retval._metadata = obj._metadata
+    elif isinstance(obj, list):
+        retval = [snapshot_state(v, memo) for v in obj]
+    elif isinstance(obj, tuple) and not hasattr(obj, "_fields"):
+        retval = tuple(snapshot_state(v, memo) for v in obj)
+    else:
+        return obj
+    memo[id(obj)] = retval
+    return retval
+
+
+def save_atomic(obj: Any, path: Union[str, Path]):
+    """Save the object to a temporary file and rename it to the path.
+
+    The file at the path is always a complete one,
+    even if the process is killed while saving.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        torch.save(obj, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+class CheckpointWriter:
+    """Save the checkpoints without blocking the training.
+
+    The states are copied to CPU by the calling thread at save(),
+    and the files are written by a background thread,
+    so that the training can go on while serializing them to the disk.
+    Only one saving is performed at a time: save() waits for the previous one
+    and thus at most one snapshot of the states is held in the memory.
+    Call wait() before reading the saved files.
+    The error raised in the background thread is raised by save() or wait().
+
+    Examples:
+        >>> writer = CheckpointWriter()
+        >>> writer.save([(model.state_dict(), "1epoch.pth")])
+        >>> ...
+        >>> writer.wait()
+
+    Args:
+        asynchronous: If False, save the files synchronously
+            without copying the states.
+    """
+
+    def __init__(self, asynchronous: bool = True):
+        assert check_argument_types()
+        self.asynchronous = asynchronous
+        self._thread = None
+        self._error = None
+
+    def save(self, objs: Sequence[Tuple[Any, Union[str, Path]]]):
+        """Save the pairs of the object and the path in order."""
+        self.wait()
+        if not self.asynchronous:
+            for obj, path in objs:
+                save_atomic(obj, path)
+            return
+
+        memo = {}
+        objs = [(snapshot_state(obj, memo), path) for obj, path in objs]
+        # NOTE: Not daemon thread, so that the last checkpoint is completed
+        #   even if the main thread exits due to an error.
+        self._thread = threading.Thread(target=self._save, args=(objs,))
+        self._thread.start()
+
+    def _save(self, objs: Sequence[Tuple[Any, Union[str, Path]]]):
+        try:
+            for obj, path in objs:
+                save_atomic(obj, path)
+        except BaseException as e:
+            self._error = e
+
+    def wait(self):
+        """Wait for the files to be written."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            logging.error("Failed to save the checkpoint")
+            raise error
@@ -1,6 +1,8 @@
 from typing import Collection
 from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Sequence
 from typing import Tuple
 from typing import Union
 
@@ -9,8 +11,6 @@ import torch
 from typeguard import check_argument_types
 from typeguard import check_return_type
 
-from espnet.nets.pytorch_backend.nets_utils import pad_list
-
 
 class CommonCollateFn:
     """Functor class of common_collate_fn()"""
@@ -20,11 +20,15 @@ class CommonCollateFn:
         float_pad_value: Union[float, int] = 0.0,
         int_pad_value: int = -32768,
         not_sequence: Collection[str] = (),
+        shared_memory: Optional[bool] = None,
+        pin_memory: bool = False,
     ):
         assert check_argument_types()
         self.float_pad_value = float_pad_value
         self.int_pad_value = int_pad_value
         self.not_sequence = set(not_sequence)
+        self.shared_memory = shared_memory
+        self.pin_memory = pin_memory
 
     def __repr__(self):
         return (
@@ -40,17 +44,102 @@ class CommonCollateFn:
             float_pad_value=self.float_pad_value,
             int_pad_value=self.int_pad_value,
             not_sequence=self.not_sequence,
+            shared_memory=self.shared_memory,
+            pin_memory=self.pin_memory,
         )
 
 
+class BatchPreprocessCollateFn:
+    """Apply the batch-wise part of the preprocessing before collate_fn.
+
+    Examples:
+        >>> preprocess_fn = CommonPreprocessor(..., batch_augmentation=True)
+        >>> collate_fn = BatchPreprocessCollateFn(preprocess_fn, CommonCollateFn())
+    """
+
+    def __init__(self, preprocess_fn, collate_fn=None):
+        self.preprocess_fn = preprocess_fn
+        self.collate_fn = collate_fn
+
+    def __repr__(self):
+        return f"{self.__class__}(collate_fn={self.collate_fn})"
+
+    def __call__(self, data: Collection[Tuple[str, Dict[str, np.ndarray]]]):
+        data = self.preprocess_fn.process_batch(list(data))
+        if self.collate_fn is None:
+            return torch.utils.data.dataloader.default_collate(data)
+        return self.collate_fn(data)
+
+
+def _empty_shared(shape: Tuple[int, ...], dtype: torch.dtype) -> torch.Tensor:
+    if hasattr(torch, "UntypedStorage") and hasattr(
+        torch.UntypedStorage, "_new_shared"
+    ):
+        # Allocate the shared memory directly instead of copying to it
+        nbytes = int(np.prod(shape)) * torch.empty(0, dtype=dtype).element_size()
+        storage = torch.UntypedStorage._new_shared(nbytes)
+        return torch.empty(0, dtype=dtype).set_(storage, 0, shape)
+    else:
+        return torch.empty(shape, dtype=dtype).share_memory_()
+
+
+def pad_arrays(
+    arrays: Sequence[np.ndarray],
+    pad_value: Union[float, int],
+    shared_memory: bool = False,
+    pin_memory: bool = False,
+) -> torch.Tensor:
+    """Pad the arrays into a tensor allocated at once.
+
+    Unlike pad_list(), the arrays are not converted to tensors one by one,
+    but copied into the output buffer directly, and only the padded parts
+    are filled with pad_value.
+
+    Args:
+        arrays: Batch x (Length, ...)
+        pad_value: The value for padding
+        shared_memory: Allocate the tensor in shared memory,
+            which can be passed to the other processes without copying
+        pin_memory: Allocate the tensor in page-locked memory
+            for the asynchronous copy to GPU
+
+    Returns:
+        (Batch, Length, ...)
+
+    """
+    lengths = [a.shape[0] for a in arrays]
+    max_len = max(lengths)
+    # NOTE: The dtype and the rest of the shape follow the first array as pad_list
+    first = arrays[0]
+    shape = (len(arrays), max_len) + first.shape[1:]
+    dtype = torch.from_numpy(first[:0]).dtype
+    if shared_memory:
+        tensor = _empty_shared(shape, dtype)
+    else:
+        tensor = torch.empty(shape, dtype=dtype, pin_memory=pin_memory)
+    buffer = tensor.numpy()
+    for i, (a, length) in enumerate(zip(arrays, lengths)):
+        buffer[i, :length] = a
+        if length < max_len:
+            buffer[i, length:] = pad_value
+    return tensor
+
+
 def common_collate_fn(
     data: Collection[Tuple[str, Dict[str, np.ndarray]]],
     float_pad_value: Union[float, int] = 0.0,
     int_pad_value: int = -32768,
     not_sequence: Collection[str] = (),
+    shared_memory: Optional[bool] = None,
+    pin_memory: bool = False,
 ) -> Tuple[List[str], Dict[str, torch.Tensor]]:
     """Concatenate ndarray-list to an array and convert to torch.Tensor.
 
+    The padded tensor of each key is allocated at once by pad_arrays().
+    If shared_memory is None, the tensors are allocated in shared memory
+    only in the worker processes of DataLoader, as default_collate() of pytorch,
+    and pin_memory is ignored in the worker processes.
+
     Examples:
         >>> from espnet2.samplers.constant_batch_sampler import ConstantBatchSampler,
         >>> import espnet2.tasks.abs_task
@@ -75,6 +164,14 @@ def common_collate_fn(
         not k.endswith("_lengths") for k in data[0]
     ), f"*_lengths is reserved: {list(data[0])}"
 
+    in_worker = torch.utils.data.get_worker_info() is not None
+    if shared_memory is None:
+        shared_memory = in_worker
+    # NOTE: The page-locked memory can't be shared with the other processes
+    pin_memory = (
+        pin_memory and not in_worker and not shared_memory and torch.cuda.is_available()
+    )
+
     output = {}
     for key in data[0]:
         # NOTE(kamo):
@@ -88,10 +185,13 @@ def common_collate_fn(
         array_list = [d[key] for d in data]
 
         # Assume the first axis is length:
-        # tensor_list: Batch x (Length, ...)
-        tensor_list = [torch.from_numpy(a) for a in array_list]
         # tensor: (Batch, Length, ...)
-        tensor = pad_list(tensor_list, pad_value)
+        tensor = pad_arrays(
+            array_list,
+            pad_value,
+            shared_memory=shared_memory,
+            pin_memory=pin_memory,
+        )
         output[key] = tensor
 
         # lens: (Batch,)
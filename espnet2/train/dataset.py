@@ -24,13 +24,15 @@ from typeguard import check_argument_types
 from typeguard import check_return_type
 
 from espnet2.fileio.npy_scp import NpyScpReader
+from espnet2.fileio.packed_scp import PackedScpReader
 from espnet2.fileio.rand_gen_dataset import FloatRandomGenerateDataset
 from espnet2.fileio.rand_gen_dataset import IntRandomGenerateDataset
 from espnet2.fileio.read_text import load_num_sequence_text
 from espnet2.fileio.read_text import read_2column_text
 from espnet2.fileio.rttm import RttmReader
 from espnet2.fileio.sound_scp import SoundScpReader
-from espnet2.utils.sized_dict import SizedDict
+from espnet2.utils.lru_cache import LRUCache
+from espnet2.utils.lru_cache import SharedLRUCache
 
 
 class AdapterForSoundScpReader(collections.abc.Mapping):
@@ -105,7 +107,7 @@ class H5FileWrapper:
         return value[()]
 
 
-def sound_loader(path, float_dtype=None):
+def sound_loader(path, float_dtype=None, lazy: bool = False):
     # The file is as follows:
     #   utterance_id_A /some/where/a.wav
     #   utterance_id_B /some/where/a.flac
@@ -113,7 +115,7 @@ def sound_loader(path, float_dtype=None):
     # NOTE(kamo): SoundScpReader doesn't support pipe-fashion
     # like Kaldi e.g. "cat a.wav |".
     # NOTE(kamo): The audio signal is normalized to [-1,1] range.
-    loader = SoundScpReader(path, normalize=True, always_2d=False)
+    loader = SoundScpReader(path, normalize=True, always_2d=False, lazy=lazy)
 
     # SoundScpReader.__getitem__() returns Tuple[int, ndarray],
     # but ndarray is desired, so Adapter class is inserted here
@@ -137,7 +139,7 @@ def rand_int_loader(filepath, loader_type):
 DATA_TYPES = {
     "sound": dict(
         func=sound_loader,
-        kwargs=["float_dtype"],
+        kwargs=["float_dtype", "lazy"],
         help="Audio format types which supported by sndfile wav, flac, etc."
         "\n\n"
         "   utterance_id_a a.wav\n"
@@ -155,16 +157,27 @@ DATA_TYPES = {
     ),
     "npy": dict(
         func=NpyScpReader,
-        kwargs=[],
+        kwargs=["lazy"],
         help="Npy file format."
         "\n\n"
         "   utterance_id_A /some/where/a.npy\n"
         "   utterance_id_B /some/where/b.npy\n"
         "   ...",
     ),
+    "packed": dict(
+        func=PackedScpReader,
+        kwargs=["lazy"],
+        help="Arrays packed into large shard files, which are read by np.memmap "
+        "without opening a file for each sample. "
+        "This can be created by 'python -m espnet2.bin.make_packed_scp'."
+        "\n\n"
+        "   utterance_id_A /some/where/shard.0.bin 0 float32 100,80\n"
+        "   utterance_id_B /some/where/shard.0.bin 32000 float32 150,80\n"
+        "   ...",
+    ),
     "text_int": dict(
         func=functools.partial(load_num_sequence_text, loader_type="text_int"),
-        kwargs=[],
+        kwargs=["lazy"],
         help="A text file in which is written a sequence of interger numbers "
         "separated by space."
         "\n\n"
@@ -174,7 +187,7 @@ DATA_TYPES = {
     ),
     "csv_int": dict(
         func=functools.partial(load_num_sequence_text, loader_type="csv_int"),
-        kwargs=[],
+        kwargs=["lazy"],
         help="A text file in which is written a sequence of interger numbers "
         "separated by comma."
         "\n\n"
@@ -184,7 +197,7 @@ DATA_TYPES = {
     ),
     "text_float": dict(
         func=functools.partial(load_num_sequence_text, loader_type="text_float"),
-        kwargs=[],
+        kwargs=["lazy"],
         help="A text file in which is written a sequence of float numbers "
         "separated by space."
         "\n\n"
@@ -194,7 +207,7 @@ DATA_TYPES = {
     ),
     "csv_float": dict(
         func=functools.partial(load_num_sequence_text, loader_type="csv_float"),
-        kwargs=[],
+        kwargs=["lazy"],
         help="A text file in which is written a sequence of float numbers "
         "separated by comma."
         "\n\n"
@@ -204,7 +217,7 @@ DATA_TYPES = {
     ),
     "text": dict(
         func=read_2column_text,
-        kwargs=[],
+        kwargs=["lazy"],
         help="Return text as is. The text must be converted to ndarray "
         "by 'preprocess'."
         "\n\n"
@@ -244,7 +257,7 @@ DATA_TYPES = {
     ),
     "rttm": dict(
         func=RttmReader,
-        kwargs=[],
+        kwargs=["lazy"],
         help="rttm file loader, currently support for speaker diarization"
         "\n\n"
         "    SPEAKER file1 1 0 1023 <NA> <NA> spk1 <NA>"
@@ -291,6 +304,7 @@ class ESPnetDataset(AbsDataset):
         int_dtype: str = "long",
         max_cache_size: Union[float, int, str] = 0.0,
         max_cache_fd: int = 0,
+        lazy_index: bool = False,
     ):
         assert check_argument_types()
         if len(path_name_type_list) == 0:
@@ -304,6 +318,7 @@ class ESPnetDataset(AbsDataset):
         self.float_dtype = float_dtype
         self.int_dtype = int_dtype
         self.max_cache_fd = max_cache_fd
+        self.lazy_index = lazy_index
 
         self.loader_dict = {}
         self.debug_info = {}
@@ -322,8 +337,12 @@ class ESPnetDataset(AbsDataset):
         if isinstance(max_cache_size, str):
             max_cache_size = humanfriendly.parse_size(max_cache_size)
         self.max_cache_size = max_cache_size
-        if max_cache_size > 0:
-            self.cache = SizedDict(shared=True)
+        if max_cache_size == float("inf"):
+            # An unbounded cache can't be allocated in the shared memory
+            self.cache = LRUCache(max_cache_size)
+        elif max_cache_size > 0:
+            # The cache is shared by the workers of DataLoader
+            self.cache = SharedLRUCache(int(max_cache_size))
         else:
             self.cache = None
 
@@ -350,6 +369,8 @@ class ESPnetDataset(AbsDataset):
                         kwargs["int_dtype"] = self.int_dtype
                     elif key2 == "max_cache_fd":
                         kwargs["max_cache_fd"] = self.max_cache_fd
+                    elif key2 == "lazy":
+                        kwargs["lazy"] = self.lazy_index
                     else:
                         raise RuntimeError(f"Not implemented keyword argument: {key2}")
 
@@ -391,9 +412,10 @@ class ESPnetDataset(AbsDataset):
             d = next(iter(self.loader_dict.values()))
             uid = list(d)[uid]
 
-        if self.cache is not None and uid in self.cache:
-            data = self.cache[uid]
-            return uid, data
+        if self.cache is not None:
+            data = self.cache.get(uid)
+            if data is not None:
+                return uid, data
 
         data = {}
         # 1. Load data from each loaders
@@ -445,7 +467,7 @@ class ESPnetDataset(AbsDataset):
                 raise NotImplementedError(f"Not supported dtype: {value.dtype}")
             data[name] = value
 
-        if self.cache is not None and self.cache.size < self.max_cache_size:
+        if self.cache is not None:
             self.cache[uid] = data
 
         retval = uid, data
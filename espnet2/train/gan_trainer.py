@@ -95,6 +95,7 @@ class GANTrainer(Trainer):
         summary_writer,
         options: GANTrainerOptions,
         distributed_option: DistributedOption,
+        profiler=None,
     ) -> bool:
         """Train one epoch."""
         assert check_argument_types()
@@ -147,6 +148,8 @@ class GANTrainer(Trainer):
             batch = to_device(batch, "cuda" if ngpu > 0 else "cpu")
             if no_forward_run:
                 all_steps_are_invalid = False
+                if profiler is not None:
+                    profiler.step()
                 continue
 
             turn_start_time = time.perf_counter()
@@ -298,6 +301,8 @@ class GANTrainer(Trainer):
 
             reporter.register({"train_time": time.perf_counter() - start_time})
             start_time = time.perf_counter()
+            if profiler is not None:
+                profiler.step()
 
             # NOTE(kamo): Call log_message() after next()
             reporter.next()
@@ -63,6 +63,12 @@ DATA_TYPES = {
 class IterableESPnetDataset(IterableDataset):
     """Pytorch Dataset class for ESPNet.
 
+    The lines of the files are read sequentially and split into shards
+    for each of the DataLoader workers and the distributed ranks,
+    i.e. each process reads only every `num_shards`-th sample.
+    If `shuffle_buffer_size` > 1, the samples are shuffled
+    within a buffer of the size, so that the files are still read sequentially.
+
     Examples:
         >>> dataset = IterableESPnetDataset([('wav.scp', 'input', 'sound'),
         ...                                  ('token_int', 'output', 'text_int')],
@@ -81,6 +87,9 @@ class IterableESPnetDataset(IterableDataset):
         float_dtype: str = "float32",
         int_dtype: str = "long",
         key_file: str = None,
+        shuffle_buffer_size: int = 0,
+        seed: int = 0,
+        distributed: bool = False,
     ):
         assert check_argument_types()
         if len(path_name_type_list) == 0:
@@ -94,6 +103,15 @@ class IterableESPnetDataset(IterableDataset):
         self.float_dtype = float_dtype
         self.int_dtype = int_dtype
         self.key_file = key_file
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self.epoch = 0
+        if distributed:
+            self.rank = torch.distributed.get_rank()
+            self.world_size = torch.distributed.get_world_size()
+        else:
+            self.rank = 0
+            self.world_size = 1
 
         self.debug_info = {}
         non_iterable_list = []
@@ -138,7 +156,41 @@ class IterableESPnetDataset(IterableDataset):
         _mes += f"\n  preprocess: {self.preprocess})"
         return _mes
 
+    def set_epoch(self, epoch: int):
+        """Change the seed of the shuffle buffer for each epoch."""
+        self.epoch = epoch
+
+    def shard(self) -> Tuple[int, int]:
+        """Return the index of the shard of this process and the number of shards."""
+        worker_info = torch.utils.data.get_worker_info()
+        if worker_info is None:
+            worker_id, num_workers = 0, 1
+        else:
+            worker_id, num_workers = worker_info.id, worker_info.num_workers
+        return self.rank * num_workers + worker_id, self.world_size * num_workers
+
     def __iter__(self) -> Iterator[Tuple[Union[str, int], Dict[str, np.ndarray]]]:
+        if self.shuffle_buffer_size <= 1:
+            yield from self._iter_samples()
+            return
+
+        shard_id, _ = self.shard()
+        state = np.random.RandomState([self.seed, self.epoch, shard_id])
+        buffer = []
+        for sample in self._iter_samples():
+            if len(buffer) < self.shuffle_buffer_size:
+                buffer.append(sample)
+                continue
+            # Replace a random sample in the buffer with the new one
+            i = state.randint(len(buffer))
+            yield buffer[i]
+            buffer[i] = sample
+        state.shuffle(buffer)
+        yield from buffer
+
+    def _iter_samples(
+        self,
+    ) -> Iterator[Tuple[Union[str, int], Dict[str, np.ndarray]]]:
         if self.key_file is not None:
             uid_iter = (
                 line.rstrip().split(maxsplit=1)[0]
@@ -154,15 +206,14 @@ class IterableESPnetDataset(IterableDataset):
 
         files = [open(lis[0], encoding="utf-8") for lis in self.path_name_type_list]
 
-        worker_info = torch.utils.data.get_worker_info()
+        shard_id, num_shards = self.shard()
 
         linenum = 0
         count = 0
         for count, uid in enumerate(uid_iter, 1):
-            # If num_workers>=1, split keys
-            if worker_info is not None:
-                if (count - 1) % worker_info.num_workers != worker_info.id:
-                    continue
+            # If num_workers>=1 or distributed, split keys
+            if (count - 1) % num_shards != shard_id:
+                continue
 
             # 1. Read a line from each file
             while True:
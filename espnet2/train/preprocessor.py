@@ -5,17 +5,19 @@ from typing import Collection
 from typing import Dict
 from typing import Iterable
 from typing import List
+from typing import Tuple
 from typing import Union
 
 import numpy as np
 import scipy.signal
-import soundfile
 from typeguard import check_argument_types
 from typeguard import check_return_type
 
 from espnet2.text.build_tokenizer import build_tokenizer
 from espnet2.text.cleaner import TextCleaner
+from espnet2.text.token_cache import TokenCache
 from espnet2.text.token_id_converter import TokenIDConverter
+from espnet2.train.speech_augmentation import SpeechAugmenter
 
 
 class AbsPreprocessor(ABC):
@@ -86,10 +88,10 @@ def detect_non_silence(
     >>> x = np.random.randn(1000)
     >>> detect = detect_non_silence(x)
     >>> assert x.shape == detect.shape
-    >>> assert detect.dtype == np.bool
+    >>> assert detect.dtype == bool
     """
     if x.shape[-1] < frame_length:
-        return np.full(x.shape, fill_value=True, dtype=np.bool)
+        return np.full(x.shape, fill_value=True, dtype=bool)
 
     if x.dtype.kind == "i":
         x = x.astype(np.float64)
@@ -107,7 +109,7 @@ def detect_non_silence(
     # mean_power: (C, 1)
     mean_power = np.mean(power, axis=-1, keepdims=True)
     if np.all(mean_power == 0):
-        return np.full(x.shape, fill_value=True, dtype=np.bool)
+        return np.full(x.shape, fill_value=True, dtype=bool)
     # detect_frames: (C, T)
     detect_frames = power / mean_power > threshold
     # detects: (C, T, F)
@@ -145,6 +147,8 @@ class CommonPreprocessor(AbsPreprocessor):
         speech_volume_normalize: float = None,
         speech_name: str = "speech",
         text_name: str = "text",
+        batch_augmentation: bool = False,
+        token_cache_dir: Union[Path, str] = None,
     ):
         super().__init__(train)
         self.train = train
@@ -176,144 +180,100 @@ class CommonPreprocessor(AbsPreprocessor):
             self.tokenizer = None
             self.token_id_converter = None
 
-        if train and rir_scp is not None:
-            self.rirs = []
-            with open(rir_scp, "r", encoding="utf-8") as f:
-                for line in f:
-                    sps = line.strip().split(None, 1)
-                    if len(sps) == 1:
-                        self.rirs.append(sps[0])
-                    else:
-                        self.rirs.append(sps[1])
+        if token_cache_dir is not None and self.tokenizer is not None:
+            self.token_cache = TokenCache(
+                token_cache_dir,
+                dict(
+                    token_type=token_type,
+                    token_list=token_list,
+                    bpemodel=bpemodel,
+                    text_cleaner=text_cleaner,
+                    g2p_type=g2p_type,
+                    unk_symbol=unk_symbol,
+                    space_symbol=space_symbol,
+                    non_linguistic_symbols=non_linguistic_symbols,
+                    delimiter=delimiter,
+                ),
+            )
         else:
-            self.rirs = None
+            self.token_cache = None
 
-        if train and noise_scp is not None:
-            self.noises = []
-            with open(noise_scp, "r", encoding="utf-8") as f:
-                for line in f:
-                    sps = line.strip().split(None, 1)
-                    if len(sps) == 1:
-                        self.noises.append(sps[0])
-                    else:
-                        self.noises.append(sps[1])
+        if noise_scp is not None:
             sps = noise_db_range.split("_")
             if len(sps) == 1:
-                self.noise_db_low, self.noise_db_high = float(sps[0])
+                noise_db_low = noise_db_high = float(sps[0])
             elif len(sps) == 2:
-                self.noise_db_low, self.noise_db_high = float(sps[0]), float(sps[1])
+                noise_db_low, noise_db_high = float(sps[0]), float(sps[1])
             else:
                 raise ValueError(
                     "Format error: '{noise_db_range}' e.g. -3_4 -> [-3db,4db]"
                 )
         else:
+            noise_db_low, noise_db_high = 3.0, 10.0
+
+        if train and (rir_scp is not None or noise_scp is not None):
+            # NOTE: The RIRs and the noises are loaded into shared memory here,
+            #   i.e. before forking the DataLoader workers
+            self.augmenter = SpeechAugmenter(
+                rir_scp=rir_scp,
+                rir_apply_prob=rir_apply_prob,
+                noise_scp=noise_scp,
+                noise_apply_prob=noise_apply_prob,
+                noise_db_range=(noise_db_low, noise_db_high),
+            )
+            self.rirs = self.augmenter.rirs
+            self.noises = self.augmenter.noises
+        else:
+            self.augmenter = None
+            self.rirs = None
             self.noises = None
+        # If True, the augmentation is deferred to process_batch()
+        self.batch_augmentation = batch_augmentation and self.augmenter is not None
 
     def _speech_process(
         self, data: Dict[str, Union[str, np.ndarray]]
     ) -> Dict[str, Union[str, np.ndarray]]:
         assert check_argument_types()
         if self.speech_name in data:
-            if self.train and (self.rirs is not None or self.noises is not None):
-                speech = data[self.speech_name]
-                nsamples = len(speech)
-
-                # speech: (Nmic, Time)
-                if speech.ndim == 1:
-                    speech = speech[None, :]
-                else:
-                    speech = speech.T
-                # Calc power on non shlence region
-                power = (speech[detect_non_silence(speech)] ** 2).mean()
-
-                # 1. Convolve RIR
-                if self.rirs is not None and self.rir_apply_prob >= np.random.random():
-                    rir_path = np.random.choice(self.rirs)
-                    if rir_path is not None:
-                        rir, _ = soundfile.read(
-                            rir_path, dtype=np.float64, always_2d=True
-                        )
+            if self.train and self.augmenter is not None:
+                if self.batch_augmentation:
+                    return data
+                data[self.speech_name] = self.augmenter(data[self.speech_name])
 
-                        # rir: (Nmic, Time)
-                        rir = rir.T
-
-                        # speech: (Nmic, Time)
-                        # Note that this operation doesn't change the signal length
-                        speech = scipy.signal.convolve(speech, rir, mode="full")[
-                            :, : speech.shape[1]
-                        ]
-                        # Reverse mean power to the original power
-                        power2 = (speech[detect_non_silence(speech)] ** 2).mean()
-                        speech = np.sqrt(power / max(power2, 1e-10)) * speech
-
-                # 2. Add Noise
-                if (
-                    self.noises is not None
-                    and self.noise_apply_prob >= np.random.random()
-                ):
-                    noise_path = np.random.choice(self.noises)
-                    if noise_path is not None:
-                        noise_db = np.random.uniform(
-                            self.noise_db_low, self.noise_db_high
-                        )
-                        with soundfile.SoundFile(noise_path) as f:
-                            if f.frames == nsamples:
-                                noise = f.read(dtype=np.float64, always_2d=True)
-                            elif f.frames < nsamples:
-                                offset = np.random.randint(0, nsamples - f.frames)
-                                # noise: (Time, Nmic)
-                                noise = f.read(dtype=np.float64, always_2d=True)
-                                # Repeat noise
-                                noise = np.pad(
-                                    noise,
-                                    [(offset, nsamples - f.frames - offset), (0, 0)],
-                                    mode="wrap",
-                                )
-                            else:
-                                offset = np.random.randint(0, f.frames - nsamples)
-                                f.seek(offset)
-                                # noise: (Time, Nmic)
-                                noise = f.read(
-                                    nsamples, dtype=np.float64, always_2d=True
-                                )
-                                if len(noise) != nsamples:
-                                    raise RuntimeError(f"Something wrong: {noise_path}")
-                        # noise: (Nmic, Time)
-                        noise = noise.T
-
-                        noise_power = (noise**2).mean()
-                        scale = (
-                            10 ** (-noise_db / 20)
-                            * np.sqrt(power)
-                            / np.sqrt(max(noise_power, 1e-10))
-                        )
-                        speech = speech + scale * noise
-
-                speech = speech.T
-                ma = np.max(np.abs(speech))
-                if ma > 1.0:
-                    speech /= ma
-                data[self.speech_name] = speech
-
-            if self.speech_volume_normalize is not None:
-                speech = data[self.speech_name]
-                ma = np.max(np.abs(speech))
-                data[self.speech_name] = speech * self.speech_volume_normalize / ma
+            data = self._volume_normalize(data)
         assert check_return_type(data)
         return data
 
+    def _volume_normalize(
+        self, data: Dict[str, Union[str, np.ndarray]]
+    ) -> Dict[str, Union[str, np.ndarray]]:
+        if self.speech_volume_normalize is not None:
+            speech = data[self.speech_name]
+            ma = np.max(np.abs(speech))
+            data[self.speech_name] = speech * self.speech_volume_normalize / ma
+        return data
+
     def _text_process(
         self, data: Dict[str, Union[str, np.ndarray]]
     ) -> Dict[str, np.ndarray]:
         if self.text_name in data and self.tokenizer is not None:
             text = data[self.text_name]
-            text = self.text_cleaner(text)
-            tokens = self.tokenizer.text2tokens(text)
-            text_ints = self.token_id_converter.tokens2ids(tokens)
+            text_ints = None
+            if self.token_cache is not None:
+                text_ints = self.token_cache.get(text)
+            if text_ints is None:
+                text_ints = self._text2ids(text)
+                if self.token_cache is not None:
+                    self.token_cache.put(text, text_ints)
             data[self.text_name] = np.array(text_ints, dtype=np.int64)
         assert check_return_type(data)
         return data
 
+    def _text2ids(self, text: str) -> List[int]:
+        text = self.text_cleaner(text)
+        tokens = self.tokenizer.text2tokens(text)
+        return self.token_id_converter.tokens2ids(tokens)
+
     def __call__(
         self, uid: str, data: Dict[str, Union[str, np.ndarray]]
     ) -> Dict[str, np.ndarray]:
@@ -323,6 +283,25 @@ class CommonPreprocessor(AbsPreprocessor):
         data = self._text_process(data)
         return data
 
+    def process_batch(
+        self, data: List[Tuple[str, Dict[str, np.ndarray]]]
+    ) -> List[Tuple[str, Dict[str, np.ndarray]]]:
+        """Apply the augmentation deferred by `batch_augmentation` to a mini-batch.
+
+        This is called in collate_fn, i.e. after __call__() for each sample.
+        """
+        assert check_argument_types()
+        if not (self.train and self.batch_augmentation):
+            return data
+        indices = [i for i, (_, d) in enumerate(data) if self.speech_name in d]
+        speeches = self.augmenter.augment_batch(
+            [data[i][1][self.speech_name] for i in indices]
+        )
+        for i, speech in zip(indices, speeches):
+            data[i][1][self.speech_name] = speech
+            self._volume_normalize(data[i][1])
+        return data
+
 
 class CommonPreprocessor_multi(AbsPreprocessor):
     def __init__(
@@ -418,6 +397,8 @@ class MutliTokenizerCommonPreprocessor(CommonPreprocessor):
         speech_volume_normalize: float = None,
         speech_name: str = "speech",
         text_name: List[str] = ["text"],
+        batch_augmentation: bool = False,
+        token_cache_dir: Union[Path, str] = None,
     ):
         # TODO(jiatong): sync with Kamo and Jing on interface for preprocessor
         super().__init__(
@@ -439,6 +420,7 @@ class MutliTokenizerCommonPreprocessor(CommonPreprocessor):
             noise_apply_prob=noise_apply_prob,
             noise_db_range=noise_db_range,
             speech_volume_normalize=speech_volume_normalize,
+            batch_augmentation=batch_augmentation,
         )
 
         assert (
@@ -447,6 +429,9 @@ class MutliTokenizerCommonPreprocessor(CommonPreprocessor):
         self.num_tokenizer = len(token_type)
         self.tokenizer = []
         self.token_id_converter = []
+        # NOTE: The caches of the tokenizers are separated
+        #   by their configurations, e.g. for the target and the source texts
+        self.token_cache = []
 
         for i in range(self.num_tokenizer):
             if token_type[i] is not None:
@@ -469,9 +454,29 @@ class MutliTokenizerCommonPreprocessor(CommonPreprocessor):
                         unk_symbol=unk_symbol,
                     )
                 )
+                if token_cache_dir is not None:
+                    self.token_cache.append(
+                        TokenCache(
+                            token_cache_dir,
+                            dict(
+                                token_type=token_type[i],
+                                token_list=token_list[i],
+                                bpemodel=bpemodel[i],
+                                text_cleaner=text_cleaner,
+                                g2p_type=g2p_type,
+                                unk_symbol=unk_symbol,
+                                space_symbol=space_symbol,
+                                non_linguistic_symbols=non_linguistic_symbols,
+                                delimiter=delimiter,
+                            ),
+                        )
+                    )
+                else:
+                    self.token_cache.append(None)
             else:
                 self.tokenizer.append(None)
                 self.token_id_converter.append(None)
+                self.token_cache.append(None)
 
         self.text_cleaner = TextCleaner(text_cleaner)
         self.text_name = text_name  # override the text_name from CommonPreprocessor
@@ -483,9 +488,16 @@ class MutliTokenizerCommonPreprocessor(CommonPreprocessor):
             text_name = self.text_name[i]
             if text_name in data and self.tokenizer[i] is not None:
                 text = data[text_name]
-                text = self.text_cleaner(text)
-                tokens = self.tokenizer[i].text2tokens(text)
-                text_ints = self.token_id_converter[i].tokens2ids(tokens)
+                token_cache = self.token_cache[i]
+                text_ints = None
+                if token_cache is not None:
+                    text_ints = token_cache.get(text)
+                if text_ints is None:
+                    cleaned = self.text_cleaner(text)
+                    tokens = self.tokenizer[i].text2tokens(cleaned)
+                    text_ints = self.token_id_converter[i].tokens2ids(tokens)
+                    if token_cache is not None:
+                        token_cache.put(text, text_ints)
                 data[text_name] = np.array(text_ints, dtype=np.int64)
         assert check_return_type(data)
         return data
@@ -22,6 +22,8 @@ import torch
 from typeguard import check_argument_types
 from typeguard import check_return_type
 
+from espnet2.torch_utils.recursive_op import recursive_all_reduce
+
 
 Num = Union[float, int, complex, torch.Tensor, np.ndarray]
 
@@ -280,6 +282,74 @@ class SubReporter:
                 break
 
 
+class StatsAccumulator:
+    """Accumulate the weighted stats of the steps and register them at once.
+
+    In distributed training, averaging the stats over the workers
+    at every step issues a collective communication for each step.
+    Instead, the weighted sums of the stats are accumulated on the device
+    in each worker, and averaged over the workers by one all_reduce
+    when flush() is called, e.g. every N steps.
+    The stats of the accumulated steps are registered as one step.
+
+    Examples:
+        >>> accumulator = StatsAccumulator(distributed=True)
+        >>> for iiter, batch in enumerate(iterator, 1):
+        ...     loss, stats, weight = model(**batch)
+        ...     accumulator.add(stats, weight)
+        ...     if iiter % 10 == 0:
+        ...         accumulator.flush(sub_reporter)
+        ...     sub_reporter.next()
+
+    """
+
+    def __init__(self, distributed: bool = False):
+        self.distributed = distributed
+        self.sums = {}
+        self.weights = {}
+
+    def __len__(self) -> int:
+        return len(self.sums)
+
+    def add(self, stats: Dict[str, torch.Tensor], weight: torch.Tensor):
+        """Add the stats averaged in this worker and the weight of them.
+
+        A non-finite value, e.g. inf loss, is skipped with its weight
+        as in aggregate() so that it doesn't spoil the other steps.
+        """
+        weight = weight.detach()
+        for k, v in stats.items():
+            if v is None:
+                continue
+            v = v.detach()
+            # NOTE: Masked on the device without synchronizing with the host
+            valid = torch.isfinite(v) & torch.isfinite(weight)
+            w = weight * valid
+            v = torch.where(valid, v * weight, torch.zeros_like(v))
+            if k in self.sums:
+                self.sums[k] = self.sums[k] + v
+                self.weights[k] = self.weights[k] + w
+            else:
+                self.sums[k] = v
+                self.weights[k] = w
+
+    def flush(self, reporter: SubReporter):
+        """Register the stats averaged over the workers and reset them.
+
+        All workers must call this method at the same steps
+        having the same keys of the stats.
+        """
+        if len(self.sums) == 0:
+            return
+        sums, weights = self.sums, self.weights
+        if self.distributed:
+            sums, weights = recursive_all_reduce((sums, weights))
+        for k in sums:
+            reporter.register({k: sums[k] / weights[k]}, weights[k])
+        self.sums = {}
+        self.weights = {}
+
+
 class Reporter:
     """Reporter class.
 
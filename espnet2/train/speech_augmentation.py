@@ -0,0 +1,354 @@
+import logging
+from pathlib import Path
+from typing import List
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+import humanfriendly
+import numpy as np
+import scipy.fft
+import soundfile
+import torch
+from typeguard import check_argument_types
+
+from espnet2.utils.lru_cache import LRUCache
+
+
+def read_audio_scp(path: Union[Path, str]) -> List[str]:
+    """Read the audio paths of a scp file, whose first column is optional.
+
+    Examples:
+        rir.scp:
+            rir1 /some/path/rir1.wav
+            /some/path/rir2.wav
+
+    """
+    paths = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            sps = line.strip().split(None, 1)
+            if len(sps) == 1:
+                paths.append(sps[0])
+            elif len(sps) == 2:
+                paths.append(sps[1])
+    return paths
+
+
+class AudioBank:
+    """Audio files of a scp file loaded once into shared memory.
+
+    All the samples are converted to float32 and concatenated into
+    a single arena allocated in shared memory, so that the files are not read
+    for each sample and the DataLoader workers don't hold their own copies.
+    If the total size exceeds `max_size`, the files are read on demand instead.
+
+    Examples:
+        >>> bank = AudioBank("rir.scp")
+        >>> rir = bank.read(0)  # (Channel, Time)
+
+    """
+
+    def __init__(self, scp: Union[Path, str], max_size: Union[int, str] = "8GB"):
+        assert check_argument_types()
+        if isinstance(max_size, str):
+            max_size = humanfriendly.parse_size(max_size)
+        self.scp = scp
+        self.paths = read_audio_scp(scp)
+        if len(self.paths) == 0:
+            raise RuntimeError(f"No audio files are found: {scp}")
+        infos = [soundfile.info(p) for p in self.paths]
+        self.lengths = np.array([info.frames for info in infos], dtype=np.int64)
+        self.channels = np.array([info.channels for info in infos], dtype=np.int64)
+        sizes = self.lengths * self.channels
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+        nbytes = 4 * int(sizes.sum())
+        if nbytes <= max_size:
+            self.arena = torch.empty(int(sizes.sum()), dtype=torch.float32)
+            self.arena.share_memory_()
+            arena = self.arena.numpy()
+            for i, p in enumerate(self.paths):
+                wav, _ = soundfile.read(p, dtype=np.float32, always_2d=True)
+                offset = self.offsets[i]
+                # (Time, Channel) -> (Channel, Time)
+                arena[offset : offset + sizes[i]] = wav.T.reshape(-1)
+        else:
+            logging.warning(
+                f"{scp} is too large to be loaded into memory "
+                f"({humanfriendly.format_size(nbytes)} > "
+                f"{humanfriendly.format_size(max_size)}), "
+                "so that the files are read for each sample"
+            )
+            self.arena = None
+        self._set_views()
+
+    def _set_views(self):
+        self._arena = self.arena.numpy() if self.arena is not None else None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_arena"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._set_views()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def read(self, i: int, start: int = 0, frames: int = None) -> np.ndarray:
+        """Read the audio of the index.
+
+        Returns:
+            (Channel, Time) float32 array, which must not be modified
+        """
+        if frames is None:
+            frames = self.lengths[i] - start
+        if self._arena is None:
+            wav, _ = soundfile.read(
+                self.paths[i],
+                start=start,
+                frames=frames,
+                dtype=np.float32,
+                always_2d=True,
+            )
+            return wav.T
+        offset = self.offsets[i]
+        length = self.lengths[i]
+        wav = self._arena[offset : offset + length * self.channels[i]]
+        return wav.reshape(self.channels[i], length)[:, start : start + frames]
+
+
+class SpeechAugmenter:
+    """Reverberation and additive noise augmentation of speech.
+
+    RIRs and noises are held by AudioBank and the RIRs are convolved by
+    overlap-add FFT convolution in float32, where the spectra of the RIRs
+    are cached and all the signals of a mini-batch are transformed at once.
+    The FFT size is shared by all the RIRs,
+    so that the spectra of different RIRs can be applied in a batch.
+
+    Examples:
+        >>> augmenter = SpeechAugmenter(rir_scp="rir.scp", noise_scp="noise.scp")
+        >>> speeches = augmenter.augment_batch([speech1, speech2])
+
+    """
+
+    def __init__(
+        self,
+        rir_scp: str = None,
+        rir_apply_prob: float = 1.0,
+        noise_scp: str = None,
+        noise_apply_prob: float = 1.0,
+        noise_db_range: Tuple[float, float] = (3.0, 10.0),
+        max_bank_size: Union[int, str] = "8GB",
+        rir_spectrum_cache_size: Union[int, str] = "256MB",
+    ):
+        assert check_argument_types()
+        self.rir_apply_prob = rir_apply_prob
+        self.noise_apply_prob = noise_apply_prob
+        self.noise_db_low, self.noise_db_high = noise_db_range
+
+        if rir_scp is not None:
+            self.rirs = AudioBank(rir_scp, max_size=max_bank_size)
+            max_rir_length = int(self.rirs.lengths.max())
+            # NOTE: The tail of each block (nfft - block_size) must be
+            #   shorter than the block to add it to the next block only
+            self.nfft = scipy.fft.next_fast_len(2 * max_rir_length)
+            self.block_size = self.nfft - max_rir_length + 1
+        else:
+            self.rirs = None
+        if isinstance(rir_spectrum_cache_size, str):
+            rir_spectrum_cache_size = humanfriendly.parse_size(rir_spectrum_cache_size)
+        self.rir_spectra = LRUCache(rir_spectrum_cache_size)
+
+        if noise_scp is not None:
+            self.noises = AudioBank(noise_scp, max_size=max_bank_size)
+        else:
+            self.noises = None
+
+    def rir_spectrum(self, i: int) -> np.ndarray:
+        """Get the spectrum of the RIR: (Channel, nfft // 2 + 1)"""
+        spectrum = self.rir_spectra.get(i)
+        if spectrum is None:
+            spectrum = scipy.fft.rfft(self.rirs.read(i), n=self.nfft, axis=-1)
+            self.rir_spectra[i] = spectrum
+        return spectrum
+
+    def convolve_batch(
+        self, speeches: Sequence[np.ndarray], rir_ids: Sequence[int]
+    ) -> List[np.ndarray]:
+        """Convolve the RIRs to the speeches.
+
+        The multi-channel signals are convolved as scipy.signal.convolve,
+        i.e. the channel axis is also convolved.
+
+        Args:
+            speeches: Batch x (Channel, Time)
+            rir_ids: The indices of the RIRs for each speech
+        Returns:
+            Batch x (Channel + RIR_Channel - 1, Time)
+        """
+        L = self.block_size
+        spectra = [self.rir_spectrum(i) for i in rir_ids]
+
+        # 1. Split the signals into blocks and transform them at once
+        # blocks: (NBlocks, nfft)
+        num_blocks = [-(-x.shape[1] // L) for x in speeches]
+        num_rows = sum(len(x) * n for x, n in zip(speeches, num_blocks))
+        blocks = np.zeros((num_rows, self.nfft), dtype=np.float32)
+        starts = []
+        row = 0
+        for x, n in zip(speeches, num_blocks):
+            starts.append([])
+            for channel in x:
+                padded = np.zeros(n * L, dtype=np.float32)
+                padded[: len(channel)] = channel
+                blocks[row : row + n, :L] = padded.reshape(n, L)
+                starts[-1].append(row)
+                row += n
+        spec_blocks = scipy.fft.rfft(blocks, axis=-1)
+
+        # 2. Multiply the spectra of the RIRs for each pair of the channels
+        # i.e. out[c] = sum_{i + j = c} speech[i] * rir[j]
+        num_products = sum(
+            len(x) * len(spectrum) * n
+            for x, spectrum, n in zip(speeches, spectra, num_blocks)
+        )
+        if num_products == num_rows:
+            # e.g. Single channel RIRs: Multiply in-place
+            products = spec_blocks
+        else:
+            products = np.empty(
+                (num_products, spec_blocks.shape[1]), dtype=spec_blocks.dtype
+            )
+        pos = 0
+        for x, spectrum, n, start in zip(speeches, spectra, num_blocks, starts):
+            for i in range(len(x)):
+                for j in range(len(spectrum)):
+                    np.multiply(
+                        spec_blocks[start[i] : start[i] + n],
+                        spectrum[j],
+                        out=products[pos : pos + n],
+                    )
+                    pos += n
+        # out_blocks: (NProducts, nfft)
+        out_blocks = scipy.fft.irfft(products, n=self.nfft, axis=-1)
+
+        # 3. Overlap-add the blocks
+        retval = []
+        pos = 0
+        for x, spectrum, n in zip(speeches, spectra, num_blocks):
+            out = np.zeros((len(x) + len(spectrum) - 1, n + 1, L), np.float32)
+            for i in range(len(x)):
+                for j in range(len(spectrum)):
+                    y = out_blocks[pos : pos + n]
+                    pos += n
+                    out[i + j, :n] += y[:, :L]
+                    out[i + j, 1:, : self.nfft - L] += y[:, L:]
+            retval.append(out.reshape(len(out), -1)[:, : x.shape[1]])
+        return retval
+
+    def noise_segment(self, i: int, nsamples: int) -> np.ndarray:
+        """Cut or repeat the noise to the length at a random offset.
+
+        Returns:
+            (Channel, nsamples)
+        """
+        frames = self.noises.lengths[i]
+        if frames == nsamples:
+            noise = self.noises.read(i)
+        elif frames < nsamples:
+            offset = np.random.randint(0, nsamples - frames)
+            # Repeat noise
+            noise = np.pad(
+                self.noises.read(i),
+                [(0, 0), (offset, nsamples - frames - offset)],
+                mode="wrap",
+            )
+        else:
+            offset = np.random.randint(0, frames - nsamples)
+            noise = self.noises.read(i, offset, nsamples)
+            if noise.shape[1] != nsamples:
+                raise RuntimeError(f"Something wrong: {self.noises.paths[i]}")
+        return noise
+
+    def augment_batch(self, speeches: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Apply the augmentation to each speech of a mini-batch.
+
+        The power of the speech is calculated on the non-silence region,
+        which is detected on the dry speech only once
+        and reused for the reverberant speech.
+
+        Args:
+            speeches: Batch x (Time,) or (Time, Channel)
+        Returns:
+            Batch x (Time, Channel)
+        """
+        # NOTE: Import here to avoid the circular import
+        from espnet2.train.preprocessor import detect_non_silence
+
+        xs = []
+        powers = []
+        masks = []
+        rir_ids = []
+        noises = []
+        for speech in speeches:
+            # x: (Nmic, Time)
+            x = speech[None, :] if speech.ndim == 1 else speech.T
+            x = x.astype(np.float32)
+            # Calc power on non silence region
+            mask = detect_non_silence(x)
+            xs.append(x)
+            masks.append(mask.any(axis=0))
+            powers.append((x[mask] ** 2).mean())
+
+            # The random values are drawn in the same order as the previous
+            # sample-wise implementation: RIR, noise, noise level and offset
+            if self.rirs is not None and self.rir_apply_prob >= np.random.random():
+                rir_ids.append(np.random.randint(len(self.rirs)))
+            else:
+                rir_ids.append(None)
+            if self.noises is not None and self.noise_apply_prob >= np.random.random():
+                i = np.random.randint(len(self.noises))
+                noise_db = np.random.uniform(self.noise_db_low, self.noise_db_high)
+                noises.append((noise_db, self.noise_segment(i, x.shape[1])))
+            else:
+                noises.append(None)
+
+        # 1. Convolve RIR
+        indices = [i for i, r in enumerate(rir_ids) if r is not None]
+        if len(indices) > 0:
+            reverbs = self.convolve_batch(
+                [xs[i] for i in indices], [rir_ids[i] for i in indices]
+            )
+            for i, x in zip(indices, reverbs):
+                # Reverse mean power to the original power
+                power2 = (x[:, masks[i]] ** 2).mean()
+                xs[i] = np.sqrt(powers[i] / max(power2, 1e-10)) * x
+
+        # 2. Add Noise
+        retval = []
+        for x, power, noise in zip(xs, powers, noises):
+            if noise is not None:
+                noise_db, noise = noise
+                noise_power = (noise**2).mean()
+                scale = (
+                    10 ** (-noise_db / 20)
+                    * np.sqrt(power)
+                    / np.sqrt(max(noise_power, 1e-10))
+                )
+                x = x + np.float32(scale) * noise
+
+            # x: (Time, Nmic)
+            x = x.T
+            ma = np.max(np.abs(x))
+            if ma > 1.0:
+                x = x / ma
+            retval.append(x)
+        return retval
+
+    def __call__(self, speech: np.ndarray) -> np.ndarray:
+        return self.augment_batch([speech])[0]
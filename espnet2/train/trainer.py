@@ -1,14 +1,17 @@
 """Trainer module."""
 import argparse
+import contextlib
 from contextlib import contextmanager
 import dataclasses
 from dataclasses import is_dataclass
 from distutils.version import LooseVersion
+import functools
 import logging
 from pathlib import Path
 import time
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
 from typing import Sequence
@@ -34,8 +37,10 @@ from espnet2.torch_utils.device_funcs import to_device
 from espnet2.torch_utils.recursive_op import recursive_average
 from espnet2.torch_utils.set_all_random_seed import set_all_random_seed
 from espnet2.train.abs_espnet_model import AbsESPnetModel
+from espnet2.train.checkpoint_writer import CheckpointWriter
 from espnet2.train.distributed_utils import DistributedOption
 from espnet2.train.reporter import Reporter
+from espnet2.train.reporter import StatsAccumulator
 from espnet2.train.reporter import SubReporter
 from espnet2.utils.build_dataclass import build_dataclass
 
@@ -59,6 +64,11 @@ except ImportError:
     fairscale = None
 
 
+def _synchronize():
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        torch.cuda.synchronize()
+
+
 @dataclasses.dataclass
 class TrainerOptions:
     ngpu: int
@@ -86,6 +96,11 @@ class TrainerOptions:
     val_scheduler_criterion: Sequence[str]
     unused_parameters: bool
     wandb_model_log_interval: int
+    async_checkpoint: bool
+    checkpoint_interval: int
+    report_step_details: bool
+    stats_reduce_interval: int
+    profiler_steps: Optional[Sequence[int]]
 
 
 class Trainer:
@@ -134,7 +149,13 @@ class Trainer:
         schedulers: Sequence[Optional[AbsScheduler]],
         scaler: Optional[GradScaler],
         ngpu: int = 0,
-    ):
+    ) -> Optional[dict]:
+        """Load the states from the checkpoint.
+
+        Returns:
+            The progress in the epoch, {"epoch": int, "iiter": int},
+            if the checkpoint was saved in the middle of the epoch, else None.
+        """
         states = torch.load(
             checkpoint,
             map_location=f"cuda:{torch.cuda.current_device()}" if ngpu > 0 else "cpu",
@@ -153,6 +174,7 @@ class Trainer:
                 scaler.load_state_dict(states["scaler"])
 
         logging.info(f"The training was resumed using {checkpoint}")
+        return states.get("progress")
 
     @classmethod
     def run(
@@ -198,8 +220,33 @@ class Trainer:
         else:
             scaler = None
 
+        checkpoint_interval = trainer_options.checkpoint_interval
+        if checkpoint_interval > 0:
+            if checkpoint_interval % trainer_options.accum_grad != 0:
+                raise ValueError(
+                    f"checkpoint_interval must be a multiple of accum_grad: "
+                    f"{checkpoint_interval} % {trainer_options.accum_grad} != 0"
+                )
+            if trainer_options.sharded_ddp:
+                raise RuntimeError(
+                    "checkpoint_interval is not supported with sharded_ddp"
+                )
+        checkpoint_writer = CheckpointWriter(trainer_options.async_checkpoint)
+
+        profiler_steps = trainer_options.profiler_steps
+        if profiler_steps is not None:
+            if LooseVersion(torch.__version__) < LooseVersion("1.8.1"):
+                raise RuntimeError("Require torch>=1.8.1 for profiler_steps")
+            if len(profiler_steps) != 2 or not (
+                0 <= profiler_steps[0] < profiler_steps[1]
+            ):
+                raise ValueError(
+                    f"profiler_steps must be a pair of start < end: {profiler_steps}"
+                )
+
+        progress = None
         if trainer_options.resume and (output_dir / "checkpoint.pth").exists():
-            cls.resume(
+            progress = cls.resume(
                 checkpoint=output_dir / "checkpoint.pth",
                 model=model,
                 optimizers=optimizers,
@@ -262,6 +309,17 @@ class Trainer:
         else:
             train_summary_writer = None
 
+        def save_progress(iepoch: int, iiter: int):
+            states = cls._checkpoint_states(
+                model,
+                reporter,
+                optimizers,
+                schedulers,
+                scaler,
+                progress={"epoch": iepoch, "iiter": iiter},
+            )
+            checkpoint_writer.save([(states, output_dir / "checkpoint.pth")])
+
         start_time = time.perf_counter()
         for iepoch in range(start_epoch, trainer_options.max_epoch + 1):
             if iepoch != start_epoch:
@@ -281,19 +339,58 @@ class Trainer:
             set_all_random_seed(trainer_options.seed + iepoch)
 
             reporter.set_epoch(iepoch)
+            if progress is not None and progress["epoch"] == iepoch:
+                # The checkpoint was saved in the middle of this epoch
+                skip_iters = progress["iiter"]
+                logging.info(f"Skipping {skip_iters} iterations done before resume")
+                train_iter = train_iter_factory.resume_iter(iepoch, skip_iters)
+            else:
+                skip_iters = 0
+                train_iter = train_iter_factory.build_iter(iepoch)
+            if (
+                profiler_steps is not None
+                and iepoch == start_epoch
+                and profiler_steps[1] > skip_iters
+            ):
+                profiler = cls._build_profiler(
+                    start=profiler_steps[0] - skip_iters,
+                    end=profiler_steps[1] - skip_iters,
+                    trace_dir=output_dir / "profiler",
+                )
+            else:
+                profiler = None
+
             # 1. Train and validation for one-epoch
             with reporter.observe("train") as sub_reporter:
-                all_steps_are_invalid = cls.train_one_epoch(
-                    model=dp_model,
-                    optimizers=optimizers,
-                    schedulers=schedulers,
-                    iterator=train_iter_factory.build_iter(iepoch),
-                    reporter=sub_reporter,
-                    scaler=scaler,
-                    summary_writer=train_summary_writer,
-                    options=trainer_options,
-                    distributed_option=distributed_option,
-                )
+                if checkpoint_interval > 0 and (
+                    not distributed_option.distributed
+                    or distributed_option.dist_rank == 0
+                ):
+                    train_iter = cls._save_checkpoint_every(
+                        train_iter,
+                        interval=checkpoint_interval,
+                        start=skip_iters,
+                        save_fn=functools.partial(save_progress, iepoch),
+                        reporter=sub_reporter,
+                    )
+                with profiler if profiler is not None else contextlib.nullcontext():
+                    all_steps_are_invalid = cls.train_one_epoch(
+                        model=dp_model,
+                        optimizers=optimizers,
+                        schedulers=schedulers,
+                        iterator=train_iter,
+                        reporter=sub_reporter,
+                        scaler=scaler,
+                        summary_writer=train_summary_writer,
+                        options=trainer_options,
+                        distributed_option=distributed_option,
+                        profiler=profiler,
+                    )
+                if profiler is not None:
+                    logging.info(
+                        "The trace of torch.profiler was written in "
+                        f"{output_dir / 'profiler'}"
+                    )
 
             with reporter.observe("valid") as sub_reporter:
                 cls.validate_one_epoch(
@@ -341,22 +438,18 @@ class Trainer:
                     reporter.wandb_log()
 
                 # 4. Save/Update the checkpoint
-                torch.save(
-                    {
-                        "model": model.state_dict(),
-                        "reporter": reporter.state_dict(),
-                        "optimizers": [o.state_dict() for o in optimizers],
-                        "schedulers": [
-                            s.state_dict() if s is not None else None
-                            for s in schedulers
-                        ],
-                        "scaler": scaler.state_dict() if scaler is not None else None,
-                    },
-                    output_dir / "checkpoint.pth",
-                )
-
                 # 5. Save and log the model and update the link to the best model
-                torch.save(model.state_dict(), output_dir / f"{iepoch}epoch.pth")
+                # NOTE: The files are written in background
+                #   and the links to them are created before finishing it.
+                states = cls._checkpoint_states(
+                    model, reporter, optimizers, schedulers, scaler
+                )
+                checkpoint_writer.save(
+                    [
+                        (states, output_dir / "checkpoint.pth"),
+                        (states["model"], output_dir / f"{iepoch}epoch.pth"),
+                    ]
+                )
 
                 # Creates a sym link latest.pth -> {iepoch}epoch.pth
                 p = output_dir / "latest.pth"
@@ -390,6 +483,8 @@ class Trainer:
                 if log_model and trainer_options.use_wandb:
                     import wandb
 
+                    checkpoint_writer.wait()
+
                     logging.info("Logging Model on this epoch :::::")
                     artifact = wandb.Artifact(
                         name=f"model_{wandb.run.id}",
@@ -419,6 +514,7 @@ class Trainer:
                     trainer_options.nbest_averaging_interval > 0
                     and iepoch % trainer_options.nbest_averaging_interval == 0
                 ):
+                    checkpoint_writer.wait()
                     average_nbest_models(
                         reporter=reporter,
                         output_dir=output_dir,
@@ -455,6 +551,7 @@ class Trainer:
                 f"The training was finished at {trainer_options.max_epoch} epochs "
             )
 
+        checkpoint_writer.wait()
         # Generated n-best averaged model
         if not distributed_option.distributed or distributed_option.dist_rank == 0:
             average_nbest_models(
@@ -464,6 +561,118 @@ class Trainer:
                 nbest=keep_nbest_models,
             )
 
+    @staticmethod
+    def _checkpoint_states(
+        model: torch.nn.Module,
+        reporter: Reporter,
+        optimizers: Sequence[torch.optim.Optimizer],
+        schedulers: Sequence[Optional[AbsScheduler]],
+        scaler: Optional[GradScaler],
+        progress: Optional[dict] = None,
+    ) -> dict:
+        reporter_state = reporter.state_dict()
+        if progress is not None:
+            # NOTE: The stats of the current epoch is not stored yet,
+            #   so the reporter is resumed as the previous epoch is the last
+            reporter_state["epoch"] = progress["epoch"] - 1
+        states = {
+            "model": model.state_dict(),
+            "reporter": reporter_state,
+            "optimizers": [o.state_dict() for o in optimizers],
+            "schedulers": [
+                s.state_dict() if s is not None else None for s in schedulers
+            ],
+            "scaler": scaler.state_dict() if scaler is not None else None,
+        }
+        if progress is not None:
+            states["progress"] = progress
+        return states
+
+    @staticmethod
+    def _save_checkpoint_every(
+        iterator: Iterable, interval: int, start: int, save_fn, reporter: SubReporter
+    ) -> Iterator:
+        """Call save_fn(iiter) after every "interval" iterations.
+
+        When the next mini-batch is requested, the finished iterations
+        are counted by the reporter, which starts a step after receiving
+        a mini-batch. Thus the states are saved between the training steps
+        even if the trainer reads the mini-batches ahead.
+        """
+        last_saved = start
+        for batch in iterator:
+            iiter = start + reporter.count
+            if iiter != last_saved and iiter % interval == 0:
+                save_fn(iiter)
+                last_saved = iiter
+            yield batch
+
+    @staticmethod
+    def _build_profiler(start: int, end: int, trace_dir: Path):
+        """Build torch.profiler tracing from the "start"-th training step.
+
+        The steps after the "start"-th until the "end"-th are traced
+        and the trace is written to "trace_dir" for tensorboard.
+        step() of the profiler must be called at the end of each training step.
+        """
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        start = max(start, 0)
+        return torch.profiler.profile(
+            activities=activities,
+            schedule=torch.profiler.schedule(
+                wait=max(start - 1, 0),
+                warmup=min(start, 1),
+                active=end - start,
+                repeat=1,
+            ),
+            on_trace_ready=torch.profiler.tensorboard_trace_handler(str(trace_dir)),
+            record_shapes=True,
+            profile_memory=True,
+        )
+
+    @staticmethod
+    @contextmanager
+    def _measure_detail(details: Dict[str, float], name: str, enabled: bool):
+        """Add the time of the block synchronizing the CUDA device."""
+        if not enabled:
+            yield
+            return
+        _synchronize()
+        start = time.perf_counter()
+        yield
+        _synchronize()
+        details[name] = details.get(name, 0.0) + time.perf_counter() - start
+
+    @staticmethod
+    def _mark_last(iterable: Iterable) -> Iterator:
+        """Yield the pairs of the item and the flag if it's the last one."""
+        iterator = iter(iterable)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        for next_item in iterator:
+            yield item, False
+            item = next_item
+        yield item, True
+
+    @staticmethod
+    def _reduce_weight_and_stop(
+        weight: torch.Tensor, is_last: bool, device: torch.device
+    ) -> Tuple[torch.Tensor, bool]:
+        """Sum the weight over the processes together with the stop-flags.
+
+        Returns:
+            The summed weight and True if any process finishes at this step.
+        """
+        packed = torch.tensor([0.0, float(is_last)], dtype=torch.float64, device=device)
+        packed[0] = weight
+        torch.distributed.all_reduce(packed, ReduceOp.SUM)
+        weight_sum, num_last = packed.to(weight.dtype)[0], packed[1].item()
+        return weight_sum, num_last > 0
+
     @classmethod
     def train_one_epoch(
         cls,
@@ -476,6 +685,7 @@ class Trainer:
         summary_writer,
         options: TrainerOptions,
         distributed_option: DistributedOption,
+        profiler=None,
     ) -> bool:
         assert check_argument_types()
 
@@ -487,6 +697,8 @@ class Trainer:
         no_forward_run = options.no_forward_run
         ngpu = options.ngpu
         use_wandb = options.use_wandb
+        report_step_details = options.report_step_details
+        stats_reduce_interval = options.stats_reduce_interval
         distributed = distributed_option.distributed
 
         if log_interval is None:
@@ -495,96 +707,144 @@ class Trainer:
             except TypeError:
                 log_interval = 100
 
+        measure_detail = functools.partial(
+            cls._measure_detail, enabled=report_step_details
+        )
         model.train()
         all_steps_are_invalid = True
         # [For distributed] Because iteration counts are not always equals between
-        # processes, send stop-flag to the other processes if iterator is finished
+        # processes, send stop-flag to the other processes if iterator is finished.
+        # NOTE: Each process tells if the current step is its last one
+        #   in the all-reduce of the weight at each step,
+        #   and only a process having no mini-batch sends this stop-flag
+        #   at the first step before the forward computation.
         iterator_stop = torch.tensor(0).to("cuda" if ngpu > 0 else "cpu")
+        # [For distributed] The stats are averaged over the processes at once
+        # every stats_reduce_interval steps
+        stats_accumulator = StatsAccumulator(distributed)
 
         start_time = time.perf_counter()
-        for iiter, (_, batch) in enumerate(
-            reporter.measure_iter_time(iterator, "iter_time"), 1
+        step_end_time = start_time
+        for iiter, ((utt_id, batch), is_last) in enumerate(
+            reporter.measure_iter_time(cls._mark_last(iterator), "iter_time"), 1
         ):
             assert isinstance(batch, dict), type(batch)
+            # The time of the parts of this step if report_step_details
+            details = {}
 
-            if distributed:
-                torch.distributed.all_reduce(iterator_stop, ReduceOp.SUM)
+            if distributed and iiter == 1:
+                with measure_detail(details, "all_reduce_time"):
+                    torch.distributed.all_reduce(iterator_stop, ReduceOp.SUM)
                 if iterator_stop > 0:
                     break
 
-            batch = to_device(batch, "cuda" if ngpu > 0 else "cpu")
+            with measure_detail(details, "to_device_time"):
+                batch = to_device(batch, "cuda" if ngpu > 0 else "cpu")
             if no_forward_run:
                 all_steps_are_invalid = False
+                if profiler is not None:
+                    profiler.step()
+                if distributed:
+                    with measure_detail(details, "all_reduce_time"):
+                        _, stop = cls._reduce_weight_and_stop(
+                            torch.tensor(0), is_last, iterator_stop.device
+                        )
+                    if stop:
+                        break
                 continue
 
-            with autocast(scaler is not None):
-                with reporter.measure_time("forward_time"):
-                    retval = model(**batch)
-
-                    # Note(kamo):
-                    # Supporting two patterns for the returned value from the model
-                    #   a. dict type
-                    if isinstance(retval, dict):
-                        loss = retval["loss"]
-                        stats = retval["stats"]
-                        weight = retval["weight"]
-                        optim_idx = retval.get("optim_idx")
-                        if optim_idx is not None and not isinstance(optim_idx, int):
-                            if not isinstance(optim_idx, torch.Tensor):
-                                raise RuntimeError(
-                                    "optim_idx must be int or 1dim torch.Tensor, "
-                                    f"but got {type(optim_idx)}"
-                                )
-                            if optim_idx.dim() >= 2:
-                                raise RuntimeError(
-                                    "optim_idx must be int or 1dim torch.Tensor, "
-                                    f"but got {optim_idx.dim()}dim tensor"
+            if iiter % accum_grad != 0 and hasattr(model, "no_sync"):
+                # NOTE: Skip the all-reduce of the gradients in the backward
+                #   except for the last micro-batch of the gradient accumulation.
+                #   The gradients are accumulated locally and averaged over
+                #   the workers at once by the backward of the last one,
+                #   so the scaling of the loss by world_size below is still valid.
+                sync_context = model.no_sync()
+            else:
+                sync_context = contextlib.nullcontext()
+            with sync_context:
+                with autocast(scaler is not None):
+                    with reporter.measure_time("forward_time"):
+                        retval = model(**batch)
+
+                        # Note(kamo):
+                        # Supporting two patterns for the returned value from the model
+                        #   a. dict type
+                        if isinstance(retval, dict):
+                            loss = retval["loss"]
+                            stats = retval["stats"]
+                            weight = retval["weight"]
+                            optim_idx = retval.get("optim_idx")
+                            if optim_idx is not None and not isinstance(optim_idx, int):
+                                if not isinstance(optim_idx, torch.Tensor):
+                                    raise RuntimeError(
+                                        "optim_idx must be int or 1dim torch.Tensor, "
+                                        f"but got {type(optim_idx)}"
+                                    )
+                                if optim_idx.dim() >= 2:
+                                    raise RuntimeError(
+                                        "optim_idx must be int or 1dim torch.Tensor, "
+                                        f"but got {optim_idx.dim()}dim tensor"
+                                    )
+                                if optim_idx.dim() == 1:
+                                    for v in optim_idx:
+                                        if v != optim_idx[0]:
+                                            raise RuntimeError(
+                                                "optim_idx must be 1dim tensor "
+                                                "having same values for all entries"
+                                            )
+                                    optim_idx = optim_idx[0].item()
+                                else:
+                                    optim_idx = optim_idx.item()
+
+                        #   b. tuple or list type
+                        else:
+                            loss, stats, weight = retval
+                            optim_idx = None
+
+                        if report_step_details:
+                            _synchronize()
+
+                    stats = {k: v for k, v in stats.items() if v is not None}
+                    stop = False
+                    if ngpu > 1 or distributed:
+                        # Apply weighted averaging for loss and stats
+                        loss = (loss * weight.type(loss.dtype)).sum()
+
+                        # The stats are averaged over the workers by stats_accumulator
+                        stats, weight = recursive_average(stats, weight)
+                        if distributed:
+                            stats_accumulator.add(stats, weight)
+                            with measure_detail(details, "all_reduce_time"):
+                                weight, stop = cls._reduce_weight_and_stop(
+                                    weight, is_last, iterator_stop.device
                                 )
-                            if optim_idx.dim() == 1:
-                                for v in optim_idx:
-                                    if v != optim_idx[0]:
-                                        raise RuntimeError(
-                                            "optim_idx must be 1dim tensor "
-                                            "having same values for all entries"
-                                        )
-                                optim_idx = optim_idx[0].item()
-                            else:
-                                optim_idx = optim_idx.item()
-
-                    #   b. tuple or list type
-                    else:
-                        loss, stats, weight = retval
-                        optim_idx = None
-
-                stats = {k: v for k, v in stats.items() if v is not None}
-                if ngpu > 1 or distributed:
-                    # Apply weighted averaging for loss and stats
-                    loss = (loss * weight.type(loss.dtype)).sum()
 
-                    # if distributed, this method can also apply all_reduce()
-                    stats, weight = recursive_average(stats, weight, distributed)
+                        # Now weight is summation over all workers
+                        loss /= weight.type(loss.dtype)
+                    if distributed:
+                        # NOTE(kamo): Multiply world_size because
+                        # DistributedDataParallel automatically normalizes
+                        # the gradient by world_size.
+                        loss *= torch.distributed.get_world_size()
 
-                    # Now weight is summation over all workers
-                    loss /= weight
-                if distributed:
-                    # NOTE(kamo): Multiply world_size because DistributedDataParallel
-                    # automatically normalizes the gradient by world_size.
-                    loss *= torch.distributed.get_world_size()
-
-                loss /= accum_grad
+                    loss /= accum_grad
 
-            reporter.register(stats, weight)
+                if not distributed:
+                    reporter.register(stats, weight)
 
-            with reporter.measure_time("backward_time"):
-                if scaler is not None:
-                    # Scales loss.  Calls backward() on scaled loss
-                    # to create scaled gradients.
-                    # Backward passes under autocast are not recommended.
-                    # Backward ops run in the same dtype autocast chose
-                    # for corresponding forward ops.
-                    scaler.scale(loss).backward()
-                else:
-                    loss.backward()
+                with reporter.measure_time("backward_time"):
+                    if scaler is not None:
+                        # Scales loss.  Calls backward() on scaled loss
+                        # to create scaled gradients.
+                        # Backward passes under autocast are not recommended.
+                        # Backward ops run in the same dtype autocast chose
+                        # for corresponding forward ops.
+                        scaler.scale(loss).backward()
+                    else:
+                        loss.backward()
+                    if report_step_details:
+                        _synchronize()
 
             if iiter % accum_grad == 0:
                 if scaler is not None:
@@ -605,11 +865,12 @@ class Trainer:
                     )
 
                 # compute the gradient norm to check if it is normal or not
-                grad_norm = torch.nn.utils.clip_grad_norm_(
-                    model.parameters(),
-                    max_norm=grad_clip,
-                    norm_type=grad_clip_type,
-                )
+                with measure_detail(details, "grad_clip_time"):
+                    grad_norm = torch.nn.utils.clip_grad_norm_(
+                        model.parameters(),
+                        max_norm=grad_clip,
+                        norm_type=grad_clip_type,
+                    )
                 # PyTorch<=1.4, clip_grad_norm_ returns float value
                 if not isinstance(grad_norm, torch.Tensor):
                     grad_norm = torch.tensor(grad_norm)
@@ -670,6 +931,35 @@ class Trainer:
                 )
                 start_time = time.perf_counter()
 
+            if distributed and (
+                iiter % stats_reduce_interval == 0 or iiter % log_interval == 0 or stop
+            ):
+                with measure_detail(details, "all_reduce_time"):
+                    stats_accumulator.flush(reporter)
+
+            if report_step_details:
+                # The throughput including the time to wait for the data
+                now = time.perf_counter()
+                elapsed = now - step_end_time
+                step_end_time = now
+                details["samples_per_sec"] = len(utt_id) / elapsed
+                for k, v in batch.items():
+                    # e.g. text_lengths -> text_per_sec: The tokens per second
+                    if k.endswith("_lengths"):
+                        details[k[: -len("_lengths")] + "_per_sec"] = (
+                            v.sum().item() / elapsed
+                        )
+                if ngpu > 0:
+                    details["gpu_max_alloc_mem_GB"] = (
+                        torch.cuda.max_memory_allocated() / 2**30
+                    )
+                reporter.register(details)
+
+            # NOTE: Step the profiler at the end of the training step,
+            #   i.e. not in the iterator fetching the next mini-batch in advance
+            if profiler is not None:
+                profiler.step()
+
             # NOTE(kamo): Call log_message() after next()
             reporter.next()
             if iiter % log_interval == 0:
@@ -678,9 +968,13 @@ class Trainer:
                     reporter.tensorboard_add_scalar(summary_writer, -log_interval)
                 if use_wandb:
                     reporter.wandb_log()
+            if stop:
+                break
 
         else:
             if distributed:
+                # NOTE: Reached only if this process has no mini-batch,
+                #   because the other processes stop at the last step of any process
                 iterator_stop.fill_(1)
                 torch.distributed.all_reduce(iterator_stop, ReduceOp.SUM)
         return all_steps_are_invalid
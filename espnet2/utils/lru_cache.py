@@ -0,0 +1,401 @@
+import collections
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+from typing import Any
+from typing import Optional
+from typing import Tuple
+import weakref
+
+import numpy as np
+import torch
+from torch import multiprocessing
+
+
+def get_nbytes(obj) -> int:
+    """Get the number of bytes of the data held by an object.
+
+    Unlike `sys.getsizeof`, the buffers of arrays and tensors are counted exactly
+    and the containers are traversed without counting their own overheads.
+
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, torch.Tensor):
+        return obj.element_size() * obj.nelement()
+    elif isinstance(obj, str):
+        return len(obj.encode("utf-8"))
+    elif isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    elif isinstance(obj, dict):
+        return sum(get_nbytes(k) + get_nbytes(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        return sum(get_nbytes(v) for v in obj)
+    else:
+        return sys.getsizeof(obj)
+
+
+class LRUCache(collections.abc.MutableMapping):
+    """Cache evicting the least recently used items to keep the size in bytes.
+
+    Examples:
+        >>> cache = LRUCache(max_size=1024)
+        >>> cache["a"] = np.zeros(100, dtype=np.float32)
+        >>> cache["b"] = np.zeros(100, dtype=np.float32)
+        >>> cache["c"] = np.zeros(100, dtype=np.float32)
+        >>> "a" in cache
+        False
+
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.cache = collections.OrderedDict()
+        self.sizes = {}
+        self.size = 0
+
+    def __setitem__(self, key, value):
+        if key in self.cache:
+            del self[key]
+        nbytes = get_nbytes(key) + get_nbytes(value)
+        if nbytes > self.max_size:
+            return
+        while self.size + nbytes > self.max_size:
+            del self[next(iter(self.cache))]
+        self.cache[key] = value
+        self.sizes[key] = nbytes
+        self.size += nbytes
+
+    def __getitem__(self, key):
+        value = self.cache[key]
+        self.cache.move_to_end(key)
+        return value
+
+    def __delitem__(self, key):
+        del self.cache[key]
+        self.size -= self.sizes.pop(key)
+
+    def __iter__(self):
+        return iter(self.cache)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __len__(self):
+        return len(self.cache)
+
+
+def _remove_file(path: str, pid: int):
+    # NOTE: Only the creator removes the file, not the forked processes
+    if os.getpid() == pid:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class SharedLRUCache:
+    """LRU cache shared by processes, e.g. the workers of DataLoader.
+
+    The values are pickled into an arena of `max_size` bytes
+    in a memory mapped file, in /dev/shm if it exists,
+    so that every process sees the values stored by the other processes
+    instead of holding its own copy.
+    The file is sparse and the memory is reserved only when the arena is filled,
+    so a large cache doesn't consume the memory in advance.
+    If the shared memory is exhausted, the cache stops growing
+    and evicts the entries instead.
+
+    The keys are distributed to `num_shards` shards having their own locks,
+    arenas, and hash tables of the entries with open addressing,
+    so that the processes don't wait for each other to look up the entries.
+    The keys are identified by their 128 bits hashes
+    and the cache can't iterate over the keys.
+    In each shard, the least recently used entries are evicted
+    when the arena is full or the number of entries reaches the limit,
+    and the arena is compacted when it is too fragmented to store a new value.
+
+    Examples:
+        >>> cache = SharedLRUCache(max_size=1024 ** 3)
+        >>> cache["utt1"] = {"speech": np.zeros(16000, dtype=np.float32)}
+        >>> data = cache.get("utt1")
+
+    Args:
+        max_size: The size of the arena in bytes
+        max_entries: The maximum number of the entries.
+            If None, one entry per 4KB of max_size is allowed.
+        num_shards: The number of the shards. If None, one shard per 64MB
+            of max_size up to 16 shards. A value is cached only if it is
+            smaller than the arena of a shard, i.e. max_size / num_shards.
+    """
+
+    # Columns of the header of each shard
+    _HEAD, _LIMIT, _COMMITTED, _CLOCK, _COUNT, _SIZE = range(6)
+    # Columns of the hash tables: The two hashes of the key
+    # (h1=0 means an empty row), offset, size and last access
+    _H1, _H2, _OFFSET, _NBYTES, _TICK = range(5)
+    # The unit to reserve the memory of the arena
+    _CHUNK = 1 << 20
+
+    def __init__(
+        self,
+        max_size: int,
+        max_entries: Optional[int] = None,
+        num_shards: Optional[int] = None,
+    ):
+        if max_entries is None:
+            max_entries = max(max_size // 4096, 1024)
+        if num_shards is None:
+            num_shards = min(max(max_size >> 26, 1), 16)
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.num_shards = num_shards
+        self.shard_size = max_size // num_shards
+        self.shard_entries = -(-max_entries // num_shards)
+        # The load factor of the hash tables is at most 0.5
+        self.table_size = 1 << (2 * self.shard_entries - 1).bit_length()
+
+        # Layout of the file: the headers, the hash tables, and the arenas
+        self._table_offset = num_shards * 8 * 8
+        arena_offset = self._table_offset + num_shards * self.table_size * 5 * 8
+        self._arena_offset = -(-arena_offset // mmap.PAGESIZE) * mmap.PAGESIZE
+        self._file_size = self._arena_offset + num_shards * self.shard_size
+
+        shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        fd, self.path = tempfile.mkstemp(prefix="espnet_lru_cache_", dir=shm_dir)
+        weakref.finalize(self, _remove_file, self.path, os.getpid())
+        try:
+            # NOTE: The file is sparse, and filled with zeros when read
+            os.ftruncate(fd, self._file_size)
+            if hasattr(os, "posix_fallocate"):
+                # Reserve the headers and the hash tables,
+                # otherwise the access to them could fail with SIGBUS
+                os.posix_fallocate(fd, 0, self._arena_offset)
+        finally:
+            os.close(fd)
+        # NOTE: The lock of spawn context can be passed to any kind of process
+        context = multiprocessing.get_context("spawn")
+        self.locks = [context.Lock() for _ in range(num_shards)]
+        self._open()
+        self._header[:, self._LIMIT] = self.shard_size
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_RDWR)
+        weakref.finalize(self, os.close, self._fd)
+        self._mmap = mmap.mmap(self._fd, self._file_size)
+        buffer = memoryview(self._mmap)
+        self._header = np.frombuffer(
+            buffer, dtype=np.int64, count=self.num_shards * 8
+        ).reshape(self.num_shards, 8)
+        self._tables = np.frombuffer(
+            buffer,
+            dtype=np.int64,
+            count=self.num_shards * self.table_size * 5,
+            offset=self._table_offset,
+        ).reshape(self.num_shards, self.table_size, 5)
+        self._arena = np.frombuffer(buffer, dtype=np.uint8, offset=self._arena_offset)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for k in ("_fd", "_mmap", "_header", "_tables", "_arena"):
+            del state[k]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    @staticmethod
+    def hash_key(key) -> Tuple[int, int]:
+        """Get the two 64 bits hashes of a key, which are the same in all processes."""
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        # h1=0 is reserved for empty rows
+        h1 = int.from_bytes(digest[:8], "little", signed=True) or 1
+        h2 = int.from_bytes(digest[8:], "little", signed=True)
+        return h1, h2
+
+    def _shard(self, h2: int) -> int:
+        return h2 % self.num_shards
+
+    def _find(self, shard: int, h1: int, h2: int) -> Tuple[Optional[int], int]:
+        """Find the row of the key.
+
+        Returns:
+            The row of the key or None, and the empty row ending the probing.
+        """
+        table = self._tables[shard]
+        mask = self.table_size - 1
+        row = h1 & mask
+        while True:
+            r1 = table[row, self._H1]
+            if r1 == 0:
+                return None, row
+            if r1 == h1 and table[row, self._H2] == h2:
+                return row, row
+            row = (row + 1) & mask
+
+    def _remove(self, shard: int, row: int):
+        """Remove the entry of the row, keeping the probing of the other rows."""
+        table = self._tables[shard]
+        header = self._header[shard]
+        header[self._COUNT] -= 1
+        header[self._SIZE] -= table[row, self._NBYTES]
+        mask = self.table_size - 1
+        # Shift the following rows backward not to break their probing sequences
+        hole = row
+        row = (row + 1) & mask
+        while table[row, self._H1] != 0:
+            home = table[row, self._H1] & mask
+            if (row - home) & mask >= (row - hole) & mask:
+                table[hole] = table[row]
+                hole = row
+            row = (row + 1) & mask
+        table[hole] = 0
+
+    def _evict(self, shard: int):
+        table = self._tables[shard]
+        valid = np.flatnonzero(table[:, self._H1] != 0)
+        self._remove(shard, valid[np.argmin(table[valid, self._TICK])])
+
+    def _reserve(self, shard: int, end: int) -> bool:
+        """Reserve the memory of the arena of the shard until "end"."""
+        header = self._header[shard]
+        if end <= header[self._COMMITTED]:
+            return True
+        committed = min(
+            max(end, header[self._COMMITTED] + self._CHUNK), self.shard_size
+        )
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(
+                    self._fd,
+                    self._arena_offset + shard * self.shard_size,
+                    int(committed),
+                )
+            except OSError as e:
+                logging.warning(
+                    f"The cache is limited to {header[self._COMMITTED]} bytes "
+                    f"in the shard {shard}: {e}"
+                )
+                header[self._LIMIT] = header[self._COMMITTED]
+                return False
+        header[self._COMMITTED] = committed
+        return True
+
+    def _allocate(self, shard: int, nbytes: int) -> Optional[int]:
+        """Find the offset of `nbytes` free bytes in the arena of the shard."""
+        header = self._header[shard]
+        table = self._tables[shard]
+        while True:
+            if nbytes > header[self._LIMIT]:
+                return None
+            while header[self._SIZE] + nbytes > header[self._LIMIT]:
+                self._evict(shard)
+
+            if header[self._HEAD] + nbytes <= header[self._LIMIT]:
+                offset = int(header[self._HEAD])
+            else:
+                valid = np.flatnonzero(table[:, self._H1] != 0)
+                valid = valid[np.argsort(table[valid, self._OFFSET])]
+                offsets = table[valid, self._OFFSET]
+                ends = offsets + table[valid, self._NBYTES]
+                # The gaps before each entry and after the last entry
+                starts = np.concatenate([[0], ends])
+                gaps = np.concatenate([offsets, [header[self._LIMIT]]]) - starts
+                fits = np.flatnonzero(gaps >= nbytes)
+                if len(fits) > 0:
+                    offset = int(starts[fits[0]])
+                else:
+                    offset = self._compact(shard, valid)
+
+            if self._reserve(shard, offset + nbytes):
+                header[self._HEAD] = max(header[self._HEAD], offset + nbytes)
+                return offset
+            # The limit is lowered due to the lack of the memory: Try again
+
+    def _compact(self, shard: int, rows: np.ndarray) -> int:
+        """Move the entries of the rows sorted by offset to the beginning."""
+        table = self._tables[shard]
+        arena = self._arena[shard * self.shard_size : (shard + 1) * self.shard_size]
+        pos = 0
+        for row in rows:
+            offset, size = table[row, self._OFFSET], table[row, self._NBYTES]
+            if offset != pos:
+                arena[pos : pos + size] = arena[offset : offset + size]
+                table[row, self._OFFSET] = pos
+            pos += size
+        self._header[shard, self._HEAD] = pos
+        return pos
+
+    @property
+    def size(self) -> int:
+        """The total bytes of the stored values."""
+        return int(self._header[:, self._SIZE].sum())
+
+    def __setitem__(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.shard_size:
+            logging.debug(f"Too large to cache: {key} ({len(data)} bytes)")
+            return
+        h1, h2 = self.hash_key(key)
+        shard = self._shard(h2)
+        header = self._header[shard]
+        with self.locks[shard]:
+            row, _ = self._find(shard, h1, h2)
+            if row is not None:
+                self._remove(shard, row)
+            if header[self._COUNT] >= self.shard_entries:
+                self._evict(shard)
+            offset = self._allocate(shard, len(data))
+            if offset is None:
+                return
+            start = shard * self.shard_size + offset
+            self._arena[start : start + len(data)] = np.frombuffer(data, np.uint8)
+            _, row = self._find(shard, h1, h2)
+            header[self._CLOCK] += 1
+            self._tables[shard, row] = (h1, h2, offset, len(data), header[self._CLOCK])
+            header[self._COUNT] += 1
+            header[self._SIZE] += len(data)
+
+    def get(self, key, default=None) -> Any:
+        h1, h2 = self.hash_key(key)
+        shard = self._shard(h2)
+        header = self._header[shard]
+        table = self._tables[shard]
+        with self.locks[shard]:
+            row, _ = self._find(shard, h1, h2)
+            if row is None:
+                return default
+            header[self._CLOCK] += 1
+            table[row, self._TICK] = header[self._CLOCK]
+            start = shard * self.shard_size + table[row, self._OFFSET]
+            data = self._arena[start : start + table[row, self._NBYTES]].tobytes()
+        return pickle.loads(data)
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key):
+        h1, h2 = self.hash_key(key)
+        shard = self._shard(h2)
+        with self.locks[shard]:
+            row, _ = self._find(shard, h1, h2)
+            if row is None:
+                raise KeyError(key)
+            self._remove(shard, row)
+
+    def __contains__(self, key):
+        h1, h2 = self.hash_key(key)
+        shard = self._shard(h2)
+        with self.locks[shard]:
+            return self._find(shard, h1, h2)[0] is not None
+
+    def __len__(self):
+        return int(self._header[:, self._COUNT].sum())
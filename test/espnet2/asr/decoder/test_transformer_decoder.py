@@ -2,6 +2,7 @@ import pytest
 import torch
 
 from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.batch_beam_search_multi_utt import BatchBeamSearchMultiUtt
 from espnet.nets.batch_beam_search_online_sim import BatchBeamSearchOnlineSim
 from espnet.nets.beam_search import BeamSearch
 from espnet.nets.scorers.ctc import CTCPrefixScorer
@@ -188,6 +189,67 @@ def test_TransformerDecoder_batch_beam_search(
         )
 
 
+@pytest.mark.parametrize("ctc_weight, ctc_window", [(0.0, 0), (0.3, 0), (0.3, 4)])
+@pytest.mark.parametrize("maxlenratio", [0.0, 0.5])
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize(
+    "decoder_class",
+    [
+        TransformerDecoder,
+        LightweightConvolutionTransformerDecoder,
+    ],
+)
+def test_TransformerDecoder_batch_beam_search_multi_utt(
+    ctc_weight, ctc_window, maxlenratio, dtype, decoder_class
+):
+    token_list = ["<blank>", "a", "b", "c", "unk", "<eos>"]
+    vocab_size = len(token_list)
+    encoder_output_size = 4
+
+    torch.manual_seed(0)
+    decoder = decoder_class(
+        vocab_size=vocab_size,
+        encoder_output_size=encoder_output_size,
+        linear_units=10,
+    )
+    ctc = CTC(odim=vocab_size, encoder_output_size=encoder_output_size).to(dtype)
+    kwargs = dict(
+        beam_size=3,
+        vocab_size=vocab_size,
+        weights={"test": 1.0 - ctc_weight, "ctc": ctc_weight},
+        scorers={
+            "test": decoder,
+            "ctc": CTCPrefixScorer(ctc=ctc, eos=vocab_size - 1, window=ctc_window),
+        },
+        token_list=token_list,
+        sos=vocab_size - 1,
+        eos=vocab_size - 1,
+        pre_beam_score_key="full",
+    )
+    beam = BatchBeamSearch(**kwargs)
+    beam.to(dtype=dtype).eval()
+    multi_beam = BatchBeamSearchMultiUtt(**kwargs)
+    multi_beam.to(dtype=dtype).eval()
+
+    enc_lens = torch.tensor([10, 7, 4])
+    enc = torch.randn(len(enc_lens), 10, encoder_output_size).type(dtype)
+    with torch.no_grad():
+        nbest_list = multi_beam(
+            x=enc, maxlenratio=maxlenratio, minlenratio=0.0, x_lens=enc_lens
+        )
+        assert len(nbest_list) == len(enc_lens)
+        for e, l, nbest in zip(enc, enc_lens, nbest_list):
+            expected = beam(x=e[:l], maxlenratio=maxlenratio, minlenratio=0.0)
+            assert len(nbest) == len(expected)
+            assert nbest[0].yseq.tolist() == expected[0].yseq.tolist()
+            torch.testing.assert_close(
+                torch.stack([h.score for h in nbest]),
+                torch.stack([h.score for h in expected]),
+                rtol=1e-4,
+                atol=1e-4,
+            )
+
+
 @pytest.mark.parametrize("input_layer", ["embed"])
 @pytest.mark.parametrize("normalize_before", [True, False])
 @pytest.mark.parametrize("use_output_layer", [True])
@@ -202,8 +264,15 @@ def test_TransformerDecoder_batch_beam_search(
         DynamicConvolution2DTransformerDecoder,
     ],
 )
+@pytest.mark.parametrize("ctc_window", [0, 3])
 def test_TransformerDecoder_batch_beam_search_online(
-    input_layer, normalize_before, use_output_layer, dtype, decoder_class, tmp_path
+    input_layer,
+    normalize_before,
+    use_output_layer,
+    dtype,
+    decoder_class,
+    ctc_window,
+    tmp_path,
 ):
     token_list = ["<blank>", "a", "b", "c", "unk", "<eos>"]
     vocab_size = len(token_list)
@@ -219,7 +288,7 @@ def test_TransformerDecoder_batch_beam_search_online(
     )
     ctc = CTC(odim=vocab_size, encoder_output_size=encoder_output_size)
     ctc.to(dtype)
-    ctc_scorer = CTCPrefixScorer(ctc=ctc, eos=vocab_size - 1)
+    ctc_scorer = CTCPrefixScorer(ctc=ctc, eos=vocab_size - 1, window=ctc_window)
     beam = BatchBeamSearchOnlineSim(
         beam_size=3,
         vocab_size=vocab_size,
@@ -258,3 +327,45 @@ def test_TransformerDecoder_batch_beam_search_online(
             maxlenratio=0.0,
             minlenratio=0.0,
         )
+
+
+@pytest.mark.parametrize("normalize_before", [True, False])
+@pytest.mark.parametrize("concat_after", [True, False])
+@pytest.mark.parametrize("padded", ["none", "uniform", "subset"])
+def test_TransformerDecoder_batch_score_kv_cache(
+    normalize_before, concat_after, padded
+):
+    torch.manual_seed(0)
+    decoder = TransformerDecoder(
+        6, 12, normalize_before=normalize_before, concat_after=concat_after
+    ).eval()
+    assert decoder.use_kv_cache
+    if padded == "none":
+        x = torch.randn(1, 9, 12)
+        x_lens = torch.tensor([9])
+        utt_ids = torch.zeros(3, dtype=torch.long)
+        xs = x.expand(len(utt_ids), -1, -1)
+    else:
+        x = torch.randn(2, 9, 12)
+        x_lens = torch.tensor([9, 7])
+        if padded == "uniform":
+            utt_ids = torch.tensor([0, 0, 0, 1, 1, 1])
+        else:
+            # any hypotheses of the utterances, e.g., the running ones in beam search
+            utt_ids = torch.tensor([1, 0, 1])
+    ys = torch.full((len(utt_ids), 1), 5, dtype=torch.long)
+    states = [None] * len(utt_ids)
+    with torch.no_grad():
+        for _ in range(4):
+            if padded == "none":
+                logp, states = decoder.batch_score(ys, states, xs)
+            else:
+                logp, states = decoder.batch_score_padded(
+                    ys, states, x, x_lens, utt_ids
+                )
+            for y, b, lp in zip(ys, utt_ids.tolist(), logp):
+                expected, _ = decoder.score(y, None, x[b, : x_lens[b]])
+                torch.testing.assert_close(lp, expected)
+            ys = torch.cat([ys, torch.randint(1, 5, (len(ys), 1))], dim=1)
+    # the self-attention keys and values are cached for each position
+    assert states[0][0].shape == (2, 4, 4, 3)
@@ -50,3 +50,38 @@ def test_Encoder_output_size():
 def test_Encoder_invalid_type():
     with pytest.raises(ValueError):
         ContextualBlockTransformerEncoder(20, input_layer="fff")
+
+
+def test_Encoder_forward_infer_batch():
+    encoder = ContextualBlockTransformerEncoder(
+        20,
+        output_size=16,
+        num_blocks=2,
+        block_size=8,
+        hop_size=4,
+        look_ahead=2,
+    ).eval()
+    xs = [torch.randn(1, n, 20) for n in [80, 150, 45]]
+
+    def encode(batch):
+        states = [None] * len(xs)
+        outputs = [[] for _ in xs]
+        for start in range(0, 150, 30):
+            streams = [i for i, x in enumerate(xs) if start < x.size(1)]
+            args = []
+            for i in streams:
+                x = xs[i][:, start : start + 30]
+                is_final = start + 30 >= xs[i].size(1)
+                args.append((x, torch.LongTensor([x.size(1)]), states[i], is_final))
+            if batch:
+                results = encoder.forward_infer_batch(*map(list, zip(*args)))
+            else:
+                results = [encoder.forward_infer(*a) for a in args]
+            for i, (y, _, next_states) in zip(streams, results):
+                outputs[i].append(y)
+                states[i] = next_states
+        return [torch.cat(ys, dim=1) for ys in outputs]
+
+    with torch.no_grad():
+        for y, y_batch in zip(encode(False), encode(True)):
+            torch.testing.assert_close(y, y_batch)
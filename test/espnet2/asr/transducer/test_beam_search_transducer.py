@@ -2,6 +2,7 @@ import pytest
 import torch
 
 from espnet2.asr.transducer.beam_search_transducer import BeamSearchTransducer
+from espnet2.asr.transducer.beam_search_transducer import Hypothesis
 from espnet2.asr.transducer.joint_network import JointNetwork
 from espnet2.asr.transducer.transducer_decoder import TransducerDecoder
 from espnet2.lm.seq_rnn_lm import SequentialRNNLM
@@ -51,3 +52,128 @@ def test_transducer_beam_search(rnn_type, search_params):
 
     with torch.no_grad():
         _ = beam(enc_out)
+
+
+@pytest.mark.parametrize("search_type", ["default", "tsd"])
+def test_transducer_beam_search_batch_expand(search_type, monkeypatch):
+    vocab_size = 6
+
+    decoder = TransducerDecoder(vocab_size, hidden_size=4)
+    joint_net = JointNetwork(vocab_size, 4, 4, joint_space_size=2)
+
+    beam = BeamSearchTransducer(
+        decoder, joint_net, beam_size=3, search_type=search_type, max_sym_exp=3
+    )
+
+    caches = []
+    batch_sizes = []
+    batch_score = decoder.batch_score
+    rnn_forward = decoder.rnn_forward
+
+    def _batch_score(hyps, dec_states, cache, use_lm):
+        caches.append(cache)
+        return batch_score(hyps, dec_states, cache, use_lm)
+
+    def _rnn_forward(sequence, state):
+        batch_sizes.append(sequence.size(0))
+        return rnn_forward(sequence, state)
+
+    monkeypatch.setattr(decoder, "batch_score", _batch_score)
+    monkeypatch.setattr(decoder, "rnn_forward", _rnn_forward)
+
+    enc_out = torch.randn(10, 4)
+
+    with torch.no_grad():
+        _ = beam(enc_out)
+
+    # all the expansions share one cache, and each label prefix is forwarded once
+    assert all(cache is caches[0] for cache in caches)
+    assert all(isinstance(key, tuple) for key in caches[0])
+    assert sum(batch_sizes) == len(caches[0])
+    assert max(batch_sizes) > 1
+
+
+def _default_beam_search_per_hyp(beam, enc_out):
+    """Expand the hypotheses one by one as the previous implementation."""
+    beam_size = min(beam.beam_size, beam.vocab_size)
+    beam_k = min(beam_size, (beam.vocab_size - 1))
+
+    kept_hyps = [
+        Hypothesis(
+            score=0.0, yseq=[beam.blank_id], dec_state=beam.decoder.init_state(1)
+        )
+    ]
+    cache = {}
+    num_duplicates = 0
+
+    for enc_out_t in enc_out:
+        hyps = kept_hyps
+        kept_hyps = []
+        popped = set()
+
+        while True:
+            max_hyp = max(hyps, key=lambda x: x.score)
+            hyps.remove(max_hyp)
+            if tuple(max_hyp.yseq) in popped:
+                num_duplicates += 1
+            popped.add(tuple(max_hyp.yseq))
+
+            dec_out, state, _ = beam.decoder.score(max_hyp, cache)
+            logp = torch.log_softmax(beam.joint_network(enc_out_t, dec_out), dim=-1)
+            top_k = logp[1:].topk(beam_k, dim=-1)
+
+            kept_hyps.append(
+                Hypothesis(
+                    score=(max_hyp.score + float(logp[0:1])),
+                    yseq=max_hyp.yseq[:],
+                    dec_state=max_hyp.dec_state,
+                )
+            )
+            for logp, k in zip(*top_k):
+                hyps.append(
+                    Hypothesis(
+                        score=max_hyp.score + float(logp),
+                        yseq=max_hyp.yseq[:] + [int(k + 1)],
+                        dec_state=state,
+                    )
+                )
+
+            hyps_max = float(max(hyps, key=lambda x: x.score).score)
+            kept_most_prob = sorted(
+                [hyp for hyp in kept_hyps if hyp.score > hyps_max],
+                key=lambda x: x.score,
+            )
+            if len(kept_most_prob) >= beam_size:
+                kept_hyps = kept_most_prob
+                break
+
+    return beam.sort_nbest(kept_hyps), num_duplicates
+
+
+def test_transducer_default_beam_search_duplicate_prefixes():
+    vocab_size = 5
+    num_duplicates = 0
+    for seed in range(40):
+        torch.manual_seed(seed)
+        decoder = TransducerDecoder(vocab_size, hidden_size=4)
+        joint_net = JointNetwork(vocab_size, 4, 4, joint_space_size=2)
+        beam = BeamSearchTransducer(
+            decoder,
+            joint_net,
+            beam_size=4,
+            search_type="default",
+            score_norm=False,
+            nbest=4,
+        )
+        enc_out = torch.randn(20, 4)
+
+        with torch.no_grad():
+            nbest = beam(enc_out)
+            desired, n = _default_beam_search_per_hyp(beam, enc_out)
+        num_duplicates += n
+
+        assert [h.yseq for h in nbest] == [h.yseq for h in desired]
+        for h, h2 in zip(nbest, desired):
+            assert h.score == pytest.approx(h2.score, abs=1e-4)
+    # The hypotheses having the same label sequence are popped in a step
+    assert num_duplicates > 0
@@ -118,3 +118,75 @@ def test_Speech2Text_streaming(asr_config_file_streaming, lm_config_file):
         assert isinstance(token[0], str)
         assert isinstance(token_int[0], int)
         assert isinstance(hyp, Hypothesis)
+
+
+@pytest.mark.execution_timeout(10)
+@pytest.mark.parametrize("use_transformer", [True, False])
+def test_Speech2Text_batch(
+    asr_config_file, asr_config_file_streaming, lm_config_file, use_transformer
+):
+    speech2text = Speech2Text(
+        asr_train_config=asr_config_file_streaming
+        if use_transformer
+        else asr_config_file,
+        lm_train_config=lm_config_file,
+        beam_size=2,
+        batch_size=3,
+    )
+    speech_lengths = np.array([100000, 80000, 50000])
+    speech = np.random.randn(len(speech_lengths), speech_lengths.max())
+    results_list = speech2text(speech, speech_lengths)
+    assert len(results_list) == len(speech_lengths)
+    for results in results_list:
+        for text, token, token_int, hyp in results:
+            assert isinstance(text, str)
+            assert isinstance(token, list)
+            assert isinstance(token_int, list)
+            assert isinstance(hyp, Hypothesis)
+
+
+@pytest.mark.execution_timeout(10)
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_Speech2Text_profile_beam_search(
+    asr_config_file_streaming, lm_config_file, batch_size
+):
+    speech2text = Speech2Text(
+        asr_train_config=asr_config_file_streaming,
+        lm_train_config=lm_config_file,
+        beam_size=2,
+        batch_size=batch_size,
+        profile_beam_search=True,
+    )
+    if batch_size == 1:
+        speech2text(np.random.randn(50000))
+    else:
+        speech2text(np.random.randn(2, 50000), np.array([50000, 30000]))
+    summary = speech2text.beam_search.profiler.summary()
+    assert summary["n_steps"] > 0
+    for k in ("decoder", "ctc", "lm"):
+        assert summary["components"][k]["calls"] == summary["n_steps"]
+
+
+@pytest.mark.execution_timeout(10)
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_Speech2Text_pruning(asr_config_file_streaming, batch_size):
+    speech2text = Speech2Text(
+        asr_train_config=asr_config_file_streaming,
+        beam_size=3,
+        batch_size=batch_size,
+        beam_threshold=0.0,
+        dynamic_beam_mass=0.9,
+        early_stop=True,
+        profile_beam_search=True,
+    )
+    if batch_size == 1:
+        results_list = [speech2text(np.random.randn(50000))]
+    else:
+        results_list = speech2text(np.random.randn(2, 50000), np.array([50000, 30000]))
+    for results in results_list:
+        for text, token, token_int, hyp in results:
+            assert isinstance(text, str)
+            assert isinstance(hyp, Hypothesis)
+    summary = speech2text.beam_search.profiler.summary()
+    if batch_size == 1:
+        assert max(step["n_hyps"] for step in summary["timeline"]) == 1
@@ -0,0 +1,134 @@
+from argparse import ArgumentParser
+import asyncio
+from pathlib import Path
+import string
+
+import numpy as np
+import pytest
+
+from espnet2.bin.asr_inference_streaming import get_parser
+from espnet2.bin.asr_inference_streaming import main
+from espnet2.bin.asr_inference_streaming import Speech2TextStreaming
+from espnet2.bin.asr_inference_streaming import Speech2TextStreamingMultiplexer
+from espnet2.bin.asr_inference_streaming import Speech2TextStreamingServer
+from espnet2.tasks.asr import ASRTask
+
+
+def test_get_parser():
+    assert isinstance(get_parser(), ArgumentParser)
+
+
+def test_main():
+    with pytest.raises(SystemExit):
+        main()
+
+
+@pytest.fixture()
+def token_list(tmp_path: Path):
+    with (tmp_path / "tokens.txt").open("w") as f:
+        f.write("<blank>\n")
+        for c in string.ascii_letters:
+            f.write(f"{c}\n")
+        f.write("<unk>\n")
+        f.write("<sos/eos>\n")
+    return tmp_path / "tokens.txt"
+
+
+@pytest.fixture()
+def asr_config_file(tmp_path: Path, token_list):
+    # Write default configuration file
+    ASRTask.main(
+        cmd=[
+            "--dry_run",
+            "true",
+            "--output_dir",
+            str(tmp_path / "asr"),
+            "--token_list",
+            str(token_list),
+            "--token_type",
+            "char",
+            "--encoder",
+            "contextual_block_transformer",
+            "--encoder_conf",
+            "output_size=16",
+            "--encoder_conf",
+            "num_blocks=2",
+            "--encoder_conf",
+            "block_size=16",
+            "--encoder_conf",
+            "hop_size=8",
+            "--encoder_conf",
+            "look_ahead=4",
+            "--decoder",
+            "transformer",
+            "--decoder_conf",
+            "num_blocks=1",
+        ]
+    )
+    return tmp_path / "asr" / "config.yaml"
+
+
+def split_chunks(speech, chunk_length=1600):
+    return [speech[i : i + chunk_length] for i in range(0, len(speech), chunk_length)]
+
+
+@pytest.fixture()
+def speech2text(asr_config_file):
+    return Speech2TextStreaming(asr_train_config=asr_config_file, beam_size=2)
+
+
+@pytest.fixture()
+def speeches():
+    return {
+        "a": np.random.randn(16000).astype(np.float32),
+        "b": np.random.randn(24000).astype(np.float32),
+        "c": np.random.randn(9000).astype(np.float32),
+    }
+
+
+@pytest.fixture()
+def expected(speech2text, speeches):
+    expected = {}
+    for key, speech in speeches.items():
+        chunks = split_chunks(speech)
+        for i, chunk in enumerate(chunks):
+            results = speech2text(chunk, is_final=i == len(chunks) - 1)
+        expected[key] = [token_int for _, _, token_int, _ in results]
+    return expected
+
+
+@pytest.mark.execution_timeout(10)
+def test_Speech2TextStreamingMultiplexer(speech2text, speeches, expected):
+    multiplexer = Speech2TextStreamingMultiplexer(speech2text)
+    chunks = {key: split_chunks(speech) for key, speech in speeches.items()}
+    outputs = {}
+    for i in range(max(len(c) for c in chunks.values())):
+        keys = [key for key, c in chunks.items() if i < len(c)]
+        is_final = {key: i == len(chunks[key]) - 1 for key in keys}
+        results = multiplexer({key: chunks[key][i] for key in keys}, is_final)
+        for key in keys:
+            if is_final[key]:
+                outputs[key] = [token_int for _, _, token_int, _ in results[key]]
+    assert outputs == expected
+    assert len(multiplexer.slots) == 0
+
+
+@pytest.mark.execution_timeout(10)
+def test_Speech2TextStreamingServer(speech2text, speeches, expected):
+    server = Speech2TextStreamingServer(Speech2TextStreamingMultiplexer(speech2text))
+
+    async def client(key, speech):
+        chunks = split_chunks(speech)
+        for i, chunk in enumerate(chunks):
+            results = await server.recognize(key, chunk, is_final=i == len(chunks) - 1)
+        return [token_int for _, _, token_int, _ in results]
+
+    async def run_clients():
+        serving = asyncio.ensure_future(server.run())
+        outputs = await asyncio.gather(
+            *[client(key, speech) for key, speech in speeches.items()]
+        )
+        serving.cancel()
+        return dict(zip(speeches, outputs))
+
+    assert asyncio.run(run_clients()) == expected
@@ -0,0 +1,55 @@
+from argparse import ArgumentParser
+
+import numpy as np
+import pytest
+
+from espnet2.bin.make_packed_scp import get_parser
+from espnet2.bin.make_packed_scp import main
+from espnet2.fileio.npy_scp import NpyScpWriter
+from espnet2.fileio.sound_scp import SoundScpWriter
+from espnet2.train.dataset import ESPnetDataset
+
+
+def test_get_parser():
+    assert isinstance(get_parser(), ArgumentParser)
+
+
+def test_main():
+    with pytest.raises(SystemExit):
+        main()
+
+
+@pytest.mark.parametrize("data_type", ["sound", "npy"])
+def test_make_packed_scp(tmp_path, data_type):
+    p = tmp_path / "input.scp"
+    if data_type == "sound":
+        with SoundScpWriter(tmp_path / "wav", p) as w:
+            w["a"] = 16000, np.random.randint(-100, 100, (1600,), dtype=np.int16)
+            w["b"] = 16000, np.random.randint(-100, 100, (800,), dtype=np.int16)
+    else:
+        with NpyScpWriter(tmp_path / "npy", p) as w:
+            w["a"] = np.random.randn(10, 4)
+            w["b"] = np.random.randint(0, 10, (3,))
+    main(
+        cmd=[
+            "--scp",
+            str(p),
+            "--data_type",
+            data_type,
+            "--output_dir",
+            str(tmp_path / "packed"),
+            "--max_shard_size",
+            "100",
+        ]
+    )
+
+    desired = ESPnetDataset([(str(p), "data", data_type)])
+    target = ESPnetDataset(
+        [(str(tmp_path / "packed" / "packed.scp"), "data", "packed")]
+    )
+    assert list(target) == list(desired)
+    for key in desired:
+        d = desired[key][1]["data"]
+        t = target[key][1]["data"]
+        assert t.dtype == d.dtype
+        np.testing.assert_allclose(t, d, rtol=1e-6)
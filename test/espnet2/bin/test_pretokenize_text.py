@@ -0,0 +1,53 @@
+from argparse import ArgumentParser
+
+import numpy as np
+import pytest
+
+from espnet2.bin.pretokenize_text import get_parser
+from espnet2.bin.pretokenize_text import main
+from espnet2.train.preprocessor import CommonPreprocessor
+
+
+def test_get_parser():
+    assert isinstance(get_parser(), ArgumentParser)
+
+
+def test_main():
+    with pytest.raises(SystemExit):
+        main()
+
+
+def test_main_token_cache(tmp_path):
+    token_list = tmp_path / "tokens.txt"
+    with token_list.open("w") as f:
+        f.write("<blank>\n<unk>\na\nb\nc\n<space>\n")
+    text = tmp_path / "text"
+    with text.open("w") as f:
+        f.write("utt1 ab c\nutt2 ca\n")
+    cache_dir = tmp_path / "cache"
+    main(
+        cmd=[
+            "--input",
+            str(text),
+            "--token_cache_dir",
+            str(cache_dir),
+            "--token_type",
+            "char",
+            "--token_list",
+            str(token_list),
+        ]
+    )
+
+    # Built as the tasks
+    preprocessor = CommonPreprocessor(
+        train=True,
+        token_type="char",
+        token_list=str(token_list),
+        bpemodel=None,
+        non_linguistic_symbols=None,
+        text_cleaner=None,
+        g2p_type=None,
+        token_cache_dir=str(cache_dir),
+    )
+    assert len(preprocessor.token_cache) == 2
+    np.testing.assert_array_equal(preprocessor.token_cache.get("ca"), [4, 2])
@@ -13,3 +13,35 @@ def test_get_parser():
 def test_main():
     with pytest.raises(SystemExit):
         main()
+
+
+@pytest.mark.parametrize("write_vocabulary", [False, True])
+@pytest.mark.parametrize("token_type", ["char", "word"])
+def test_main_nj(tmp_path, write_vocabulary, token_type):
+    text = tmp_path / "text"
+    with text.open("w") as f:
+        for i in range(50):
+            f.write(f"utt{i} " + " ".join(["ab", "bc", "cd", "de"][: i % 5]) + "\n")
+    outputs = []
+    for nj in [1, 2]:
+        output = tmp_path / f"output{nj}"
+        main(
+            cmd=[
+                "--input",
+                str(text),
+                "--output",
+                str(output),
+                "--field",
+                "2-",
+                "--token_type",
+                token_type,
+                "--write_vocabulary",
+                str(write_vocabulary),
+                "--nj",
+                str(nj),
+                "--chunk_size",
+                "7",
+            ]
+        )
+        outputs.append(output.read_text())
+    assert outputs[0] == outputs[1]
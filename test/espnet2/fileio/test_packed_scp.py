@@ -0,0 +1,66 @@
+from pathlib import Path
+import pickle
+
+import numpy as np
+import pytest
+
+from espnet2.fileio.packed_scp import PackedScpReader
+from espnet2.fileio.packed_scp import PackedScpWriter
+
+
+@pytest.mark.parametrize("max_shard_size", ["1GB", 100])
+def test_PackedScpWriter(tmp_path: Path, max_shard_size):
+    desired = {
+        "abc": np.random.randn(3).astype(np.float32),
+        "def": np.random.randn(2, 5, 10),
+        "ghi": np.random.randint(-100, 100, 7, dtype=np.int16),
+        "jkl": np.zeros((0, 4), dtype=np.int64),
+    }
+    with PackedScpWriter(
+        tmp_path / "data", tmp_path / "packed.scp", max_shard_size=max_shard_size
+    ) as writer:
+        for k, v in desired.items():
+            writer[k] = v
+        with pytest.raises(TypeError):
+            writer["mno"] = np.array(["a"])
+    if max_shard_size == 100:
+        # "def" exceeds max_shard_size and is written to a shard alone
+        assert writer.num_shards == 3
+    else:
+        assert writer.num_shards == 1
+
+    target = PackedScpReader(tmp_path / "packed.scp")
+    for k in desired:
+        t = target[k]
+        d = desired[k]
+        assert t.dtype == d.dtype
+        assert not t.flags.writeable
+        np.testing.assert_array_equal(t, d)
+        assert target.get_path(k) == writer.get_path(k)
+
+    assert len(target) == len(desired)
+    assert "abc" in target
+    assert "mno" not in target
+    assert tuple(target.keys()) == tuple(desired)
+    assert tuple(target) == tuple(desired)
+
+
+def test_PackedScpReader_pickle(tmp_path: Path):
+    array = np.random.randn(4, 3)
+    with PackedScpWriter(tmp_path / "data", tmp_path / "packed.scp") as writer:
+        writer["abc"] = array
+    reader = PackedScpReader(tmp_path / "packed.scp")
+    np.testing.assert_array_equal(reader["abc"], array)
+    assert len(reader.shards) == 1
+
+    reader2 = pickle.loads(pickle.dumps(reader))
+    assert len(reader2.shards) == 0
+    np.testing.assert_array_equal(reader2["abc"], array)
+
+
+def test_PackedScpReader_invalid(tmp_path: Path):
+    p = tmp_path / "packed.scp"
+    with p.open("w") as f:
+        f.write("abc shard.0.bin 0\n")
+    with pytest.raises(RuntimeError):
+        PackedScpReader(p)
@@ -1,8 +1,10 @@
 from pathlib import Path
+import pickle
 
 import numpy as np
 import pytest
 
+from espnet2.fileio.read_text import IndexedTextReader
 from espnet2.fileio.read_text import load_num_sequence_text
 from espnet2.fileio.read_text import read_2column_text
 
@@ -52,3 +54,91 @@ def test_load_num_sequence_text_invalid(tmp_path: Path):
         f.write("abc 2 4\n")
     with pytest.raises(RuntimeError):
         load_num_sequence_text(p)
+
+
+def test_read_2column_text_lazy(tmp_path: Path):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("def /some/path/b.wav\n")
+        f.write("abc /some/path/a b.wav\n")
+        f.write("ghi")
+    desired = read_2column_text(p)
+    target = read_2column_text(p, lazy=True)
+    assert isinstance(target, IndexedTextReader)
+    assert dict(target) == desired
+    assert list(target) == ["def", "abc", "ghi"]
+    assert len(target) == 3
+    assert "abc" in target
+    assert "xyz" not in target
+    with pytest.raises(KeyError):
+        target["xyz"]
+    assert (tmp_path / "dummy.scp.idx").exists()
+
+    # The index is reused
+    mtime = (tmp_path / "dummy.scp.idx").stat().st_mtime_ns
+    assert dict(read_2column_text(p, lazy=True)) == desired
+    assert (tmp_path / "dummy.scp.idx").stat().st_mtime_ns == mtime
+
+    # The index is built again if the file is modified
+    with p.open("a") as f:
+        f.write("\njkl /some/path/c.wav\n")
+    target = read_2column_text(p, lazy=True)
+    assert target["jkl"] == "/some/path/c.wav"
+    assert len(target) == 4
+
+
+def test_read_2column_text_lazy_pickle(tmp_path: Path):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("abc /some/path/a.wav\n")
+    target = pickle.loads(pickle.dumps(read_2column_text(p, lazy=True)))
+    assert target["abc"] == "/some/path/a.wav"
+
+
+def test_read_2column_text_lazy_duplicated(tmp_path: Path):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("abc 1\n")
+        f.write("abc 2\n")
+    with pytest.raises(RuntimeError):
+        read_2column_text(p, lazy=True)
+
+
+def test_IndexedTextReader_not_unique(tmp_path: Path):
+    p = tmp_path / "dummy.txt"
+    with p.open("w") as f:
+        f.write("A abc 1\n")
+        f.write("B def 2\n")
+        f.write("C abc 3\n")
+    target = IndexedTextReader(p, key_field=1, unique=False)
+    assert list(target) == ["abc", "def"]
+    assert target["abc"] == ["A abc 1", "C abc 3"]
+    assert target["def"] == ["B def 2"]
+
+
+def test_IndexedTextReader_unwritable(tmp_path: Path, monkeypatch):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("abc /some/path/a.wav\n")
+
+    def _write_index(self, arrays):
+        raise PermissionError
+
+    monkeypatch.setattr(IndexedTextReader, "_write_index", _write_index)
+    # The index is kept in the memory
+    target = IndexedTextReader(p)
+    assert target["abc"] == "/some/path/a.wav"
+    assert not (tmp_path / "dummy.scp.idx").exists()
+
+
+@pytest.mark.parametrize("loader_type", ["text_int", "csv_float"])
+def test_load_num_sequence_text_lazy(loader_type: str, tmp_path: Path):
+    p = tmp_path / "dummy.txt"
+    delimiter = "," if "csv" in loader_type else " "
+    with p.open("w") as f:
+        f.write("abc " + delimiter.join(["0", "1", "2"]) + "\n")
+        f.write("def " + delimiter.join(["3", "4", "5"]) + "\n")
+    desired = load_num_sequence_text(p, loader_type=loader_type)
+    target = load_num_sequence_text(p, loader_type=loader_type, lazy=True)
+    assert dict(target) == desired
+    assert isinstance(target["abc"][0], type(desired["abc"][0]))
@@ -16,3 +16,18 @@ def test_MultpleIterFactory(shuffle):
         shuffle=shuffle,
     )
     assert [i for i in iter_factory.build_iter(0)] == [0, 1, 2, 0, 1, 2]
+
+
+class GeneratorIterFactory(AbsIterFactory):
+    def build_iter(self, epoch: int, shuffle: bool = None):
+        yield from range(3)
+
+
+@pytest.mark.parametrize("factory_class", [IterFactory, GeneratorIterFactory])
+@pytest.mark.parametrize("iiter", [0, 2, 3, 4, 6])
+def test_MultpleIterFactory_resume_iter(factory_class, iiter):
+    iter_factory = MultipleIterFactory(
+        build_funcs=[lambda: factory_class(), lambda: factory_class()],
+    )
+    desired = list(iter_factory.build_iter(0))
+    assert list(iter_factory.resume_iter(0, iiter)) == desired[iiter:]
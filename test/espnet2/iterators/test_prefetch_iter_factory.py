@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+import torch
+
+from espnet2.iterators.abs_iter_factory import AbsIterFactory
+from espnet2.iterators.prefetch_iter_factory import pin_memory
+from espnet2.iterators.prefetch_iter_factory import Prefetcher
+from espnet2.iterators.prefetch_iter_factory import PrefetchIterFactory
+from espnet2.iterators.sequence_iter_factory import SequenceIterFactory
+
+
+class Dataset:
+    def __getitem__(self, item):
+        return str(item), {"x": torch.full((3,), float(item))}
+
+
+def collate_fn(data):
+    ids = [i for i, _ in data]
+    return ids, {"x": torch.stack([d["x"] for _, d in data])}
+
+
+@pytest.fixture()
+def iter_factory():
+    batches = [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]]
+    return SequenceIterFactory(
+        dataset=Dataset(), batches=batches, shuffle=True, collate_fn=collate_fn
+    )
+
+
+@pytest.mark.parametrize("num_prefetch", [1, 3])
+def test_PrefetchIterFactory(iter_factory, num_prefetch):
+    prefetch_iter_factory = PrefetchIterFactory(iter_factory, num_prefetch=num_prefetch)
+    for epoch in range(1, 3):
+        desired = list(iter_factory.build_iter(epoch))
+        it = prefetch_iter_factory.build_iter(epoch)
+        assert len(it) == len(desired)
+        for (ids, batch), (ids2, batch2) in zip(it, desired):
+            assert ids == ids2
+            assert torch.equal(batch["x"], batch2["x"])
+
+
+def test_Prefetcher_no_len():
+    prefetcher = Prefetcher(iter(range(3)))
+    with pytest.raises(TypeError):
+        len(prefetcher)
+    assert list(prefetcher) == [0, 1, 2]
+
+
+def test_Prefetcher_error():
+    def generate():
+        yield 0
+        raise ValueError("error in the data loader")
+
+    it = iter(Prefetcher(generate()))
+    assert next(it) == 0
+    with pytest.raises(ValueError):
+        next(it)
+
+
+def test_Prefetcher_break():
+    num_threads = threading.active_count()
+    it = Prefetcher(range(100), num_prefetch=2)
+    for i in it:
+        if i == 3:
+            break
+    # The background thread is stopped when the generator is closed
+    assert threading.active_count() == num_threads
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="Require cuda")
+def test_pin_memory():
+    data = ("id", {"x": torch.zeros(2)}, [1])
+    pinned = pin_memory(data)
+    assert pinned[0] == "id"
+    assert pinned[1]["x"].is_pinned()
+    assert pinned[2] == [1]
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="Require cuda")
+def test_Prefetcher_cuda(iter_factory):
+    desired = list(iter_factory.build_iter(1))
+    it = Prefetcher(iter_factory.build_iter(1), device="cuda")
+    for (ids, batch), (ids2, batch2) in zip(it, desired):
+        assert ids == ids2
+        assert batch["x"].is_cuda
+        assert torch.equal(batch["x"].cpu(), batch2["x"])
+
+
+class DummyIterFactory(AbsIterFactory):
+    def build_iter(self, epoch: int, shuffle: bool = None):
+        return range(epoch)
+
+
+def test_PrefetchIterFactory_generator():
+    iter_factory = PrefetchIterFactory(DummyIterFactory())
+    assert list(iter_factory.build_iter(3)) == [0, 1, 2]
+
+
+def test_PrefetchIterFactory_resume_iter():
+    iter_factory = PrefetchIterFactory(DummyIterFactory())
+    assert list(iter_factory.resume_iter(5, 2)) == [2, 3, 4]
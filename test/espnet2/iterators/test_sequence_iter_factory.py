@@ -67,3 +67,22 @@ def test_SequenceIterFactory_deterministic(collate, num_iters_per_epoch):
     for i in range(1, 10):
         for v, v2 in zip(iter_factory.build_iter(i), iter_factory.build_iter(i)):
             assert (v == v2).all()
+
+
+@pytest.mark.parametrize("num_iters_per_epoch", [None, 3, 9])
+def test_SequenceIterFactory_resume_iter(num_iters_per_epoch):
+    dataset = Dataset()
+    batches = [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]]
+    iter_factory = SequenceIterFactory(
+        dataset=dataset,
+        batches=batches,
+        num_iters_per_epoch=num_iters_per_epoch,
+        shuffle=True,
+        collate_fn=collate_func,
+    )
+
+    for i in range(1, 5):
+        desired = [v.tolist() for v in iter_factory.build_iter(i)]
+        it = iter_factory.resume_iter(i, 2)
+        assert len(it) == len(desired) - 2
+        assert [v.tolist() for v in it] == desired[2:]
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from espnet2.iterators.stream_iter_factory import StreamIterFactory
+from espnet2.train.collate_fn import CommonCollateFn
+from espnet2.train.iterable_dataset import IterableESPnetDataset
+
+
+@pytest.fixture()
+def dataset(tmp_path):
+    p = tmp_path / "text_int"
+    with p.open("w") as f:
+        for i in range(50):
+            f.write(f"utt{i:02d} " + " ".join(["1"] * (i % 9 + 1)) + "\n")
+    return IterableESPnetDataset([(str(p), "text", "text_int")], shuffle_buffer_size=8)
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+@pytest.mark.parametrize("batch_bins", [None, 20])
+def test_StreamIterFactory(dataset, num_workers, batch_bins):
+    iter_factory = StreamIterFactory(
+        dataset,
+        batch_size=4,
+        batch_bins=batch_bins,
+        bucket_buffer_size=16,
+        shuffle=True,
+        num_workers=num_workers,
+        collate_fn=CommonCollateFn(),
+    )
+    keys = []
+    for ids, batch in iter_factory.build_iter(1):
+        lengths = batch["text_lengths"].numpy()
+        # Sorted in descending order
+        assert (np.diff(lengths) <= 0).all()
+        if batch_bins is None:
+            assert len(ids) <= 4
+        elif len(ids) > 1:
+            # The last sample exceeding batch_bins is included
+            assert (len(ids) - 1) * lengths[1] <= batch_bins
+        keys += ids
+    assert sorted(keys) == [f"utt{i:02d}" for i in range(50)]
+
+    keys2 = [k for ids, _ in iter_factory.build_iter(1) for k in ids]
+    assert keys == keys2
+
+
+def test_StreamIterFactory_num_batches(dataset):
+    iter_factory = StreamIterFactory(dataset, batch_size=3, num_batches=2)
+    batches = list(iter_factory.build_iter(1))
+    assert len(batches) == 2
+    assert all(len(batch) == 3 for batch in batches)
@@ -83,3 +83,19 @@ def test_TransformerLM_batch_beam_search(pos_enc, dtype):
             maxlenratio=0.0,
             minlenratio=0.0,
         )
+
+
+@pytest.mark.parametrize("pos_enc", ["sinusoidal", None])
+def test_TransformerLM_batch_score_kv_cache(pos_enc):
+    torch.manual_seed(0)
+    model = TransformerLM(6, pos_enc=pos_enc, unit=10).eval()
+    assert model.encoder.use_kv_cache
+    ys = torch.full((3, 1), 5, dtype=torch.long)
+    states = [None] * len(ys)
+    with torch.no_grad():
+        for _ in range(4):
+            logp, states = model.batch_score(ys, states, None)
+            for i, y in enumerate(ys):
+                expected, _ = model.score(y, None, None)
+                torch.testing.assert_close(logp[i], expected)
+            ys = torch.cat([ys, torch.randint(0, 5, (len(ys), 1))], dim=1)
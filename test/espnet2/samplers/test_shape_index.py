@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+from espnet2.samplers.shape_index import cached_batch_list
+from espnet2.samplers.shape_index import get_shape_index
+from espnet2.samplers.shape_index import greedy_batch_sizes
+from espnet2.samplers.shape_index import load_aligned_shapes
+from espnet2.samplers.shape_index import ShapeIndex
+from espnet2.samplers.shape_index import split_batches
+
+
+@pytest.fixture()
+def shape_files(tmp_path):
+    p1 = tmp_path / "shape1.txt"
+    with p1.open("w") as f:
+        f.write("a 1000,80\n")
+        f.write("b 400,80\n")
+        f.write("c 800,80\n")
+        f.write("d 400,80\n")
+
+    p2 = tmp_path / "shape2.txt"
+    with p2.open("w") as f:
+        f.write("d 49,30\n")
+        f.write("c 39,30\n")
+        f.write("b 50,30\n")
+        f.write("a 30,30\n")
+
+    return str(p1), str(p2)
+
+
+def test_ShapeIndex(shape_files):
+    index = ShapeIndex(shape_files[0])
+    np.testing.assert_array_equal(index.keys, ["a", "b", "c", "d"])
+    np.testing.assert_array_equal(
+        index.shapes, [[1000, 80], [400, 80], [800, 80], [400, 80]]
+    )
+    np.testing.assert_array_equal(index.ndims, [2, 2, 2, 2])
+    # The order of the same lengths is kept
+    np.testing.assert_array_equal(index.order, [1, 3, 2, 0])
+    assert index.order.dtype == np.uint32
+    assert len(index) == 4
+    assert index.index_path.exists()
+
+
+def test_ShapeIndex_reuse(shape_files, monkeypatch):
+    index = ShapeIndex(shape_files[0])
+
+    def _build_index(self):
+        raise AssertionError("The index is built again")
+
+    monkeypatch.setattr(ShapeIndex, "_build_index", _build_index)
+    index2 = ShapeIndex(shape_files[0])
+    np.testing.assert_array_equal(index.keys, index2.keys)
+    np.testing.assert_array_equal(index.shapes, index2.shapes)
+    np.testing.assert_array_equal(index.order, index2.order)
+
+
+def test_ShapeIndex_modified(shape_files):
+    ShapeIndex(shape_files[0])
+    with open(shape_files[0], "a") as f:
+        f.write("e 10,80\n")
+    index = ShapeIndex(shape_files[0])
+    np.testing.assert_array_equal(index.keys, ["a", "b", "c", "d", "e"])
+    assert index.order[0] == 4
+
+
+def test_ShapeIndex_unwritable(shape_files, monkeypatch):
+    def _write_index(self, arrays):
+        raise PermissionError("Permission denied")
+
+    monkeypatch.setattr(ShapeIndex, "_write_index", _write_index)
+    index = ShapeIndex(shape_files[0])
+    np.testing.assert_array_equal(index.keys, ["a", "b", "c", "d"])
+    assert not index.index_path.exists()
+
+
+def test_ShapeIndex_different_ndims(tmp_path):
+    p = tmp_path / "shape.txt"
+    with p.open("w") as f:
+        f.write("a 10\n")
+        f.write("b 5,3,2\n")
+    index = ShapeIndex(p)
+    np.testing.assert_array_equal(index.shapes, [[10, 1, 1], [5, 3, 2]])
+    np.testing.assert_array_equal(index.ndims, [1, 3])
+
+
+def test_ShapeIndex_lookup(shape_files):
+    index = ShapeIndex(shape_files[1])
+    np.testing.assert_array_equal(index.lookup(np.array(["a", "d", "b"])), [3, 0, 2])
+    with pytest.raises(KeyError):
+        index.lookup(np.array(["a", "x"]))
+
+
+def test_get_shape_index(shape_files):
+    assert get_shape_index(shape_files[0]) is get_shape_index(shape_files[0])
+
+
+def test_load_aligned_shapes(shape_files):
+    keys, shapes, ndims = load_aligned_shapes(shape_files)
+    np.testing.assert_array_equal(keys, ["b", "d", "c", "a"])
+    np.testing.assert_array_equal(shapes[0][:, 0], [400, 400, 800, 1000])
+    np.testing.assert_array_equal(shapes[1][:, 0], [50, 49, 39, 30])
+    np.testing.assert_array_equal(ndims[1], [2, 2, 2, 2])
+
+
+def test_load_aligned_shapes_mismatched(shape_files, tmp_path):
+    p = tmp_path / "shape3.txt"
+    with p.open("w") as f:
+        f.write("a 1000,80\n")
+        f.write("x 400,80\n")
+        f.write("c 800,80\n")
+        f.write("d 400,80\n")
+    with pytest.raises(RuntimeError):
+        load_aligned_shapes([shape_files[0], str(p)])
+
+
+@pytest.mark.parametrize("padding", [True, False])
+def test_greedy_batch_sizes(padding):
+    batch_sizes = greedy_batch_sizes(
+        [1, 1, 3, 3],
+        batch_bins=5,
+        min_batch_size=1,
+        drop_last=False,
+        padding=padding,
+    )
+    if padding:
+        # bins = 3 x 3 > 5
+        assert batch_sizes == [3, 1]
+    else:
+        # bins = 1 + 1 + 3 + 3 > 5
+        assert batch_sizes == [4]
+
+
+def test_greedy_batch_sizes_redistribute():
+    batch_sizes = greedy_batch_sizes(
+        [1] * 5, batch_bins=2, min_batch_size=2, drop_last=False, padding=False
+    )
+    assert batch_sizes == [3, 2]
+
+
+@pytest.mark.parametrize("sort_in_batch", ["descending", "ascending"])
+def test_split_batches(sort_in_batch):
+    batch_list = split_batches(["a", "b", "c"], [2, 1], sort_in_batch)
+    if sort_in_batch == "descending":
+        assert batch_list == [("b", "a"), ("c",)]
+    else:
+        assert batch_list == [("a", "b"), ("c",)]
+
+
+def test_cached_batch_list(shape_files):
+    built = []
+
+    def build():
+        built.append(True)
+        return [("a", "b")]
+
+    options = dict(batch_size=2)
+    batch_list = cached_batch_list("test", shape_files, options, build)
+    batch_list.append(("c",))
+    assert cached_batch_list("test", shape_files, options, build) == [("a", "b")]
+    assert len(built) == 1
+
+    cached_batch_list("test", shape_files, dict(batch_size=3), build)
+    assert len(built) == 2
@@ -1,8 +1,11 @@
+import argparse
+
 import configargparse
 import pytest
 import torch
 
 from espnet2.tasks.abs_task import AbsTask
+from espnet2.tasks.abs_task import IteratorOptions
 from espnet2.torch_utils.device_funcs import force_gatherable
 from espnet2.train.abs_espnet_model import AbsESPnetModel
 from espnet2.train.collate_fn import CommonCollateFn
@@ -132,3 +135,52 @@ def test_main(tmp_path):
             "1",
         ]
     )
+
+
+@pytest.mark.parametrize(
+    "batch_type, rank, batch_size, batch_bins",
+    [
+        ("sorted", 0, 3, None),
+        ("sorted", 1, 2, None),
+        ("length", 0, 5, 500),
+        ("length", 1, 5, 500),
+    ],
+)
+def test_build_stream_iter_factory_distributed(
+    tmp_path, monkeypatch, batch_type, rank, batch_size, batch_bins
+):
+    train_text = tmp_path / "train.txt"
+    with train_text.open("w") as f:
+        f.write("a 10,1\n")
+    monkeypatch.setattr(torch.distributed, "get_world_size", lambda: 2)
+    monkeypatch.setattr(torch.distributed, "get_rank", lambda: rank)
+
+    args = argparse.Namespace(
+        train_dtype="float32",
+        shuffle_buffer_size=0,
+        seed=0,
+        allow_variable_data_keys=False,
+        bucket_buffer_size=100,
+        sort_in_batch="descending",
+        num_workers=0,
+        ngpu=0,
+    )
+    iter_options = IteratorOptions(
+        preprocess_fn=None,
+        collate_fn=CommonCollateFn(),
+        data_path_and_name_and_type=[(str(train_text), "x", "rand_float")],
+        shape_files=[],
+        batch_size=5,
+        batch_bins=1000,
+        batch_type=batch_type,
+        max_cache_size=0.0,
+        max_cache_fd=0,
+        distributed=True,
+        num_batches=None,
+        num_iters_per_epoch=None,
+        train=True,
+    )
+    # The global batch size is divided among the ranks
+    iter_factory = TestTask.build_stream_iter_factory(args, iter_options, "train")
+    assert iter_factory.batch_size == batch_size
+    assert iter_factory.batch_bins == batch_bins
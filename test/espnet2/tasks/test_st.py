@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+import soundfile
+
+from espnet2.tasks.st import STTask
+
+
+def test_add_arguments():
+    STTask.get_parser()
+
+
+def test_add_arguments_help():
+    parser = STTask.get_parser()
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--help"])
+
+
+def test_main_help():
+    with pytest.raises(SystemExit):
+        STTask.main(cmd=["--help"])
+
+
+def test_main_print_config():
+    with pytest.raises(SystemExit):
+        STTask.main(cmd=["--print_config"])
+
+
+def test_main_with_no_args():
+    with pytest.raises(SystemExit):
+        STTask.main(cmd=[])
+
+
+@pytest.fixture()
+def token_list(tmp_path):
+    p = tmp_path / "tokens.txt"
+    with p.open("w") as f:
+        f.write("<blank>\n<unk>\na\nb\nc\n<space>\n")
+    return str(p)
+
+
+@pytest.fixture()
+def rir_scp(tmp_path):
+    path = tmp_path / "rir0.wav"
+    soundfile.write(path, np.random.randn(100), 16000, subtype="FLOAT")
+    p = tmp_path / "rir.scp"
+    with p.open("w") as f:
+        f.write(f"rir0 {path}\n")
+    return str(p)
+
+
+@pytest.mark.parametrize("batch_augmentation", [True, False])
+def test_build_preprocess_fn(token_list, rir_scp, batch_augmentation):
+    args = STTask.get_parser().parse_args(
+        [
+            "--token_list",
+            token_list,
+            "--src_token_list",
+            token_list,
+            "--token_type",
+            "char",
+            "--src_token_type",
+            "char",
+            "--rir_scp",
+            rir_scp,
+            "--batch_augmentation",
+            str(batch_augmentation),
+        ]
+    )
+    preprocess_fn = STTask.build_preprocess_fn(args, train=True)
+    assert preprocess_fn.batch_augmentation == batch_augmentation
+    data = preprocess_fn(
+        "utt1", dict(speech=np.random.randn(800), text="ab", src_text="c a")
+    )
+    np.testing.assert_array_equal(data["text"], [2, 3])
+    np.testing.assert_array_equal(data["src_text"], [4, 5, 2])
+
+
+def test_build_preprocess_fn_token_cache(tmp_path, token_list):
+    args = STTask.get_parser().parse_args(
+        [
+            "--token_list",
+            token_list,
+            "--src_token_list",
+            token_list,
+            "--token_type",
+            "char",
+            "--src_token_type",
+            "word",
+            "--token_cache_dir",
+            str(tmp_path / "cache"),
+        ]
+    )
+    preprocess_fn = STTask.build_preprocess_fn(args, train=True)
+    data = preprocess_fn("utt1", dict(text="ab", src_text="c a"))
+    np.testing.assert_array_equal(data["text"], [2, 3])
+    np.testing.assert_array_equal(data["src_text"], [4, 2])
+    assert [len(c) for c in preprocess_fn.token_cache] == [1, 1]
+
+    # The cached token ids are used for each of the texts
+    preprocess_fn2 = STTask.build_preprocess_fn(args, train=True)
+    preprocess_fn2.tokenizer = [object(), object()]
+    data = preprocess_fn2("utt1", dict(text="ab", src_text="c a"))
+    np.testing.assert_array_equal(data["text"], [2, 3])
+    np.testing.assert_array_equal(data["src_text"], [4, 2])
@@ -0,0 +1,77 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from espnet2.text.token_cache import TokenCache
+from espnet2.train.preprocessor import CommonPreprocessor
+
+
+@pytest.fixture()
+def token_list(tmp_path):
+    p = tmp_path / "tokens.txt"
+    with p.open("w") as f:
+        f.write("<blank>\n<unk>\na\nb\nc\n<space>\n")
+    return str(p)
+
+
+def test_TokenCache(tmp_path):
+    cache = TokenCache(tmp_path / "cache", dict(token_type="char"))
+    assert cache.get("abc") is None
+    cache.put("abc", [2, 3, 4])
+    ids = cache.get("abc")
+    assert ids.dtype == np.int64
+    np.testing.assert_array_equal(ids, [2, 3, 4])
+    assert len(cache) == 1
+
+    # Persistent
+    cache2 = TokenCache(tmp_path / "cache", dict(token_type="char"))
+    np.testing.assert_array_equal(cache2.get("abc"), [2, 3, 4])
+    # Another configuration
+    cache3 = TokenCache(tmp_path / "cache", dict(token_type="word"))
+    assert cache3.get("abc") is None
+
+
+def test_TokenCache_file_contents(tmp_path, token_list):
+    cache = TokenCache(tmp_path / "cache", dict(token_list=token_list))
+    cache.put("abc", [2, 3, 4])
+    assert TokenCache(tmp_path / "cache", dict(token_list=token_list)).get("abc")[0]
+    with open(token_list, "a") as f:
+        f.write("d\n")
+    # The token list is modified
+    cache2 = TokenCache(tmp_path / "cache", dict(token_list=token_list))
+    assert cache2.get("abc") is None
+
+
+def test_TokenCache_pickle(tmp_path):
+    cache = TokenCache(tmp_path / "cache", dict(token_type="char"))
+    cache.put("abc", [2, 3, 4])
+    cache2 = pickle.loads(pickle.dumps(cache))
+    np.testing.assert_array_equal(cache2.get("abc"), [2, 3, 4])
+
+
+def test_TokenCache_disabled(tmp_path):
+    (tmp_path / "file").touch()
+    cache = TokenCache(tmp_path / "file" / "cache", dict(token_type="char"))
+    assert not cache.enabled
+    cache.put("abc", [2, 3, 4])
+    assert cache.get("abc") is None
+
+
+def test_CommonPreprocessor_token_cache(tmp_path, token_list):
+    preprocessor = CommonPreprocessor(
+        train=True,
+        token_type="char",
+        token_list=token_list,
+        token_cache_dir=tmp_path / "cache",
+    )
+    data = preprocessor("utt1", dict(text="ab c"))
+    np.testing.assert_array_equal(data["text"], [2, 3, 5, 4])
+    assert len(preprocessor.token_cache) == 1
+
+    # The tokenizer isn't invoked for the cached text
+    preprocessor.tokenizer = None
+    preprocessor2 = pickle.loads(pickle.dumps(preprocessor))
+    preprocessor2.tokenizer = object()
+    data = preprocessor2("utt2", dict(text="ab c"))
+    np.testing.assert_array_equal(data["text"], [2, 3, 5, 4])
@@ -0,0 +1,107 @@
+from concurrent.futures.process import ProcessPoolExecutor
+
+import torch
+
+from espnet2.torch_utils.recursive_op import recursive_all_reduce
+from espnet2.torch_utils.recursive_op import recursive_average
+from espnet2.train.reporter import Reporter
+from espnet2.train.reporter import StatsAccumulator
+
+
+def _run(init_method, rank, world_size, func):
+    torch.distributed.init_process_group(
+        backend="gloo", init_method=init_method, rank=rank, world_size=world_size
+    )
+    try:
+        return func(rank)
+    finally:
+        torch.distributed.destroy_process_group()
+
+
+def _run_workers(tmp_path, func, world_size=2):
+    init_method = f"file://{tmp_path}/init"
+    with ProcessPoolExecutor(max_workers=world_size) as e:
+        futures = [
+            e.submit(_run, init_method, rank, world_size, func)
+            for rank in range(world_size)
+        ]
+        return [f.result() for f in futures]
+
+
+def test_recursive_average():
+    stats = {"loss": torch.tensor([1.0, 3.0]), "acc": None}
+    stats, weight = recursive_average(stats, torch.tensor([1, 3]))
+    assert stats["loss"].item() == 2.5
+    assert stats["acc"] is None
+    assert weight.item() == 4
+
+
+def _all_reduce(rank):
+    obj = {"a": torch.tensor(rank + 1.0), "b": [torch.tensor([rank, 1]), None]}
+    return recursive_all_reduce(obj)
+
+
+def test_recursive_all_reduce(tmp_path):
+    for obj in _run_workers(tmp_path, _all_reduce):
+        assert obj["a"].item() == 3.0
+        assert obj["b"][0].dtype == torch.int64
+        assert obj["b"][0].tolist() == [1, 2]
+        assert obj["b"][1] is None
+
+
+def _average(rank):
+    stats = {"loss": torch.tensor([1.0, 3.0]) + rank * 4}
+    stats, weight = recursive_average(stats, torch.tensor([1, 3]), distributed=True)
+    return stats["loss"].item(), weight.item()
+
+
+def test_recursive_average_distributed(tmp_path):
+    # (1 * 1 + 3 * 3 + 5 * 1 + 7 * 3) / 8
+    assert _run_workers(tmp_path, _average) == [(4.5, 8), (4.5, 8)]
+
+
+def _accumulate(rank):
+    reporter = Reporter()
+    accumulator = StatsAccumulator(distributed=True)
+    with reporter.observe("train", 1) as sub_reporter:
+        for i in range(3):
+            # Registered at each step by the trainer
+            sub_reporter.register({"iter_time": 0.1})
+            accumulator.add({"loss": torch.tensor(float(rank + i))}, torch.tensor(2))
+            if i == 1:
+                accumulator.flush(sub_reporter)
+            if i == 2:
+                accumulator.flush(sub_reporter)
+            sub_reporter.next()
+    return reporter.get_value("train", "loss")
+
+
+def test_StatsAccumulator(tmp_path):
+    # The average of 0, 1, 1, 2, 2, 3
+    assert _run_workers(tmp_path, _accumulate) == [1.5, 1.5]
+
+
+def test_StatsAccumulator_local():
+    reporter = Reporter()
+    accumulator = StatsAccumulator()
+    with reporter.observe("train", 1) as sub_reporter:
+        accumulator.add({"loss": torch.tensor(1.0)}, torch.tensor(1))
+        accumulator.add({"loss": torch.tensor(4.0)}, torch.tensor(3))
+        accumulator.flush(sub_reporter)
+        sub_reporter.next()
+    assert reporter.get_value("train", "loss") == 3.25
+    assert len(accumulator) == 0
+
+
+def test_StatsAccumulator_non_finite():
+    reporter = Reporter()
+    accumulator = StatsAccumulator()
+    with reporter.observe("train", 1) as sub_reporter:
+        accumulator.add({"loss": torch.tensor(1.0)}, torch.tensor(1))
+        # e.g. inf CTC loss in a step
+        accumulator.add({"loss": torch.tensor(float("inf"))}, torch.tensor(2))
+        accumulator.add({"loss": torch.tensor(4.0)}, torch.tensor(3))
+        accumulator.flush(sub_reporter)
+        sub_reporter.next()
+    # Only the non-finite step is excluded
+    assert reporter.get_value("train", "loss") == 3.25
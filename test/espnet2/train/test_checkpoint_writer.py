@@ -0,0 +1,56 @@
+import pytest
+import torch
+
+from espnet2.train.checkpoint_writer import CheckpointWriter
+from espnet2.train.checkpoint_writer import snapshot_state
+
+
+def test_snapshot_state():
+    model = torch.nn.Linear(2, 2)
+    state = {"model": model.state_dict(), "stats": {1: [1.0]}}
+    snapshot = snapshot_state(state)
+    with torch.no_grad():
+        model.weight.add_(1.0)
+    state["stats"][2] = [2.0]
+    assert not torch.equal(snapshot["model"]["weight"], model.weight)
+    assert list(snapshot["stats"]) == [1]
+    assert snapshot["model"]._metadata == state["model"]._metadata
+
+
+def test_snapshot_state_shared_tensor():
+    x = torch.randn(3)
+    snapshot = snapshot_state([{"a": x}, x])
+    assert snapshot[0]["a"] is snapshot[1]
+
+
+@pytest.mark.parametrize("asynchronous", [True, False])
+def test_CheckpointWriter(tmp_path, asynchronous):
+    model = torch.nn.Linear(2, 2)
+    expected = {k: v.clone() for k, v in model.state_dict().items()}
+    writer = CheckpointWriter(asynchronous)
+    writer.save(
+        [
+            ({"model": model.state_dict()}, tmp_path / "checkpoint.pth"),
+            (model.state_dict(), tmp_path / "1epoch.pth"),
+        ]
+    )
+    with torch.no_grad():
+        model.weight.add_(1.0)
+    writer.wait()
+
+    for k, v in torch.load(tmp_path / "1epoch.pth").items():
+        assert torch.equal(v, expected[k])
+    assert list(torch.load(tmp_path / "checkpoint.pth")) == ["model"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "1epoch.pth",
+        "checkpoint.pth",
+    ]
+
+
+def test_CheckpointWriter_error(tmp_path):
+    writer = CheckpointWriter()
+    writer.save([({}, tmp_path / "not_found" / "checkpoint.pth")])
+    with pytest.raises((OSError, RuntimeError)):
+        writer.wait()
+    # The error is raised only once
+    writer.wait()
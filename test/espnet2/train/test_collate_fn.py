@@ -1,8 +1,11 @@
 import numpy as np
 import pytest
+import torch
 
+from espnet.nets.pytorch_backend.nets_utils import pad_list
 from espnet2.train.collate_fn import common_collate_fn
 from espnet2.train.collate_fn import CommonCollateFn
+from espnet2.train.collate_fn import pad_arrays
 
 
 @pytest.mark.parametrize(
@@ -121,3 +124,35 @@ def test_CommonCollateFn_repr(float_pad_value, int_pad_value, not_sequence):
             not_sequence=not_sequence,
         )
     )
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64, np.int64, np.bool_])
+@pytest.mark.parametrize("shared_memory", [True, False])
+def test_pad_arrays(dtype, shared_memory):
+    arrays = [
+        np.random.randn(3, 2).astype(dtype),
+        np.random.randn(1, 2).astype(dtype),
+        np.random.randn(4, 2).astype(dtype),
+    ]
+    tensor = pad_arrays(arrays, 0, shared_memory=shared_memory)
+    desired = pad_list([torch.from_numpy(a) for a in arrays], 0)
+    assert tensor.dtype == desired.dtype
+    assert tensor.is_shared() == shared_memory
+    np.testing.assert_array_equal(tensor.numpy(), desired.numpy())
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="Require cuda")
+def test_pad_arrays_pin_memory():
+    tensor = pad_arrays([np.zeros(3), np.ones(2)], -1, pin_memory=True)
+    assert tensor.is_pinned()
+
+
+def test_common_collate_fn_in_worker():
+    data = [(str(i), dict(a=np.random.randn(i + 1, 5))) for i in range(4)]
+    loader = torch.utils.data.DataLoader(
+        data, batch_size=4, collate_fn=common_collate_fn, num_workers=1
+    )
+    _, batch = next(iter(loader))
+    _, desired = common_collate_fn(data)
+    np.testing.assert_array_equal(batch["a"].numpy(), desired["a"].numpy())
+    np.testing.assert_array_equal(batch["a_lengths"], [1, 2, 3, 4])
@@ -2,6 +2,7 @@ import h5py
 import kaldiio
 import numpy as np
 import pytest
+import torch
 
 from espnet2.fileio.npy_scp import NpyScpWriter
 from espnet2.fileio.sound_scp import SoundScpWriter
@@ -106,6 +107,33 @@ def test_ESPnetDataset_npy_scp(npy_scp):
     )
 
 
+@pytest.mark.parametrize("max_cache_size", ["1MB", float("inf")])
+def test_ESPnetDataset_cache(npy_scp, max_cache_size):
+    dataset = ESPnetDataset(
+        path_name_type_list=[(npy_scp, "data3", "npy")],
+        max_cache_size=max_cache_size,
+    )
+    _, data = dataset["a"]
+    assert len(dataset.cache) == 1
+    _, data2 = dataset["a"]
+    np.testing.assert_array_equal(data["data3"], data2["data3"])
+
+
+def test_ESPnetDataset_cache_shared_by_workers(npy_scp):
+    dataset = ESPnetDataset(
+        path_name_type_list=[(npy_scp, "data3", "npy")],
+        max_cache_size="1MB",
+    )
+    loader = torch.utils.data.DataLoader(
+        dataset, batch_size=None, sampler=["a", "b"], num_workers=2
+    )
+    for _ in loader:
+        pass
+    # The samples loaded by the workers are cached in the shared memory
+    assert len(dataset.cache) == 2
+    assert "a" in dataset.cache
+
+
 @pytest.fixture
 def h5file_1(tmp_path):
     p = tmp_path / "file.h5"
@@ -289,3 +317,34 @@ def test_ESPnetDataset_csv_int(csv_int):
 
     _, data = dataset["b"]
     assert tuple(data["data8"]) == (2, 3, 4)
+
+
+@pytest.fixture
+def rttm(tmp_path):
+    p = tmp_path / "rttm"
+    with p.open("w") as f:
+        f.write("SPEAKER a 1 0 10 <NA> <NA> spk1 <NA>\n")
+        f.write("SPEAKER b 1 5 15 <NA> <NA> spk1 <NA>\n")
+        f.write("SPEAKER a 1 8 19 <NA> <NA> spk2 <NA>\n")
+        f.write("END     a <NA> <NA> 20 <NA> <NA> <NA> <NA>\n")
+        f.write("END     b <NA> <NA> 16 <NA> <NA> <NA> <NA>\n")
+    return str(p)
+
+
+def test_ESPnetDataset_lazy_index(sound_scp, npy_scp, text, text_int, rttm):
+    path_name_type_list = [
+        (sound_scp, "data1", "sound"),
+        (npy_scp, "data3", "npy"),
+        (text, "data6", "text"),
+        (text_int, "data7", "text_int"),
+        (rttm, "data8", "rttm"),
+    ]
+    desired = ESPnetDataset(path_name_type_list, preprocess=preprocess)
+    target = ESPnetDataset(path_name_type_list, preprocess=preprocess, lazy_index=True)
+    assert list(target) == list(desired)
+    for key in ("a", "b"):
+        d = desired[key][1]
+        t = target[key][1]
+        assert set(t) == set(d)
+        for name in d:
+            np.testing.assert_array_equal(t[name], d[name])
@@ -290,3 +290,45 @@ def test_ESPnetDataset_csv_int(csv_int):
             assert tuple(data["data8"]) == (0, 1, 2)
         if key == "b":
             assert tuple(data["data8"]) == (2, 3, 4)
+
+
+@pytest.fixture
+def long_text_int(tmp_path):
+    p = tmp_path / "long_text_int"
+    with p.open("w") as f:
+        for i in range(100):
+            f.write(f"utt{i:03d} " + " ".join(["1"] * (i % 7 + 1)) + "\n")
+    return str(p)
+
+
+def test_IterableESPnetDataset_shuffle_buffer(long_text_int):
+    dataset = IterableESPnetDataset(
+        path_name_type_list=[(long_text_int, "data1", "text_int")],
+        shuffle_buffer_size=10,
+    )
+    keys = [k for k, _ in dataset]
+    assert keys != sorted(keys)
+    assert sorted(keys) == [f"utt{i:03d}" for i in range(100)]
+    # Reproducible in the same epoch, and different in the next epoch
+    assert keys == [k for k, _ in dataset]
+    dataset.set_epoch(2)
+    assert keys != [k for k, _ in dataset]
+
+
+@pytest.mark.parametrize("num_workers", [0, 3])
+def test_IterableESPnetDataset_shard(long_text_int, num_workers):
+    from torch.utils.data import DataLoader
+
+    dataset = IterableESPnetDataset(
+        path_name_type_list=[(long_text_int, "data1", "text_int")],
+        shuffle_buffer_size=5,
+    )
+    # Emulate the ranks of distributed training
+    keys = []
+    for rank in range(2):
+        dataset.rank, dataset.world_size = rank, 2
+        loader = DataLoader(
+            dataset, batch_size=None, num_workers=num_workers, collate_fn=lambda x: x
+        )
+        keys += [k for k, _ in loader]
+    assert sorted(keys) == [f"utt{i:03d}" for i in range(100)]
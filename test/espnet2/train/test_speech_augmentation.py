@@ -0,0 +1,113 @@
+import pickle
+
+import numpy as np
+import pytest
+import scipy.signal
+import soundfile
+
+from espnet2.train.collate_fn import BatchPreprocessCollateFn
+from espnet2.train.collate_fn import CommonCollateFn
+from espnet2.train.preprocessor import CommonPreprocessor
+from espnet2.train.speech_augmentation import AudioBank
+from espnet2.train.speech_augmentation import SpeechAugmenter
+
+
+def write_scp(tmp_path, name, wavs):
+    with (tmp_path / f"{name}.scp").open("w") as f:
+        for i, wav in enumerate(wavs):
+            path = tmp_path / f"{name}{i}.wav"
+            soundfile.write(path, wav, 16000, subtype="FLOAT")
+            f.write(f"{name}{i} {path}\n")
+    return str(tmp_path / f"{name}.scp")
+
+
+@pytest.fixture()
+def rir_scp(tmp_path):
+    rng = np.random.RandomState(0)
+    wavs = [
+        rng.randn(300) * np.exp(-np.arange(300) / 50),
+        rng.randn(120),
+        rng.randn(200, 2),
+    ]
+    return write_scp(tmp_path, "rir", wavs)
+
+
+@pytest.fixture()
+def noise_scp(tmp_path):
+    rng = np.random.RandomState(1)
+    return write_scp(tmp_path, "noise", [rng.randn(500), rng.randn(3000)])
+
+
+@pytest.mark.parametrize("max_size", ["8GB", 0])
+def test_AudioBank(rir_scp, max_size):
+    bank = AudioBank(rir_scp, max_size=max_size)
+    assert len(bank) == 3
+    for i, path in enumerate(bank.paths):
+        desired, _ = soundfile.read(path, dtype=np.float32, always_2d=True)
+        np.testing.assert_array_equal(bank.read(i), desired.T)
+        np.testing.assert_array_equal(bank.read(i, 10, 20), desired.T[:, 10:30])
+
+
+def test_AudioBank_pickle(rir_scp):
+    bank = AudioBank(rir_scp)
+    bank2 = pickle.loads(pickle.dumps(bank))
+    np.testing.assert_array_equal(bank.read(2), bank2.read(2))
+
+
+@pytest.mark.parametrize("speech_channels", [1, 2])
+def test_SpeechAugmenter_convolve_batch(rir_scp, speech_channels):
+    augmenter = SpeechAugmenter(rir_scp=rir_scp)
+    rng = np.random.RandomState(0)
+    speeches = [
+        rng.randn(speech_channels, length).astype(np.float32)
+        for length in [100, 1000, 2500]
+    ]
+    rir_ids = [2, 0, 1]
+    outputs = augmenter.convolve_batch(speeches, rir_ids)
+    for x, i, y in zip(speeches, rir_ids, outputs):
+        rir = augmenter.rirs.read(i).astype(np.float64)
+        desired = scipy.signal.convolve(x, rir, mode="full")[:, : x.shape[1]]
+        assert y.dtype == np.float32
+        np.testing.assert_allclose(y, desired, rtol=1e-4, atol=1e-4)
+    # The spectra of the RIRs are cached
+    assert len(augmenter.rir_spectra) == 3
+
+
+def test_SpeechAugmenter_augment_batch(rir_scp, noise_scp):
+    augmenter = SpeechAugmenter(
+        rir_scp=rir_scp,
+        rir_apply_prob=0.7,
+        noise_scp=noise_scp,
+        noise_apply_prob=0.7,
+    )
+    rng = np.random.RandomState(0)
+    speeches = [rng.randn(length).astype(np.float32) for length in [800, 2000, 1500]]
+
+    np.random.seed(0)
+    outputs = augmenter.augment_batch(speeches)
+    np.random.seed(0)
+    desired = [augmenter(speech) for speech in speeches]
+    for y, y2 in zip(outputs, desired):
+        assert y.dtype == np.float32
+        np.testing.assert_allclose(y, y2, rtol=1e-5, atol=1e-6)
+        assert np.max(np.abs(y)) <= 1.0
+
+
+def test_CommonPreprocessor_batch_augmentation(rir_scp, noise_scp):
+    preprocessor = CommonPreprocessor(
+        train=True,
+        rir_scp=rir_scp,
+        noise_scp=noise_scp,
+        batch_augmentation=True,
+    )
+    collate_fn = BatchPreprocessCollateFn(preprocessor, CommonCollateFn())
+    rng = np.random.RandomState(0)
+    data = [
+        (f"utt{i}", preprocessor(f"utt{i}", dict(speech=rng.randn(length))))
+        for i, length in enumerate([800, 2000])
+    ]
+    # The augmentation is deferred
+    assert data[0][1]["speech"].ndim == 1
+    _, batch = collate_fn(data)
+    assert batch["speech"].shape[:2] == (2, 2000)
+    assert batch["speech_lengths"].tolist() == [800, 2000]
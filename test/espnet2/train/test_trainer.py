@@ -0,0 +1,196 @@
+from concurrent.futures.process import ProcessPoolExecutor
+import functools
+
+import pytest
+import torch
+from torch.nn.parallel import DistributedDataParallel
+
+from espnet2.tasks.asr import ASRTask
+from espnet2.torch_utils.device_funcs import force_gatherable
+from espnet2.train.abs_espnet_model import AbsESPnetModel
+from espnet2.train.distributed_utils import DistributedOption
+from espnet2.train.reporter import Reporter
+from espnet2.train.trainer import Trainer
+
+
+class Model(AbsESPnetModel):
+    def __init__(self):
+        super().__init__()
+        self.layer = torch.nn.Linear(1, 1)
+        self.forwarded = []
+
+    def collect_feats(self):
+        return {}
+
+    def forward(self, x, x_lengths):
+        self.forwarded.append(int(x[0, 0]))
+        loss = self.layer(x).mean()
+        return force_gatherable(
+            {"loss": loss, "stats": {"loss": loss.detach()}, "weight": len(x)},
+            device=x.device,
+        )
+
+
+class Profiler:
+    def __init__(self, model):
+        self.model = model
+        self.steps = []
+
+    def step(self):
+        # The index of the mini-batch forwarded before this step
+        self.steps.append(self.model.forwarded[-1])
+
+
+def train_one_epoch(
+    tmp_path, model, num_batches, profiler, first_batch=0, distributed=False, **kwargs
+):
+    args = ASRTask.get_parser().parse_args(["--output_dir", str(tmp_path)])
+    for k, v in kwargs.items():
+        setattr(args, k, v)
+    options = Trainer.build_options(args)
+    iterator = [
+        ([f"utt{i}"], {"x": torch.full((1, 1), float(i)), "x_lengths": torch.ones(1)})
+        for i in range(first_batch, first_batch + num_batches)
+    ]
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    reporter = Reporter()
+    with reporter.observe("train") as sub_reporter:
+        Trainer.train_one_epoch(
+            model=model,
+            iterator=iterator,
+            optimizers=[optimizer],
+            schedulers=[None],
+            scaler=None,
+            reporter=sub_reporter,
+            summary_writer=None,
+            options=options,
+            distributed_option=DistributedOption(distributed=distributed),
+            profiler=profiler,
+        )
+    return reporter
+
+
+@pytest.mark.parametrize("accum_grad", [1, 2])
+def test_train_one_epoch_profiler_step(tmp_path, accum_grad):
+    model = Model()
+    profiler = Profiler(model)
+    train_one_epoch(tmp_path, model, 5, profiler, accum_grad=accum_grad)
+    # Each step of the profiler follows the step of its mini-batch
+    assert profiler.steps == [0, 1, 2, 3, 4]
+
+
+def test_train_one_epoch_profiler_trace(tmp_path):
+    model = Model()
+    profiler = Trainer._build_profiler(1, 3, tmp_path / "profiler")
+    with profiler:
+        train_one_epoch(tmp_path, model, 5, profiler)
+    assert profiler.step_num == 5
+    assert len(list((tmp_path / "profiler").iterdir())) == 1
+
+
+def _run(init_method, rank, world_size, func):
+    torch.distributed.init_process_group(
+        backend="gloo", init_method=init_method, rank=rank, world_size=world_size
+    )
+    try:
+        return func(rank)
+    finally:
+        torch.distributed.destroy_process_group()
+
+
+def _run_workers(tmp_path, func, world_size=2):
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    init_method = f"file://{tmp_path}/init"
+    with ProcessPoolExecutor(max_workers=world_size) as e:
+        futures = [
+            e.submit(_run, init_method, rank, world_size, func)
+            for rank in range(world_size)
+        ]
+        return [f.result() for f in futures]
+
+
+class DDPWithoutNoSync(DistributedDataParallel):
+    @property
+    def no_sync(self):
+        raise AttributeError("no_sync")
+
+
+def _train_accum_grad(rank, tmp_path, ddp_class):
+    torch.manual_seed(0)
+    model = Model()
+    # The mini-batches of x=1,2 in rank 0 and x=3,4 in rank 1
+    train_one_epoch(
+        tmp_path / f"rank{rank}",
+        ddp_class(model),
+        2,
+        None,
+        first_batch=1 + 2 * rank,
+        distributed=True,
+        accum_grad=2,
+    )
+    return [p.detach() for p in model.parameters()]
+
+
+def test_train_one_epoch_accum_grad_no_sync(tmp_path):
+    results = {}
+    for ddp_class in (DistributedDataParallel, DDPWithoutNoSync):
+        results[ddp_class] = _run_workers(
+            tmp_path / ddp_class.__name__,
+            functools.partial(
+                _train_accum_grad, tmp_path=tmp_path, ddp_class=ddp_class
+            ),
+        )
+    # One SGD step (lr=0.1) with the gradients averaged over the 4 mini-batches,
+    # where the loss of a mini-batch is w * x + b
+    torch.manual_seed(0)
+    weight, bias = Model().parameters()
+    expected = [weight.detach() - 0.1 * 2.5, bias.detach() - 0.1 * 1.0]
+    for params in results[DistributedDataParallel] + results[DDPWithoutNoSync]:
+        for p, e in zip(params, expected):
+            torch.testing.assert_close(p, e)
+
+
+def _train_uneven(rank, tmp_path, num_batches):
+    torch.manual_seed(0)
+    model = Model()
+    # No update of the parameters in the epoch with the large accum_grad,
+    # so that the loss of each mini-batch is w * x + b with the initial ones
+    reporter = train_one_epoch(
+        tmp_path / f"rank{rank}",
+        model,
+        num_batches[rank],
+        None,
+        first_batch=10 * rank,
+        distributed=True,
+        accum_grad=100,
+        stats_reduce_interval=2,
+    )
+    loss = reporter.get_value("train", "loss") if len(model.forwarded) > 0 else None
+    return model.forwarded, loss
+
+
+@pytest.mark.parametrize(
+    "num_batches, expected",
+    [
+        # Both processes stop at the last step of the process having fewer batches
+        ((5, 3), [[0, 1, 2], [10, 11, 12]]),
+        ((3, 5), [[0, 1, 2], [10, 11, 12]]),
+        # A process having no mini-batch stops the others before the first step
+        ((3, 0), [[], []]),
+        ((0, 0), [[], []]),
+    ],
+)
+def test_train_one_epoch_distributed_stop(tmp_path, num_batches, expected):
+    results = _run_workers(
+        tmp_path / "workers",
+        functools.partial(_train_uneven, tmp_path=tmp_path, num_batches=num_batches),
+    )
+    assert [forwarded for forwarded, _ in results] == expected
+    if len(expected[0]) > 0:
+        torch.manual_seed(0)
+        weight, bias = Model().parameters()
+        xs = torch.tensor(expected[0] + expected[1], dtype=torch.float)
+        # The stats are averaged over the steps of both processes
+        expected_loss = (weight * xs.mean() + bias).item()
+        for _, loss in results:
+            assert loss == pytest.approx(expected_loss, rel=1e-5)
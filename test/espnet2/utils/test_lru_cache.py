@@ -0,0 +1,196 @@
+import multiprocessing
+import os
+import pickle
+
+import numpy as np
+import pytest
+import torch
+
+from espnet2.utils.lru_cache import get_nbytes
+from espnet2.utils.lru_cache import LRUCache
+from espnet2.utils.lru_cache import SharedLRUCache
+
+
+def test_get_nbytes():
+    x = np.random.randn(10)
+    y = torch.randn(3, 4)
+    assert get_nbytes(x) == 80
+    assert get_nbytes(y) == 48
+    assert get_nbytes({"a": x, "bc": [y, "d"]}) == 1 + 80 + 2 + 48 + 1
+
+
+def test_LRUCache_size():
+    d = LRUCache(max_size=1000)
+    assert d.size == 0
+
+    d["a"] = np.zeros(10)
+    assert d.size == 81
+    d["b"] = np.zeros(10)
+    assert d.size == 162
+
+    # Overwrite
+    d["b"] = np.zeros(20)
+    assert d.size == 242
+    del d["a"]
+    assert d.size == 161
+
+
+def test_LRUCache_evict():
+    d = LRUCache(max_size=250)
+    d["a"] = np.zeros(10)
+    d["b"] = np.zeros(10)
+    d["c"] = np.zeros(10)
+    # "a" is used recently and "b" is evicted
+    d["a"]
+    d["d"] = np.zeros(10)
+    assert list(d) == ["c", "a", "d"]
+    assert d.size == 243
+
+    # Too large to cache
+    d["e"] = np.zeros(100)
+    assert "e" not in d
+    assert len(d) == 3
+
+
+def test_SharedLRUCache_getitem():
+    d = SharedLRUCache(max_size=1000)
+    value = {"speech": np.random.randn(10).astype(np.float32), "text": "abc"}
+    d["a"] = value
+    assert "a" in d
+    assert "b" not in d
+    assert len(d) == 1
+    actual = d["a"]
+    np.testing.assert_array_equal(actual["speech"], value["speech"])
+    assert actual["text"] == value["text"]
+    assert d.get("b") is None
+    with pytest.raises(KeyError):
+        d["b"]
+
+    del d["a"]
+    assert len(d) == 0
+    assert d.size == 0
+
+
+def test_SharedLRUCache_evict():
+    x = np.random.randn(100)
+    d = SharedLRUCache(max_size=3000)
+    for k in ("a", "b", "c"):
+        d[k] = x
+    size = d.size
+    assert size <= 3000
+    # "a" is used recently and "b" is evicted
+    d["a"]
+    d["d"] = x
+    assert "b" not in d
+    for k in ("a", "c", "d"):
+        np.testing.assert_array_equal(d[k], x)
+    assert d.size == size
+
+    # Too large to cache
+    d["e"] = np.random.randn(1000)
+    assert "e" not in d
+
+
+def test_SharedLRUCache_compact():
+    small = np.random.randn(50)
+    large = np.random.randn(80)
+    small_size = len(pickle.dumps(small, protocol=pickle.HIGHEST_PROTOCOL))
+    large_size = len(pickle.dumps(large, protocol=pickle.HIGHEST_PROTOCOL))
+    assert small_size < large_size <= 2 * small_size
+    d = SharedLRUCache(max_size=4 * small_size)
+    for k in ("a", "b", "c", "d"):
+        d[k] = small
+    del d["a"]
+    del d["c"]
+    # The free space is fragmented into two gaps
+    d["e"] = large
+    assert len(d) == 3
+    np.testing.assert_array_equal(d["b"], small)
+    np.testing.assert_array_equal(d["d"], small)
+    np.testing.assert_array_equal(d["e"], large)
+
+
+def test_SharedLRUCache_max_entries():
+    d = SharedLRUCache(max_size=10000, max_entries=2)
+    d["a"] = 1
+    d["b"] = 2
+    d["c"] = 3
+    assert len(d) == 2
+    assert "a" not in d
+    assert d["c"] == 3
+
+
+def _set(d, key, value):
+    d[key] = value
+
+
+@pytest.mark.execution_timeout(10)
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_SharedLRUCache_shared(method):
+    d = SharedLRUCache(max_size=10000)
+    x = np.random.randn(10)
+
+    mp = multiprocessing.get_context(method)
+    p = mp.Process(target=_set, args=(d, "a", x))
+    p.start()
+    p.join()
+    assert p.exitcode == 0
+    np.testing.assert_array_equal(d["a"], x)
+
+
+def test_SharedLRUCache_lazy_allocation():
+    d = SharedLRUCache(max_size=1 << 30)
+    # The entries are limited by the size instead of the fixed number
+    assert d.max_entries == (1 << 30) // 4096
+    # The arena isn't allocated until it's filled
+    assert os.stat(d.path).st_blocks * 512 < (1 << 26)
+    d["a"] = np.zeros(1 << 20, dtype=np.uint8)
+    assert os.stat(d.path).st_blocks * 512 < (1 << 27)
+    np.testing.assert_array_equal(d["a"], np.zeros(1 << 20, dtype=np.uint8))
+
+
+def test_SharedLRUCache_out_of_memory(monkeypatch):
+    d = SharedLRUCache(max_size=10 * SharedLRUCache._CHUNK)
+    x = np.zeros(SharedLRUCache._CHUNK, dtype=np.uint8)
+    d["a"] = x
+    d["b"] = x
+
+    def posix_fallocate(fd, offset, length):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "posix_fallocate", posix_fallocate)
+    # The cache doesn't grow and the least recently used entry is evicted
+    d["a"]
+    d["c"] = x
+    assert "b" not in d
+    np.testing.assert_array_equal(d["a"], x)
+    np.testing.assert_array_equal(d["c"], x)
+
+
+def test_SharedLRUCache_hash_collision(monkeypatch):
+    # All the keys are hashed to the same row of the hash table
+    monkeypatch.setattr(
+        SharedLRUCache, "hash_key", staticmethod(lambda key: (1, int(key)))
+    )
+    d = SharedLRUCache(max_size=10000)
+    for i in range(10):
+        d[str(i)] = i
+    for i in range(0, 10, 3):
+        del d[str(i)]
+    for i in range(10):
+        if i % 3 == 0:
+            assert str(i) not in d
+        else:
+            assert d[str(i)] == i
+    assert len(d) == 6
+
+
+def test_SharedLRUCache_shards():
+    d = SharedLRUCache(max_size=10000, max_entries=8, num_shards=4)
+    for i in range(100):
+        d[str(i)] = i
+    # Each shard keeps 2 entries
+    assert len(d) == 8
+    for i in range(92, 100):
+        if str(i) in d:
+            assert d[str(i)] == i
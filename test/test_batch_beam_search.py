@@ -1,4 +1,5 @@
 from argparse import Namespace
+import json
 
 import numpy
 import os
@@ -7,10 +8,13 @@ import torch
 
 from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.batch_beam_search import BeamSearch
+from espnet.nets.batch_beam_search_multi_utt import BatchBeamSearchMultiUtt
 from espnet.nets.beam_search import Hypothesis
+from espnet.nets.beam_search_profiler import BeamSearchProfiler
 from espnet.nets.lm_interface import dynamic_import_lm
 from espnet.nets.scorers.length_bonus import LengthBonus
 from espnet.nets.scorers.ngram import NgramFullScorer
+from espnet.nets.scorers.ngram import NgramPartScorer
 
 from test.test_beam_search import prepare
 from test.test_beam_search import transformer_args
@@ -189,3 +193,200 @@ def test_batch_beam_search_equal(
         numpy.testing.assert_allclose(
             expected.score.cpu(), actual.score.cpu(), rtol=1e-6
         )
+
+
+@pytest.mark.parametrize("beam_class", [BeamSearch, BatchBeamSearch])
+def test_beam_search_profiler(beam_class):
+    torch.manual_seed(123)
+    model, x, ilens, y, data, train_args = prepare(
+        "transformer", transformer_args, mtlalpha=0.5
+    )
+    model.eval()
+    char_list = train_args.char_list
+    scorers = model.scorers()
+    scorers["length_bonus"] = LengthBonus(len(char_list))
+    beam = beam_class(
+        beam_size=3,
+        vocab_size=len(char_list),
+        weights=dict(decoder=0.5, ctc=0.5, length_bonus=0.1),
+        scorers=scorers,
+        sos=model.sos,
+        eos=model.eos,
+        pre_beam_score_key="full",
+    )
+    beam.profiler = BeamSearchProfiler()
+    with torch.no_grad():
+        enc = model.encode(x[0, : ilens[0]])
+        nbest = beam(x=enc, maxlenratio=0.0, minlenratio=0.0)
+    summary = beam.profiler.summary()
+    assert summary["n_steps"] == len(summary["timeline"]) > 0
+    for k in ("decoder", "ctc", "length_bonus", "pre_beam", "post_process"):
+        assert summary["components"][k]["calls"] > 0
+        assert summary["components"][k]["n_hyps"] >= summary["n_steps"]
+    assert summary["pre_beam"]["max_size"] == beam.pre_beam_size
+    assert summary["timeline"][0]["n_hyps"] == 1
+    assert set(summary["timeline"][0]["components"]) >= {"decoder", "ctc"}
+    json.dumps(summary)
+
+    # the total profile is accumulated over the searches
+    with torch.no_grad():
+        assert beam(x=enc, maxlenratio=0.0, minlenratio=0.0)[0].yseq.tolist() == (
+            nbest[0].yseq.tolist()
+        )
+    total = beam.profiler.summary(total=True)
+    assert total["n_searches"] == 2
+    assert total["n_steps"] == summary["n_steps"] * 2
+
+
+def prepare_pruning_beam(beam_class, **kwargs):
+    torch.manual_seed(123)
+    model, x, ilens, y, data, train_args = prepare(
+        "transformer", transformer_args, mtlalpha=0.5
+    )
+    model.eval()
+    beam = beam_class(
+        beam_size=3,
+        vocab_size=len(train_args.char_list),
+        weights=dict(decoder=0.5, ctc=0.5),
+        scorers=model.scorers(),
+        sos=model.sos,
+        eos=model.eos,
+        pre_beam_score_key="full",
+        **kwargs,
+    )
+    beam.profiler = BeamSearchProfiler()
+    with torch.no_grad():
+        enc = model.encode(x[0, : ilens[0]])
+    return beam, enc
+
+
+@pytest.mark.parametrize("beam_class", [BeamSearch, BatchBeamSearch])
+@pytest.mark.parametrize(
+    "pruning",
+    [
+        dict(beam_threshold=0.0),
+        dict(dynamic_beam_mass=1e-6),
+        dict(beam_threshold=0.0, min_beam_size=2),
+    ],
+)
+def test_beam_search_pruning(beam_class, pruning):
+    beam, enc = prepare_pruning_beam(beam_class, **pruning)
+    with torch.no_grad():
+        nbest = beam(x=enc, maxlenratio=0.0, minlenratio=0.0)
+    assert len(nbest) > 0
+    summary = beam.profiler.summary()
+    assert summary["components"]["prune"]["calls"] == summary["n_steps"]
+    n_hyps = [step["n_hyps"] for step in summary["timeline"]]
+    assert max(n_hyps) <= pruning.get("min_beam_size", 1)
+
+
+@pytest.mark.parametrize("beam_class", [BeamSearch, BatchBeamSearch])
+def test_beam_search_pruning_disabled(beam_class):
+    beam, enc = prepare_pruning_beam(beam_class)
+    loose_beam, _ = prepare_pruning_beam(beam_class, beam_threshold=1e10)
+    with torch.no_grad():
+        expected = beam(x=enc, maxlenratio=0.0, minlenratio=0.0)
+        actual = loose_beam(x=enc, maxlenratio=0.0, minlenratio=0.0)
+    assert [h.yseq.tolist() for h in actual] == [h.yseq.tolist() for h in expected]
+    assert [step["n_hyps"] for step in beam.profiler.summary()["timeline"]] == [
+        step["n_hyps"] for step in loose_beam.profiler.summary()["timeline"]
+    ]
+
+
+@pytest.mark.parametrize("beam_class", [BeamSearch, BatchBeamSearch])
+def test_beam_search_early_stop(beam_class):
+    beam, enc = prepare_pruning_beam(beam_class)
+    early_beam, _ = prepare_pruning_beam(beam_class, early_stop=True)
+    with torch.no_grad():
+        expected = beam(x=enc, maxlenratio=0.0, minlenratio=0.0)
+        actual = early_beam(x=enc, maxlenratio=0.0, minlenratio=0.0)
+    assert actual[0].yseq.tolist() == expected[0].yseq.tolist()
+    assert early_beam.is_dominated(
+        beam.init_hyp(enc), [actual[0]._replace(score=torch.tensor(1.0))]
+    )
+    assert (
+        early_beam.profiler.summary()["n_steps"] <= beam.profiler.summary()["n_steps"]
+    )
+
+
+@pytest.mark.parametrize(
+    "pruning",
+    [
+        dict(beam_threshold=1.0),
+        dict(dynamic_beam_mass=0.9, min_beam_size=2),
+        dict(early_stop=True),
+    ],
+)
+def test_batch_beam_search_multi_utt_pruning(pruning):
+    beam, enc = prepare_pruning_beam(BatchBeamSearch, **pruning)
+    multi_beam, _ = prepare_pruning_beam(BatchBeamSearchMultiUtt, **pruning)
+    enc_lens = torch.tensor([enc.size(0), enc.size(0) // 2])
+    encs = torch.stack([enc, enc])
+    with torch.no_grad():
+        nbest_list = multi_beam(
+            x=encs, maxlenratio=0.0, minlenratio=0.0, x_lens=enc_lens
+        )
+        for e, l, nbest in zip(encs, enc_lens, nbest_list):
+            expected = beam(x=e[:l], maxlenratio=0.0, minlenratio=0.0)
+            assert nbest[0].yseq.tolist() == expected[0].yseq.tolist()
+
+
+@pytest.mark.parametrize(
+    "pruning",
+    [
+        dict(beam_threshold=0.0),
+        dict(dynamic_beam_mass=1e-6, min_beam_size=2),
+    ],
+)
+def test_batch_beam_search_multi_utt_pruning_skips_scoring(pruning):
+    multi_beam, enc = prepare_pruning_beam(BatchBeamSearchMultiUtt, **pruning)
+    enc_lens = torch.tensor([enc.size(0), enc.size(0) // 2])
+    encs = torch.stack([enc, enc])
+    with torch.no_grad():
+        nbest_list = multi_beam(
+            x=encs, maxlenratio=0.0, minlenratio=0.0, x_lens=enc_lens
+        )
+    assert all(len(nbest) > 0 for nbest in nbest_list)
+    summary = multi_beam.profiler.summary()
+    n_hyps = [step["n_hyps"] for step in summary["timeline"]]
+    # the pruned hypotheses are not scored
+    assert max(n_hyps[1:]) <= len(encs) * pruning.get("min_beam_size", 1)
+    for k in ("decoder", "ctc"):
+        assert summary["components"][k]["n_hyps"] == sum(n_hyps)
+
+
+@pytest.mark.parametrize("ngram_class", [NgramFullScorer, NgramPartScorer])
+def test_batch_beam_search_multi_utt_ngram(ngram_class):
+    torch.manual_seed(123)
+    model, x, ilens, y, data, train_args = prepare(
+        "transformer", transformer_args, mtlalpha=0.5
+    )
+    model.eval()
+    root = os.path.dirname(os.path.abspath(__file__))
+    scorers = model.scorers()
+    scorers["ngram"] = ngram_class(
+        os.path.join(root, "beam_search_test.arpa"), train_args.char_list
+    )
+    kwargs = dict(
+        beam_size=3,
+        vocab_size=len(train_args.char_list),
+        weights=dict(decoder=0.5, ctc=0.5, ngram=0.3),
+        scorers=scorers,
+        sos=model.sos,
+        eos=model.eos,
+        pre_beam_score_key="full",
+    )
+    beam = BatchBeamSearch(**kwargs)
+    multi_beam = BatchBeamSearchMultiUtt(**kwargs)
+    with torch.no_grad():
+        enc = model.encode(x[0, : ilens[0]])
+        # The utterances of different lengths
+        enc_lens = torch.tensor([enc.size(0), enc.size(0) // 2])
+        encs = torch.stack([enc, enc])
+        nbest_list = multi_beam(
+            x=encs, maxlenratio=0.0, minlenratio=0.0, x_lens=enc_lens
+        )
+        for e, l, nbest in zip(encs, enc_lens, nbest_list):
+            expected = beam(x=e[:l], maxlenratio=0.0, minlenratio=0.0)
+            assert nbest[0].yseq.tolist() == expected[0].yseq.tolist()
+            assert not torch.isnan(nbest[0].score)
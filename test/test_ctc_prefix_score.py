@@ -0,0 +1,94 @@
+import numpy
+import pytest
+import torch
+
+from espnet.nets.ctc_prefix_score import CTCPrefixScore
+from espnet.nets.ctc_prefix_score import CTCPrefixScoreTH
+from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.scorers.ctc import CTCPrefixScorer
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 32])
+@pytest.mark.parametrize("use_scoring_ids", [False, True])
+@pytest.mark.parametrize("xlen", [20, 15])
+def test_ctc_prefix_score_th(chunk_size, use_scoring_ids, xlen):
+    torch.manual_seed(0)
+    blank, odim, input_length = 0, 6, 20
+    eos = odim - 1
+    x = torch.randn(1, input_length, odim).log_softmax(dim=-1)
+    ref = CTCPrefixScore(x[0, :xlen].numpy(), blank, eos, numpy)
+    scorer = CTCPrefixScoreTH(x.clone(), [xlen], blank, eos, chunk_size=chunk_size)
+
+    labels = numpy.arange(odim)
+    r_ref, s_ref = ref.initial_state(), 0.0
+    state = None
+    y = [eos]
+    for token in [1, 2, 2, 3]:
+        scoring_ids = torch.tensor([[1, 2, 3, eos]]) if use_scoring_ids else None
+        scores, full_state = scorer([y], state, scoring_ids)
+        log_psi_ref, states_ref = ref(y, labels, r_ref)
+
+        targets = scoring_ids[0] if use_scoring_ids else torch.arange(1, odim)
+        numpy.testing.assert_allclose(
+            scores[0, targets].numpy(),
+            (log_psi_ref - s_ref)[targets.numpy()],
+            rtol=1e-4,
+        )
+
+        state = scorer.index_select_state(full_state, torch.tensor([[token]]))
+        r_ref, s_ref = states_ref[token], log_psi_ref[token]
+        y = y + [token]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4])
+def test_ctc_prefix_score_th_batch(chunk_size):
+    torch.manual_seed(0)
+    blank, odim, input_length, n_hyps = 0, 5, 12, 2
+    eos = odim - 1
+    x = torch.randn(2, input_length, odim).log_softmax(dim=-1)
+    xlens = [input_length, 8]
+    batch_scorer = CTCPrefixScoreTH(x.clone(), xlens, blank, eos, chunk_size=chunk_size)
+    y = [[eos, 1], [eos, 2], [eos, 3], [eos, 1]]
+    batch_scores, _ = batch_scorer(y, None)
+    for b, xlen in enumerate(xlens):
+        scorer = CTCPrefixScoreTH(
+            x[b : b + 1, :xlen].clone(), [xlen], blank, eos, chunk_size=chunk_size
+        )
+        scores, _ = scorer(y[b * n_hyps : (b + 1) * n_hyps], None)
+        torch.testing.assert_close(batch_scores[b * n_hyps : (b + 1) * n_hyps], scores)
+
+
+class DummyCTC(torch.nn.Module):
+    def log_softmax(self, x):
+        return torch.log_softmax(x, dim=-1)
+
+
+@pytest.mark.parametrize("window", [0, 10, 40])
+@pytest.mark.parametrize("chunk_size", [1, 4])
+def test_batch_beam_search_ctc_window(window, chunk_size):
+    torch.manual_seed(0)
+    odim, input_length, n_labels = 8, 300, 30
+    eos = odim - 1
+    labels = torch.randint(1, eos, (n_labels,))
+    # peaky posteriors with the labels at every 7 frames after a leading silence
+    # longer than the window
+    x = torch.randn(input_length, odim)
+    x[:, 0] += 10
+    spikes = torch.arange(n_labels) * 7 + 50
+    x[spikes, labels] += 20
+
+    beam_search = BatchBeamSearch(
+        scorers=dict(ctc=CTCPrefixScorer(DummyCTC(), eos, chunk_size, window)),
+        weights=dict(ctc=1.0),
+        beam_size=3,
+        vocab_size=odim,
+        sos=eos,
+        eos=eos,
+        pre_beam_score_key=None,
+    )
+    nbest = beam_search(x=x, maxlenratio=0.0)
+    assert nbest[0].yseq[1:-1].tolist() == labels.tolist()
+    if window > 0:
+        r, _, offset, end = nbest[0].states["ctc"]
+        assert r.size(0) <= window + 1
+        assert r.size(0) == end - offset
@@ -3,6 +3,8 @@ import pytest
 
 from math import isclose
 
+import torch
+
 kenlm = pytest.importorskip("kenlm")
 
 
@@ -15,3 +17,66 @@ def test_ngram_build(test_sens):
     lm = kenlm.LanguageModel(os.path.join(root, "test.arpa"))
     assert isclose(lm.score(test_sens[0]), -1.04, rel_tol=0.01)
     assert isclose(lm.score(test_sens[1]), -1.18, rel_tol=0.01)
+
+
+token_list = ["<blank>", "I", "like", "apple", "you", "love", "coffee", "<eos>"]
+test_ys = [[7, 1, 2], [7, 4, 5], [7, 1, 5]]
+
+
+def prefix_state(scorer, y, x):
+    state = scorer.init_state(x)
+    for i in range(1, len(y)):
+        _, state = scorer.score_partial_(
+            torch.tensor(y[:i]), torch.tensor([0]), state, x
+        )
+    return state
+
+
+@pytest.mark.parametrize("cache_size", [1, 100])
+def test_ngram_full_batch_score(cache_size):
+    from espnet.nets.scorers.ngram import NgramFullScorer
+
+    scorer = NgramFullScorer(
+        os.path.join(root, "test.arpa"),
+        token_list,
+        cache_size=cache_size,
+        row_cache_size=cache_size,
+    )
+    x = torch.zeros(1, 1)
+    ys = torch.tensor(test_ys)
+    states = [prefix_state(scorer, y, x) for y in test_ys]
+    for _ in range(2):  # the second loop hits the caches
+        scores, out_states = scorer.batch_score(ys, states, x)
+        for i, y in enumerate(ys):
+            score, out_state = scorer.score(y, states[i], x)
+            torch.testing.assert_close(scores[i], score)
+            assert out_states[i] == out_state
+            for j in range(len(token_list)):
+                expected = scorer.lm.BaseScore(
+                    out_state, scorer.chardict[j], kenlm.State()
+                )
+                assert isclose(score[j].item(), expected, rel_tol=1e-6)
+        assert len(scorer.cache) <= cache_size
+        assert len(scorer.row_cache) <= cache_size
+
+
+def test_ngram_partial_batch_score():
+    from espnet.nets.scorers.ngram import NgramPartScorer
+
+    scorer = NgramPartScorer(os.path.join(root, "test.arpa"), token_list)
+    x = torch.zeros(1, 1)
+    ys = torch.tensor(test_ys)
+    states = [prefix_state(scorer, y, x) for y in test_ys]
+    ids = torch.tensor([[1, 2], [4, 6], [3, 7]])
+    scores, out_states = scorer.batch_score_partial(ys, ids, states, x)
+    full_scores, _ = scorer.batch_score_partial(ys, None, states, x)
+    for i, y in enumerate(ys):
+        score, out_state = scorer.score_partial(y, ids[i], states[i], x)
+        torch.testing.assert_close(scores[i, ids[i]], score)
+        torch.testing.assert_close(full_scores[i, ids[i]], score)
+        assert scorer.select_state(out_states, i) == out_state
+        mask = torch.ones(len(token_list), dtype=torch.bool)
+        mask[ids[i]] = False
+        assert (scores[i, mask] == scorer.logzero).all()
+    # No NaN even if the weight is 0
+    assert not torch.isnan(0.0 * scores).any()
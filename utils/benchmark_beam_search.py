@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Benchmark of the WER/latency trade-off of beam search pruning.
+
+Each pruning setting is decoded with espnet2.bin.asr_inference.Speech2Text
+and compared with the unpruned beam search.
+The batch sizes larger than 1 decode the utterances together
+with the multi-utterance beam search (BatchBeamSearchMultiUtt).
+If --asr-train-config is not given, a randomly initialized model is built
+from the default configuration of the unit tests and decodes random speech,
+so that the error rate is measured against the unpruned results.
+
+"""
+
+import argparse
+import logging
+from pathlib import Path
+import string
+import tempfile
+import time
+
+import editdistance
+import numpy as np
+import soundfile
+import torch
+
+from espnet2.bin.asr_inference import Speech2Text
+from espnet2.tasks.asr import ASRTask
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark beam search pruning",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--asr-train-config",
+        type=str,
+        default=None,
+        help="ASR training configuration (random test model if not given)",
+    )
+    parser.add_argument("--asr-model-file", type=str, default=None, help="ASR model")
+    parser.add_argument(
+        "--wav-scp",
+        type=str,
+        default=None,
+        help="wav.scp to decode (random speech if not given)",
+    )
+    parser.add_argument(
+        "--text",
+        type=str,
+        default=None,
+        help="reference text to compute WER "
+        "(the token error rate against the unpruned results if not given)",
+    )
+    parser.add_argument(
+        "--n-utts", type=int, default=5, help="number of random utterances"
+    )
+    parser.add_argument(
+        "--speech-length",
+        type=int,
+        default=16000,
+        help="number of samples of random utterances",
+    )
+    parser.add_argument("--beam-size", type=int, default=10, help="beam size")
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=[1, 5],
+        help="numbers of utterances decoded together to evaluate",
+    )
+    parser.add_argument("--ctc-weight", type=float, default=0.3, help="CTC weight")
+    parser.add_argument(
+        "--maxlenratio",
+        type=float,
+        default=-20,
+        help="max output length ratio (<0 means the constant max length)",
+    )
+    parser.add_argument(
+        "--beam-thresholds",
+        type=float,
+        nargs="*",
+        default=[5.0, 1.0, 0.2],
+        help="beam thresholds to evaluate",
+    )
+    parser.add_argument(
+        "--dynamic-beam-masses",
+        type=float,
+        nargs="*",
+        default=[0.99, 0.9, 0.5],
+        help="posterior masses of the dynamic beam to evaluate",
+    )
+    parser.add_argument(
+        "--min-beam-size",
+        type=int,
+        default=1,
+        help="minimum beam size of the pruning",
+    )
+    parser.add_argument("--device", type=str, default="cpu", help="device")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    return parser
+
+
+def build_test_model(output_dir: Path):
+    """Write a randomly initialized model as in the tests.
+
+    Returns the paths of the configuration and the model file.
+
+    """
+    token_list = output_dir / "tokens.txt"
+    with token_list.open("w") as f:
+        f.write("<blank>\n")
+        for c in string.ascii_letters:
+            f.write(f"{c}\n")
+        f.write("<unk>\n")
+        f.write("<sos/eos>\n")
+    ASRTask.main(
+        cmd=[
+            "--dry_run",
+            "true",
+            "--output_dir",
+            str(output_dir / "asr"),
+            "--token_list",
+            str(token_list),
+            "--token_type",
+            "char",
+            "--decoder",
+            "transformer",
+        ]
+    )
+    config = output_dir / "asr" / "config.yaml"
+    model, _ = ASRTask.build_model_from_file(config)
+    torch.save(model.state_dict(), output_dir / "asr" / "model.pth")
+    return config, output_dir / "asr" / "model.pth"
+
+
+def load_speech(args):
+    """Load the utterances to decode as a dict of key to speech."""
+    if args.wav_scp is None:
+        rng = np.random.RandomState(args.seed)
+        return {
+            f"utt{i}": rng.randn(args.speech_length).astype(np.float32)
+            for i in range(args.n_utts)
+        }
+    speech = {}
+    with open(args.wav_scp) as f:
+        for line in f:
+            key, path = line.rstrip().split(maxsplit=1)
+            speech[key], _ = soundfile.read(path, dtype="float32")
+    return speech
+
+
+def run(speech, asr_train_config, asr_model_file, args, batch_size, **pruning):
+    """Decode all the utterances.
+
+    Returns the best texts, the best token sequences, the elapsed seconds
+    and the number of steps and running hypotheses.
+
+    """
+    speech2text = Speech2Text(
+        asr_train_config=asr_train_config,
+        asr_model_file=asr_model_file,
+        device=args.device,
+        batch_size=batch_size,
+        beam_size=args.beam_size,
+        ctc_weight=args.ctc_weight,
+        maxlenratio=args.maxlenratio,
+        profile_beam_search=True,
+        **pruning,
+    )
+    texts = {}
+    tokens = {}
+    elapsed = 0.0
+    n_steps = 0
+    n_hyps = 0
+    keys = list(speech)
+    for i in range(0, len(keys), batch_size):
+        batch_keys = keys[i : i + batch_size]
+        torch.manual_seed(args.seed)
+        start = time.perf_counter()
+        if batch_size == 1:
+            results = [speech2text(speech[batch_keys[0]])]
+        else:
+            lengths = [len(speech[k]) for k in batch_keys]
+            padded = np.zeros((len(batch_keys), max(lengths)), dtype=np.float32)
+            for j, k in enumerate(batch_keys):
+                padded[j, : lengths[j]] = speech[k]
+            results = speech2text(padded, np.array(lengths))
+        elapsed += time.perf_counter() - start
+        for key, result in zip(batch_keys, results):
+            texts[key], tokens[key], _, _ = result[0]
+        summary = speech2text.beam_search.profiler.summary()
+        n_steps += summary["n_steps"]
+        n_hyps += sum(step["n_hyps"] for step in summary["timeline"])
+    return texts, tokens, elapsed, n_steps, n_hyps
+
+
+def error_rate(results, refs):
+    """Compute the error rate of the results against the references."""
+    n_err = sum(editdistance.eval(results[k], refs[k]) for k in refs)
+    n_ref = sum(len(refs[k]) for k in refs)
+    return 100.0 * n_err / max(n_ref, 1)
+
+
+def main():
+    args = get_parser().parse_args()
+    speech = load_speech(args)
+    with tempfile.TemporaryDirectory() as d:
+        asr_train_config = args.asr_train_config
+        asr_model_file = args.asr_model_file
+        if asr_train_config is None:
+            torch.manual_seed(args.seed)
+            asr_train_config, asr_model_file = build_test_model(Path(d))
+        # suppress the logs of every decoding
+        logging.disable(logging.INFO)
+
+        settings = [("baseline", {})]
+        settings += [
+            (
+                f"beam_threshold={t}",
+                dict(beam_threshold=t, min_beam_size=args.min_beam_size),
+            )
+            for t in args.beam_thresholds
+        ]
+        settings += [
+            (
+                f"dynamic_beam_mass={m}",
+                dict(dynamic_beam_mass=m, min_beam_size=args.min_beam_size),
+            )
+            for m in args.dynamic_beam_masses
+        ]
+        settings += [("early_stop", dict(early_stop=True))]
+
+        refs = None
+        if args.text is not None:
+            refs = {}
+            with open(args.text) as f:
+                for line in f:
+                    key, *text = line.rstrip().split(maxsplit=1)
+                    refs[key] = text[0].split() if len(text) > 0 else []
+        # hyps/step counts the scored hypotheses of all the utterances in a batch
+        print(
+            f"{'setting':28s} {'batch':>5s} {'ER[%]':>7s} {'ms/utt':>9s} "
+            f"{'hyps/step':>9s}"
+        )
+        for batch_size in args.batch_sizes:
+            for name, pruning in settings:
+                texts, tokens, elapsed, n_steps, n_hyps = run(
+                    speech,
+                    asr_train_config,
+                    asr_model_file,
+                    args,
+                    batch_size,
+                    **pruning,
+                )
+                if args.text is None:
+                    results = tokens
+                else:
+                    # compare the words with the reference text
+                    results = {k: v.split() for k, v in texts.items()}
+                if refs is None:
+                    refs = results
+                print(
+                    f"{name:28s} {batch_size:5d} {error_rate(results, refs):7.2f} "
+                    f"{1000 * elapsed / len(speech):9.1f} "
+                    f"{n_hyps / max(n_steps, 1):9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Micro-benchmark of common_collate_fn for various batch sizes.
+
+pad_arrays(), which copies the samples into a tensor allocated at once,
+is compared with the previous implementation converting each sample
+to a tensor and padding them by pad_list(), for each memory type of the output.
+
+"""
+
+import argparse
+import time
+from unittest import mock
+
+import numpy as np
+import torch
+
+from espnet.nets.pytorch_backend.nets_utils import pad_list
+from espnet2.train import collate_fn
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark common_collate_fn",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32, 128],
+        help="batch sizes",
+    )
+    parser.add_argument(
+        "--min-length", type=int, default=100, help="minimum number of frames"
+    )
+    parser.add_argument(
+        "--max-length", type=int, default=1500, help="maximum number of frames"
+    )
+    parser.add_argument("--feat-dim", type=int, default=80, help="feature dimension")
+    parser.add_argument(
+        "--text-length", type=int, default=100, help="maximum number of tokens"
+    )
+    parser.add_argument(
+        "--n-iters", type=int, default=20, help="number of iterations to average"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    return parser
+
+
+def pad_list_arrays(arrays, pad_value, shared_memory=False, pin_memory=False):
+    """The previous implementation converting each array by pad_list()."""
+    tensor = pad_list([torch.from_numpy(a) for a in arrays], pad_value)
+    if shared_memory:
+        tensor.share_memory_()
+    if pin_memory:
+        tensor = tensor.pin_memory()
+    return tensor
+
+
+def make_batch(rng, batch_size, args):
+    """Make a mini-batch of random speech features and token sequences."""
+    batch = []
+    for i in range(batch_size):
+        length = rng.randint(args.min_length, args.max_length + 1)
+        text_length = rng.randint(1, args.text_length + 1)
+        batch.append(
+            (
+                f"utt{i}",
+                dict(
+                    speech=rng.randn(length, args.feat_dim).astype(np.float32),
+                    text=rng.randint(0, 5000, text_length).astype(np.int64),
+                ),
+            )
+        )
+    return batch
+
+
+def measure(pad_func, batches, **kwargs):
+    """Returns the average milliseconds per mini-batch."""
+    # Replace the padding function only, not to measure the other overheads
+    with mock.patch.object(collate_fn, "pad_arrays", pad_func):
+        start = time.perf_counter()
+        for batch in batches:
+            collate_fn.common_collate_fn(batch, **kwargs)
+        return 1000 * (time.perf_counter() - start) / len(batches)
+
+
+def main():
+    args = get_parser().parse_args()
+    rng = np.random.RandomState(args.seed)
+
+    memories = [("", {}), ("(shared)", dict(shared_memory=True))]
+    if torch.cuda.is_available():
+        memories.append(("(pinned)", dict(pin_memory=True)))
+    settings = []
+    for suffix, kwargs in memories:
+        settings += [
+            (f"pad_list{suffix}", pad_list_arrays, kwargs),
+            (f"pad_arrays{suffix}", collate_fn.pad_arrays, kwargs),
+        ]
+
+    print(f"{'padding':28s} {'batch':>6s} {'ms/batch':>9s} {'speedup':>8s}")
+    for batch_size in args.batch_sizes:
+        batches = [make_batch(rng, batch_size, args) for _ in range(args.n_iters)]
+        # warm up
+        for _, pad_func, kwargs in settings:
+            measure(pad_func, batches[:1], **kwargs)
+
+        for i, (name, pad_func, kwargs) in enumerate(settings):
+            ms = measure(pad_func, batches, **kwargs)
+            if i % 2 == 0:
+                # pad_list with the same memory
+                baseline = ms
+            print(f"{name:28s} {batch_size:6d} {ms:9.3f} {baseline / ms:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Micro-benchmark of CTCPrefixScoreTH for various beam and vocabulary sizes."""
+
+import argparse
+import time
+
+import torch
+
+from espnet.nets.ctc_prefix_score import CTCPrefixScoreTH
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark CTC prefix scoring",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--beam-sizes", type=int, nargs="+", default=[1, 5, 10, 20], help="beam sizes"
+    )
+    parser.add_argument(
+        "--vocab-sizes",
+        type=int,
+        nargs="+",
+        default=[100, 500, 5000],
+        help="vocabulary sizes",
+    )
+    parser.add_argument(
+        "--chunk-sizes",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="chunk sizes of the forward recursion (1 means frame-by-frame)",
+    )
+    parser.add_argument(
+        "--input-length", type=int, default=200, help="number of encoder frames"
+    )
+    parser.add_argument(
+        "--output-length", type=int, default=10, help="number of decoding steps"
+    )
+    parser.add_argument(
+        "--pre-beam-ratio",
+        type=float,
+        default=1.5,
+        help="pre-beam ratio to select the labels to score (0 scores all labels)",
+    )
+    parser.add_argument("--device", type=str, default="cpu", help="device")
+    parser.add_argument("--dtype", type=str, default="float32", help="data type")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    return parser
+
+
+def run(x, beam, chunk_size, output_length, pre_beam_ratio):
+    """Run prefix scoring of `output_length` steps.
+
+    Returns the elapsed seconds and the scores of the last step.
+
+    """
+    odim = x.size(-1)
+    eos = odim - 1
+    scorer = CTCPrefixScoreTH(x.clone(), [x.size(1)], 0, eos, chunk_size=chunk_size)
+    snum = min(int(beam * pre_beam_ratio), odim)
+    y = [[eos] for _ in range(beam)]
+    state = None
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(output_length):
+        scoring_ids = None
+        if pre_beam_ratio > 0:
+            scoring_ids = torch.stack(
+                [torch.randperm(odim, device=x.device)[:snum] for _ in y]
+            )
+        scores, state_full = scorer(y, state, scoring_ids)
+        best_ids = scores.view(1, -1).topk(beam, dim=1)[1]
+        state = scorer.index_select_state(state_full, best_ids)
+        y = [y[i // odim] + [i % odim] for i in best_ids.view(-1).tolist()]
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    return time.perf_counter() - start, scores
+
+
+def main():
+    args = get_parser().parse_args()
+    torch.manual_seed(args.seed)
+    dtype = getattr(torch, args.dtype)
+
+    print(
+        "beam vocab "
+        + " ".join(f"chunk={c:<4d}[ms/step]" for c in args.chunk_sizes)
+        + " max_diff"
+    )
+    with torch.no_grad():
+        for odim in args.vocab_sizes:
+            x = torch.randn(1, args.input_length, odim, device=args.device)
+            x = x.to(dtype).log_softmax(dim=-1)
+            for beam in args.beam_sizes:
+                elapsed = []
+                scores = []
+                for chunk_size in args.chunk_sizes:
+                    # use the same scoring ids for all the chunk sizes
+                    torch.manual_seed(args.seed)
+                    e, s = run(
+                        x, beam, chunk_size, args.output_length, args.pre_beam_ratio
+                    )
+                    elapsed.append(e)
+                    scores.append(s)
+                max_diff = max((s - scores[0]).abs().max().item() for s in scores)
+                print(
+                    f"{beam:4d} {odim:5d} "
+                    + " ".join(
+                        f"{1000 * e / args.output_length:21.3f}" for e in elapsed
+                    )
+                    + f" {max_diff:.2e}"
+                )
+
+
+if __name__ == "__main__":
+    main()